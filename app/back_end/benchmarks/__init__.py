@@ -0,0 +1,7 @@
+"""
+Benchmarks of the data processing of the back-end.
+
+Every benchmark is a module run from the `app/back_end` directory, e.g.
+`python -m benchmarks.parse_lovd --variants 100000`. Inputs are generated synthetically by the
+`synthetic` module, so no download is needed.
+"""
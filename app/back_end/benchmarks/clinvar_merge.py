@@ -0,0 +1,162 @@
+"""
+Benchmark of the LOVD and ClinVar merge against a merge of the whole export on name strings.
+
+The reference implementation reads the whole ClinVar export at once, extracts the transcript and
+cDNA position of every name and joins both tables with `pd.merge` on the resulting strings.
+`merge_clinvar_lovd` reads the export batch by batch, only parses the names on the transcripts of
+the LOVD variants and probes an index of the LOVD variants. Both must produce the same rows.
+
+Usage:
+    python -m benchmarks.clinvar_merge --records 1000000 --lovd-variants 20000
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.data.refactoring import (
+    parse_lovd,
+    parse_clinvar,
+    set_lovd_dtypes,
+    from_clinvar_names_to_cdna_positions,
+)
+from src.data.clinvar_merge import (
+    CLINVAR_SUFFIX,
+    merge_clinvar_lovd,
+    key_lovd_transcript_variants,
+    transcript_variant_keys,
+)
+from .synthetic import write_lovd_file, write_clinvar_file
+
+# Number of ClinVar records read at a time, as in the merge route
+CLINVAR_BATCH_ROWS = 100_000
+
+
+def _measure(function, *args, **kwargs):
+    """
+    Run a function twice, measuring its wall time and then its peak traced memory.
+
+    Tracing memory slows down allocations, so the time is measured on a separate run.
+
+    Returns:
+        tuple: The result of the function, the seconds it took and the peak memory in bytes.
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        function(*args, **kwargs)
+        return result, seconds, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def reference_merge(lovd, transcripts, clinvar_path, output_path):
+    """
+    Merge LOVD and ClinVar data by reading the whole export and joining on name strings.
+
+    Args:
+        lovd (DataFrame): The LOVD variants on transcripts.
+        transcripts (DataFrame): The LOVD transcripts.
+        clinvar_path (str): The path of the ClinVar export.
+        output_path (str): The path to write the merged CSV to.
+
+    Returns:
+        int: The number of merged rows.
+    """
+    clinvar = parse_clinvar(clinvar_path).add_suffix(CLINVAR_SUFFIX)
+    names = clinvar["Name" + CLINVAR_SUFFIX]
+    accessions = names.str.extract(r"^\s*([A-Z]{2}_\d+)(?:\.\d+)?[(:]", expand=False)
+    clinvar["key"] = transcript_variant_keys(
+        accessions, from_clinvar_names_to_cdna_positions(names)
+    ).fillna("clinvar")
+
+    lovd = lovd.assign(key=key_lovd_transcript_variants(lovd, transcripts).fillna("lovd"))
+    merged = pd.merge(lovd, clinvar, how="outer", on="key").drop(columns="key")
+    merged.to_csv(output_path, index=False)
+    return len(merged)
+
+
+def indexed_merge(lovd, transcripts, clinvar_path, output_path):
+    """
+    Merge LOVD and ClinVar data with `merge_clinvar_lovd`.
+
+    Args:
+        lovd (DataFrame): The LOVD variants on transcripts.
+        transcripts (DataFrame): The LOVD transcripts.
+        clinvar_path (str): The path of the ClinVar export.
+        output_path (str): The path to write the merged CSV to.
+
+    Returns:
+        int: The number of merged rows.
+    """
+    with open(output_path, "w", encoding="utf-8", newline="") as output:
+        return merge_clinvar_lovd(
+            lovd, transcripts, parse_clinvar(clinvar_path, CLINVAR_BATCH_ROWS), output
+        )
+
+
+def _row_hashes(path):
+    """
+    Hash the rows of a merged CSV file, sorted, so that files of the same rows compare equal.
+
+    Args:
+        path (str): The path of the merged CSV file.
+
+    Returns:
+        np.ndarray: The sorted hashes of the rows, as written.
+    """
+    frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return np.sort(pd.util.hash_pandas_object(frame, index=False).to_numpy())
+
+
+def main():
+    """
+    Run the benchmark and print its results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--lovd-variants", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        lovd_path = os.path.join(directory, "lovd.txt")
+        clinvar_path = os.path.join(directory, "clinvar.txt")
+        write_lovd_file(lovd_path, args.lovd_variants)
+        write_clinvar_file(clinvar_path, args.records, args.lovd_variants)
+
+        tables = parse_lovd(lovd_path, save_to=None,
+                            tables=["Variants_On_Transcripts", "Transcripts"])
+        set_lovd_dtypes(tables)
+        lovd, transcripts = tables["Variants_On_Transcripts"], tables["Transcripts"]
+
+        reference_path = os.path.join(directory, "reference.csv")
+        indexed_path = os.path.join(directory, "indexed.csv")
+        _, reference_time, reference_memory = _measure(
+            reference_merge, lovd, transcripts, clinvar_path, reference_path
+        )
+        rows, indexed_time, indexed_memory = _measure(
+            indexed_merge, lovd, transcripts, clinvar_path, indexed_path
+        )
+
+        same = np.array_equal(_row_hashes(reference_path), _row_hashes(indexed_path))
+        result = pd.read_csv(indexed_path, usecols=["id", "Name" + CLINVAR_SUFFIX], dtype=str)
+        matched = result["Name" + CLINVAR_SUFFIX].notna() & result["id"].notna()
+
+    print(f"ClinVar records: {args.records}, LOVD variants: {args.lovd_variants}")
+    print(f"Merged rows: {rows}, of which matched: {int(matched.sum())}")
+    print(f"Same rows: {same}")
+    print(f"whole export, string join: {reference_time:8.2f} s {reference_memory / 2**20:8.0f} MiB")
+    print(f"batches, indexed join:     {indexed_time:8.2f} s {indexed_memory / 2**20:8.0f} MiB")
+    print(f"Speedup: {reference_time / indexed_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Benchmark of the memory of an LOVD and gnomAD merge with the declared column types.
+
+Sources used to keep the types inferred by the parsers: `set_gnomad_dtypes` discarded the result
+of `convert_dtypes`, and `set_lovd_dtypes` converted text to `string` columns holding one Python
+object per value, so that merged tables were dominated by Python strings. The former conversions
+are kept here as `legacy_set_lovd_dtypes` and `legacy_set_gnomad_dtypes` for comparison, against
+the schemas of `src.data.schemas`.
+
+Both runs parse the sources, convert their types and merge them in memory, as the merge route
+does for gnomAD exports smaller than `PARTITIONED_MERGE_BYTES`. They must merge the same pairs of
+LOVD and gnomAD rows. LOVD variants only known on hg19 are converted, so the hg19 to hg38 chain
+file must be installed, as for the merge route.
+
+Usage:
+    python -m benchmarks.merge_dtypes --records 1000000 --lovd-variants 20000
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.data.refactoring import (
+    parse_lovd,
+    parse_gnomad,
+    set_lovd_dtypes,
+    set_gnomad_dtypes,
+    merge_gnomad_lovd,
+)
+from .synthetic import write_lovd_file, write_gnomad_file
+
+MERGED_TABLES = ["Variants_On_Genome", "Variants_On_Transcripts"]
+
+
+def legacy_set_lovd_dtypes(tables):
+    """
+    The former implementation of `set_lovd_dtypes`.
+
+    Args:
+        tables (dict): The LOVD tables by name, converted in place.
+    """
+    for name, frame in tables.items():
+        tables[name] = frame.convert_dtypes()
+
+
+def legacy_set_gnomad_dtypes(data):
+    """
+    The former implementation of `set_gnomad_dtypes`, which left the data as it was parsed.
+
+    Args:
+        data (DataFrame): The gnomAD data.
+    """
+    data.convert_dtypes()
+
+
+def merge_sources(lovd_path, gnomad_path, set_lovd, set_gnomad):
+    """
+    Parse both sources, convert their types and merge them in memory, as the merge route does.
+
+    Args:
+        lovd_path (str): The path of the LOVD download.
+        gnomad_path (str): The path of the gnomAD export.
+        set_lovd (callable): Converts the types of the LOVD tables.
+        set_gnomad (callable): Converts the types of the gnomAD data.
+
+    Returns:
+        DataFrame: The merged data.
+    """
+    tables = parse_lovd(lovd_path, save_to=None, tables=MERGED_TABLES)
+    set_lovd(tables)
+    lovd = pd.merge(
+        tables["Variants_On_Transcripts"],
+        tables["Variants_On_Genome"][["id", "VariantOnGenome/DNA", "VariantOnGenome/DNA/hg38"]],
+        on="id",
+        how="left",
+    )
+    del tables
+
+    gnomad = parse_gnomad(gnomad_path)
+    set_gnomad(gnomad)
+    return merge_gnomad_lovd(lovd, gnomad)
+
+
+def _measure(function, *args):
+    """
+    Run a function twice, measuring its wall time and then its peak traced memory.
+
+    Tracing memory slows down allocations, so the time is measured on a separate run.
+
+    Returns:
+        tuple: The result of the function, the seconds it took and the peak memory in bytes.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    del result
+
+    tracemalloc.start()
+    try:
+        result = function(*args)
+        return result, seconds, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _pair_hashes(merged):
+    """
+    Hash the pairs of LOVD and gnomAD rows of a merge, sorted.
+
+    Args:
+        merged (DataFrame): The merged data.
+
+    Returns:
+        np.ndarray: The sorted hashes of the pairs of LOVD ID and gnomAD variant ID.
+    """
+    pairs = merged[["id", "variant_id_gnomad"]].astype(object).fillna("").astype(str)
+    return np.sort(pd.util.hash_pandas_object(pairs, index=False).to_numpy())
+
+
+def _object_share(frame):
+    """
+    Return the share of the memory of a table held by columns of Python objects.
+
+    Args:
+        frame (DataFrame): The table.
+
+    Returns:
+        float: The share, between 0 and 1.
+    """
+    usage = frame.memory_usage(deep=True, index=False)
+    objects = [column for column in frame.columns if frame[column].dtype == object
+               or getattr(frame[column].dtype, "storage", None) == "python"]
+    return usage[objects].sum() / usage.sum()
+
+
+def main():
+    """
+    Run the benchmark and print its results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--lovd-variants", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        lovd_path = os.path.join(directory, "lovd.txt")
+        gnomad_path = os.path.join(directory, "gnomad.csv")
+        write_lovd_file(lovd_path, args.lovd_variants)
+        write_gnomad_file(gnomad_path, args.records, args.lovd_variants)
+        gnomad_size = os.path.getsize(gnomad_path)
+
+        results = {}
+        for name, set_lovd, set_gnomad in [
+            ("legacy types", legacy_set_lovd_dtypes, legacy_set_gnomad_dtypes),
+            ("declared schemas", set_lovd_dtypes, set_gnomad_dtypes),
+        ]:
+            merged, seconds, peak = _measure(
+                merge_sources, lovd_path, gnomad_path, set_lovd, set_gnomad
+            )
+            size = merged.memory_usage(deep=True, index=False).sum()
+            results[name] = (seconds, peak, size, _object_share(merged), _pair_hashes(merged))
+            rows = len(merged)
+            del merged
+
+    legacy, declared = results["legacy types"], results["declared schemas"]
+    print(f"gnomAD records: {args.records} ({gnomad_size / 2**20:.0f} MiB), "
+          f"LOVD variants: {args.lovd_variants}, merged rows: {rows}")
+    print(f"Same pairs of rows: {np.array_equal(legacy[4], declared[4])}")
+    print(f"{'':18}{'time':>10}{'peak memory':>14}{'merged table':>14}{'objects':>9}")
+    for name, (seconds, peak, size, share, _) in results.items():
+        print(f"{name:18}{seconds:8.2f} s{peak / 2**20:10.0f} MiB{size / 2**20:10.0f} MiB"
+              f"{share:8.0%}")
+    print(f"Peak memory: {legacy[1] / declared[1]:.1f}x lower, "
+          f"merged table: {legacy[2] / declared[2]:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
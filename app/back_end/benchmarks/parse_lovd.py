@@ -0,0 +1,141 @@
+"""
+Benchmark of `parse_lovd` against the former row by row implementation.
+
+The former implementation appended every row to its table with `pd.concat`, which copies the
+table each time and is quadratic in the number of rows, then inferred the type of every value
+separately. It is kept here as `legacy_parse_lovd` for comparison. Since it takes minutes on large
+files, it runs on fewer variants (`--legacy-variants`, and half as many) and its time for the full
+file is extrapolated from a fit of `a * n + b * n**2` to both runs.
+
+Both implementations must produce the same CSV output, which is checked on the smaller file.
+
+Usage:
+    python -m benchmarks.parse_lovd --variants 100000 --legacy-variants 10000
+"""
+
+import io
+import os
+import time
+import argparse
+import tempfile
+
+import pandas as pd
+from pandas import DataFrame
+
+from src.data.refactoring import infer_type, parse_lovd
+from .synthetic import write_lovd_file
+
+MERGED_TABLES = ["Variants_On_Genome", "Variants_On_Transcripts"]
+
+
+def legacy_parse_lovd(path):
+    """
+    The former implementation of `parse_lovd`, without saving the tables.
+
+    Args:
+        path (str): The path of the LOVD file.
+
+    Returns:
+        dict: The tables of the file by name.
+    """
+    d = {}
+    with open(path, encoding="UTF-8") as f:
+        [f.readline() for _ in range(4)]  # pylint: disable=expression-not-assigned
+
+        while True:
+            line = f.readline()
+            if line == '':
+                break
+
+            table_name = line.split("##")[1].strip()
+            line = f.readline()
+            while line.startswith("##"):
+                line = f.readline()
+
+            table_header = [column[3:-3] for column in line[:-1].split('\t')]
+            frame = DataFrame([], columns=table_header)
+            line = f.readline()
+            while line != '\n':
+                variables = [variable[1:-1] for variable in line[:-1].split('\t')]
+                observation = DataFrame([variables], columns=table_header)
+                frame = pd.concat([frame, observation], ignore_index=True)
+                line = f.readline()
+
+            for col in frame.columns:
+                frame[col] = frame[col].apply(infer_type)
+
+            d[table_name] = frame
+            f.readline()
+
+    return d
+
+
+def _measure(function, *args, **kwargs):
+    """
+    Run a function once and measure its wall time.
+
+    Returns:
+        tuple: The result of the function and the seconds it took.
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _to_csv(tables):
+    """
+    Serialize tables as CSV, to compare the output of two parsers.
+
+    Returns:
+        dict: The CSV text of every table by name.
+    """
+    return {name: frame.to_csv(index=False) for name, frame in tables.items()}
+
+
+def main():
+    """
+    Run the benchmark and print its results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--variants", type=int, default=100_000)
+    parser.add_argument("--legacy-variants", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "lovd_data.txt")
+        legacy_path = os.path.join(directory, "lovd_legacy.txt")
+        half_path = os.path.join(directory, "lovd_half.txt")
+        write_lovd_file(path, args.variants)
+        write_lovd_file(legacy_path, args.legacy_variants)
+        write_lovd_file(half_path, args.legacy_variants // 2)
+
+        print(f"LOVD file: {args.variants} variants, {os.path.getsize(path) / 2**20:.1f} MiB")
+
+        legacy, legacy_time = _measure(legacy_parse_lovd, legacy_path)
+        _, half_time = _measure(legacy_parse_lovd, half_path)
+        current, _ = _measure(parse_lovd, legacy_path, save_to=None)
+        print(f"Same CSV output on {args.legacy_variants} variants: "
+              f"{_to_csv(legacy) == _to_csv(current)}")
+
+        _, all_time = _measure(parse_lovd, path, save_to=None)
+        _, merged_time = _measure(parse_lovd, path, save_to=None, tables=MERGED_TABLES)
+        _, stream_time = _measure(
+            parse_lovd, io.StringIO(open(path, encoding="utf-8").read()), save_to=None,
+            tables=MERGED_TABLES,
+        )
+
+    # Fit t(n) = a * n + b * n**2 through both legacy runs
+    n, m = args.legacy_variants, args.legacy_variants // 2
+    quadratic = max((legacy_time / n - half_time / m) / (n - m), 0)
+    linear = legacy_time / n - quadratic * n
+    estimate = linear * args.variants + quadratic * args.variants**2
+    print(f"legacy parse_lovd, {args.legacy_variants} variants: {legacy_time:8.2f} s")
+    print(f"legacy parse_lovd, {args.variants} variants:  {estimate:8.2f} s (extrapolated)")
+    print(f"parse_lovd, all tables:                {all_time:8.2f} s")
+    print(f"parse_lovd, merged tables:             {merged_time:8.2f} s")
+    print(f"parse_lovd, merged tables from memory: {stream_time:8.2f} s")
+    print(f"Speedup: {estimate / all_time:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Generators of synthetic source files for the benchmarks.
+
+The files follow the layout of the real downloads, with values drawn from a seeded random
+generator, so that a benchmark always runs on the same data for the same arguments.
+
+Functions:
+- write_lovd_file: Writes an LOVD download with the given number of variants.
+- write_clinvar_file: Writes a ClinVar export with the given number of records, some of them
+    reporting the variants of an LOVD download.
+- write_gnomad_file: Writes a gnomAD export with the given number of records, some of them
+    reporting the variants of an LOVD download.
+"""
+
+import random
+
+NUCLEOTIDES = "ACGT"
+
+LOVD_GENOME_COLUMNS = [
+    "id", "allele", "effectid", "chromosome", "position_g_start", "position_g_end", "type",
+    "average_frequency", "owned_by", "VariantOnGenome/DBID", "VariantOnGenome/DNA",
+    "VariantOnGenome/DNA/hg38", "VariantOnGenome/Frequency", "VariantOnGenome/Reference",
+    "VariantOnGenome/Remarks", "created_date",
+]
+
+CLINVAR_COLUMNS = [
+    "Name", "Gene(s)", "Protein change", "Condition(s)", "Accession", "GRCh37Chromosome",
+    "GRCh37Location", "GRCh38Chromosome", "GRCh38Location", "VariationID", "AlleleID(s)",
+    "dbSNP ID", "Canonical SPDI", "Variant type", "Molecular consequence",
+    "Germline classification", "Germline date last evaluated", "Germline review status",
+]
+
+CLINVAR_CLASSIFICATIONS = [
+    "Pathogenic", "Likely pathogenic", "Uncertain significance", "Likely benign", "Benign",
+    "Conflicting classifications of pathogenicity",
+]
+
+GNOMAD_POPULATIONS = {
+    "afr": "African/African American", "eas": "East Asian", "asj": "Ashkenazi Jew",
+    "sas": "South Asian", "nfe": "European (non-Finnish)", "fin": "European (Finnish)",
+    "mid": "Middle Eastern", "amr": "Admixed American", "ami": "Amish", "remaining": "Remaining",
+}
+
+GNOMAD_COLUMNS = [
+    "variant_id", "chrom", "pos", "ref", "alt", "rsid", "filters", "flags", "HGVS Consequence",
+    "Protein Consequence", "Transcript Consequence", "ClinVar Clinical Significance", "total_ac",
+    "total_an", "Allele Frequency", "Homozygote Count",
+    *[f"Allele_Frequency_{population}" for population in GNOMAD_POPULATIONS],
+    "Popmax", "Popmax population",
+]
+
+GNOMAD_CONSEQUENCES = [
+    "missense_variant", "synonymous_variant", "intron_variant", "splice_region_variant",
+    "stop_gained", "frameshift_variant", "3_prime_UTR_variant",
+]
+
+LOVD_TRANSCRIPT_COLUMNS = [
+    "id", "transcriptid", "effectid", "position_c_start", "position_c_start_intron",
+    "position_c_end", "position_c_end_intron", "VariantOnTranscript/DNA",
+    "VariantOnTranscript/Exon", "VariantOnTranscript/Protein", "VariantOnTranscript/RNA",
+]
+
+
+def _write_table(file, name, header, rows, notes=()):
+    """
+    Write one table of an LOVD download.
+
+    Args:
+        file (file-like): The text stream to write to.
+        name (str): The name of the table.
+        header (list): The names of the columns.
+        rows (iterable): The rows of the table, as lists of values.
+        notes (iterable): The notes written below the name of the table.
+    """
+    file.write(f"## {name} ## Do not remove or alter this header ##\n")
+    for note in notes:
+        file.write(f"## {note}\n")
+    file.write("\t".join(f'"{{{{{column}}}}}"' for column in header) + "\n")
+    for row in rows:
+        file.write("\t".join(f'"{value}"' for value in row) + "\n")
+    file.write("\n\n")
+
+
+def _lovd_variants(variants, rng):
+    """
+    Generate the genomic and transcript rows of synthetic LOVD variants.
+
+    Args:
+        variants (int): The number of variants.
+        rng (random.Random): The random generator.
+
+    Yields:
+        tuple: The row of the variant in `Variants_On_Genome` and in `Variants_On_Transcripts`.
+    """
+    position = 64_000_000
+    for i in range(1, variants + 1):
+        position += rng.randint(1, 40)
+        ref, alt = rng.sample(NUCLEOTIDES, 2)
+        kind = rng.random()
+        if kind < 0.8:
+            dna = f"g.{position}{ref}>{alt}"
+            cdna = f"c.{i * 3}{ref}>{alt}"
+        elif kind < 0.9:
+            dna = f"g.{position}del"
+            cdna = f"c.{i * 3}del"
+        else:
+            dna = f"g.{position}_{position + 2}dup"
+            cdna = f"c.{i * 3}_{i * 3 + 2}dup"
+        # Some variants are only known on hg19
+        hg38 = "" if rng.random() < 0.1 else dna.replace(str(position), str(position - 1_000))
+        frequency = f"{rng.random() / 100:.6f}" if rng.random() < 0.3 else ""
+
+        yield (
+            [
+                f"{i:010d}", "0", "55", "6", position, position, "subst", frequency,
+                f"{rng.randint(1, 500):05d}", f"EYS_{i:06d}", dna, hg38, "",
+                f"{{PMID:Author {rng.randint(2000, 2024)}:{rng.randint(10**7, 10**8)}}}",
+                "", "2024-01-01 12:00:00",
+            ],
+            [
+                f"{i:010d}", "00025123", "55", i * 3, 0, i * 3, 0, cdna,
+                f"{rng.randint(1, 44)}{'i' if rng.random() < 0.05 else ''}", "p.(=)", "r.(?)",
+            ],
+        )
+
+
+def write_lovd_file(path, variants, seed=0):
+    """
+    Write an LOVD download with the given number of variants.
+
+    The download holds the `Genes`, `Transcripts`, `Diseases`, `Variants_On_Genome` and
+    `Variants_On_Transcripts` tables, every variant having one row in each of the last two.
+
+    Args:
+        path (str): The path of the file to write.
+        variants (int): The number of variants.
+        seed (int): The seed of the random generator.
+    """
+    rng = random.Random(seed)
+    genome_rows = []
+    transcript_rows = []
+    for genome_row, transcript_row in _lovd_variants(variants, rng):
+        genome_rows.append(genome_row)
+        transcript_rows.append(transcript_row)
+
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(
+            "### LOVD-version 3000-290 ### Full data download ### To import, do not remove or "
+            "alter this header ###\n"
+        )
+        file.write('## Filter: (gene_id = "EYS")\n')
+        file.write("# charset = UTF-8\n\n")
+
+        _write_table(
+            file, "Genes", ["id", "name", "chromosome", "chrom_band"],
+            [["EYS", "eyes shut homolog", "6", "q12"]], ["Count = 1"],
+        )
+        _write_table(
+            file, "Transcripts", ["id", "geneid", "name", "id_ncbi"],
+            [["00025123", "EYS", "transcript variant 1", "NM_001142800.2"]], ["Count = 1"],
+        )
+        _write_table(
+            file, "Diseases", ["id", "symbol", "name"],
+            [["00112", "RP", "retinitis pigmentosa"]], ["Count = 1"],
+        )
+        _write_table(
+            file, "Variants_On_Genome", LOVD_GENOME_COLUMNS, genome_rows,
+            [f"Count = {variants}"],
+        )
+        _write_table(
+            file, "Variants_On_Transcripts", LOVD_TRANSCRIPT_COLUMNS, transcript_rows,
+            [f"Count = {variants}"],
+        )
+
+
+def write_clinvar_file(path, records, lovd_variants=0, shared=0.5, seed=0):
+    """
+    Write a ClinVar export with the given number of records.
+
+    Records report substitutions on transcripts of many genes. A share of the variants of the
+    LOVD download written by `write_lovd_file` with `lovd_variants` variants and the same seed are
+    reported too, on a later version of its transcript.
+
+    Args:
+        path (str): The path of the file to write.
+        records (int): The number of records.
+        lovd_variants (int): The number of variants of the LOVD download.
+        shared (float): The share of the LOVD variants reported in ClinVar.
+        seed (int): The seed of the random generator.
+    """
+    # The LOVD variants are generated again from the seed of the LOVD download
+    lovd_rng = random.Random(seed)
+    rng = random.Random(seed + 1)
+    lovd_cdna = [
+        transcript_row[7] for _, transcript_row in _lovd_variants(lovd_variants, lovd_rng)
+        if rng.random() < shared
+    ][:records]
+    lovd_records = set(rng.sample(range(records), len(lovd_cdna)))
+
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("\t".join(CLINVAR_COLUMNS) + "\n")
+        lovd_index = 0
+        for i in range(records):
+            if i in lovd_records:
+                gene, transcript = "EYS", "NM_001142800.3"
+                cdna = lovd_cdna[lovd_index]
+                lovd_index += 1
+            else:
+                gene_number = rng.randint(1, 20_000)
+                gene, transcript = f"GENE{gene_number}", f"NM_{gene_number:06d}.{rng.randint(1, 4)}"
+                ref, alt = rng.sample(NUCLEOTIDES, 2)
+                cdna = f"c.{rng.randint(1, 10_000)}{ref}>{alt}"
+            position = rng.randint(1, 10**8)
+            file.write("\t".join([
+                f"{transcript}({gene}):{cdna} (p.Glu{rng.randint(1, 3000)}Gly)", gene,
+                f"E{rng.randint(1, 3000)}G", "not provided", f"VCV{i:09d}", "6", str(position),
+                "6", str(position - 1_000), str(i), str(i + 10**6), f"rs{rng.randint(1, 10**9)}",
+                f"NC_000006.12:{position}:A:G", "single nucleotide variant", "missense variant",
+                rng.choice(CLINVAR_CLASSIFICATIONS), "Jan 01, 2024",
+                "criteria provided, single submitter",
+            ]) + "\n")
+
+
+def write_gnomad_file(path, records, lovd_variants=0, shared=0.5, seed=0):
+    """
+    Write a gnomAD export with the given number of records, in the format of the gnomAD download.
+
+    Records report substitutions on chromosome 6. A share of the substitutions of the LOVD
+    download written by `write_lovd_file` with `lovd_variants` variants and the same seed are
+    reported too, at their hg38 position.
+
+    Args:
+        path (str): The path of the file to write.
+        records (int): The number of records.
+        lovd_variants (int): The number of variants of the LOVD download.
+        shared (float): The share of the LOVD substitutions reported in gnomAD.
+        seed (int): The seed of the random generator.
+    """
+    # The LOVD variants are generated again from the seed of the LOVD download
+    lovd_rng = random.Random(seed)
+    rng = random.Random(seed + 2)
+    lovd_variants = [
+        genome_row[11] for genome_row, _ in _lovd_variants(lovd_variants, lovd_rng)
+        if ">" in genome_row[11] and rng.random() < shared
+    ][:records]
+    lovd_records = dict(zip(sorted(rng.sample(range(records), len(lovd_variants))), lovd_variants))
+    populations = list(GNOMAD_POPULATIONS)
+
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(",".join(f'"{column}"' for column in GNOMAD_COLUMNS) + "\n")
+        for i in range(records):
+            if i in lovd_records:
+                # e.g. g.63999394T>G
+                position, ref, alt = lovd_records[i][2:-3], lovd_records[i][-3], lovd_records[i][-1]
+            else:
+                position = str(rng.randint(1, 170_000_000))
+                ref, alt = rng.sample(NUCLEOTIDES, 2)
+            allele_number = rng.randint(100_000, 1_600_000)
+            allele_count = rng.randint(1, 1_000)
+            frequencies = [rng.random() / 100 if rng.random() < 0.5 else 0.0 for _ in populations]
+            popmax = max(range(len(populations)), key=frequencies.__getitem__)
+            file.write(",".join([
+                f"6-{position}-{ref}-{alt}", "6", position, ref, alt, f"rs{rng.randint(1, 10**9)}",
+                "PASS" if rng.random() < 0.9 else "AC0", "" if rng.random() < 0.95 else "LCR",
+                f"c.{rng.randint(1, 10_000)}{ref}>{alt}", f"p.Glu{rng.randint(1, 3000)}Gly",
+                rng.choice(GNOMAD_CONSEQUENCES),
+                rng.choice(CLINVAR_CLASSIFICATIONS) if rng.random() < 0.1 else "",
+                str(allele_count), str(allele_number), repr(allele_count / allele_number),
+                str(rng.randint(0, 10)), *map(repr, frequencies), repr(frequencies[popmax]),
+                GNOMAD_POPULATIONS[populations[popmax]] if frequencies[popmax] else "",
+            ]) + "\n")
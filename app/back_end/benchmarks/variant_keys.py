@@ -0,0 +1,92 @@
+"""
+Benchmark of joins on packed variant keys against joins on variant ID strings.
+
+Two tables of variant IDs in the gnomAD format ('6-123-A-G') are joined the way LOVD and gnomAD
+data are merged, once on the ID strings and once on the keys of `pack_variant_keys`. Packing the
+keys is measured separately, since it happens once per table and is shared by every later join,
+deduplication and lookup. Both joins must match the same pairs of rows.
+
+Usage:
+    python -m benchmarks.variant_keys --variants 1000000
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.data.variant_keys import variant_keys_from_ids
+
+
+def _measure(function, *args, **kwargs):
+    """
+    Run a function once and measure its wall time.
+
+    Returns:
+        tuple: The result of the function and the seconds it took.
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _variant_ids(variants, seed=0):
+    """
+    Generate variant IDs of substitutions and short indels in the gnomAD format.
+
+    Args:
+        variants (int): The number of variants.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        pd.Series: The variant IDs.
+    """
+    rng = np.random.default_rng(seed)
+    chromosomes = rng.choice(["1", "6", "X"], variants)
+    positions = rng.integers(1, 2**28, variants).astype(str)
+    refs = rng.choice(list("ACGT"), variants)
+    alts = rng.choice(["A", "C", "G", "T", "AT", "GTTC", "ACGTACGTACGTAAAT"], variants)
+    return pd.Series(chromosomes).str.cat([positions, refs, alts], sep="-")
+
+
+def main():
+    """
+    Run the benchmark and print its results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--variants", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    ids = _variant_ids(args.variants)
+    left = pd.DataFrame({"variant_id": ids, "row": np.arange(len(ids))})
+    right = pd.DataFrame({
+        "variant_id": ids.sample(frac=1, random_state=1).to_numpy(),
+        "other_row": np.arange(len(ids)),
+    })
+
+    (left_keys, _), left_time = _measure(variant_keys_from_ids, left["variant_id"])
+    (right_keys, _), right_time = _measure(variant_keys_from_ids, right["variant_id"])
+    keyed_left = pd.DataFrame({"variant_key": left_keys, "row": left["row"]})
+    keyed_right = pd.DataFrame({"variant_key": right_keys, "other_row": right["other_row"]})
+
+    by_id, id_time = _measure(pd.merge, left, right, how="outer", on="variant_id")
+    by_key, key_time = _measure(pd.merge, keyed_left, keyed_right, how="outer", on="variant_key")
+
+    def pairs(merged):
+        return merged[["row", "other_row"]].sort_values(["row", "other_row"]).to_numpy()
+
+    id_memory = left["variant_id"].memory_usage(deep=True, index=False)
+    key_memory = left_keys.memory_usage(deep=True, index=False)
+    print(f"Variants: {args.variants}")
+    print(f"Same matches: {np.array_equal(pairs(by_id), pairs(by_key))}")
+    print(f"packing keys, both tables: {left_time + right_time:8.2f} s")
+    print(f"join on ID strings:        {id_time:8.2f} s")
+    print(f"join on keys:              {key_time:8.2f} s")
+    print(f"ID strings: {id_memory / 2**20:8.1f} MiB")
+    print(f"keys:       {key_memory / 2**20:8.1f} MiB")
+    print(f"Speedup of the join: {id_time / key_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,12 @@ The module is responsible for:
 - Configuring application settings such as compression and CORS policies.
 - Initializing Flask extensions including compression, Socket.IO, and CORS.
 - Registering application routes and event handlers.
+- Running the maintenance of the workspace in a single worker process, elected by a lock:
+    - Cleaning up orphaned temporary files of the derived artifacts cache and inactive uploads.
+    - Removing the deduplicated file blobs which are no longer referenced, with their artifacts.
+    - Removing the chunks of file snapshots which are no longer referenced.
+    - Compressing at rest the workspace files which have not been accessed for a while.
+    - Downloading the liftover chain files and building their indexes.
 
 Dependencies:
 - Flask: The core web framework.
@@ -23,13 +29,95 @@ Returns:
 
 # pylint: disable=import-error
 
+import gevent
 import gevent.monkey
 from flask import Flask
 
-from .setup.extensions import compress, socketio, cors, env
+from .setup.extensions import (
+    compress,
+    socketio,
+    cors,
+    env,
+    cache_manager,
+    upload_manager,
+    cold_storage_manager,
+    blob_store,
+    snapshot_manager,
+    lock_manager,
+    logger,
+)
 from .setup.router import router
 from .setup.eventer import eventer
-from .constants import BASE_ROUTE
+from .utils.helpers import compact_cold_workspace_files
+from .tools import LiftOverError, download_chain_file, get_chain_index
+from .tools.liftover import PROVISIONED_CHAINS
+from .constants import BASE_ROUTE, WORKSPACE_DIR
+
+
+# Name of the lock held by the worker process running the maintenance, on the workspace root
+MAINTENANCE_LOCK = "maintenance"
+
+# Seconds between two attempts of the other worker processes to take over the maintenance
+MAINTENANCE_RETRY_INTERVAL = 60
+
+
+def _clean_up_workspace():
+    """
+    Remove the orphaned and unreferenced files of the workspace.
+    """
+    # Remove orphaned temporary files and enforce the cache budget
+    cache_manager.cleanup()
+
+    # Remove inactive chunked uploads
+    upload_manager.cleanup()
+
+    # Remove unreferenced blobs and their derived artifacts
+    for blob_path in blob_store.cleanup(WORKSPACE_DIR):
+        cache_manager.invalidate(blob_path)
+
+    # Remove the chunks of pruned file versions
+    snapshot_manager.cleanup()
+
+
+def _provision_liftover():
+    """
+    Download the liftover chain files and build their indexes, if missing.
+
+    The indexes are built on a worker thread. Requests converting positions meanwhile fail instead
+    of downloading the chain files themselves.
+    """
+    for from_db, to_db in PROVISIONED_CHAINS:
+        try:
+            download_chain_file(from_db, to_db)
+            gevent.get_hub().threadpool.apply(get_chain_index, (from_db, to_db))
+        except LiftOverError as e:
+            logger.warning("Cannot provision the %s to %s liftover: %s", from_db, to_db, e)
+
+
+def _run_maintenance(interval):
+    """
+    Run the maintenance of the workspace in the one worker process holding the maintenance lock.
+
+    Every worker process runs this greenlet, but only the one which takes the lock cleans up the
+    workspace, then enforces the cache budget and compresses the workspace files which have not
+    been accessed for a while every `interval` seconds. It keeps the lock for its lifetime, the
+    other processes retry to take it over in case it exits.
+
+    Args:
+        interval (int): The interval between two compaction walks in seconds.
+    """
+    while True:
+        try:
+            with lock_manager.exclusive(WORKSPACE_DIR, MAINTENANCE_LOCK, timeout=0):
+                _clean_up_workspace()
+                _provision_liftover()
+                while True:
+                    gevent.sleep(interval)
+                    cache_manager.evict()
+                    if cold_storage_manager.max_idle:
+                        compact_cold_workspace_files()
+        except TimeoutError:
+            gevent.sleep(MAINTENANCE_RETRY_INTERVAL)
 
 
 def create_app():
@@ -47,6 +135,15 @@ def create_app():
     - Socket.IO: Configured with gevent as the async mode, CORS allowed origins from environment,
         and a Redis message queue.
     - CORS: Applied with origins specified from the environment.
+    - Maintenance: A single worker process, elected by a lock, runs the maintenance of the
+        workspace in the background:
+        - Cache: Orphaned temporary files left by crashed workers are removed and the byte budget
+            of the derived artifacts cache is enforced.
+        - Uploads: Chunked uploads without activity for a week are removed.
+        - Blobs: Deduplicated file blobs no longer referenced by any workspace are removed.
+        - Snapshots: Chunks no longer referenced by any file version are removed.
+        - Cold storage: Workspace files not accessed for a while are compressed at rest.
+        - Liftover: The chain files are downloaded, with a timeout, and indexed.
 
     Returns:
         Flask: A fully configured Flask application instance with extensions initialized,
@@ -73,7 +170,14 @@ def create_app():
         message_queue=env.get_redis_url(),
         max_http_buffer_size=50 * 1024 * 1024,
     )
-    cors.init_app(app, resources={r"*": {"origins": env.get_origins()}})
+    cors.init_app(
+        app,
+        resources={r"*": {"origins": env.get_origins()}},
+        expose_headers=["X-Workspace-Usage", "X-Workspace-Soft-Quota", "X-Workspace-Hard-Quota"],
+    )
+
+    # Clean up and compress the workspace once, in whichever worker process takes the lock
+    gevent.spawn(_run_maintenance, env.get_cold_storage_interval())
 
     # Set up event handlers
     eventer()
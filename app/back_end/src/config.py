@@ -99,3 +99,81 @@ class Env:
             str: The Redis URL, defaulting to "redis://localhost:6379/0".
         """
         return cls.get("REDIS_URL", "redis://localhost:6379/0")
+
+    @classmethod
+    def get_cache_max_bytes(cls):
+        """
+        Get the byte budget of the derived artifacts cache from environment variables.
+
+        Once the budget is exceeded, the least recently used artifacts are evicted.
+
+        Returns:
+            int: The byte budget, defaulting to 10 GiB.
+        """
+        return int(cls.get("CACHE_MAX_BYTES", 10 * 1024**3))
+
+    @classmethod
+    def get_quota_soft_bytes(cls):
+        """
+        Get the soft disk quota per user from environment variables.
+
+        Writes exceeding the soft quota succeed, but the user is warned.
+
+        Returns:
+            int: The soft quota in bytes, defaulting to 8 GiB.
+        """
+        return int(cls.get("QUOTA_SOFT_BYTES", 8 * 1024**3))
+
+    @classmethod
+    def get_quota_hard_bytes(cls):
+        """
+        Get the hard disk quota per user from environment variables.
+
+        Writes exceeding the hard quota are rejected before they start.
+
+        Returns:
+            int: The hard quota in bytes, defaulting to 10 GiB.
+        """
+        return int(cls.get("QUOTA_HARD_BYTES", 10 * 1024**3))
+
+    @classmethod
+    def get_usage_reconcile_interval(cls):
+        """
+        Get the interval of the disk usage reconciliation walk from environment variables.
+
+        Returns:
+            int: The interval in seconds, defaulting to 3600.
+        """
+        return int(cls.get("USAGE_RECONCILE_INTERVAL", 3600))
+
+    @classmethod
+    def get_cold_storage_after(cls):
+        """
+        Get the period without access after which workspace files are compressed at rest from
+        environment variables.
+
+        Returns:
+            int: The period in seconds, defaulting to 30 days. 0 disables the compression.
+        """
+        return int(cls.get("COLD_STORAGE_AFTER", 30 * 24 * 3600))
+
+    @classmethod
+    def get_cold_storage_interval(cls):
+        """
+        Get the interval of the walk compressing workspace files at rest from environment
+        variables.
+
+        Returns:
+            int: The interval in seconds, defaulting to 21600 (6 hours).
+        """
+        return int(cls.get("COLD_STORAGE_INTERVAL", 6 * 3600))
+
+    @classmethod
+    def get_snapshot_max_versions(cls):
+        """
+        Get the number of previous versions kept per workspace file from environment variables.
+
+        Returns:
+            int: The number of versions, defaulting to 20. 0 disables the snapshots.
+        """
+        return int(cls.get("SNAPSHOT_MAX_VERSIONS", 20))
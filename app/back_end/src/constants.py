@@ -4,7 +4,8 @@ This module defines key project paths and routes used across the application.
 It sets up:
 - The base directory of the project.
 - Source directory path.
-- Workspace directory paths, including a template directory.
+- Workspace directory paths, including a template directory, a derived artifacts cache
+    directory and a directory for chunked uploads in progress.
 - Base API route and specific routes for various functionalities.
 
 These constants are typically used for file handling, directory management, and routing in the
@@ -24,6 +25,13 @@ BASE_DIR = os.path.dirname(os.path.abspath(__name__))
 SRC_DIR = os.path.join(BASE_DIR, "src")
 WORKSPACE_DIR = os.path.join(SRC_DIR, "workspace")
 WORKSPACE_TEMPLATE_DIR = os.path.join(WORKSPACE_DIR, "template")
+WORKSPACE_BATCH_DIR = os.path.join(WORKSPACE_DIR, ".batch")
+WORKSPACE_BLOB_DIR = os.path.join(WORKSPACE_DIR, ".blobs")
+WORKSPACE_SNAPSHOT_DIR = os.path.join(WORKSPACE_DIR, ".snapshots")
+WORKSPACE_LOCK_DIR = os.path.join(WORKSPACE_DIR, ".locks")
+WORKSPACE_LIFTOVER_DIR = os.path.join(WORKSPACE_DIR, ".liftover")
+WORKSPACE_CACHE_DIR = os.path.join(WORKSPACE_DIR, ".cache")
+WORKSPACE_UPLOAD_DIR = os.path.join(WORKSPACE_DIR, ".uploads")
 
 # Routes
 BASE_ROUTE = "/api/v1"
@@ -32,13 +40,16 @@ WORKSPACE_FILE_ROUTE = "/workspace/file"
 WORKSPACE_CREATE_ROUTE = "/workspace/create"
 WORKSPACE_RENAME_ROUTE = "/workspace/rename"
 WORKSPACE_DELETE_ROUTE = "/workspace/delete"
+WORKSPACE_BATCH_ROUTE = "/workspace/batch"
 WORKSPACE_AGGREGATE_ROUTE = "/workspace/aggregate"
 WORKSPACE_IMPORT_ROUTE = "/workspace/import"
+WORKSPACE_UPLOAD_ROUTE = "/workspace/upload"
 WORKSPACE_EXPORT_ROUTE = "/workspace/export"
 WORKSPACE_DOWNLOAD_ROUTE = "/workspace/download"
 WORKSPACE_MERGE_ROUTE = "/workspace/merge"
 WORKSPACE_APPLY_ROUTE = "/workspace/apply"
 WORKSPACE_ALIGN_ROUTE = "/workspace/align"
+WORKSPACE_VERSION_ROUTE = "/workspace/versions"
 
 # Events
 CONSOLE_FEEDBACK_EVENT = "console_feedback"
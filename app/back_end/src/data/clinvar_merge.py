@@ -0,0 +1,196 @@
+""" Module dedicated for merging LOVD and ClinVar data in a single pass over ClinVar """
+
+import logging
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Compute functions are registered when pyarrow is imported, pylint cannot see them
+# pylint: disable=no-member
+
+from .refactoring import from_clinvar_names_to_cdna_positions
+
+CLINVAR_SUFFIX = "_clinvar"
+
+# RefSeq transcript accession at the start of a ClinVar name, e.g. `NM_001142800` of
+# `NM_001142800.2(EYS):c.9405T>A (p.Tyr3135Ter)`
+_ACCESSION_PATTERN = r"^\s*(?P<accession>[A-Z]{2}_\d+)(?:\.\d+)?[(:]"
+
+
+def transcript_variant_keys(accessions: pd.Series, cdna: pd.Series) -> pd.Series:
+    """
+    Builds the keys joining variants on transcripts, e.g. 'NM_001142800:c.9405T>A'.
+
+    Versions of the transcripts are left out, since LOVD and ClinVar often refer to different
+    versions of the same transcript with the same numbering.
+
+    :param pd.Series accessions: RefSeq accessions of the transcripts, with or without version
+    :param pd.Series cdna: cDNA positions, as returned by `from_clinvar_names_to_cdna_positions`
+    :returns: keys, missing where the accession or the cDNA position is missing
+    :rtype: pd.Series
+    """
+
+    accessions = accessions.astype("string").str.replace(r"\.\d+$", "", regex=True)
+    return accessions + ":" + cdna.astype("string")
+
+
+def from_clinvar_names_to_accessions(names: pd.Series) -> pd.Series:
+    """
+    Extracts the RefSeq transcript accessions, without version, from a column of ClinVar names.
+
+    :param pd.Series names: ClinVar names, e.g. 'NM_001142800.2(EYS):c.9405T>A (p.Tyr3135Ter)'
+    :returns: accessions, e.g. 'NM_001142800', missing where the name has none
+    :rtype: pd.Series
+    """
+
+    values = pa.array(names.astype(object).where(names.notna(), None), type=pa.string())
+    accessions = pc.struct_field(pc.extract_regex(values, _ACCESSION_PATTERN), "accession")
+    return pd.Series(accessions.to_pandas(), index=names.index, dtype="string")
+
+
+def key_lovd_transcript_variants(lovd: pd.DataFrame, transcripts: pd.DataFrame) -> pd.Series:
+    """
+    Builds the keys of LOVD variants on transcripts, see `transcript_variant_keys`.
+
+    :param DataFrame lovd: LOVD variants on transcripts, with 'transcriptid' and
+        'VariantOnTranscript/DNA'
+    :param DataFrame transcripts: LOVD transcripts, with 'id' and 'id_ncbi'
+    :returns: keys with the index of `lovd`
+    :rtype: pd.Series
+    """
+
+    accessions = pd.Series(transcripts["id_ncbi"].astype("string").to_numpy(),
+                           index=transcripts["id"].astype("string"))
+    lovd_accessions = lovd["transcriptid"].astype("string").map(accessions)
+    cdna = from_clinvar_names_to_cdna_positions(lovd["VariantOnTranscript/DNA"])
+    return transcript_variant_keys(lovd_accessions, cdna)
+
+
+class _TranscriptVariantIndex:
+    """
+    Hash index of LOVD rows by key, with the rows of each key stored contiguously.
+    """
+
+    def __init__(self, keys: pd.Series):
+        codes, uniques = pd.factorize(keys)
+        self.index = pd.Index(np.asarray(uniques, dtype=object))
+        self.accessions = {key.split(":", 1)[0] for key in self.index}
+
+        valid = codes >= 0
+        self.counts = np.bincount(codes[valid], minlength=len(uniques))
+        self.starts = np.cumsum(self.counts) - self.counts
+        self.rows = np.flatnonzero(valid)[np.argsort(codes[valid], kind="stable")]
+        self.unkeyed = np.flatnonzero(~valid)
+        self.matched = np.zeros(len(uniques), dtype=bool)
+
+    def probe(self, names: pd.Series) -> np.ndarray:
+        """
+        Looks up ClinVar names, only normalizing those on a transcript of the index.
+
+        :param pd.Series names: ClinVar names
+        :returns: codes of the matching keys, -1 where no LOVD row matches
+        :rtype: np.ndarray
+        """
+
+        codes = np.full(len(names), -1, dtype=np.int64)
+        accessions = from_clinvar_names_to_accessions(names)
+        candidates = accessions.isin(self.accessions).to_numpy(dtype=bool)
+        if candidates.any():
+            cdna = from_clinvar_names_to_cdna_positions(names[candidates])
+            keys = transcript_variant_keys(accessions[candidates], cdna)
+            codes[candidates] = self.index.get_indexer(keys.astype(object).fillna(""))
+
+        self.matched[codes[codes >= 0]] = True
+        return codes
+
+    def expand(self, codes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Pairs probed rows with their matching LOVD rows.
+
+        :param np.ndarray codes: codes returned by `probe`
+        :returns: positions of the probed rows, repeated for every match, and positions of the
+            matching LOVD rows, -1 for unmatched probed rows
+        :rtype: tuple[np.ndarray, np.ndarray]
+        """
+
+        # Unmatched rows take the last entries, a single pair without LOVD row
+        repeats = np.append(self.counts, 1)[codes]
+        probed_rows = np.repeat(np.arange(len(codes)), repeats)
+
+        # Offset of every pair within the LOVD rows of its key
+        offsets = np.arange(len(probed_rows)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        pair_codes = codes[probed_rows]
+        positions = np.where(pair_codes >= 0, np.append(self.starts, 0)[pair_codes] + offsets,
+                             len(self.rows))
+        return probed_rows, np.append(self.rows, -1)[positions]
+
+    def unmatched_rows(self) -> np.ndarray:
+        """
+        Returns the positions of the LOVD rows which matched no probed row.
+
+        :returns: positions of the rows, in their order
+        :rtype: np.ndarray
+        """
+
+        unmatched = np.repeat(~self.matched, self.counts)
+        return np.sort(np.concatenate([self.rows[unmatched], self.unkeyed]))
+
+
+def merge_clinvar_lovd(lovd: pd.DataFrame, transcripts: pd.DataFrame, clinvar_batches,
+                       output) -> int:
+    """
+    Merges LOVD and ClinVar data on transcript and cDNA position, writing the merged rows as CSV.
+
+    LOVD variants are indexed by the key of `transcript_variant_keys`, then ClinVar is read once,
+    batch by batch, each batch being joined against the index and written, so that only the LOVD
+    data and a batch are held in memory. ClinVar names are only parsed on the transcripts of the
+    LOVD variants. As with `merge_gnomad_lovd`, the join is outer: the rows of ClinVar come in
+    their order, followed by the LOVD rows matching no ClinVar row.
+
+    :param DataFrame lovd: LOVD variants on transcripts, see `key_lovd_transcript_variants`
+    :param DataFrame transcripts: LOVD transcripts, with 'id' and 'id_ncbi'
+    :param clinvar_batches: batches of ClinVar rows, as returned by `parse_clinvar`
+    :param output: text stream to write the CSV to
+    :returns: number of merged rows written
+    :rtype: int
+    :raises ValueError: if ClinVar data has no 'Name' column
+    """
+
+    # Nullable types keep integers written as such in the rows without LOVD data
+    lovd = lovd.reset_index(drop=True).convert_dtypes()
+    index = _TranscriptVariantIndex(key_lovd_transcript_variants(lovd, transcripts))
+
+    columns = None
+    rows = matches = 0
+    for batch in clinvar_batches:
+        batch = batch.add_suffix(CLINVAR_SUFFIX).reset_index(drop=True)
+        if "Name" + CLINVAR_SUFFIX not in batch.columns:
+            raise ValueError("ClinVar data has no 'Name' column")
+        if columns is None:
+            columns = list(lovd.columns) + [column for column in batch.columns
+                                            if column not in lovd.columns]
+            pd.DataFrame(columns=columns).to_csv(output, index=False)
+
+        codes = index.probe(batch["Name" + CLINVAR_SUFFIX])
+        probed_rows, lovd_rows = index.expand(codes)
+        merged = pd.concat(
+            [lovd.reindex(lovd_rows).reset_index(drop=True),
+             batch.take(probed_rows).reset_index(drop=True)],
+            axis=1,
+        )
+        merged.reindex(columns=columns).to_csv(output, header=False, index=False)
+        rows += len(merged)
+        matches += int((lovd_rows >= 0).sum())
+
+    if columns is None:
+        columns = list(lovd.columns)
+        pd.DataFrame(columns=columns).to_csv(output, index=False)
+
+    remaining = lovd.take(index.unmatched_rows())
+    remaining.reindex(columns=columns).to_csv(output, header=False, index=False)
+    rows += len(remaining)
+
+    logging.info("Merged %d rows, %d pairs of matching LOVD and ClinVar rows", rows, matches)
+    return rows
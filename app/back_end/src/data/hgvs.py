@@ -0,0 +1,187 @@
+""" Module dedicated for parsing HGVS variant descriptions in batches """
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+HGVS_COLUMNS = ["chrom", "start", "end", "ref", "alt", "kind", "coordinate", "location"]
+
+# Optional reference sequence (e.g. `NC_000006.12:` or `NM_000329.3(RPE65):`), coordinate system,
+# position or range, and one of the supported variant types. A description ends at a whitespace,
+# a parenthesis or a semicolon, so that ClinVar names such as `...:c.11A>G (p.Glu4Gly)` match.
+_POSITION = r"[-*]?\d+(?:[+-]\d+)?"
+_HGVS_PATTERN = (
+    r"^\s*(?:(?P<reference>[^\s:()]+)(?:\([^)]*\))?:)?"
+    r"(?P<coordinate>[gcmn])\."
+    rf"(?P<start>{_POSITION})(?:_(?P<end>{_POSITION}))?"
+    r"(?:(?P<ref>[ACGTN])>(?P<alt>[ACGTN])"
+    r"|del(?P<deleted>[ACGTN]*)ins(?P<inserted>[ACGTN]+)"
+    r"|(?P<kind>del|dup|inv)(?P<sequence>[ACGTN]*)"
+    r"|ins(?P<insertion>[ACGTN]+))"
+    r"(?=$|[\s(;])"
+)
+
+# Chromosomes of the RefSeq genomic accessions which are not numbered after the chromosome
+_ACCESSION_CHROMOSOMES = {"23": "X", "24": "Y", "12920": "M"}
+
+
+def map_distinct(values: pd.Series, function):
+    """
+    Applies a vectorized function to the distinct values of a column only.
+
+    Columns of variants repeat the same descriptions many times, e.g. a variant reported by
+    several submitters, so parsing and formatting them once saves most of the work.
+
+    :param pd.Series values: column of values
+    :param function: called with the distinct values as strings, followed by a missing value,
+        returns a Series or DataFrame with one row for each of them
+    :returns: rows returned by `function`, in the order and with the index of `values`
+    :rtype: pd.Series | pd.DataFrame
+    """
+
+    codes, uniques = pd.factorize(values)
+    distinct = pd.Series(np.append(uniques.astype(str).astype(object), None), dtype="string")
+    result = function(distinct)
+
+    # Missing values take the row of the missing value at the end
+    result = result.take(np.where(codes < 0, len(uniques), codes))
+    result.index = values.index
+    return result
+
+
+def _chromosomes_of_references(references: pd.Series) -> pd.Series:
+    """
+    Extracts the chromosomes of RefSeq genomic accessions, e.g. `6` of `NC_000006.12`.
+
+    :param pd.Series references: reference sequences of the variants
+    :returns: chromosomes, missing for other reference sequences
+    :rtype: pd.Series
+    """
+
+    numbers = references.str.extract(r"^NC_0*(\d+)\.\d+$", expand=False)
+    return numbers.replace(_ACCESSION_CHROMOSOMES)
+
+
+def _parse_distinct(variants: pd.Series, chromosome: str | None) -> pd.DataFrame:
+    """
+    Parses distinct variant descriptions, see `parse_hgvs`.
+
+    :param pd.Series variants: distinct variant descriptions, as strings
+    :param str chromosome: chromosome of variants without a genomic reference sequence
+    :returns: parsed variants with the columns of `HGVS_COLUMNS`
+    :rtype: pd.DataFrame
+    """
+
+    parsed = variants.str.extract(_HGVS_PATTERN)
+    matched = parsed["coordinate"].notna()
+
+    kind = parsed["kind"].copy()
+    kind[parsed["insertion"].notna()] = "ins"
+    kind[parsed["inserted"].notna()] = "delins"
+    kind[parsed["ref"].notna()] = "subst"
+
+    ref = (parsed["ref"]
+           .fillna(parsed["deleted"].replace("", pd.NA))
+           .fillna(parsed["sequence"].replace("", pd.NA)))
+    alt = parsed["alt"].fillna(parsed["inserted"]).fillna(parsed["insertion"])
+
+    # Only genomic and plain coding positions are numbers, intronic and UTR positions are not
+    end_text = parsed["end"].fillna(parsed["start"])
+    start, end = (
+        pd.to_numeric(text.where(text.str.fullmatch(r"\d+").fillna(False)), errors="coerce")
+        .astype("Int64")
+        for text in (parsed["start"], end_text)
+    )
+
+    chrom = _chromosomes_of_references(parsed["reference"])
+    if chromosome is not None:
+        chrom = chrom.fillna(str(chromosome))
+    chrom[parsed["coordinate"] == "m"] = "M"
+
+    location = parsed["start"] + ("_" + parsed["end"]).fillna("")
+
+    result = pd.DataFrame({
+        "chrom": chrom,
+        "start": start,
+        "end": end,
+        "ref": ref,
+        "alt": alt,
+        "kind": kind,
+        "coordinate": parsed["coordinate"],
+        "location": location,
+    })
+    result.loc[~matched, ["chrom", "ref", "alt", "kind"]] = pd.NA
+    return result.astype({column: "string" for column in HGVS_COLUMNS
+                          if column not in ("start", "end")})
+
+
+def parse_hgvs(variants: pd.Series, chromosome: str | None = None) -> pd.DataFrame:
+    """
+    Parses HGVS variant descriptions into columns.
+
+    Substitutions (`g.123A>G`), deletions (`g.123del`, `g.123_125delACT`), duplications,
+    insertions (`g.123_124insAT`), deletion-insertions (`g.123_125delinsAT`) and inversions are
+    supported, with an optional reference sequence (`NC_000006.12:g.123A>G`). Each distinct
+    description is parsed once, so columns repeating the same variants are parsed quickly.
+
+    The columns are:
+    - chrom: chromosome, from the RefSeq genomic accession or `chromosome`
+    - start, end: first and last position, for numbered positions only; the positions around the
+      insertion for insertions
+    - ref: reference allele of substitutions and the deleted, duplicated or inverted sequence if
+      given
+    - alt: alternative allele of substitutions and the inserted sequence
+    - kind: one of `subst`, `del`, `dup`, `ins`, `delins` or `inv`
+    - coordinate: coordinate system, e.g. `g` or `c`
+    - location: position or range as written, e.g. `123+5_124-3`
+
+    :param pd.Series variants: variant descriptions
+    :param str chromosome: chromosome of variants without a genomic reference sequence
+    :returns: parsed variants with the index of `variants`, missing values for descriptions which
+        cannot be parsed
+    :rtype: pd.DataFrame
+    """
+
+    return map_distinct(variants, lambda distinct: _parse_distinct(distinct, chromosome))
+
+
+@lru_cache(maxsize=65536)
+def parse_hgvs_variant(variant: str, chromosome: str | None = None) -> tuple:
+    """
+    Parses a single HGVS variant description, see `parse_hgvs`.
+
+    :param str variant: variant description
+    :param str chromosome: chromosome of variants without a genomic reference sequence
+    :returns: values of the columns of `HGVS_COLUMNS`, None for missing values
+    :rtype: tuple
+    """
+
+    row = parse_hgvs(pd.Series([variant], dtype=object), chromosome).iloc[0]
+    return tuple(None if pd.isna(value) else value for value in row)
+
+
+def format_hgvs(variants: pd.DataFrame) -> pd.Series:
+    """
+    Formats parsed variants as HGVS variant descriptions, without a reference sequence.
+
+    :param pd.DataFrame variants: variants with the columns of `HGVS_COLUMNS`, as returned by
+        `parse_hgvs`; the numbered positions take precedence over `location`
+    :returns: variant descriptions, e.g. `g.123_125delACT`, missing where `kind` is missing
+    :rtype: pd.Series
+    """
+
+    start = variants["start"].astype("string")
+    end = variants["end"].astype("string")
+    location = (start + ("_" + end).where(end != start, "")).fillna(variants["location"])
+
+    kind = variants["kind"]
+    ref = variants["ref"].fillna("")
+    alt = variants["alt"].fillna("")
+    change = (kind + ref).astype("string")
+    for name, value in (("subst", ref + ">" + alt), ("ins", "ins" + alt),
+                        ("delins", "delins" + alt)):
+        change = change.mask((kind == name).fillna(False), value)
+
+    return variants["coordinate"] + "." + location + change
@@ -0,0 +1,154 @@
+""" Module dedicated for updating merged LOVD and gnomAD data when a source changes """
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .refactoring import key_lovd_variants, key_gnomad_variants, merge_keyed_variants
+from .variant_keys import MISSING_KEY, variant_keys_from_ids
+
+KEY_COLUMN = "variant_key"
+
+
+def hash_keyed_rows(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Hashes the rows of a keyed table, to compare two versions of a source.
+
+    :param DataFrame frame: rows with their keys in `KEY_COLUMN`
+    :returns: the columns `KEY_COLUMN` and `hash`, the hash of the other values of every row
+    :rtype: pd.DataFrame
+    """
+
+    values = frame.drop(columns=KEY_COLUMN)
+    return pd.DataFrame({
+        KEY_COLUMN: frame[KEY_COLUMN].to_numpy(dtype=np.int64),
+        "hash": pd.util.hash_pandas_object(values, index=False).to_numpy(),
+    })
+
+
+def changed_keys(old_hashes: pd.DataFrame, new_hashes: pd.DataFrame) -> np.ndarray:
+    """
+    Finds the keys whose rows differ between two versions of a source.
+
+    A key is changed when a row was added, removed or modified, including when the same row
+    occurs a different number of times.
+
+    :param DataFrame old_hashes: hashed rows of the old version, see `hash_keyed_rows`
+    :param DataFrame new_hashes: hashed rows of the new version, see `hash_keyed_rows`
+    :returns: changed keys, sorted
+    :rtype: np.ndarray
+    """
+
+    def numbered(hashes):
+        return hashes.assign(occurrence=hashes.groupby([KEY_COLUMN, "hash"]).cumcount())
+
+    pairs = pd.merge(numbered(old_hashes), numbered(new_hashes), how="outer", indicator=True,
+                     on=[KEY_COLUMN, "hash", "occurrence"])
+    return np.unique(pairs.loc[pairs["_merge"] != "both", KEY_COLUMN].to_numpy(dtype=np.int64))
+
+
+def key_merged_variants(merged: pd.DataFrame) -> pd.Series:
+    """
+    Recovers the keys rows were joined on by `merge_keyed_variants`, from the merged rows.
+
+    Rows with gnomAD data take the key of their gnomAD variant, the other rows the key of their
+    LOVD variant, so that every row takes the key of the rows it was merged from.
+
+    :param DataFrame merged: merged rows, as strings read back from CSV, empty where missing
+    :returns: keys with the index of `merged`
+    :rtype: pd.Series
+    """
+
+    lovd_keys, _ = variant_keys_from_ids(merged["hg38_gnomad_format"])
+    gnomad_keys, _ = variant_keys_from_ids(merged["variant_id_gnomad"])
+    gnomad_keys = gnomad_keys.replace(MISSING_KEY, MISSING_KEY - 1)
+    return gnomad_keys.where(merged["variant_id_gnomad"] != "", lovd_keys)
+
+
+def _hash_gnomad_batches(batches):
+    """
+    Hashes the rows of gnomAD data batch by batch, see `hash_keyed_rows`.
+
+    :param batches: batches of gnomAD rows, as accepted by `merge_gnomad_lovd`
+    :returns: hashed rows, and the columns of the data
+    :rtype: tuple[pd.DataFrame, list]
+    """
+
+    hashes, columns = [], []
+    for batch in batches:
+        columns = list(batch.columns)
+        hashes.append(hash_keyed_rows(key_gnomad_variants(batch.add_suffix("_gnomad"))))
+    if not hashes:
+        return pd.DataFrame({KEY_COLUMN: [], "hash": []}).astype(np.int64), columns
+    return pd.concat(hashes, ignore_index=True), columns
+
+
+def update_merged_lovd_gnomad(merged_batches, lovd: pd.DataFrame, old_lovd: pd.DataFrame | None,
+                              gnomad_batches, old_gnomad_batches, output) -> tuple[int, int] | None:
+    """
+    Updates data merged by `merge_gnomad_lovd` to new versions of its sources, writing it as CSV.
+
+    Both versions of the sources are compared by variant key. Merged rows of unchanged keys are
+    written back as they are, and the rows of changed keys are merged again from the new versions
+    and written after them. The result has the rows of merging the new versions from scratch,
+    while only the changed variants are merged. gnomAD data is read batch by batch.
+
+    :param merged_batches: batches of the merged rows, as strings read back from CSV, empty where
+        missing
+    :param DataFrame lovd: new LOVD data, as accepted by `merge_gnomad_lovd`
+    :param old_lovd: LOVD data the merged rows were built from, None if it did not change
+    :param gnomad_batches: called without arguments, returns the batches of the new gnomAD data;
+        called once, or twice if `old_gnomad_batches` is given
+    :param old_gnomad_batches: batches of the gnomAD data the merged rows were built from, None if
+        it did not change
+    :param output: text stream to write the CSV to
+    :returns: number of merged rows kept and number of merged rows written again, or None if the
+        columns of a source changed, the data must then be merged from scratch
+    :rtype: tuple[int, int] | None
+    """
+
+    lovd = key_lovd_variants(lovd)
+    changed = np.empty(0, dtype=np.int64)
+    if old_lovd is not None:
+        old_lovd = key_lovd_variants(old_lovd)
+        if list(old_lovd.columns) != list(lovd.columns):
+            return None
+        changed = changed_keys(hash_keyed_rows(old_lovd), hash_keyed_rows(lovd))
+        del old_lovd
+
+    if old_gnomad_batches is not None:
+        old_hashes, old_columns = _hash_gnomad_batches(old_gnomad_batches)
+        new_hashes, new_columns = _hash_gnomad_batches(gnomad_batches())
+        if old_columns != new_columns:
+            return None
+        changed = np.union1d(changed, changed_keys(old_hashes, new_hashes))
+        del old_hashes, new_hashes
+
+    # Keep only the changed variants of each batch as it is read
+    gnomad = (key_gnomad_variants(batch.add_suffix("_gnomad")) for batch in gnomad_batches())
+    gnomad = pd.concat((batch[batch[KEY_COLUMN].isin(changed)] for batch in gnomad),
+                       ignore_index=True)
+    updated = merge_keyed_variants(lovd[lovd[KEY_COLUMN].isin(changed)], gnomad)
+
+    columns = None
+    kept = 0
+    for batch in merged_batches:
+        if columns is None:
+            columns = list(batch.columns)
+            if set(updated.columns) - set(columns):
+                return None
+            pd.DataFrame(columns=columns).to_csv(output, index=False)
+
+        batch = batch[~key_merged_variants(batch).isin(changed)]
+        batch.to_csv(output, header=False, index=False)
+        kept += len(batch)
+
+    if columns is None:
+        columns = list(updated.columns)
+        pd.DataFrame(columns=columns).to_csv(output, index=False)
+    updated.reindex(columns=columns).to_csv(output, header=False, index=False)
+
+    logging.info("Kept %d merged rows, merged %d rows of %d changed variants again",
+                 kept, len(updated), len(changed))
+    return kept, len(updated)
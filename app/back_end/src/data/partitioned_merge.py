@@ -0,0 +1,108 @@
+""" Module dedicated for merging LOVD and gnomAD data larger than memory """
+
+import os
+import glob
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .refactoring import key_lovd_variants, key_gnomad_variants, merge_keyed_variants
+from .variant_keys import ALLELE_BITS
+
+KEY_COLUMN = "variant_key"
+DEFAULT_PARTITIONS = 64
+
+
+def _write_partitions(batches, directory: str, side: str, partitions: int, prepare) -> list:
+    """
+    Writes batches of rows to files by partition of their variant keys.
+
+    Variants at the same position are written to the same partition, so that every pair of
+    matching rows meets in a single partition.
+
+    :param batches: batches of rows, as DataFrames
+    :param str directory: directory of the partition files
+    :param str side: name of the input, part of the file names
+    :param int partitions: number of partitions
+    :param prepare: called with a batch, returns the batch with its keys in `KEY_COLUMN`
+    :returns: columns of the prepared batches, without `KEY_COLUMN`, empty if there is none
+    :rtype: list
+    """
+
+    columns = []
+    for number, batch in enumerate(batches):
+        batch = prepare(batch)
+        if not columns:
+            columns = [column for column in batch.columns if column != KEY_COLUMN]
+
+        buckets = (batch[KEY_COLUMN].to_numpy() >> ALLELE_BITS) % partitions
+        for partition, rows in batch.groupby(buckets, sort=False):
+            rows.to_pickle(os.path.join(directory, f"{side}-{partition:05d}-{number:07d}.pkl"))
+
+    return columns
+
+
+def _read_partition(directory: str, side: str, partition: int, columns: list) -> pd.DataFrame:
+    """
+    Reads the rows of an input in a partition.
+
+    :param str directory: directory of the partition files
+    :param str side: name of the input
+    :param int partition: number of the partition
+    :param list columns: columns of the input, without `KEY_COLUMN`
+    :returns: rows of the partition, with their keys
+    :rtype: pd.DataFrame
+    """
+
+    paths = sorted(glob.glob(os.path.join(directory, f"{side}-{partition:05d}-*.pkl")))
+    if not paths:
+        return pd.DataFrame(columns=columns + [KEY_COLUMN]).astype({KEY_COLUMN: np.int64})
+
+    frame = pd.concat([pd.read_pickle(path) for path in paths], ignore_index=True)
+    for path in paths:
+        os.remove(path)
+    return frame
+
+
+def merge_gnomad_lovd_partitioned(lovd_batches, gnomad_batches, output, directory: str,
+                                  partitions: int = DEFAULT_PARTITIONS) -> int:
+    """
+    Merges LOVD and gnomAD data with bounded memory, writing the merged rows as CSV.
+
+    Both inputs are read batch by batch and written to disk in partitions by variant key, then
+    joined partition by partition, so that only a batch or a partition is held in memory at a
+    time. The result has the rows and columns of `merge_gnomad_lovd`, but is ordered by partition.
+
+    :param lovd_batches: batches of LOVD rows, as accepted by `merge_gnomad_lovd`
+    :param gnomad_batches: batches of gnomAD rows, as accepted by `merge_gnomad_lovd`
+    :param output: text stream to write the CSV to
+    :param str directory: existing empty directory for the partition files
+    :param int partitions: number of partitions
+    :returns: number of merged rows written
+    :rtype: int
+    """
+
+    lovd_columns = _write_partitions(lovd_batches, directory, "lovd", partitions,
+                                     key_lovd_variants)
+    gnomad_columns = _write_partitions(
+        gnomad_batches, directory, "gnomad", partitions,
+        lambda batch: key_gnomad_variants(batch.add_suffix("_gnomad")),
+    )
+    columns = lovd_columns + [column for column in gnomad_columns if column not in lovd_columns]
+
+    pd.DataFrame(columns=columns).to_csv(output, index=False)
+
+    rows = 0
+    for partition in range(partitions):
+        lovd = _read_partition(directory, "lovd", partition, lovd_columns)
+        gnomad = _read_partition(directory, "gnomad", partition, gnomad_columns)
+        if lovd.empty and gnomad.empty:
+            continue
+
+        merged = merge_keyed_variants(lovd, gnomad)
+        merged.reindex(columns=columns).to_csv(output, header=False, index=False)
+        rows += len(merged)
+
+    logging.info("Merged %d rows in %d partitions", rows, partitions)
+    return rows
@@ -2,40 +2,46 @@
 
 import os
 import logging
-import re
 
 
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
-from pyliftover import LiftOver
-
-from .constants import LOVD_PATH, GNOMAD_PATH
+from .constants import LOVD_PATH, GNOMAD_PATH, CLINVAR_PATH
+from .hgvs import parse_hgvs, parse_hgvs_variant, format_hgvs, map_distinct
+from .variant_keys import MISSING_KEY, variant_keys_from_ids
+from .schemas import LOVD_SCHEMA, GNOMAD_SCHEMA, apply_schema
+from ..tools.liftover import liftover_positions
 
 
 def set_lovd_dtypes(df_dict: dict[str, pd.DataFrame]):
     """
     Convert data from LOVD format table to desired data format based on specified data types.
 
+    Columns take the types declared by `LOVD_SCHEMA`, see `apply_schema`.
+
     :param dict[str, DataFrame] df_dict: Dictionary of tables saved as DataFrame
     """
 
     for table_name, frame in df_dict.items():
         try:
-            frame = frame.convert_dtypes()
+            apply_schema(frame, LOVD_SCHEMA, "LOVD")
         except Exception as e:
             raise Exception(f"Failed to convert data types for LOVD table '{table_name}': {e}") from e
-        df_dict[table_name] = frame
+
 
 def set_gnomad_dtypes(df:pd.DataFrame):
     """
     Convert data from gnomAD format table to desired data format based on specified data types.
 
+    Columns take the types declared by `GNOMAD_SCHEMA` in place, see `apply_schema`.
+
     :param DataFrame df: DataFrame containing gnomAD data
     :raises GnomadDtypeConversionError: if there is an error during data type conversion
     """
     try:
-        df.convert_dtypes()
+        apply_schema(df, GNOMAD_SCHEMA, "gnomAD")
     except Exception as e:
         raise Exception(f"Failed to convert gnomAD data types: {e}") from e
 
@@ -61,75 +67,145 @@ def infer_type(value:str):
         return value  # Return as string if it cannot be converted
 
 
-def parse_lovd(path: str = LOVD_PATH + '/lovd_data.txt', save_to: str = LOVD_PATH):
+def infer_column_type(values) -> pd.Series:
+    """
+    Infer the type of a whole column of string values at once.
+
+    A column is numeric when every non-empty value is a number: integer columns become `int64`
+    (nullable `Int64` if some values are empty) and other numeric columns `float64`. Any other
+    column is kept as strings, so identifiers such as exon numbers `12i` or zero padded codes keep
+    their text.
+
+    :param values: sequence of string values of the column
+    :returns: the column with its inferred type
+    :rtype: pd.Series
+    """
+
+    column = pd.Series(values, dtype=object)
+    present = column != ""
+    if not present.any():
+        return column
+
+    try:
+        # Parsing stops at the first value which is not a number
+        numbers = pd.to_numeric(column[present])
+    except (ValueError, TypeError):
+        return column
+    if numbers.isna().any():
+        return column
+
+    if present.all():
+        return numbers
+
+    # Empty values are missing, integers stay integers
+    inferred = pd.Series(pd.NA if numbers.dtype.kind in "iu" else np.nan,
+                         index=column.index,
+                         dtype="Int64" if numbers.dtype.kind in "iu" else "float64")
+    inferred[present] = numbers
+    return inferred
+
+
+def _build_lovd_table(header: list[str], rows: list[list[str]]) -> DataFrame:
+    """
+    Build a table of LOVD data once all of its rows are read.
+
+    :param list[str] header: names of the columns
+    :param list[list[str]] rows: rows of unquoted string values
+    :returns: table with the type of every column inferred
+    :rtype: DataFrame
+    """
+
+    columns = list(zip(*rows)) if rows else [() for _ in header]
+    frame = DataFrame({i: infer_column_type(values) for i, values in enumerate(columns)})
+    frame.columns = header
+    return frame
+
+
+def parse_lovd(path: str = LOVD_PATH + '/lovd_data.txt', save_to: str | None = LOVD_PATH,
+               tables: list[str] | None = None):
     """
     Converts data from text file with LOVD format to dictionary of tables.
 
     Key is name of table, value is data saved as pandas DataFrame.
     Notes for each table are displayed with log.
 
-    **IMPORTANT:** It doesn't provide types for data inside. Use set_lovd_dtypes for this.
+    The file is read in a single pass: the rows of every table are collected as lists and the
+    DataFrame of the table is built once, with the type of every column inferred at once
+    (see `infer_column_type`). Rows of tables which are not selected are skipped without being
+    split.
+
+    **IMPORTANT:** It only infers numeric columns. Use set_lovd_dtypes for the other types.
 
-    :param str path: path to text file
+    :param str path: path to text file, or an opened text stream
+    :param str save_to: directory where every table is saved as CSV, or None to not save them
+    :param list[str] tables: names of the tables to parse, or None to parse all of them
     :returns: dictionary of tables
-    :rtype: dict[str, tuple[DataFrame, list[str]]]
+    :rtype: dict[str, DataFrame]
+    :raises ValueError: if a row does not have as many values as its table has columns
     """
 
     # Check if the file exists
-    if not os.path.exists(path):
+    if isinstance(path, str) and not os.path.exists(path):
         raise FileNotFoundError(f"The file at {path} does not exist.")
 
     d = {}
+    selected = set(tables) if tables is not None else None
 
-    with open(path, encoding="UTF-8") as f:
+    table_name = None
+    notes = []
+    header = None
+    rows = []
+
+    def finish_table():
+        if selected is None or table_name in selected:
+            d[table_name] = _build_lovd_table(header or [], rows)
+
+    with open(path, encoding="UTF-8") if isinstance(path, str) else path as f:
         # skip header
         [f.readline() for _ in range(4)]  # pylint: disable=expression-not-assigned
 
         # Notify about parsing in log
         logging.info("Parsing file %s using parse_lovd.", path)
 
-        while True:
-            line = f.readline()
-
-            if line == '':
-                break
-
-            table_name = line.split("##")[1].strip()
-
-            # Save notes for each table
-            notes = ""
-            i = 1
-            line = f.readline()
-            while line.startswith("##"):
-                notes += f"\n    - Note {i}: {line[3:-1]}"
-                i += 1
-                line = f.readline()
-
-            # Log notes for each table
-            if notes:
-                logging.info("[%s]%s", table_name, notes)
-
-            table_header = [column[3:-3] for column in line[:-1].split('\t')]
-            frame = DataFrame([], columns=table_header)
-            line = f.readline()
-            while line != '\n':
-                variables = [variable[1:-1] for variable in line[:-1].split('\t')]
-                observation = DataFrame([variables], columns=table_header)
-                frame = pd.concat([frame, observation], ignore_index=True)
-                line = f.readline()
-
-            for col in frame.columns:
-                frame[col] = frame[col].apply(infer_type)
-
-            d[table_name] = frame
-
-            file_location = os.path.join(save_to, f"{table_name}.csv")
-            if not os.path.exists(save_to):
-                os.makedirs(save_to)
-            frame.to_csv(file_location, index=False)
-
-            # skip inter tables lines
-            [f.readline() for _ in range(1)]  # pylint: disable=expression-not-assigned
+        for line in f:
+            line = line.rstrip("\r\n")
+
+            if table_name is None:
+                # Tables are separated by empty lines and start with their name
+                if line:
+                    table_name = line.split("##")[1].strip()
+                    notes, header, rows = [], None, []
+            elif header is None:
+                if line.startswith("##"):
+                    notes.append(line[3:])
+                    continue
+
+                # Log notes for each table
+                if notes:
+                    logging.info("[%s]%s", table_name, "".join(
+                        f"\n    - Note {i}: {note}" for i, note in enumerate(notes, 1)))
+                header = [column[3:-3] for column in line.split('\t')]
+            elif line:
+                if selected is not None and table_name not in selected:
+                    continue
+                variables = [variable[1:-1] for variable in line.split('\t')]
+                if len(variables) != len(header):
+                    raise ValueError(f"Row {len(rows) + 1} of LOVD table '{table_name}' has "
+                                     f"{len(variables)} values instead of {len(header)}.")
+                rows.append(variables)
+            else:
+                # An empty line ends the table
+                finish_table()
+                table_name = None
+
+        if table_name is not None and header is not None:
+            finish_table()
+
+    if save_to is not None:
+        if not os.path.exists(save_to):
+            os.makedirs(save_to)
+        for name, frame in d.items():
+            frame.to_csv(os.path.join(save_to, f"{name}.csv"), index=False)
 
     return d
 
@@ -138,13 +214,13 @@ def parse_gnomad(path:str=GNOMAD_PATH + '/gnomad_data.csv'):
     """
     Parses data from a gnomAD format text file into a pandas DataFrame.
 
-    :param str path: path to the gnomAD data file
+    :param str path: path to the gnomAD data file, or an opened text stream
     :returns: pandas DataFrame containing gnomAD data
     :rtype: pd.DataFrame
     """
 
     # Check if the file exists
-    if not os.path.exists(path):
+    if isinstance(path, str) and not os.path.exists(path):
         raise FileNotFoundError(f"The file at {path} does not exist.")
     logging.info("Parsing file %s using parse_gnomad.", path)
     try:
@@ -155,29 +231,66 @@ def parse_gnomad(path:str=GNOMAD_PATH + '/gnomad_data.csv'):
         raise e
 
 
+def parse_clinvar(path:str=CLINVAR_PATH + '/clinvar_data.txt', batch_rows:int|None=None):
+    """
+    Parses data from a ClinVar tabular text export into a pandas DataFrame.
+
+    Values are kept as they are written, as strings, empty where they are missing.
+
+    :param str path: path to the ClinVar data file, or an opened text stream
+    :param int batch_rows: if given, the data is read this many rows at a time
+    :returns: pandas DataFrame containing ClinVar data, or an iterator of DataFrames with
+        `batch_rows` rows each if `batch_rows` is given
+    :rtype: pd.DataFrame
+    """
+
+    # Check if the file exists
+    if isinstance(path, str) and not os.path.exists(path):
+        raise FileNotFoundError(f"The file at {path} does not exist.")
+    logging.info("Parsing file %s using parse_clinvar.", path)
+    try:
+        # Rows may end with a tab, which must not turn the first column into the index
+        return pd.read_csv(path, sep='\t', encoding='UTF-8', dtype=str, keep_default_na=False,
+                           index_col=False, chunksize=batch_rows)
+    except Exception as e:
+        logging.error("Error parsing ClinVar data: %s", str(e))
+        raise e
+
+
 def from_clinvar_name_to_cdna_position(name:str):
     """
     Custom cleaner to extract cDNA position from Clinvar `name` variable.
 
-    :param str name:
-    :returns: extracted cDNA
+    :param str name: Clinvar name, e.g. 'NM_001142800.2(EYS):c.9405T>A (p.Tyr3135Ter)'
+    :returns: extracted cDNA, e.g. 'c.9405T>A' or 'c.1211_1212del', None if the name cannot be
+        parsed
     :rtype: str
     """
 
-    start = name.find(":") + 1
-    ends = {'del', 'delins', 'dup', 'ins', 'inv', 'subst'}
+    cdna = from_clinvar_names_to_cdna_positions(pd.Series([name], dtype=object)).iloc[0]
+    return None if pd.isna(cdna) else cdna
+
 
-    if "p." in name:
-        name = name[:name.index("p.") - 1].strip()
+def from_clinvar_names_to_cdna_positions(names: pd.Series) -> pd.Series:
+    """
+    Extracts cDNA positions from a column of Clinvar names, see
+    `from_clinvar_name_to_cdna_position`.
+
+    The inserted and deleted sequences are left out, only the alleles of substitutions are kept.
 
-    end = len(name)
+    :param pd.Series names: Clinvar names
+    :returns: extracted cDNA, missing where the name cannot be parsed
+    :rtype: pd.Series
+    """
 
-    for i in ends:
-        if i in name:
-            end = name.index(i) + len(i)
-            break
+    def extract(distinct):
+        variants = parse_hgvs(distinct)
+        change = variants["kind"]
+        substitution = (change == "subst").fillna(False)
+        change = change.mask(substitution, variants["ref"] + ">" + variants["alt"])
+        return variants["coordinate"] + "." + variants["location"] + change
 
-    return name[start:end]
+    return map_distinct(names, extract)
 
 
 def lovd_fill_hg38(lovd: pd.DataFrame):
@@ -197,31 +310,87 @@ def lovd_fill_hg38(lovd: pd.DataFrame):
         return
     lovd.loc[:,'hg38_gnomad_format'] = lovd.loc[:,'VariantOnGenome/DNA/hg38'].replace('', pd.NA)
     missing_hg38_mask = lovd.loc[:,'hg38_gnomad_format'].isna()
-    lovd.loc[missing_hg38_mask, 'hg38_gnomad_format'] = (lovd.loc[missing_hg38_mask,
-                                                                'VariantOnGenome/DNA'].
-                                                         apply(convert_hg19_if_missing))
-    lovd.loc[:,'hg38_gnomad_format'] = lovd.loc[:,'hg38_gnomad_format'].apply(convert_to_gnomad_gen)
+    lovd.loc[missing_hg38_mask, 'hg38_gnomad_format'] = convert_hg19_series(
+        lovd.loc[missing_hg38_mask, 'VariantOnGenome/DNA'])
+    lovd.loc[:,'hg38_gnomad_format'] = convert_to_gnomad_series(lovd.loc[:,'hg38_gnomad_format'])
+
+
+def convert_hg19_series(hg19: pd.Series, chromosome: str = "6") -> pd.Series:
+    """
+    Converts hg19 variants to hg38 in a single batch.
+
+    The variants are parsed by `parse_hgvs`, and their start and end positions are converted at
+    once by the liftover engine of the tools package. Alleles of variants mapped to the reverse
+    strand are reverse complemented.
+
+    :param pd.Series hg19: variants in the format 'g.positionref>alt', or other genomic HGVS
+        descriptions such as 'g.start_enddel'
+    :param str chromosome: chromosome of the variants without a genomic reference sequence
+    :return: hg38 variants, or '?' for invalid values and variants which cannot be converted
+        as a whole
+    :rtype: pd.Series
+    """
+
+    if hg19.empty:
+        return pd.Series([], index=hg19.index, dtype=object)
 
+    def convert(distinct):
+        variants = parse_hgvs(distinct, chromosome)
+        start = liftover_positions(variants["chrom"], variants["start"])
+        end = liftover_positions(variants["chrom"], variants["end"])
 
-def convert_hg19_if_missing(hg19: str, lo = LiftOver('hg19', 'hg38')):
+        # Both ends are mapped to the same chain block, or the variant is not converted
+        valid = ((variants["coordinate"] == "g")
+                 & (start["chromosome"] == end["chromosome"])
+                 & (start["strand"] == end["strand"])
+                 & ((end["position"] - start["position"]).abs()
+                    == variants["end"] - variants["start"])).fillna(False)
+
+        reverse = (start["strand"] == "-").fillna(False)
+        complement = str.maketrans("ACGTN", "TGCAN")
+        for column in ("ref", "alt"):
+            variants[column] = variants[column].mask(
+                reverse, variants[column].str.translate(complement).str[::-1])
+        variants["start"] = start["position"].where(~reverse, end["position"])
+        variants["end"] = end["position"].where(~reverse, start["position"])
+
+        result = format_hgvs(variants).astype(object)
+        result[~valid.to_numpy(dtype=bool)] = "?"
+        return result
+
+    return map_distinct(hg19, convert)
+
+
+def convert_hg19_if_missing(hg19: str, lo = None):
     """
     Converts hg19 variant to hg38 if hg38 is missing.
     :param hg19: a row from the DataFrame.
-    :param lo: converter for genomic data between reference assemblies
+    :param lo: converter for genomic data between reference assemblies, the batch liftover
+        engine is used if not given
     :return: hg38 value or a conversion of the hg19 value in the format 'g.positionref>alt'.
     """
 
-    if pd.isna(hg19) or '_' in hg19:
+    if pd.isna(hg19):
         return "?"
 
-    match = re.search(r'g\.(\d+)', hg19)
-    if not match:
+    if lo is None:
+        return convert_hg19_series(pd.Series([hg19])).iloc[0]
+
+    chrom, start, end, _, _, kind, coordinate, _ = parse_hgvs_variant(hg19, "6")
+    if kind is None or coordinate != "g" or start is None or start != end:
         return '?'
 
-    position_str = match.group(1)
-    new_pos = lo.convert_coordinate('chr6', int(position_str))[0][1]
-    return f"g.{new_pos}{hg19[-3:]}"
+    converted = lo.convert_coordinate(f'chr{chrom}', int(start) - 1)
+    if not converted:
+        return '?'
 
+    variant = parse_hgvs(pd.Series([hg19]), "6")
+    variant["start"] = variant["end"] = converted[0][1] + 1
+    if converted[0][2] == '-':
+        complement = str.maketrans("ACGTN", "TGCAN")
+        variant["ref"] = variant["ref"].str.translate(complement).str[::-1]
+        variant["alt"] = variant["alt"].str.translate(complement).str[::-1]
+    return format_hgvs(variant).iloc[0]
 
 
 def convert_to_gnomad_gen(variant: str):
@@ -233,30 +402,36 @@ def convert_to_gnomad_gen(variant: str):
     or '?' if the input contains interval ranges or is invalid.
     """
 
-    patterns = {
-        'dup': re.compile(r'^g\.(\d+)dup$'),
-        'del': re.compile(r'^g\.(\d+)del$'),
-        'ref_alt': re.compile(r'^g\.(\d+)([A-Z])>([A-Z])$')
-    }
+    return convert_to_gnomad_series(pd.Series([variant], dtype=object)).iloc[0]
+
+
+def convert_to_gnomad_series(variants: pd.Series, chromosome: str = "6") -> pd.Series:
+    """
+    Converts a column of hg38 variants to the format used by gnomAD, see `convert_to_gnomad_gen`.
+
+    Substitutions become 'chromosome-position-ref-alt', and deletions and duplications of a
+    single position 'chromosome-position-del' and 'chromosome-position-dup'.
 
-    match = patterns['dup'].match(variant)
-    if match:
-        position = match.group(1)
-        return f"6-{position}-dup"
+    :param pd.Series variants: variants in the format 'g.startRef>Alt'
+    :param str chromosome: chromosome of the variants without a genomic reference sequence
+    :return: variants in the gnomAD format, or '?' for ranges, other kinds of variants and
+        invalid values
+    :rtype: pd.Series
+    """
 
-    match = patterns['del'].match(variant)
-    if match:
-        position = match.group(1)
-        return f"6-{position}-del"
+    def convert(distinct):
+        parsed = parse_hgvs(distinct, chromosome)
+        prefix = parsed["chrom"] + "-" + parsed["start"].astype("string") + "-"
+        single = (parsed["coordinate"] == "g") & (parsed["start"] == parsed["end"])
 
-    match = patterns['ref_alt'].match(variant)
-    if match:
-        position = match.group(1)
-        ref = match.group(2)
-        alt = match.group(3)
-        return f"6-{position}-{ref}-{alt}"
+        result = pd.Series("?", index=distinct.index, dtype=object)
+        substitution = (single & (parsed["kind"] == "subst")).fillna(False)
+        result[substitution] = prefix + parsed["ref"] + "-" + parsed["alt"]
+        indel = (single & parsed["kind"].isin(["del", "dup"])).fillna(False)
+        result[indel] = prefix + parsed["kind"]
+        return result
 
-    return "?"
+    return map_distinct(variants, convert)
 
 
 def merge_gnomad_lovd(lovd:pd.DataFrame, gnomad:pd.DataFrame):
@@ -277,15 +452,52 @@ def merge_gnomad_lovd(lovd:pd.DataFrame, gnomad:pd.DataFrame):
     lovd_fill_hg38(lovd)
     gnomad.columns = [col + '_gnomad' for col in gnomad.columns]
 
-    merged_frame = pd.merge(
-        lovd,
-        gnomad,
-        how="outer",
-        left_on="hg38_gnomad_format",
-        right_on="variant_id_gnomad"
-    )
+    return merge_keyed_variants(key_lovd_variants(lovd, fill_hg38=False),
+                                key_gnomad_variants(gnomad))
+
+
+def key_lovd_variants(lovd:pd.DataFrame, fill_hg38:bool=True):
+    """
+    Adds the variant keys of LOVD rows for `merge_keyed_variants`.
+
+    :param DataFrame lovd: LOVD dataframe
+    :param bool fill_hg38: whether to fill the hg38 variants first, see `lovd_fill_hg38`
+    :returns: LOVD dataframe with the keys of 'hg38_gnomad_format' in 'variant_key'
+    :rtype: pd.DataFrame
+    """
+
+    if fill_hg38:
+        lovd_fill_hg38(lovd)
+    keys, _ = variant_keys_from_ids(lovd['hg38_gnomad_format'])
+    return lovd.assign(variant_key=keys)
+
+
+def key_gnomad_variants(gnomad:pd.DataFrame):
+    """
+    Adds the variant keys of gnomAD rows for `merge_keyed_variants`.
+
+    :param DataFrame gnomad: gnomAD dataframe, with the '_gnomad' suffix on its columns
+    :returns: gnomAD dataframe with the keys of 'variant_id_gnomad' in 'variant_key'
+    :rtype: pd.DataFrame
+    """
+
+    keys, _ = variant_keys_from_ids(gnomad['variant_id_gnomad'])
+    # Rows without a valid variant on both sides must not match each other
+    return gnomad.assign(variant_key=keys.replace(MISSING_KEY, MISSING_KEY - 1))
 
-    return merged_frame
+
+def merge_keyed_variants(lovd:pd.DataFrame, gnomad:pd.DataFrame):
+    """
+    Merges LOVD and gnomAD rows on their variant keys.
+
+    :param DataFrame lovd: LOVD dataframe, as returned by `key_lovd_variants`
+    :param DataFrame gnomad: gnomAD dataframe, as returned by `key_gnomad_variants`
+    :returns: merged dataframe without the keys
+    :rtype: pd.DataFrame
+    """
+
+    merged_frame = pd.merge(lovd, gnomad, how="outer", on="variant_key")
+    return merged_frame.drop(columns="variant_key")
 
 
 def save_lovd_as_vcf(data:pd.DataFrame, save_to:str="./lovd.vcf"):
@@ -299,7 +511,7 @@ def save_lovd_as_vcf(data:pd.DataFrame, save_to:str="./lovd.vcf"):
         raise ValueError("VariantOnGenome/DNA/hg38 is not in the LOVD DataFrame.")
 
     save_to_dir = os.path.dirname(save_to)
-    if not os.path.exists(save_to_dir):
+    if save_to_dir and not os.path.exists(save_to_dir):
         os.makedirs(save_to_dir)
 
     with open(save_to, "w", encoding="UTF-8") as f:
@@ -307,14 +519,27 @@ def save_lovd_as_vcf(data:pd.DataFrame, save_to:str="./lovd.vcf"):
                   "##contig=<ID=6,length=63719980>\n"
                   "#CHROM	POS	ID	REF	ALT	QUAL	FILTER	INFO\n")
         f.write(header)
-        for variant in df.loc[:, "VariantOnGenome/DNA/hg38"]:
-            if len(variant) != 13 or variant[-2] != '>':
-                logging.warning("Skipping variant %s", variant)
-                continue
-            record = ["6", variant[2:-3], ".", variant[-3], variant[-1], ".", ".", "."]
-
-            f.write("\t".join(record))
-            f.write("\n")
+
+        # Other kinds of variants need the reference sequence around them
+        variants = parse_hgvs(df.loc[:, "VariantOnGenome/DNA/hg38"], "6")
+        substitution = ((variants["coordinate"] == "g") & (variants["kind"] == "subst")
+                        & variants["start"].notna()).fillna(False)
+        if not substitution.all():
+            logging.warning("Skipping %d variants which are not substitutions",
+                            (~substitution).sum())
+
+        variants = variants[substitution]
+        records = pd.DataFrame({
+            "CHROM": variants["chrom"],
+            "POS": variants["start"],
+            "ID": ".",
+            "REF": variants["ref"],
+            "ALT": variants["alt"],
+            "QUAL": ".",
+            "FILTER": ".",
+            "INFO": ".",
+        })
+        records.to_csv(f, sep="\t", header=False, index=False)
 
 
 def find_popmax_in_gnomad(data:pd.DataFrame):
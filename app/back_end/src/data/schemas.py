@@ -0,0 +1,142 @@
+""" Module dedicated for the declared column types of the sources """
+
+import re
+import logging
+
+import pandas as pd
+import pyarrow as pa
+
+# Few distinct values, stored once with a small code per row
+CATEGORY = "category"
+# Allele frequencies, kept in float64: they are written back to the merged files, where float32
+# would round them to about 8 significant digits. The savings come from the other types
+FREQUENCY = "float64"
+# Counts and positions, nullable so that the rows missing from a merge keep their integers
+COUNT = "Int32"
+# Other text, stored in contiguous Arrow buffers instead of one Python object per value
+STRING = pd.StringDtype("pyarrow")
+
+# Types by pattern of column names, matched as a whole and ignoring case, first match wins
+LOVD_SCHEMA = {
+    r"chromosome": CATEGORY,
+    r"type|allele": CATEGORY,
+    r".*ClinicalClassification.*|.*Genetic_origin": CATEGORY,
+    r"average_frequency": FREQUENCY,
+    r"position_[cg]_(start|end)(_intron)?": COUNT,
+}
+
+GNOMAD_SCHEMA = {
+    r"chrom(osome)?": CATEGORY,
+    r".*population.*|pop(max_id)?": CATEGORY,
+    r"source|flags|filters.*|vep annotation|transcript consequence": CATEGORY,
+    r"clinvar clinical significance": CATEGORY,
+    r"allele[ _]frequency.*|popmax|af(_.*)?": FREQUENCY,
+    r".*(count|number).*|(total_)?a[cn](_.*)?|.*_a[cn]_.*|ac_hom|pos(ition)?": COUNT,
+}
+
+
+def column_dtype(schema: dict, column: str):
+    """
+    Finds the declared type of a column.
+
+    :param dict schema: types by pattern of column names, e.g. `GNOMAD_SCHEMA`
+    :param str column: name of the column
+    :returns: declared type, or None if no pattern matches
+    """
+
+    for pattern, dtype in schema.items():
+        if re.fullmatch(pattern, str(column), flags=re.IGNORECASE):
+            return dtype
+    return None
+
+
+def _default_dtype(values: pd.Series):
+    """
+    Chooses the type of a column without declared type.
+
+    :param pd.Series values: values of the column
+    :returns: nullable integers for integers, Arrow-backed strings for text, None to keep the type
+    """
+
+    if pd.api.types.is_integer_dtype(values.dtype) and not isinstance(values.dtype, pd.Int32Dtype):
+        return "Int64"
+    if pd.api.types.is_bool_dtype(values.dtype):
+        return "boolean"
+    if values.dtype == object:
+        return STRING
+    return None
+
+
+def _is_integral_float(values: pd.Series):
+    """
+    Checks whether a column holds integers read as floats, e.g. because of a missing value.
+
+    :param pd.Series values: values of the column
+    :returns: True if the column is of float type and its values are whole numbers
+    """
+
+    if not pd.api.types.is_float_dtype(values.dtype):
+        return False
+    present = values.dropna()
+    return bool(((present % 1) == 0).all())
+
+
+def apply_schema(frame: pd.DataFrame, schema: dict, source: str):
+    """
+    Converts the columns of a table to their declared types, in place.
+
+    Columns without declared type keep numeric types, as nullable integers, and their text as
+    Arrow-backed strings. Categories of whole numbers are integers, also when a missing value made
+    them read as floats. Columns whose values do not fit their declared type, such as a count
+    column holding text, are converted as if they had none.
+
+    :param DataFrame frame: table of the source
+    :param dict schema: types by pattern of column names, e.g. `GNOMAD_SCHEMA`
+    :param str source: name of the source, for the log
+    """
+
+    for column in frame.columns:
+        values = frame[column]
+        dtype = column_dtype(schema, column)
+        if dtype == CATEGORY and _is_integral_float(values):
+            # Integers read as floats because the file or batch has a missing value, categories
+            # keep them as integers so that the output does not depend on how the data was read
+            values = values.astype("Int64")
+        if dtype is not None:
+            try:
+                frame[column] = values.astype(dtype)
+                continue
+            except (TypeError, ValueError, OverflowError):
+                logging.info("Column '%s' of %s data does not fit %s", column, source, dtype)
+
+        dtype = _default_dtype(values)
+        if dtype is not None:
+            frame[column] = values.astype(dtype)
+
+
+def _arrow_pandas_type(data_type: pa.DataType):
+    """
+    Maps Arrow strings to Arrow-backed pandas strings, see `arrow_to_pandas`.
+
+    :param pa.DataType data_type: Arrow type of a column
+    :returns: pandas type of the column, None for the default one
+    """
+
+    if pa.types.is_string(data_type) or pa.types.is_large_string(data_type):
+        return STRING
+    return None
+
+
+def arrow_to_pandas(table) -> pd.DataFrame:
+    """
+    Converts a table read from Parquet, keeping the declared types of its columns.
+
+    Pandas metadata restores categories and nullable integers, but not the storage of strings,
+    which would be converted to Python objects.
+
+    :param table: Arrow table or record batch
+    :returns: the table as a DataFrame
+    :rtype: pd.DataFrame
+    """
+
+    return table.to_pandas(types_mapper=_arrow_pandas_type)
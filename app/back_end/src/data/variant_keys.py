@@ -0,0 +1,229 @@
+""" Module dedicated for packing variants into integer keys for joins and lookups """
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Compute functions are registered when pyarrow is imported, pylint cannot see them
+# pylint: disable=no-member
+
+
+# A key is laid out as | 0 | chromosome: 5 bits | position: 29 bits | alleles: 29 bits |, so that
+# keys sort by chromosome and position. Alleles are either packed inline or hashed, see
+# `_allele_code`.
+CHROMOSOME_BITS = 5
+POSITION_BITS = 29
+ALLELE_BITS = 29
+
+MISSING_KEY = -1
+
+_CHROMOSOME_CODES = {**{str(number): number for number in range(1, 23)}, "X": 23, "Y": 24, "M": 25}
+_CHROMOSOME_NAMES = {code: name for name, code in _CHROMOSOME_CODES.items()}
+
+_VARIANT_ID_PATTERN = (
+    r"^(?P<chrom>[^-]+)-(?P<pos>\d+)-(?:(?P<ref>[A-Za-z]+)-(?P<alt>[A-Za-z]+)|(?P<kind>del|dup))$"
+)
+
+_BASES = "ACGT"
+_HASHED = 1 << (ALLELE_BITS - 1)
+_MAX_INLINE_BASES = 11
+
+
+def normalize_chromosome(name) -> str:
+    """
+    Normalizes a chromosome name, removing the `chr` prefix and naming the mitochondrion `M`.
+
+    :param name: chromosome name or number
+    :returns: normalized name
+    :rtype: str
+    """
+
+    name = f"{name:g}" if isinstance(name, float) else str(name)
+    name = name.strip().removeprefix("chr")
+    return "M" if name == "MT" else name
+
+
+def _allele_code(ref: str, alt: str) -> int:
+    """
+    Packs a pair of alleles into `ALLELE_BITS` bits.
+
+    Alleles of up to 11 bases of A, C, G and T in total are packed inline: the length of the
+    reference allele in 4 bits, followed by a 1 bit and 2 bits per base. Other alleles are hashed
+    with the highest bit set, and are decoded with the reverse dictionary of the keys.
+
+    :param str ref: reference allele
+    :param str alt: alternative allele
+    :returns: code of the alleles
+    :rtype: int
+    """
+
+    bases = ref + alt
+    if ref and alt and len(bases) <= _MAX_INLINE_BASES and not bases.strip(_BASES):
+        code = 1
+        for base in bases:
+            code = code << 2 | _BASES.index(base)
+        return len(ref) << (2 * _MAX_INLINE_BASES + 1) | code
+
+    digest = hashlib.blake2b(f"{ref}>{alt}".encode(), digest_size=4).digest()
+    return _HASHED | int.from_bytes(digest, "big") & (_HASHED - 1)
+
+
+def _alleles_of_code(code: int) -> tuple[str, str]:
+    """
+    Unpacks a pair of alleles packed inline, see `_allele_code`.
+
+    :param int code: code of the alleles, without the hash bit
+    :returns: reference and alternative allele
+    :rtype: tuple[str, str]
+    """
+
+    ref_length = code >> (2 * _MAX_INLINE_BASES + 1)
+    code &= (1 << (2 * _MAX_INLINE_BASES + 1)) - 1
+
+    bases = []
+    while code > 1:
+        bases.append(_BASES[code & 3])
+        code >>= 2
+    bases = "".join(reversed(bases))
+    return bases[:ref_length], bases[ref_length:]
+
+
+def pack_variant_keys(chromosomes: pd.Series, positions: pd.Series, refs: pd.Series,
+                      alts: pd.Series) -> tuple[pd.Series, dict]:
+    """
+    Packs variants into int64 keys, ordered by chromosome and position.
+
+    Joining, deduplicating and looking up variants by their keys is much faster and uses much
+    less memory than by strings such as '6-123-A-G'. Variants with the same chromosome, position
+    and alleles have the same key in every table. Long alleles are hashed, two different long
+    alleles at the same position collide with a probability of 2^-28.
+
+    :param pd.Series chromosomes: chromosome names, with or without the `chr` prefix
+    :param pd.Series positions: 1-based positions
+    :param pd.Series refs: reference alleles
+    :param pd.Series alts: alternative alleles
+    :returns: keys with the index of `positions`, `MISSING_KEY` for incomplete variants and
+        unknown chromosomes; and the reverse dictionary of the hashed alleles, alleles by code
+    :rtype: tuple[pd.Series, dict]
+    """
+
+    chromosome_codes, chromosome_names = pd.factorize(chromosomes)
+    chromosome_lookup = np.array(
+        [_CHROMOSOME_CODES.get(normalize_chromosome(name), 0) for name in chromosome_names] + [0],
+        dtype=np.int64,
+    )
+    chromosome_codes = chromosome_lookup[chromosome_codes]
+
+    values = pd.to_numeric(positions, errors="coerce").to_numpy(dtype=np.float64, na_value=0)
+    valid_positions = (values >= 1) & (values < 1 << POSITION_BITS)
+    positions = np.where(valid_positions, values, 0).astype(np.int64)
+
+    # Alleles take few distinct values, each distinct pair is packed once
+    ref_codes, ref_names = pd.factorize(refs)
+    alt_codes, alt_names = pd.factorize(alts)
+    pair_codes, pairs = pd.factorize(ref_codes.astype(np.int64) * (len(alt_names) + 1) + alt_codes)
+
+    alleles = {}
+    pair_lookup = np.empty(len(pairs) + 1, dtype=np.int64)
+    pair_lookup[-1] = -1
+    for index, pair in enumerate(pairs):
+        ref_code, alt_code = divmod(int(pair), len(alt_names) + 1)
+        if ref_code < 0 or alt_code >= len(alt_names):
+            pair_lookup[index] = -1
+            continue
+
+        ref, alt = str(ref_names[ref_code]), str(alt_names[alt_code])
+        code = _allele_code(ref, alt)
+        if code & _HASHED:
+            alleles[code] = (ref, alt)
+        pair_lookup[index] = code
+    allele_codes = pair_lookup[pair_codes]
+
+    valid = (chromosome_codes > 0) & valid_positions & (allele_codes >= 0)
+    keys = np.where(
+        valid,
+        chromosome_codes << (POSITION_BITS + ALLELE_BITS)
+        | positions << ALLELE_BITS
+        | allele_codes,
+        MISSING_KEY,
+    )
+    return pd.Series(keys, index=refs.index), alleles
+
+
+def variant_keys_from_ids(variant_ids: pd.Series) -> tuple[pd.Series, dict]:
+    """
+    Packs variant IDs in the gnomAD format ('chromosome-position-ref-alt') into keys, see
+    `pack_variant_keys`.
+
+    IDs of deletions and duplications without alleles such as '6-123-del' have the alleles ''
+    and 'del' or 'dup'.
+
+    :param pd.Series variant_ids: variant IDs
+    :returns: keys with the index of `variant_ids`, `MISSING_KEY` for invalid IDs; and the reverse
+        dictionary of the hashed alleles
+    :rtype: tuple[pd.Series, dict]
+    """
+
+    ids = pa.array(variant_ids.astype(object).where(variant_ids.notna(), None), type=pa.string())
+    parts = pc.extract_regex(ids, _VARIANT_ID_PATTERN)
+
+    def part(name, arrow_type=pa.string()):
+        values = pc.cast(pc.struct_field(parts, name), arrow_type).to_numpy(zero_copy_only=False)
+        return pd.Series(values, index=variant_ids.index)
+
+    refs, alts, kinds = part("ref"), part("alt"), part("kind")
+    indel = (kinds != "").to_numpy(dtype=bool)
+    alts[indel] = kinds[indel]
+    return pack_variant_keys(part("chrom"), part("pos", pa.int64()), refs, alts)
+
+
+def unpack_variant_keys(keys: pd.Series, alleles: dict) -> pd.DataFrame:
+    """
+    Unpacks keys into the chromosome, position and alleles of the variants.
+
+    :param pd.Series keys: keys, as returned by `pack_variant_keys`
+    :param dict alleles: reverse dictionary of the hashed alleles, as returned with the keys
+    :returns: the columns `chrom`, `pos`, `ref` and `alt` with the index of `keys`, missing values
+        for `MISSING_KEY`
+    :rtype: pd.DataFrame
+    """
+
+    values = keys.to_numpy(dtype=np.int64)
+    valid = values != MISSING_KEY
+
+    chromosome_codes = values >> (POSITION_BITS + ALLELE_BITS)
+    positions = values >> ALLELE_BITS & ((1 << POSITION_BITS) - 1)
+    allele_codes, allele_indexes = np.unique(values & ((1 << ALLELE_BITS) - 1),
+                                             return_inverse=True)
+
+    pairs = [alleles.get(int(code), (None, None)) if code & _HASHED else _alleles_of_code(int(code))
+             for code in allele_codes]
+    refs = np.array([ref for ref, _ in pairs] + [None], dtype=object)
+    alts = np.array([alt for _, alt in pairs] + [None], dtype=object)
+    allele_indexes = np.where(valid, allele_indexes.reshape(-1), len(pairs))
+
+    names = np.array([_CHROMOSOME_NAMES.get(code) for code in range(1 << CHROMOSOME_BITS)],
+                     dtype=object)
+    return pd.DataFrame({
+        "chrom": pd.array(np.where(valid, names[chromosome_codes & 31], None), dtype="string"),
+        "pos": pd.arrays.IntegerArray(positions, ~valid),
+        "ref": pd.array(refs[allele_indexes], dtype="string"),
+        "alt": pd.array(alts[allele_indexes], dtype="string"),
+    }, index=keys.index)
+
+
+def position_keys(keys: pd.Series) -> pd.Series:
+    """
+    Drops the alleles of keys, so that variants at the same position have the same key.
+
+    :param pd.Series keys: keys, as returned by `pack_variant_keys`
+    :returns: keys of the positions, `MISSING_KEY` for `MISSING_KEY`
+    :rtype: pd.Series
+    """
+
+    values = keys.to_numpy(dtype=np.int64)
+    positions = np.where(values == MISSING_KEY, MISSING_KEY, values >> ALLELE_BITS << ALLELE_BITS)
+    return pd.Series(positions, index=keys.index)
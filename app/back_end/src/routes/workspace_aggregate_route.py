@@ -24,9 +24,9 @@ import csv
 from ast import literal_eval
 from flask import Blueprint, request, jsonify
 
-from ..setup.extensions import logger
+from ..setup.extensions import logger, cold_storage_manager, lock_manager
 from ..utils.helpers import socketio_emit_to_user_session, is_number
-from ..utils.exceptions import UnexpectedError
+from ..utils.exceptions import UnexpectedError, LockTimeoutError
 from ..constants import WORKSPACE_AGGREGATE_ROUTE, CONSOLE_FEEDBACK_EVENT, WORKSPACE_DIR
 
 
@@ -109,7 +109,11 @@ def get_workspace_aggregate_all(relative_path):
     counts = {field: 0 for field in columns_aggregation.keys()}
 
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
+        # Open the current version, writers replace the file without affecting open readers
+        with lock_manager.shared(file_path, timeout=lock_manager.interactive_timeout):
+            file = cold_storage_manager.open(file_path, "r", encoding="utf-8")
+
+        with file:
             reader = csv.reader(file)
             header = next(reader)
 
@@ -224,6 +228,19 @@ def get_workspace_aggregate_all(relative_path):
             sid,
         )
         return jsonify({"error": "Requested file not found"}), 404
+    except LockTimeoutError as e:
+        logger.error("LockTimeoutError: %s while calculating all %s", e.message, file_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"LockTimeoutError: {e.message} while calculating all {file_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "File is in use by another operation"}), 423
     except PermissionError as e:
         logger.error("PermissionError: %s while calculating all %s", e, file_path)
         # Emit a feedback to the user's console
@@ -324,7 +341,11 @@ def get_workspace_aggregate(relative_path):
     skipped_count = 0
 
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
+        # Open the current version, writers replace the file without affecting open readers
+        with lock_manager.shared(file_path, timeout=lock_manager.interactive_timeout):
+            file = cold_storage_manager.open(file_path, "r", encoding="utf-8")
+
+        with file:
             reader = csv.reader(file)
             header = next(reader)
 
@@ -429,6 +450,19 @@ def get_workspace_aggregate(relative_path):
             sid,
         )
         return jsonify({"error": "Requested file not found"}), 404
+    except LockTimeoutError as e:
+        logger.error("LockTimeoutError: %s while calculating %s", e.message, file_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"LockTimeoutError: {e.message} while calculating {file_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "File is in use by another operation"}), 423
     except PermissionError as e:
         logger.error("PermissionError: %s while calculating %s", e, file_path)
         # Emit a feedback to the user's console
@@ -10,9 +10,16 @@ import os
 import pandas as pd
 from flask import Blueprint, request, jsonify
 
-from ..setup.extensions import logger
-from ..utils.helpers import socketio_emit_to_user_session
-from ..utils.exceptions import UnexpectedError
+from ..setup.extensions import logger, cache_manager, cold_storage_manager, lock_manager
+from ..utils.helpers import (
+    socketio_emit_to_user_session,
+    track_workspace_usage,
+    estimate_output_size,
+    snapshot_workspace_file,
+    parse_override_arg,
+)
+from ..utils.csv_append import append_csv_batches
+from ..utils.exceptions import UnexpectedError, QuotaExceededError, LockTimeoutError
 from ..constants import (
     WORKSPACE_APPLY_ROUTE,
     WORKSPACE_DIR,
@@ -22,7 +29,8 @@ from ..constants import (
 
 from ..tools import (
     add_spliceai_eval_columns,
-    add_cadd_eval_column
+    add_cadd_eval_column,
+    add_liftover_columns,
 )
 
 workspace_apply_route_bp = Blueprint("workspace_apply_route", __name__)
@@ -63,7 +71,7 @@ def get_workspace_apply_spliceai(relative_path):
     #       Destination file can be the same file so ensure correct handling
 
     destination_path = os.path.join(WORKSPACE_DIR, uuid, relative_path)
-    override = request.args.get("override")
+    override = parse_override_arg(request.args)
     apply_to = os.path.join(WORKSPACE_DIR, uuid, request.args.get("applyTo"))
 
     try:
@@ -83,26 +91,37 @@ def get_workspace_apply_spliceai(relative_path):
         # TODO: Implement SpliceAI algorithm apply and save logic using defined parameters
         # [destination_path, override, apply_to]
         #
-        existing_data = pd.DataFrame()
-        if os.path.exists(destination_path):
-            if override:
-                os.remove(destination_path)
+        # Writers are applied one after the other, readers keep the version they opened
+        with lock_manager.exclusive(destination_path, "write"), track_workspace_usage(
+            uuid, sid, destination_path, estimate_output_size(apply_to)
+        ):
+            # The file is replaced when overriding, otherwise the results are appended
+            append = os.path.exists(destination_path) and not override
+            if os.path.exists(destination_path) and not append:
+                snapshot_workspace_file(destination_path, "apply")
+
+            fasta_path = os.path.join(WORKSPACE_DIR,"fasta", "hg38.fa")
+            with cold_storage_manager.open(apply_to, "r", encoding="utf-8") as file:
+                temp = pd.read_csv(file)
+
+            #Delete after pitch(now limited to 50)
+            result_data_spliceai = add_spliceai_eval_columns(temp[:50], fasta_path)
+
+            # The results are appended, the existing rows are neither read nor rewritten
+            if append:
+                append_csv_batches(destination_path, [result_data_spliceai], "apply")
             else:
-                existing_data = pd.read_csv(destination_path)
-
-        fasta_path = os.path.join(WORKSPACE_DIR,"fasta", "hg38.fa")
-        temp = pd.read_csv(apply_to)
-
-        #Delete after pitch(now limited to 50)
-        result_data_spliceai = add_spliceai_eval_columns(temp[:50], fasta_path)
-
-        if not existing_data.empty:
-            result_data_spliceai = pd.concat([existing_data, result_data_spliceai], ignore_index=True)
-
-        try:
-            result_data_spliceai.to_csv(destination_path, index=False)
-        except OSError as e:
-            raise RuntimeError(f"Error saving file: {e}")
+                temp_path = cache_manager.temp_path()
+                try:
+                    result_data_spliceai.to_csv(temp_path, index=False)
+                    with lock_manager.exclusive(destination_path):
+                        os.replace(temp_path, destination_path)
+                        cache_manager.invalidate(destination_path)
+                except OSError as e:
+                    raise RuntimeError(f"Error saving file: {e}") from e
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
 
         # Emit a feedback to the user's console
         socketio_emit_to_user_session(
@@ -140,6 +159,24 @@ def get_workspace_apply_spliceai(relative_path):
             sid,
         )
         return jsonify({"error": "Requested file not found"}), 404
+    except LockTimeoutError as e:
+        logger.error(
+            "LockTimeoutError: %s while applying SpliceAI algorithm %s",
+            e.message,
+            destination_path,
+        )
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"LockTimeoutError: {e.message} while applying SpliceAI algorithm"
+                + f"{destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "File is in use by another operation"}), 423
     except PermissionError as e:
         logger.error(
             "PermissionError: %s while applying SpliceAI algorithm %s",
@@ -158,6 +195,24 @@ def get_workspace_apply_spliceai(relative_path):
             sid,
         )
         return jsonify({"error": "Permission denied"}), 403
+    except QuotaExceededError as e:
+        logger.error(
+            "QuotaExceededError: %s while applying SpliceAI algorithm %s",
+            e.message,
+            destination_path,
+        )
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"QuotaExceededError: {e.message} while applying SpliceAI algorithm"
+                + f"{destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Insufficient storage"}), 507
     except UnexpectedError as e:
         logger.error(
             "UnexpectedError: %s while applying SpliceAI algorithm %s",
@@ -233,7 +288,7 @@ def get_workspace_apply_cadd(relative_path):
     #       Destination file can be the same file so ensure correct handling
 
     destination_path = os.path.join(WORKSPACE_DIR, uuid, relative_path)
-    override = request.args.get("override")
+    override = parse_override_arg(request.args)
     apply_to = os.path.join(WORKSPACE_DIR, uuid, request.args.get("applyTo"))
 
     try:
@@ -253,25 +308,36 @@ def get_workspace_apply_cadd(relative_path):
         # TODO: Implement CADD algorithm apply and save logic using defined parameters
         # [destination_path, override, apply_to]
 
-        existing_data = pd.DataFrame()
-        if os.path.exists(destination_path):
-            if override:
-                os.remove(destination_path)
-            else:
-                existing_data = pd.read_csv(destination_path)
-
-        temp = pd.read_csv(apply_to)
+        # Writers are applied one after the other, readers keep the version they opened
+        with lock_manager.exclusive(destination_path, "write"), track_workspace_usage(
+            uuid, sid, destination_path, estimate_output_size(apply_to)
+        ):
+            # The file is replaced when overriding, otherwise the results are appended
+            append = os.path.exists(destination_path) and not override
+            if os.path.exists(destination_path) and not append:
+                snapshot_workspace_file(destination_path, "apply")
 
-        # Delete after pitch(now limited to 50)
-        result_data_cadd = add_cadd_eval_column(temp[:50])
+            with cold_storage_manager.open(apply_to, "r", encoding="utf-8") as file:
+                temp = pd.read_csv(file)
 
-        if not existing_data.empty:
-            result_data_cadd = pd.concat([existing_data, result_data_cadd], ignore_index=True)
+            # Delete after pitch(now limited to 50)
+            result_data_cadd = add_cadd_eval_column(temp[:50])
 
-        try:
-            result_data_cadd.to_csv(destination_path, index=False)
-        except OSError as e:
-            raise RuntimeError(f"Error saving file: {e}")
+            # The results are appended, the existing rows are neither read nor rewritten
+            if append:
+                append_csv_batches(destination_path, [result_data_cadd], "apply")
+            else:
+                temp_path = cache_manager.temp_path()
+                try:
+                    result_data_cadd.to_csv(temp_path, index=False)
+                    with lock_manager.exclusive(destination_path):
+                        os.replace(temp_path, destination_path)
+                        cache_manager.invalidate(destination_path)
+                except OSError as e:
+                    raise RuntimeError(f"Error saving file: {e}") from e
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
 
         # Emit a feedback to the user's console
         socketio_emit_to_user_session(
@@ -309,6 +375,22 @@ def get_workspace_apply_cadd(relative_path):
             sid,
         )
         return jsonify({"error": "Requested file not found"}), 404
+    except LockTimeoutError as e:
+        logger.error(
+            "LockTimeoutError: %s while applying CADD algorithm %s", e.message, destination_path
+        )
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"LockTimeoutError: {e.message} while applying CADD algorithm"
+                + f" {destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "File is in use by another operation"}), 423
     except PermissionError as e:
         logger.error(
             "PermissionError: %s while applying CADD algorithm %s", e, destination_path
@@ -324,6 +406,22 @@ def get_workspace_apply_cadd(relative_path):
             sid,
         )
         return jsonify({"error": "Permission denied"}), 403
+    except QuotaExceededError as e:
+        logger.error(
+            "QuotaExceededError: %s while applying CADD algorithm %s", e.message, destination_path
+        )
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"QuotaExceededError: {e.message} while applying CADD algorithm "
+                + f"{destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Insufficient storage"}), 507
     except UnexpectedError as e:
         logger.error(
             "UnexpectedError: %s while applying CADD algorithm %s",
@@ -362,3 +460,234 @@ def get_workspace_apply_cadd(relative_path):
         return jsonify({"error": "An internal error occurred"}), 500
 
     return jsonify({"message": "CADD algorithm was successfully applied"}), 200
+
+
+@workspace_apply_route_bp.route(
+    f"{WORKSPACE_APPLY_ROUTE}/liftover/<path:relative_path>", methods=["GET"]
+)
+def get_workspace_apply_liftover(relative_path):
+    """
+    Route to convert the positions of a file to another assembly and save the result to the
+    workspace.
+
+    The chromosome and position of every row are converted in a single batch, and added as the
+    `<chromosomeColumn>_<to>` and `<positionColumn>_<to>` columns, empty for positions which cannot
+    be converted.
+    """
+
+    # Check if 'uuid' and 'sid' are provided in the headers
+    if "uuid" not in request.headers or "sid" not in request.headers:
+        return jsonify({"error": "UUID and SID headers are required"}), 400
+
+    uuid = request.headers.get("uuid")
+    sid = request.headers.get("sid")
+
+    # Check if 'override', 'applyTo', 'chromosomeColumn' and 'positionColumn' are provided
+    if (
+        "override" not in request.args
+        or "applyTo" not in request.args
+        or "chromosomeColumn" not in request.args
+        or "positionColumn" not in request.args
+    ):
+        return (
+            jsonify(
+                {
+                    "error": "'override', 'applyTo', 'chromosomeColumn' and 'positionColumn' "
+                    + "parameters are required"
+                }
+            ),
+            400,
+        )
+
+    # Explanation about the parameters:
+    # - destination_path: string
+    #     - The path to the destination file (where to save it) in the user's workspace
+    #       Destination file can either be a new file or an existing file, check its existence
+    # - override: boolean
+    #     - If true, the existing destination file should be overridden
+    #     - If false, the existing destination file should not be overridden and converted
+    #       content should be appended
+    # - apply_to: string
+    #     - The path to the file whose positions should be converted
+    #       Destination file can be the same file so ensure correct handling
+    # - chromosome_column, position_column: string
+    #     - The columns holding the chromosome and the 1-based position of every row
+    # - from_db, to_db: string
+    #     - The source and target assemblies, 'hg19' and 'hg38' by default
+
+    destination_path = os.path.join(WORKSPACE_DIR, uuid, relative_path)
+    override = parse_override_arg(request.args)
+    apply_to = os.path.join(WORKSPACE_DIR, uuid, request.args.get("applyTo"))
+    chromosome_column = request.args.get("chromosomeColumn")
+    position_column = request.args.get("positionColumn")
+    from_db = request.args.get("from", "hg19")
+    to_db = request.args.get("to", "hg38")
+
+    try:
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "info",
+                "message": f"Converting positions from {from_db} to {to_db} to '{relative_path}' "
+                + f"with override: '{override}'...",
+            },
+            uuid,
+            sid,
+        )
+
+        # Writers are applied one after the other, readers keep the version they opened
+        with lock_manager.exclusive(destination_path, "write"), track_workspace_usage(
+            uuid, sid, destination_path, estimate_output_size(apply_to)
+        ):
+            # The file is replaced when overriding, otherwise the results are appended
+            append = os.path.exists(destination_path) and not override
+            if os.path.exists(destination_path) and not append:
+                snapshot_workspace_file(destination_path, "apply")
+
+            with cold_storage_manager.open(apply_to, "r", encoding="utf-8") as file:
+                temp = pd.read_csv(file)
+
+            result_data_liftover = add_liftover_columns(
+                temp, chromosome_column, position_column, from_db, to_db
+            )
+
+            # The results are appended, the existing rows are neither read nor rewritten
+            if append:
+                append_csv_batches(destination_path, [result_data_liftover], "apply")
+            else:
+                temp_path = cache_manager.temp_path()
+                try:
+                    result_data_liftover.to_csv(temp_path, index=False)
+                    with lock_manager.exclusive(destination_path):
+                        os.replace(temp_path, destination_path)
+                        cache_manager.invalidate(destination_path)
+                except OSError as e:
+                    raise RuntimeError(f"Error saving file: {e}") from e
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "succ",
+                "message": f"Positions converted to {to_db} were successfully saved to "
+                + f"'{relative_path}'.",
+            },
+            uuid,
+            sid,
+        )
+
+        socketio_emit_to_user_session(
+            WORKSPACE_UPDATE_FEEDBACK_EVENT,
+            {"status": "updated"},
+            uuid,
+            sid,
+        )
+
+    except FileNotFoundError as e:
+        logger.error(
+            "FileNotFoundError: %s while applying liftover %s",
+            e,
+            destination_path,
+        )
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"FileNotFoundError: {e} while applying liftover {destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Requested file not found"}), 404
+    except KeyError as e:
+        logger.error("KeyError: %s while applying liftover %s", e, destination_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"KeyError: {e} while applying liftover {destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Requested column not found"}), 400
+    except LockTimeoutError as e:
+        logger.error("LockTimeoutError: %s while applying liftover %s", e.message, destination_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"LockTimeoutError: {e.message} while applying liftover"
+                + f" {destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "File is in use by another operation"}), 423
+    except PermissionError as e:
+        logger.error("PermissionError: %s while applying liftover %s", e, destination_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"PermissionError: {e} while applying liftover {destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Permission denied"}), 403
+    except QuotaExceededError as e:
+        logger.error(
+            "QuotaExceededError: %s while applying liftover %s", e.message, destination_path
+        )
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"QuotaExceededError: {e.message} while applying liftover "
+                + f"{destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Insufficient storage"}), 507
+    except UnexpectedError as e:
+        logger.error(
+            "UnexpectedError: %s while applying liftover %s", e.message, destination_path
+        )
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"UnexpectedError: {e.message} while applying liftover "
+                + f"{destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "An internal error occurred"}), 500
+    except Exception as e:
+        logger.error("UnexpectedError: %s while applying liftover %s", e, destination_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"UnexpectedError: {e} while applying liftover {destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "An internal error occurred"}), 500
+
+    return jsonify({"message": "Liftover was successfully applied"}), 200
@@ -0,0 +1,367 @@
+"""
+Workspace batch route module.
+
+This module defines a route for applying several workspace mutations (create, rename, move and
+delete) in a single request. Operations are applied in order; if one of them fails, the operations
+already applied are rolled back in reverse order and the remaining ones are skipped.
+
+Compared to issuing the single item routes one by one, a batch performs one template check, emits
+one consolidated console message and one workspace update event carrying the delta of the applied
+operations.
+
+Routes:
+    PUT /workspace/batch: Applies a list of operations to the user's workspace.
+"""
+
+import os
+import shutil
+import uuid as uuid_lib
+from flask import Blueprint, request, jsonify
+
+from ..setup.extensions import (
+    compress,
+    logger,
+    cache_manager,
+    usage_manager,
+    blob_store,
+    snapshot_manager,
+)
+from ..utils.helpers import socketio_emit_to_user_session, get_path_size, keep_pending_snapshots
+from ..utils.exceptions import UnexpectedError
+from ..constants import (
+    WORKSPACE_DIR,
+    WORKSPACE_TEMPLATE_DIR,
+    WORKSPACE_BATCH_DIR,
+    WORKSPACE_BATCH_ROUTE,
+    WORKSPACE_UPDATE_FEEDBACK_EVENT,
+    CONSOLE_FEEDBACK_EVENT,
+)
+
+workspace_batch_route_bp = Blueprint("workspace_batch_route", __name__)
+
+BATCH_OPERATIONS = ("create", "rename", "move", "delete")
+
+
+def _resolve_path(user_workspace_dir, relative_path):
+    """
+    Resolve a relative path inside the user's workspace directory.
+
+    Args:
+        user_workspace_dir (str): The root directory of the user's workspace.
+        relative_path (str): The path relative to the workspace root.
+
+    Returns:
+        str: The absolute path of the item.
+
+    Raises:
+        PermissionError: If the path points outside of the user's workspace.
+    """
+    path = os.path.normpath(os.path.join(user_workspace_dir, relative_path or ""))
+    if path != user_workspace_dir and not path.startswith(user_workspace_dir + os.sep):
+        raise PermissionError(f"Path '{relative_path}' is outside of the workspace")
+    return path
+
+
+def _apply_operation(operation, user_workspace_dir, staging_dir):
+    """
+    Apply a single batch operation to the user's workspace.
+
+    Args:
+        operation (dict): The operation to apply. Contains `op`, `path` and, depending on the
+            operation, `label`, `type` or `destination`.
+        user_workspace_dir (str): The root directory of the user's workspace.
+        staging_dir (str): Directory where deleted items are kept until the batch is committed.
+
+    Returns:
+        tuple: A `(delta, undo)` pair, where `delta` describes the change for the workspace update
+            event and `undo` is a tuple describing how to revert the change.
+
+    Raises:
+        ValueError: If the operation is malformed.
+        OSError: If the file system operation fails.
+    """
+    op = operation.get("op")
+    relative_path = (operation.get("path") or "").strip("/")
+
+    if op not in BATCH_OPERATIONS:
+        raise ValueError(f"Unsupported operation '{op}'")
+
+    if op == "create":
+        label = operation.get("label")
+        file_type = operation.get("type")
+        if not label or file_type not in ("file", "folder"):
+            raise ValueError("'label' and 'type' ('file' or 'folder') are required for create")
+
+        new_id = f"{relative_path}/{label}" if relative_path else label
+        destination_path = _resolve_path(user_workspace_dir, new_id)
+
+        if file_type == "file":
+            # Exclusive creation, an existing file must not be truncated
+            with open(destination_path, "x", encoding="utf-8"):
+                pass
+        else:
+            os.mkdir(destination_path)
+
+        return (
+            {"op": op, "newId": new_id, "newLabel": label, "newType": file_type},
+            ("remove", destination_path),
+        )
+
+    if not relative_path:
+        raise ValueError(f"'path' is required for {op}")
+
+    source_path = _resolve_path(user_workspace_dir, relative_path)
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"No such file or directory: '{relative_path}'")
+
+    if op == "delete":
+        # Keep the item in the staging directory, so that it can be restored on rollback
+        keep_pending_snapshots(source_path)
+        staged_path = os.path.join(staging_dir, str(uuid_lib.uuid4()))
+        os.makedirs(staging_dir, exist_ok=True)
+        os.rename(source_path, staged_path)
+
+        return {"op": op, "oldId": relative_path}, ("restore", staged_path, source_path)
+
+    if op == "rename":
+        label = operation.get("label")
+        if not label or "/" in label:
+            raise ValueError("A valid 'label' is required for rename")
+        new_id = (
+            f"{os.path.dirname(relative_path)}/{label}" if os.path.dirname(relative_path) else label
+        )
+    else:
+        destination = (operation.get("destination") or "").strip("/")
+        if not os.path.isdir(_resolve_path(user_workspace_dir, destination)):
+            raise FileNotFoundError(f"Destination folder '{destination}' does not exist")
+        label = os.path.basename(relative_path)
+        new_id = f"{destination}/{label}" if destination else label
+
+    new_path = _resolve_path(user_workspace_dir, new_id)
+    if os.path.exists(new_path):
+        raise FileExistsError(f"'{new_id}' already exists")
+    if os.path.isdir(source_path) and new_path.startswith(source_path + os.sep):
+        raise ValueError(f"Cannot move '{relative_path}' into itself")
+
+    os.rename(source_path, new_path)
+
+    # Keep derived artifacts and previous versions with the renamed or moved file or folder
+    cache_manager.move(source_path, new_path)
+    snapshot_manager.move(source_path, new_path)
+
+    return (
+        {
+            "op": op,
+            "oldId": relative_path,
+            "newId": new_id,
+            "newLabel": label,
+            "newType": "folder" if os.path.isdir(new_path) else "file",
+        },
+        ("rename", new_path, source_path),
+    )
+
+
+def _rollback_operation(undo):
+    """
+    Revert a previously applied batch operation.
+
+    Args:
+        undo (tuple): The undo description returned by `_apply_operation`.
+
+    Returns:
+        None: This function does not return a value.
+    """
+    if undo[0] == "remove":
+        if os.path.isdir(undo[1]):
+            os.rmdir(undo[1])
+        else:
+            os.remove(undo[1])
+    elif undo[0] == "restore":
+        os.rename(undo[1], undo[2])
+    elif undo[0] == "rename":
+        os.rename(undo[1], undo[2])
+        cache_manager.move(undo[1], undo[2])
+        snapshot_manager.move(undo[1], undo[2])
+
+
+@workspace_batch_route_bp.route(WORKSPACE_BATCH_ROUTE, methods=["PUT"])
+@compress.compressed()
+def put_workspace_batch():
+    """
+    Apply a batch of create, rename, move and delete operations to the user's workspace.
+
+    Operations are applied in the given order. When an operation fails, all operations applied
+    before it are rolled back in reverse order and the remaining operations are skipped, unless
+    `atomic` is set to false, in which case the failed operation is reported and the batch
+    continues.
+
+    Headers:
+        uuid (str): The unique identifier for the user.
+        sid (str): The session identifier for the user.
+
+    Request Body (JSON):
+        operations (list): The operations to apply, each being one of:
+            - `{"op": "create", "path": <folder>, "label": <name>, "type": "file" | "folder"}`
+            - `{"op": "rename", "path": <item>, "label": <new name>}`
+            - `{"op": "move", "path": <item>, "destination": <folder>}`
+            - `{"op": "delete", "path": <item>}`
+        atomic (bool, optional): Roll back the batch on the first failure (default is true).
+
+    Returns:
+        Response: A JSON response with a `results` list holding the status of each operation
+            (`applied`, `failed`, `rolledBack` or `skipped`) and its delta or error message.
+            - `200 OK` if all operations were applied.
+            - `207 Multi-Status` if at least one operation failed.
+            - `400 Bad Request` if headers or operations are missing.
+            - `403 Forbidden` if there is a permission error accessing the workspace.
+            - `500 Internal Server Error` for unexpected errors.
+
+    Emits:
+        CONSOLE_FEEDBACK_EVENT (str): A single message summarizing the batch.
+        WORKSPACE_UPDATE_FEEDBACK_EVENT (str): A single update carrying the `delta` of the applied
+            operations.
+    """
+
+    uuid = request.headers.get("uuid")
+    sid = request.headers.get("sid")
+
+    # Ensure the uuid header is present
+    if not uuid:
+        return jsonify({"error": "UUID header is missing"}), 400
+
+    # Ensure the sid header is present
+    if not sid:
+        return jsonify({"error": "SID header is missing"}), 400
+
+    data = request.json or {}
+    operations = data.get("operations")
+    atomic = data.get("atomic", True)
+
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "'operations' must be a non-empty list"}), 400
+
+    user_workspace_dir = os.path.join(WORKSPACE_DIR, uuid)
+    # One flat directory per batch, so that committing the batch leaves no empty directory behind
+    staging_dir = os.path.join(WORKSPACE_BATCH_DIR, f"{uuid}.{uuid_lib.uuid4()}")
+
+    results = [
+        {
+            "index": index,
+            "op": operation.get("op"),
+            "path": operation.get("path"),
+            "status": "skipped",
+        }
+        for index, operation in enumerate(operations)
+    ]
+    applied = []
+
+    try:
+        # Ensure the user specific directory exists
+        if not os.path.exists(user_workspace_dir):
+            # Copy the template from the template directory to the user's workspace
+            shutil.copytree(
+                WORKSPACE_TEMPLATE_DIR, user_workspace_dir, copy_function=blob_store.copy
+            )
+
+        failure = None
+        for index, operation in enumerate(operations):
+            try:
+                delta, undo = _apply_operation(operation, user_workspace_dir, staging_dir)
+            except (OSError, ValueError, UnexpectedError) as e:
+                logger.error("%s: %s while applying batch operation %s", type(e).__name__, e, index)
+                results[index].update({"status": "failed", "error": f"{type(e).__name__}: {e}"})
+                failure = failure or (index, e)
+                if atomic:
+                    break
+                continue
+
+            results[index].update({"status": "applied", **delta})
+            applied.append((index, delta, undo))
+
+        # Roll back the applied operations in reverse order
+        if failure and atomic:
+            for index, _, undo in reversed(applied):
+                try:
+                    _rollback_operation(undo)
+                    results[index]["status"] = "rolledBack"
+                except OSError as e:
+                    logger.error("OSError: %s while rolling back batch operation %s", e, index)
+                    results[index]["error"] = f"Rollback failed: {e}"
+            applied = [entry for entry in applied if results[entry[0]]["status"] == "applied"]
+
+        # Commit the batch by removing the deleted items and their derived artifacts
+        usage_manager.record(uuid, -get_path_size(staging_dir))
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        for _, _, undo in applied:
+            if undo[0] == "restore":
+                cache_manager.invalidate(undo[2])
+
+        # Emit a single feedback to the user's console
+        if failure:
+            index, error = failure
+            statuses = [result["status"] for result in results]
+            socketio_emit_to_user_session(
+                CONSOLE_FEEDBACK_EVENT,
+                {
+                    "type": "errr",
+                    "message": f"Batch operation {index + 1} of {len(operations)} "
+                    + f"('{operations[index].get('op')}' at '{operations[index].get('path')}') "
+                    + f"failed: {error}. "
+                    + (
+                        f"{statuses.count('rolledBack')} operations were rolled back and "
+                        + f"{statuses.count('skipped')} skipped."
+                        if atomic
+                        else f"{len(applied)} operations were applied."
+                    ),
+                },
+                uuid,
+                sid,
+            )
+        else:
+            socketio_emit_to_user_session(
+                CONSOLE_FEEDBACK_EVENT,
+                {
+                    "type": "succ",
+                    "message": f"Successfully applied {len(applied)} workspace operations.",
+                },
+                uuid,
+                sid,
+            )
+
+        # Emit a single feedback to the user's workspace with the applied changes
+        if applied:
+            socketio_emit_to_user_session(
+                WORKSPACE_UPDATE_FEEDBACK_EVENT,
+                {"status": "updated", "delta": [delta for _, delta, _ in applied]},
+                uuid,
+                sid,
+            )
+
+        return jsonify({"results": results}), 207 if failure else 200
+
+    except PermissionError as e:
+        logger.error("PermissionError: %s while applying batch %s", e, user_workspace_dir)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"PermissionError: {e} while applying batch {user_workspace_dir}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Permission denied"}), 403
+    except (OSError, UnexpectedError) as e:
+        logger.error("UnexpectedError: %s while applying batch %s", e, user_workspace_dir)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"UnexpectedError: {e} while applying batch {user_workspace_dir}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "An internal error occurred"}), 500
@@ -8,12 +8,18 @@ and saving it to the user's workspace.
 # pylint: disable=broad-exception-caught
 
 import os
+import shutil
 import time  # TODO: Remove this import once the download logic is implemented
 from flask import Blueprint, request, jsonify
 
-from ..setup.extensions import logger
-from ..utils.helpers import socketio_emit_to_user_session
-from ..utils.exceptions import UnexpectedError
+from ..setup.extensions import logger, cache_manager, blob_store, lock_manager
+from ..utils.helpers import (
+    socketio_emit_to_user_session,
+    track_workspace_usage,
+    snapshot_workspace_file,
+    parse_override_arg,
+)
+from ..utils.exceptions import UnexpectedError, QuotaExceededError, LockTimeoutError
 from ..constants import (
     WORKSPACE_DOWNLOAD_ROUTE,
     WORKSPACE_DIR,
@@ -26,6 +32,51 @@ from ..data.downloading import download_selected_database_for_eys_gene
 workspace_download_route_bp = Blueprint("workspace_download_route", __name__)
 
 
+def _download_to_workspace(source, destination_path):
+    """
+    Download the data of a database to a temporary directory, then move it into the workspace.
+
+    The destination is only locked against readers while it is replaced, not during the download.
+    The caller is expected to hold the `write` lock of the destination.
+
+    Args:
+        source (str): The name of the database.
+        destination_path (str): The path of the destination file in the workspace.
+    """
+    temp_dir = cache_manager.temp_path()
+    os.makedirs(temp_dir)
+    try:
+        # LOVD tables are saved next to the download, in a directory named after it
+        temp_path = os.path.join(temp_dir, os.path.basename(destination_path))
+        download_selected_database_for_eys_gene(
+            database_name=source, save_path=temp_path, override=True
+        )
+        if not os.path.isfile(temp_path):
+            return
+
+        # Keep the previous version, then replace the old file with the new file
+        snapshot_workspace_file(destination_path, "download")
+        os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+        with lock_manager.exclusive(destination_path):
+            os.replace(temp_path, destination_path)
+
+            # Remove outdated derived artifacts
+            cache_manager.invalidate(destination_path)
+
+        tables_dir = temp_path[:-4]
+        if os.path.isdir(tables_dir):
+            os.makedirs(destination_path[:-4], exist_ok=True)
+            for name in os.listdir(tables_dir):
+                os.replace(
+                    os.path.join(tables_dir, name), os.path.join(destination_path[:-4], name)
+                )
+
+        # Downloads of the same data are stored once
+        blob_store.ingest(destination_path)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
 @workspace_download_route_bp.route(
     f"{WORKSPACE_DOWNLOAD_ROUTE}/<path:relative_path>", methods=["GET"]
 )
@@ -69,7 +120,7 @@ def get_workspace_download(relative_path):
 
     source = request.args.get("source")
     destination_path = os.path.join(WORKSPACE_DIR, uuid, relative_path)
-    override = request.args.get("override")
+    override = parse_override_arg(request.args)
     gene = request.args.get("gene")
 
     try:
@@ -85,7 +136,12 @@ def get_workspace_download(relative_path):
             sid,
         )
 
-        download_selected_database_for_eys_gene(database_name=source, save_path=destination_path, override=override)
+        # Writers are applied one after the other, readers keep the current version meanwhile
+        with lock_manager.exclusive(destination_path, "write"), track_workspace_usage(
+            uuid, sid, destination_path
+        ):
+            if override or not os.path.exists(destination_path):
+                _download_to_workspace(source, destination_path)
 
         # Emit a feedback to the user's console
         socketio_emit_to_user_session(
@@ -120,6 +176,22 @@ def get_workspace_download(relative_path):
             sid,
         )
         return jsonify({"error": "Requested file not found"}), 404
+    except LockTimeoutError as e:
+        logger.error(
+            "LockTimeoutError: %s while downloading %s %s", e.message, source, destination_path
+        )
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"LockTimeoutError: {e.message} while downloading {source}"
+                + f" {destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "File is in use by another operation"}), 423
     except PermissionError as e:
         logger.error(
             "PermissionError: %s while downloading %s %s", e, source, destination_path
@@ -135,6 +207,22 @@ def get_workspace_download(relative_path):
             sid,
         )
         return jsonify({"error": "Permission denied"}), 403
+    except QuotaExceededError as e:
+        logger.error(
+            "QuotaExceededError: %s while downloading %s %s", e.message, source, destination_path
+        )
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"QuotaExceededError: {e.message} while downloading {source} "
+                + f"{destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Insufficient storage"}), 507
     except UnexpectedError as e:
         logger.error(
             "UnexpectedError: %s while downloading %s %s",
@@ -4,6 +4,16 @@ Handle file export from the workspace.
 This module provides a Flask route for exporting files from a user's workspace.
 It performs the following:
 - Retrieves the file based on the user's workspace and the requested path.
+- Sends uncompressed files with zero-copy `sendfile`, supporting `Range` and `If-Range` requests
+  for resumed downloads. Files compressed at rest are sent decompressed, with `Range` requests
+  decompressing only the frames they cover.
+- Sends gzip or zstd compressed files from a cached precompressed artifact (with `Range` support)
+  or, when no artifact exists yet, compresses the file incrementally while streaming it and caches
+  the result for the next export.
+- Exports folders as ZIP or tar.zst archives assembled on the fly, streaming every member block
+  by block without writing a temporary archive.
+- Converts CSV files to TSV, Parquet, VCF or XLSX in a streaming fashion and caches the converted
+  file by the version of its source, so repeated exports are served without converting again.
 - Emits feedback to the user's console via SocketIO during the export process.
 - Handles exceptions like file not found, permission errors, or unexpected errors,
   returning appropriate HTTP responses.
@@ -14,10 +24,14 @@ Routes:
 
 
 import os
-from flask import Blueprint, request, jsonify, send_file
+import zlib
+import zstandard
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
 
-from ..setup.extensions import compress, logger
+from ..setup.extensions import logger, cache_manager, cold_storage_manager
 from ..utils.helpers import socketio_emit_to_user_session
+from ..utils.archive_export import ARCHIVE_FORMATS, stream_zip, stream_tar_zst
+from ..utils.file_export import EXPORT_FORMATS, COMPRESSED_FORMATS, convert_csv
 from ..utils.exceptions import UnexpectedError
 from ..constants import (
     WORKSPACE_DIR,
@@ -27,9 +41,120 @@ from ..constants import (
 
 workspace_export_route_bp = Blueprint("workspace_export_route", __name__)
 
+# Supported export compressions with their file extension and MIME type
+EXPORT_COMPRESSIONS = {
+    "gzip": ("gz", "application/gzip"),
+    "zstd": ("zst", "application/zstd"),
+}
+
+# Compressions of imported originals which can be served for an export compression
+ORIGINAL_COMPRESSIONS = {"gzip": ("gzip", "bgzip"), "zstd": ("zstd",)}
+
+# Size of the blocks read from the exported file
+BLOCK_SIZE = 1024 * 1024
+
+
+def _get_compressor(compression):
+    """
+    Create an incremental compressor with deterministic output.
+
+    The output only depends on the input, so a streamed export and its cached artifact are byte
+    identical and share the same ETag.
+
+    Args:
+        compression (str): The compression, `gzip` or `zstd`.
+
+    Returns:
+        object: A compressor with `compress(data)` and `flush()` methods.
+    """
+    if compression == "gzip":
+        # A gzip header without a modification time
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    return zstandard.ZstdCompressor(level=3).compressobj()
+
+
+def _get_compressed_artifact(file_path, compression):
+    """
+    Look up a cached compressed artifact of a file.
+
+    The compressed original kept on import is preferred, otherwise a previously exported artifact
+    is used.
+
+    Args:
+        file_path (str): The absolute path of the exported file.
+        compression (str): The compression, `gzip` or `zstd`.
+
+    Returns:
+        str or None: The artifact path, or None if no artifact exists for the current file version.
+    """
+    kinds = [f"original:{original}" for original in ORIGINAL_COMPRESSIONS[compression]]
+    for kind in kinds + [f"export:{compression}"]:
+        artifact_path = cache_manager.get(file_path, kind)
+        if artifact_path is not None:
+            return artifact_path
+    return None
+
+
+def _get_converted_artifact(file_path, file_format):
+    """
+    Look up the converted artifact of a CSV file, converting it if it is not cached yet.
+
+    Args:
+        file_path (str): The absolute path of the exported file.
+        file_format (str): The export format, one of `EXPORT_FORMATS`.
+
+    Returns:
+        str: The artifact path of the converted file.
+
+    Raises:
+        ValueError: If the file cannot be converted to the format.
+    """
+    kind = f"convert:{file_format}"
+
+    artifact_path = cache_manager.get(file_path, kind)
+    if artifact_path is None:
+        with cache_manager.build(file_path, kind) as temp_path:
+            convert_csv(file_path, temp_path, file_format)
+        artifact_path = cache_manager.path(file_path, kind)
+
+    return artifact_path
+
+
+def _stream_compressed(file_path, kind, compression, source_path=None):
+    """
+    Compress a file incrementally while streaming it and cache the compressed artifact.
+
+    The artifact is only committed when the whole file was streamed, a disconnected client leaves
+    no partial artifact behind.
+
+    Args:
+        file_path (str): The absolute path of the exported file.
+        kind (str): The artifact kind of the compressed file.
+        compression (str): The compression, `gzip` or `zstd`.
+        source_path (str, optional): The path to read the data from, e.g. a converted artifact.
+            Defaults to the exported file.
+
+    Yields:
+        bytes: The compressed blocks.
+    """
+    compressor = _get_compressor(compression)
+
+    with cache_manager.build(file_path, kind) as temp_path:
+        with cold_storage_manager.open(source_path or file_path, "rb") as source, open(
+            temp_path, "wb"
+        ) as artifact:
+            while block := source.read(BLOCK_SIZE):
+                data = compressor.compress(block)
+                if data:
+                    artifact.write(data)
+                    yield data
+
+            data = compressor.flush()
+            artifact.write(data)
+            yield data
+
 
 @workspace_export_route_bp.route(f"{WORKSPACE_EXPORT_ROUTE}/<path:relative_path>", methods=["GET"])
-@compress.compressed()
 def get_workspace_export(relative_path):
     """
     Export a file from the user's workspace.
@@ -37,13 +162,27 @@ def get_workspace_export(relative_path):
     Handles file export requests by retrieving the file from the user's workspace and
     sending it as a downloadable attachment. Emits real-time feedback during the process.
 
+    Uncompressed exports are sent with `sendfile` and support `Range` and `If-Range` requests.
+    Compressed exports are sent from a cached artifact with the same support, or streamed with
+    incremental compression while the artifact is built, in which case the whole file is sent.
+    Converted exports are sent from a cached artifact, which is built on the first export.
+    Folders are streamed as an archive, which is never cached.
+
     Args:
-        relative_path (str): The path to the file to be exported within the user's workspace.
+        relative_path (str): The path to the file or folder to be exported within the user's
+            workspace.
 
     Headers:
         uuid: Unique identifier for the user's workspace.
         sid: Session identifier for emitting real-time events.
 
+    Query Parameters:
+        compression (str, optional): `gzip` or `zstd` to download a compressed file.
+        format (str, optional): `tsv`, `parquet`, `vcf` or `xlsx` to convert a CSV file on export.
+            Parquet and XLSX are compressed internally and cannot be combined with `compression`.
+        archive (str, optional): `zip` (default) or `tar.zst`, the archive format of an exported
+            folder.
+
     Returns:
         A downloadable file or a JSON response with an error message.
     """
@@ -59,6 +198,48 @@ def get_workspace_export(relative_path):
     if not sid:
         return jsonify({"error": "SID header is missing"}), 400
 
+    compression = request.args.get("compression")
+    if compression is not None and compression not in EXPORT_COMPRESSIONS:
+        return (
+            jsonify(
+                {
+                    "error": f"Unsupported compression '{compression}'. Supported compressions: "
+                    + ", ".join(f"'{compression}'" for compression in EXPORT_COMPRESSIONS)
+                }
+            ),
+            400,
+        )
+
+    archive_format = request.args.get("archive", "zip")
+    if archive_format not in ARCHIVE_FORMATS:
+        return (
+            jsonify(
+                {
+                    "error": f"Unsupported archive format '{archive_format}'. Supported formats: "
+                    + ", ".join(f"'{archive_format}'" for archive_format in ARCHIVE_FORMATS)
+                }
+            ),
+            400,
+        )
+
+    file_format = request.args.get("format")
+    if file_format is not None and file_format not in EXPORT_FORMATS:
+        return (
+            jsonify(
+                {
+                    "error": f"Unsupported format '{file_format}'. Supported formats: "
+                    + ", ".join(f"'{file_format}'" for file_format in EXPORT_FORMATS)
+                }
+            ),
+            400,
+        )
+
+    if file_format in COMPRESSED_FORMATS and compression is not None:
+        return jsonify({"error": f"Format '{file_format}' cannot be compressed"}), 400
+
+    if file_format is not None and not relative_path.endswith(".csv"):
+        return jsonify({"error": "Only CSV files can be converted"}), 400
+
     try:
         user_workspace_dir = os.path.join(WORKSPACE_DIR, uuid)
         file_path = os.path.join(user_workspace_dir, relative_path)
@@ -71,10 +252,96 @@ def get_workspace_export(relative_path):
             sid,
         )
 
-        response = send_file(file_path, as_attachment=True)
+        if os.path.isdir(file_path):
+            extension, mimetype = ARCHIVE_FORMATS[archive_format]
+            stream = stream_zip if archive_format == "zip" else stream_tar_zst
+
+            response = Response(stream_with_context(stream(file_path)), mimetype=mimetype)
+            response.headers.set(
+                "Content-Disposition",
+                "attachment",
+                filename=f"{os.path.basename(os.path.normpath(file_path))}.{extension}",
+            )
+            return response
+
+        if file_format is None and compression is None:
+            if not cold_storage_manager.is_cold(file_path):
+                return send_file(file_path, as_attachment=True, conditional=True)
+
+            # Files compressed at rest are sent from a seekable decompressing stream
+            size = cold_storage_manager.get_size(file_path)
+            response = send_file(
+                cold_storage_manager.open(file_path, "rb"),
+                as_attachment=True,
+                download_name=os.path.basename(file_path),
+                conditional=False,
+                etag=cache_manager.get_source_version(file_path),
+                last_modified=os.path.getmtime(file_path),
+            )
+            response.content_length = size
+            return response.make_conditional(request, accept_ranges=True, complete_length=size)
+
+        source_path = None
+        download_name = os.path.basename(file_path)
+
+        if file_format is not None:
+            source_path = _get_converted_artifact(file_path, file_format)
+            extension, mimetype = EXPORT_FORMATS[file_format]
+            download_name = f"{os.path.splitext(download_name)[0]}.{extension}"
+
+            if compression is None:
+                return send_file(
+                    source_path,
+                    mimetype=mimetype,
+                    as_attachment=True,
+                    download_name=download_name,
+                    conditional=True,
+                    etag=os.path.basename(source_path),
+                    last_modified=os.path.getmtime(file_path),
+                )
+
+        extension, mimetype = EXPORT_COMPRESSIONS[compression]
+        download_name = f"{download_name}.{extension}"
+
+        if file_format is None:
+            kind = f"export:{compression}"
+            artifact_path = _get_compressed_artifact(file_path, compression)
+        else:
+            kind = f"export:{file_format}:{compression}"
+            artifact_path = cache_manager.get(file_path, kind)
+        if artifact_path is not None:
+            return send_file(
+                artifact_path,
+                mimetype=mimetype,
+                as_attachment=True,
+                download_name=download_name,
+                conditional=True,
+                etag=os.path.basename(artifact_path),
+                last_modified=os.path.getmtime(file_path),
+            )
+
+        # Range requests are answered with the whole file until the artifact is cached
+        etag = os.path.basename(cache_manager.path(file_path, kind))
+        response = Response(
+            stream_with_context(_stream_compressed(file_path, kind, compression, source_path)),
+            mimetype=mimetype,
+        )
+        response.headers.set("Content-Disposition", "attachment", filename=download_name)
+        response.set_etag(etag)
+        response.last_modified = os.path.getmtime(file_path)
 
         return response
 
+    except ValueError as e:
+        logger.error("ValueError: %s while exporting %s", e, user_workspace_dir)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {"type": "errr", "message": f"FileExportError: {e}"},
+            uuid,
+            sid,
+        )
+        return jsonify({"error": f"FileExportError: {e}"}), 400
     except FileNotFoundError as e:
         logger.error("FileNotFoundError: %s while exporting %s", e, user_workspace_dir)
         # Emit a feedback to the user's console
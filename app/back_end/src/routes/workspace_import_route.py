@@ -3,8 +3,12 @@ Handle file import into the workspace.
 
 This module provides a Flask route for importing files into a user's workspace.
 It performs the following:
-- Accepts files of type 'csv' or 'txt' for upload.
-- Saves the file to the specified workspace directory.
+- Accepts files of type 'csv', 'txt', 'tsv' or 'vcf' for upload, optionally compressed with
+  gzip, bgzip or zstd.
+- Accepts ZIP and tar archives of such files, extracts them as a stream into the folder and
+  processes the members in parallel, reporting a single summary instead of one event per file.
+- Saves the file to the specified workspace directory, decompressing it as a stream and storing
+  delimited data as CSV.
 - Emits feedback to the user's console via SocketIO during the import process.
 - Handles exceptions like file not found, permission errors, or unexpected errors,
   returning appropriate HTTP responses.
@@ -18,12 +22,19 @@ Routes:
 import os
 from flask import Blueprint, request, jsonify
 
-from ..setup.extensions import compress, logger
-from ..utils.helpers import socketio_emit_to_user_session
-from ..utils.exceptions import UnexpectedError
+from ..setup.extensions import compress, logger, cache_manager, lock_manager
+from ..utils.helpers import (
+    socketio_emit_to_user_session,
+    track_workspace_usage,
+    snapshot_workspace_file,
+    complete_workspace_import,
+    complete_workspace_archive_import,
+)
+from ..utils.file_import import get_imported_filename, import_workspace_file
+from ..utils.archive_import import is_archive, import_workspace_archive
+from ..utils.exceptions import UnexpectedError, QuotaExceededError, LockTimeoutError
 from ..constants import (
     WORKSPACE_DIR,
-    WORKSPACE_UPDATE_FEEDBACK_EVENT,
     CONSOLE_FEEDBACK_EVENT,
     WORKSPACE_IMPORT_ROUTE,
 )
@@ -38,8 +49,14 @@ def post_workspace_import(relative_path=None):
     """
     Import a file into the user's workspace.
 
-    Handles file uploads to the workspace, ensuring the file is of type 'csv' or 'txt'.
-    Saves the file to the appropriate folder and sends real-time feedback to the user's console.
+    Handles file uploads to the workspace, ensuring the file is of type 'csv', 'txt', 'tsv' or
+    'vcf', optionally compressed ('gz', 'bgz' or 'zst'). Compressed files are decompressed as a
+    stream and delimited data is stored as CSV. Saves the file to the appropriate folder and sends
+    real-time feedback to the user's console.
+
+    ZIP and tar archives ('zip', 'tar', 'tar.gz', 'tgz' or 'tar.zst') are extracted into the folder,
+    keeping their folder structure. Each member is imported like a single file and indexed. Members
+    which cannot be imported are skipped and reported in the summary.
 
     Args:
         relative_path (str, optional): The folder within the workspace where the file should
@@ -50,10 +67,12 @@ def post_workspace_import(relative_path=None):
         sid: Session identifier for emitting real-time events.
 
     Request:
-        A file part must be included in the request.
+        A file part must be included in the request. An optional `keepOriginal` form field set to
+        'true' keeps the compressed original for export.
 
     Returns:
-        JSON response with a success or error message.
+        JSON response with a success or error message, and the name, compression, detected format
+        and delimiter of the imported file, or the `imported` and `skipped` members of an archive.
     """
 
     uuid = request.headers.get("uuid")
@@ -75,17 +94,14 @@ def post_workspace_import(relative_path=None):
     if file.filename == "":
         return jsonify({"error": "No file selected for importing"}), 400
 
-    file_extension = file.filename.rsplit(".", 1)[1].lower() if "." in file.filename else None
-    if file_extension not in ["csv", "txt"]:
-        return (
-            jsonify(
-                {
-                    "error": f"FileImportError: Incorrect file type for '{file.filename}'. "
-                    + "Accepted file types: 'csv', 'txt'."
-                }
-            ),
-            400,
-        )
+    archive = is_archive(file.filename)
+
+    try:
+        imported_filename = file.filename if archive else get_imported_filename(file.filename)
+    except ValueError as e:
+        return jsonify({"error": f"FileImportError: {e}"}), 400
+
+    keep_original = request.form.get("keepOriginal", "false").lower() == "true"
 
     relative_path_title = relative_path
 
@@ -106,25 +122,63 @@ def post_workspace_import(relative_path=None):
     try:
         user_workspace_dir = os.path.join(WORKSPACE_DIR, uuid)
         folder_path = os.path.join(user_workspace_dir, relative_path)
-        destination_path = os.path.join(folder_path, file.filename)
-        file.save(destination_path)
+        destination_path = os.path.join(folder_path, imported_filename)
+        upload_path = cache_manager.temp_path()
+
+        if archive:
+            try:
+                with track_workspace_usage(
+                    uuid, sid, None, request.content_length or 0
+                ) as record_usage:
+                    file.save(upload_path)
+                    summary = import_workspace_archive(
+                        upload_path, file.filename, folder_path, record_usage
+                    )
+            finally:
+                if os.path.exists(upload_path):
+                    os.remove(upload_path)
+
+            complete_workspace_archive_import(uuid, sid, file.filename, relative_path, summary)
+
+            return jsonify({"message": "Archive imported successfully", **summary}), 200
+
+        try:
+            with track_workspace_usage(uuid, sid, destination_path, request.content_length or 0):
+                file.save(upload_path)
+                with lock_manager.exclusive(destination_path, "write"):
+                    snapshot_workspace_file(destination_path, "import")
+                    imported = import_workspace_file(
+                        upload_path, file.filename, folder_path, keep_original
+                    )
+        finally:
+            if os.path.exists(upload_path):
+                os.remove(upload_path)
+
+        complete_workspace_import(uuid, sid, destination_path)
 
-        socketio_emit_to_user_session(
-            CONSOLE_FEEDBACK_EVENT,
-            {"type": "succ", "message": f"File {file.filename} was imported successfully."},
-            uuid,
-            sid,
+        return (
+            jsonify(
+                {
+                    "message": "File imported successfully",
+                    "filename": imported["filename"],
+                    "compression": imported["compression"],
+                    "format": imported["format"],
+                    "delimiter": imported["delimiter"],
+                }
+            ),
+            200,
         )
 
+    except ValueError as e:
+        logger.error("FileImportError: %s while importing %s", e, user_workspace_dir)
+        # Emit a feedback to the user's console
         socketio_emit_to_user_session(
-            WORKSPACE_UPDATE_FEEDBACK_EVENT,
-            {"status": "updated"},
+            CONSOLE_FEEDBACK_EVENT,
+            {"type": "errr", "message": f"FileImportError: {e}"},
             uuid,
             sid,
         )
-
-        return jsonify({"message": "File imported successfully"}), 200
-
+        return jsonify({"error": f"FileImportError: {e}"}), 400
     except FileNotFoundError as e:
         logger.error("FileNotFoundError: %s while importing %s", e, user_workspace_dir)
         # Emit a feedback to the user's console
@@ -138,6 +192,19 @@ def post_workspace_import(relative_path=None):
             sid,
         )
         return jsonify({"error": "Requested file not found"}), 404
+    except LockTimeoutError as e:
+        logger.error("LockTimeoutError: %s while importing %s", e.message, user_workspace_dir)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"LockTimeoutError: {e.message} while importing {user_workspace_dir}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "File is in use by another operation"}), 423
     except PermissionError as e:
         logger.error("PermissionError: %s while importing %s", e, user_workspace_dir)
         # Emit a feedback to the user's console
@@ -151,6 +218,19 @@ def post_workspace_import(relative_path=None):
             sid,
         )
         return jsonify({"error": "Permission denied"}), 403
+    except QuotaExceededError as e:
+        logger.error("QuotaExceededError: %s while importing %s", e.message, user_workspace_dir)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"QuotaExceededError: {e.message} while importing {user_workspace_dir}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Insufficient storage"}), 507
     except UnexpectedError as e:
         logger.error("UnexpectedError: %s while importing %s", e.message, user_workspace_dir)
         # Emit a feedback to the user's console
@@ -7,30 +7,169 @@ the user's workspace.
 # pylint: disable=broad-exception-caught
 
 import os
-import time  # TODO: Remove this import once the merge logic is implemented
+import shutil
 
 import pandas as pd
 from flask import Blueprint, request, jsonify
 
-from ..setup.extensions import logger
-from ..utils.helpers import socketio_emit_to_user_session
-from ..utils.exceptions import UnexpectedError
+from ..setup.extensions import logger, cache_manager, cold_storage_manager, lock_manager
+from ..utils.helpers import (
+    socketio_emit_to_user_session,
+    track_workspace_usage,
+    estimate_output_size,
+    snapshot_workspace_file,
+    parse_override_arg,
+)
+from ..utils.exceptions import UnexpectedError, QuotaExceededError, LockTimeoutError
 from ..constants import (
     WORKSPACE_MERGE_ROUTE,
     WORKSPACE_DIR,
     CONSOLE_FEEDBACK_EVENT,
     WORKSPACE_UPDATE_FEEDBACK_EVENT,
 )
-from ..data.refactoring import (
-    set_lovd_dtypes,
-    set_gnomad_dtypes,
-    parse_lovd,
-    parse_gnomad,
-    merge_gnomad_lovd,
+from ..utils.source_cache import (
+    load_lovd_tables,
+    load_gnomad_data,
+    iter_gnomad_batches,
+    iter_clinvar_batches,
 )
+from ..utils.csv_append import append_csv_batches
+from ..utils.merge_manifest import source_digest, read_merge_manifest, write_merge_manifest
+from ..data.refactoring import merge_gnomad_lovd
+from ..data.partitioned_merge import merge_gnomad_lovd_partitioned
+from ..data.clinvar_merge import merge_clinvar_lovd
+from ..data.incremental_merge import update_merged_lovd_gnomad
 
 workspace_merge_route_bp = Blueprint("workspace_merge_route", __name__)
 
+# gnomAD exports larger than this are merged partition by partition on disk instead of in memory
+PARTITIONED_MERGE_BYTES = 256 * 1024 * 1024
+
+# Number of rows appended at a time to the destination after a merge written to disk
+APPEND_BATCH_ROWS = 100_000
+
+
+def _merge_partitioned(lovd_data, gnomad_file, output_path):
+    """
+    Merge LOVD data with a gnomAD export partition by partition, with bounded memory.
+
+    The gnomAD export is read batch by batch, and the partitions are written to a temporary
+    directory of the cache.
+
+    Args:
+        lovd_data (DataFrame): The LOVD variants on transcripts with their variants on genome.
+        gnomad_file (str): The path of the gnomAD export.
+        output_path (str): The path to write the merged CSV to.
+
+    Returns:
+        int: The number of merged rows.
+    """
+    partition_dir = cache_manager.temp_path()
+    os.makedirs(partition_dir)
+    try:
+        with open(output_path, "w", encoding="utf-8", newline="") as output:
+            return merge_gnomad_lovd_partitioned(
+                [lovd_data], iter_gnomad_batches(gnomad_file), output, partition_dir
+            )
+    finally:
+        shutil.rmtree(partition_dir, ignore_errors=True)
+
+
+def _iter_csv_batches(file_path):
+    """
+    Read a CSV file batch by batch, keeping its values as they are written.
+
+    Args:
+        file_path (str): The path of the CSV file.
+
+    Yields:
+        DataFrame: The rows of the batch, as strings.
+    """
+    with cold_storage_manager.open(file_path, "r", encoding="utf-8", newline="") as file:
+        with pd.read_csv(
+            file, dtype=str, keep_default_na=False, chunksize=APPEND_BATCH_ROWS
+        ) as reader:
+            yield from reader
+
+
+def _load_lovd_variants(lovd_file):
+    """
+    Load the LOVD variants on transcripts of a download, with the DNA of their variants on genome.
+
+    Args:
+        lovd_file (str): The path of the LOVD download.
+
+    Returns:
+        DataFrame: The LOVD data to merge with gnomAD data.
+    """
+    # Sources merged before are read back from the cache instead of being parsed again
+    lovd_data = load_lovd_tables(lovd_file, ["Variants_On_Genome", "Variants_On_Transcripts"])
+
+    variants_on_genome = lovd_data["Variants_On_Genome"].copy()
+
+    return pd.merge(
+        lovd_data["Variants_On_Transcripts"],
+        variants_on_genome[["id", "VariantOnGenome/DNA", "VariantOnGenome/DNA/hg38"]],
+        on="id",
+        how="left",
+    )
+
+
+def _is_merged_from(destination_path, sources):
+    """
+    Check whether a merged file holds exactly the merge of the given sources, see its manifest.
+
+    Args:
+        destination_path (str): The path of the merged file.
+        sources (dict): The paths of the sources by name.
+
+    Returns:
+        bool: True if the manifest of the file records the content of every source.
+    """
+    manifest = read_merge_manifest(destination_path)
+    if manifest is None or set(manifest) != set(sources):
+        return False
+    return all(manifest[name] == source_digest(path) for name, path in sources.items())
+
+
+def _update_merged(
+    destination_path, lovd_data, previous_lovd_file, gnomad_file, previous_gnomad_file, output_path
+):
+    """
+    Update a merged file to new versions of its sources, only merging the variants which changed.
+
+    Args:
+        destination_path (str): The path of the merged file, built from the previous sources.
+        lovd_data (DataFrame): The new LOVD data, see `_load_lovd_variants`.
+        previous_lovd_file (str): The path of the previous LOVD download, None if unchanged.
+        gnomad_file (str): The path of the new gnomAD export.
+        previous_gnomad_file (str): The path of the previous gnomAD export, None if unchanged.
+        output_path (str): The path to write the updated CSV to.
+
+    Returns:
+        bool: True if the file was updated, False if the columns of a source changed and the
+            sources must be merged from scratch.
+    """
+    previous_lovd = _load_lovd_variants(previous_lovd_file) if previous_lovd_file else None
+    previous_gnomad = iter_gnomad_batches(previous_gnomad_file) if previous_gnomad_file else None
+
+    with open(output_path, "w", encoding="utf-8", newline="") as output:
+        rows = update_merged_lovd_gnomad(
+            _iter_csv_batches(destination_path),
+            lovd_data,
+            previous_lovd,
+            lambda: iter_gnomad_batches(gnomad_file),
+            previous_gnomad,
+            output,
+        )
+
+    if rows is None:
+        logger.info("Columns of the sources of '%s' changed, merging them again", destination_path)
+        return False
+
+    logger.info("Updated '%s', kept %d rows and merged %d rows again", destination_path, *rows)
+    return True
+
 
 @workspace_merge_route_bp.route(
     f"{WORKSPACE_MERGE_ROUTE}/lovd_gnomad/<path:relative_path>", methods=["GET"]
@@ -74,13 +213,21 @@ def get_workspace_merge_lovd_gnomad(relative_path):
     #     - The path to the LOVD file to be used in merge
     # - gnomad_file: string
     #     - The path to the gnomAD file to be used in merge
+    # - previous_lovd_file, previous_gnomad_file: string, optional
+    #     - The paths to the previous versions of the sources, when overriding a file merged from
+    #       them: only the variants which changed are merged again, if the manifest of the file
+    #       shows it was built from these versions. Otherwise, the sources are merged from scratch
 
     destination_path = os.path.join(WORKSPACE_DIR, uuid, relative_path)
-    override = request.args.get(
-        "override", default=False, type=bool
-    )  # Ensure it's treated as a boolean
+    override = parse_override_arg(request.args)
     lovd_file = os.path.join(WORKSPACE_DIR, uuid, request.args.get("lovdFile"))
     gnomad_file = os.path.join(WORKSPACE_DIR, uuid, request.args.get("gnomadFile"))
+    previous_lovd_file = request.args.get("previousLovdFile")
+    previous_gnomad_file = request.args.get("previousGnomadFile")
+    if previous_lovd_file:
+        previous_lovd_file = os.path.join(WORKSPACE_DIR, uuid, previous_lovd_file)
+    if previous_gnomad_file:
+        previous_gnomad_file = os.path.join(WORKSPACE_DIR, uuid, previous_gnomad_file)
 
     try:
         # Emit a feedback to the user's console
@@ -101,41 +248,79 @@ def get_workspace_merge_lovd_gnomad(relative_path):
         if not os.path.exists(gnomad_file):
             raise FileNotFoundError(f"gnomAD data file not found at: {gnomad_file}")
 
-        # Load existing data if the destination file exists
-        existing_data = pd.DataFrame()
-        if os.path.exists(destination_path):
-            if override:
-                os.remove(destination_path)  # Remove file if overriding
-            else:
-                existing_data = pd.read_csv(destination_path)
-
-        lovd_data = parse_lovd(lovd_file)
-        gnomad_data = parse_gnomad(gnomad_file)
-
-        set_lovd_dtypes(lovd_data)
-        set_gnomad_dtypes(gnomad_data)
-
-        variants_on_genome = lovd_data["Variants_On_Genome"].copy()
-
-        lovd_data = pd.merge(
-            lovd_data["Variants_On_Transcripts"],
-            variants_on_genome[
-                ["id", "VariantOnGenome/DNA", "VariantOnGenome/DNA/hg38"]
-            ],
-            on="id",
-            how="left",
-        )
-
-        final_data = merge_gnomad_lovd(lovd_data, gnomad_data)
-
-        # Append existing data if we're not overriding
-        if not existing_data.empty:
-            final_data = pd.concat([existing_data, final_data], ignore_index=True)
-
-        try:
-            final_data.to_csv(destination_path, index=False)
-        except OSError as e:
-            raise RuntimeError(f"Error saving file: {e}")
+        for previous_file in (previous_lovd_file, previous_gnomad_file):
+            if previous_file and not os.path.exists(previous_file):
+                raise FileNotFoundError(f"Previous data file not found at: {previous_file}")
+
+        # Writers are applied one after the other, readers keep the version they opened
+        with lock_manager.exclusive(destination_path, "write"), track_workspace_usage(
+            uuid, sid, destination_path, estimate_output_size(lovd_file, gnomad_file)
+        ):
+            # Existing data is kept, unless the file is replaced when overriding
+            append = os.path.exists(destination_path) and not override
+            if os.path.exists(destination_path) and not append:
+                snapshot_workspace_file(destination_path, "merge")
+
+            # A file merged from the previous sources is updated instead of merged again
+            incremental = (
+                not append
+                and bool(previous_lovd_file or previous_gnomad_file)
+                and _is_merged_from(
+                    destination_path,
+                    {
+                        "lovd": previous_lovd_file or lovd_file,
+                        "gnomad": previous_gnomad_file or gnomad_file,
+                    },
+                )
+            )
+            if (previous_lovd_file or previous_gnomad_file) and not incremental:
+                logger.info(
+                    "'%s' was not merged from the previous sources, merging them again",
+                    destination_path,
+                )
+
+            lovd_data = _load_lovd_variants(lovd_file)
+
+            temp_path = cache_manager.temp_path()
+            try:
+                if incremental and _update_merged(
+                    destination_path,
+                    lovd_data,
+                    previous_lovd_file,
+                    gnomad_file,
+                    previous_gnomad_file,
+                    temp_path,
+                ):
+                    merged_batches = None
+                elif cold_storage_manager.get_size(gnomad_file) > PARTITIONED_MERGE_BYTES:
+                    rows = _merge_partitioned(lovd_data, gnomad_file, temp_path)
+                    logger.info("Merged %d rows partition by partition", rows)
+                    merged_batches = _iter_csv_batches(temp_path)
+                else:
+                    merged_data = merge_gnomad_lovd(lovd_data, load_gnomad_data(gnomad_file))
+                    merged_batches = [merged_data]
+                    if not append:
+                        merged_data.to_csv(temp_path, index=False)
+
+                # The merged rows are appended, the existing rows are neither read nor rewritten
+                if append:
+                    append_csv_batches(destination_path, merged_batches, "merge")
+                else:
+                    try:
+                        with lock_manager.exclusive(destination_path):
+                            os.replace(temp_path, destination_path)
+                            cache_manager.invalidate(destination_path)
+                    except OSError as e:
+                        raise RuntimeError(f"Error saving file: {e}") from e
+
+                    # Appended files hold other rows, only replaced ones can be updated later
+                    write_merge_manifest(
+                        destination_path,
+                        {"lovd": source_digest(lovd_file), "gnomad": source_digest(gnomad_file)},
+                    )
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
 
         # Emit a feedback to the user's console
         socketio_emit_to_user_session(
@@ -173,6 +358,22 @@ def get_workspace_merge_lovd_gnomad(relative_path):
             sid,
         )
         return jsonify({"error": "Requested file not found"}), 404
+    except LockTimeoutError as e:
+        logger.error(
+            "LockTimeoutError: %s while merging LOVD and gnomAD %s", e.message, destination_path
+        )
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"LockTimeoutError: {e.message} while merging LOVD and gnomAD"
+                + f" {destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "File is in use by another operation"}), 423
     except PermissionError as e:
         logger.error(
             "PermissionError: %s while merging LOVD and gnomAD %s", e, destination_path
@@ -188,6 +389,22 @@ def get_workspace_merge_lovd_gnomad(relative_path):
             sid,
         )
         return jsonify({"error": "Permission denied"}), 403
+    except QuotaExceededError as e:
+        logger.error(
+            "QuotaExceededError: %s while merging LOVD and gnomAD %s", e.message, destination_path
+        )
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"QuotaExceededError: {e.message} while merging LOVD and gnomAD "
+                + f"{destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Insufficient storage"}), 507
     except UnexpectedError as e:
         logger.error(
             "UnexpectedError: %s while merging LOVD and gnomAD %s",
@@ -272,7 +489,7 @@ def get_workspace_merge_lovd_clinvar(relative_path):
     #     - The path to the ClinVar file to be used in merge
 
     destination_path = os.path.join(WORKSPACE_DIR, uuid, relative_path)
-    override = request.args.get("override")
+    override = parse_override_arg(request.args)
     lovd_file = os.path.join(WORKSPACE_DIR, uuid, request.args.get("lovdFile"))
     clinvar_file = os.path.join(WORKSPACE_DIR, uuid, request.args.get("clinvarFile"))
 
@@ -289,13 +506,58 @@ def get_workspace_merge_lovd_clinvar(relative_path):
             sid,
         )
 
-        #
-        # TODO: Implement LOVD and ClinVar data merge and save logic using defined parameters
-        # [destination_path, override, lovd_file, clinvar_file]
-        #
+        if not os.path.exists(lovd_file):
+            raise FileNotFoundError(f"LOVD data file not found at: {lovd_file}")
 
-        # TODO: Remove this sleep statement once the merge logic is implemented
-        time.sleep(1)  # Simulate a delay for the merge process
+        if not os.path.exists(clinvar_file):
+            raise FileNotFoundError(f"ClinVar data file not found at: {clinvar_file}")
+
+        # Writers are applied one after the other, readers keep the version they opened
+        with lock_manager.exclusive(destination_path, "write"), track_workspace_usage(
+            uuid, sid, destination_path, estimate_output_size(lovd_file, clinvar_file)
+        ):
+            # Existing data is kept, unless the file is replaced when overriding
+            append = os.path.exists(destination_path) and not override
+            if os.path.exists(destination_path) and not append:
+                snapshot_workspace_file(destination_path, "merge")
+
+            lovd_data = load_lovd_tables(
+                lovd_file, ["Variants_On_Genome", "Variants_On_Transcripts", "Transcripts"]
+            )
+
+            variants_on_genome = lovd_data["Variants_On_Genome"].copy()
+
+            transcripts = lovd_data["Transcripts"]
+            lovd_data = pd.merge(
+                lovd_data["Variants_On_Transcripts"],
+                variants_on_genome[
+                    ["id", "VariantOnGenome/DNA", "VariantOnGenome/DNA/hg38"]
+                ],
+                on="id",
+                how="left",
+            )
+
+            # ClinVar is read once, batch by batch, and joined against an index of LOVD variants
+            temp_path = cache_manager.temp_path()
+            try:
+                with open(temp_path, "w", encoding="utf-8", newline="") as output:
+                    merge_clinvar_lovd(
+                        lovd_data, transcripts, iter_clinvar_batches(clinvar_file), output
+                    )
+
+                # The merged rows are appended, the existing rows are neither read nor rewritten
+                if append:
+                    append_csv_batches(destination_path, _iter_csv_batches(temp_path), "merge")
+                else:
+                    try:
+                        with lock_manager.exclusive(destination_path):
+                            os.replace(temp_path, destination_path)
+                            cache_manager.invalidate(destination_path)
+                    except OSError as e:
+                        raise RuntimeError(f"Error saving file: {e}") from e
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
 
         # Emit a feedback to the user's console
         socketio_emit_to_user_session(
@@ -333,6 +595,22 @@ def get_workspace_merge_lovd_clinvar(relative_path):
             sid,
         )
         return jsonify({"error": "Requested file not found"}), 404
+    except LockTimeoutError as e:
+        logger.error(
+            "LockTimeoutError: %s while merging LOVD and ClinVar %s", e.message, destination_path
+        )
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"LockTimeoutError: {e.message} while merging LOVD and ClinVar "
+                + f"{destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "File is in use by another operation"}), 423
     except PermissionError as e:
         logger.error(
             "PermissionError: %s while merging LOVD and ClinVar %s", e, destination_path
@@ -349,6 +627,22 @@ def get_workspace_merge_lovd_clinvar(relative_path):
             sid,
         )
         return jsonify({"error": "Permission denied"}), 403
+    except QuotaExceededError as e:
+        logger.error(
+            "QuotaExceededError: %s while merging LOVD and ClinVar %s", e.message, destination_path
+        )
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"QuotaExceededError: {e.message} while merging LOVD and ClinVar "
+                + f"{destination_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Insufficient storage"}), 507
     except UnexpectedError as e:
         logger.error(
             "UnexpectedError: %s while merging LOVD and ClinVar %s",
@@ -45,11 +45,14 @@ Endpoints:
    - **Query Parameters**: 
      - `page` (int): Page number of data to retrieve (default is 0).
      - `rowsPerPage` (int): Number of rows per page (default is 100).
+     - `table` (str): Table to retrieve from an LOVD download (default is the first table).
+     - `region` (str): Region `chrom:start-end` of the records to retrieve from a VCF file.
    - **Returns**:
      - `200 OK`: JSON response containing paginated file data.
-     - `400 Bad Request`: If `uuid` or `sid` headers are missing.
+     - `400 Bad Request`: If `uuid` or `sid` headers are missing, or if the region is malformed.
      - `403 Forbidden`: If there is a permission issue accessing the file.
      - `404 Not Found`: If the requested file does not exist.
+     - `423 Locked`: If the file stays in use by another operation.
      - `500 Internal Server Error`: For unexpected errors.
 
 3. `/workspace/<path:relative_path>` (PUT):
@@ -66,6 +69,7 @@ Endpoints:
      - `400 Bad Request`: If `uuid` or `sid` headers are missing.
      - `403 Forbidden`: If there is a permission issue while saving the file.
      - `404 Not Found`: If the requested file does not exist.
+     - `423 Locked`: If the file stays in use by another operation.
      - `500 Internal Server Error`: For unexpected errors.
 
 Errors and Feedback:
@@ -82,14 +86,30 @@ import csv
 from ast import literal_eval
 from flask import Blueprint, request, jsonify
 
-from ..setup.extensions import (compress, logger)
+from ..setup.extensions import (
+    compress,
+    logger,
+    cache_manager,
+    usage_manager,
+    cold_storage_manager,
+    blob_store,
+    snapshot_manager,
+    lock_manager,
+)
 from ..utils.helpers import (
     socketio_emit_to_user_session,
     build_workspace_structure,
     is_number,
     convert_to_number,
+    get_path_size,
+    track_workspace_usage,
+    snapshot_workspace_file,
+    keep_pending_snapshots,
 )
-from ..utils.exceptions import UnexpectedError
+from ..utils.lovd_file import is_lovd_file, get_lovd_index, read_lovd_page
+from ..utils.vcf_file import is_vcf_path, get_vcf_index, read_vcf_page, query_vcf_region
+from ..utils.file_import import ROW_INDEX_INTERVAL, get_workspace_file_stats
+from ..utils.exceptions import UnexpectedError, QuotaExceededError, LockTimeoutError
 from ..constants import (
     WORKSPACE_DIR,
     WORKSPACE_TEMPLATE_DIR,
@@ -120,6 +140,8 @@ def get_workspace():
         - Ensures that the user-specific workspace directory exists; if not, copies a template
             directory.
         - Builds the directory structure as a nested JSON object.
+        - Reports the user's disk usage and quotas in the `X-Workspace-Usage`,
+            `X-Workspace-Soft-Quota` and `X-Workspace-Hard-Quota` response headers.
         - Emits feedback to the user's console about the status of the workspace retrieval process.
 
     Args:
@@ -170,7 +192,9 @@ def get_workspace():
         # Ensure the user specific directory exists
         if not os.path.exists(user_workspace_dir):
             # Copy the template from the template directory to the user's workspace
-            shutil.copytree(WORKSPACE_TEMPLATE_DIR, user_workspace_dir)
+            shutil.copytree(
+                WORKSPACE_TEMPLATE_DIR, user_workspace_dir, copy_function=blob_store.copy
+            )
 
         # Build and return the workspace structure as a JSON object
         workspace_structure = [
@@ -187,8 +211,12 @@ def get_workspace():
             sid,
         )
 
-        # Return the workspace structure
-        return jsonify(workspace_structure)
+        # Return the workspace structure with the user's disk usage and quotas
+        response = jsonify(workspace_structure)
+        response.headers["X-Workspace-Usage"] = str(usage_manager.get_usage(uuid))
+        response.headers["X-Workspace-Soft-Quota"] = str(usage_manager.soft_quota)
+        response.headers["X-Workspace-Hard-Quota"] = str(usage_manager.hard_quota)
+        return response
 
     except FileNotFoundError as e:
         logger.error("FileNotFoundError: %s while accessing %s", e, user_workspace_dir)
@@ -231,6 +259,100 @@ def get_workspace():
         return jsonify({"error": "An internal error occurred"}), 500
 
 
+def _get_sorted_file_path(file_path, sort_key, sort_order):
+    """
+    Retrieve the path of a sorted copy of a workspace file, building it if necessary.
+
+    The sorted copy is a derived artifact kept in the cache for the current version of the file.
+    Numeric columns are sorted numerically, other columns alphabetically; empty cells are always
+    placed last.
+
+    Args:
+        file_path (str): The path to the file within the user's workspace directory.
+        sort_key (str): The name of the column to sort by.
+        sort_order (str): The sort order, either "asc" or "desc".
+
+    Returns:
+        str: The path to the sorted copy of the file. The copy does not exist if the file has no
+            header or the column is not found.
+    """
+    kind = f"sort:{sort_key}:{sort_order}"
+    sorted_file_path = cache_manager.get(file_path, kind)
+    if sorted_file_path is not None:
+        return sorted_file_path
+
+    # Concurrent requests for the same sort wait for the first one to build it
+    with lock_manager.exclusive(
+        file_path, f"build:{kind}", timeout=lock_manager.interactive_timeout
+    ):
+        sorted_file_path = cache_manager.get(file_path, kind)
+        if sorted_file_path is None:
+            _build_sorted_file(file_path, kind, sort_key, sort_order)
+
+    return cache_manager.path(file_path, kind)
+
+
+def _build_sorted_file(file_path, kind, sort_key, sort_order):
+    """
+    Build the sorted copy of a workspace file as a derived artifact.
+
+    Args:
+        file_path (str): The path to the file within the user's workspace directory.
+        kind (str): The artifact kind of the sorted copy.
+        sort_key (str): The name of the column to sort by.
+        sort_order (str): The sort order, either "asc" or "desc".
+
+    Returns:
+        None
+    """
+    with cold_storage_manager.open(file_path, "r", encoding="utf-8") as file:
+        reader = csv.reader(file)
+        # First line as header
+        header = next(reader)
+        if header:
+            rows = list(reader)  # Read all rows
+
+            # Find the index of the column to sort by
+            if sort_key in header:
+                sort_index = header.index(sort_key)
+                reverse_sort = sort_order == "desc"
+
+                # Detect if the column is numeric or string by examining the first valid value
+                first_valid_value = next(
+                    (row[sort_index] for row in rows if row[sort_index]), None
+                )
+
+                if first_valid_value and is_number(first_valid_value):
+                    # Sort numerically
+                    rows = sorted(
+                        rows,
+                        key=lambda row: (
+                            convert_to_number(row[sort_index])
+                            if row[sort_index]
+                            else (float("-inf") if reverse_sort else float("inf"))
+                        ),
+                        reverse=reverse_sort,
+                    )
+                else:
+                    # Sort alphabetically (string sort)
+                    rows = sorted(
+                        rows,
+                        key=lambda row: (
+                            row[sort_index].lower()
+                            if row[sort_index] != ""
+                            else ("\u0000" if reverse_sort else "\uFFFF")
+                        ),
+                        reverse=reverse_sort,
+                    )
+
+                # Save sorted data
+                with cache_manager.build(file_path, kind) as temp_file_path:
+                    with open(temp_file_path, "w", encoding="utf-8") as sorted_file:
+                        writer = csv.writer(sorted_file)
+                        writer.writerow(header)
+                        writer.writerows(rows)
+
+
 @workspace_route_bp.route(f"{WORKSPACE_FILE_ROUTE}/<path:relative_path>", methods=["GET"])
 @compress.compressed()
 def get_workspace_file(relative_path):
@@ -243,6 +365,13 @@ def get_workspace_file(relative_path):
     a specified range of rows from a CSV file. Feedback about the file retrieval process is sent to
     the user's console via WebSocket events.
 
+    LOVD downloads are recognized by their header and served one table at a time, read as tab
+    separated values with the quotes stripped. A table index built once per file version allows
+    reading any page without scanning the file.
+
+    VCF files are served with the INFO field expanded into one column per key. A `region` returns
+    only the records overlapping it, found through the region index of the file.
+
     Args:
         relative_path (str): The path to the file within the user's workspace directory.
 
@@ -253,14 +382,18 @@ def get_workspace_file(relative_path):
     Query Parameters:
         page (int): The page number of data to retrieve (default is 0).
         rowsPerPage (int): The number of rows per page (default is 100).
+        table (str): The table to retrieve from an LOVD download (default is the first table).
+        region (str): The region `chrom:start-end` of the records to retrieve from a VCF file.
 
     Returns:
-        Response: A JSON response containing the paginated file data or an error message. The
-        response includes:
+        Response: A JSON response containing the paginated file data or an error message. For LOVD
+        downloads, it also holds the `table`, its `notes` and the names of all `tables`. LOVD and
+        VCF responses are flagged `readOnly`. The response includes:
             - `200 OK` with the file data if successful.
-            - `400 Bad Request` if required headers are missing.
+            - `400 Bad Request` if required headers are missing or the region is malformed.
             - `403 Forbidden` if there is a permission error.
             - `404 Not Found` if the requested file does not exist.
+            - `423 Locked` if the file stays in use by another operation.
             - `500 Internal Server Error` for unexpected errors.
 
     Emits:
@@ -311,112 +444,149 @@ def get_workspace_file(relative_path):
         # Ensure the user specific directory exists
         if not os.path.exists(user_workspace_dir):
             # Copy the template from the template directory to the user's workspace
-            shutil.copytree(WORKSPACE_TEMPLATE_DIR, user_workspace_dir)
-
-        # Check if file is empty
-        if os.path.getsize(file_path) == 0:
-            return jsonify(
-                {"page": page, "totalRows": total_rows, "header": header, "rows": paginated_rows}
+            shutil.copytree(
+                WORKSPACE_TEMPLATE_DIR, user_workspace_dir, copy_function=blob_store.copy
             )
 
-        # Return file content with sorting
-        if sort:
-            sort_key, sort_order = list(sort.items())[0]
-            sorted_file_path = f"{file_path}.{sort_key}.{sort_order}.sort"
+        # Resolve the file and its derived artifacts for a single version of the file
+        with lock_manager.shared(file_path, timeout=lock_manager.interactive_timeout):
+            # Check if file is empty
+            if os.path.getsize(file_path) == 0:
+                return jsonify(
+                    {
+                        "page": page,
+                        "totalRows": total_rows,
+                        "header": header,
+                        "rows": paginated_rows,
+                    }
+                )
+
+            # Return a table of an LOVD download, sorting is not supported
+            if is_lovd_file(file_path):
+                tables = get_lovd_index(file_path)["tables"]
+                table_name = request.args.get("table") or (tables[0]["name"] if tables else "")
+                table = next((table for table in tables if table["name"] == table_name), None)
+
+                if table is None:
+                    return jsonify({"error": f"Table '{table_name}' not found"}), 404
+
+                response_data = {
+                    "page": page,
+                    "totalRows": table["rows"],
+                    "header": table["header"],
+                    "rows": read_lovd_page(file_path, table, start_row, rows_per_page),
+                    "table": table["name"],
+                    "notes": table["notes"],
+                    "tables": [table["name"] for table in tables],
+                    "readOnly": True,
+                }
+
+                # Emit a feedback to the user's console
+                socketio_emit_to_user_session(
+                    CONSOLE_FEEDBACK_EVENT,
+                    {
+                        "type": "succ",
+                        "message": f"Table '{table['name']}' of file at '{relative_path}' "
+                        + "retrieved successfully.",
+                    },
+                    uuid,
+                    sid,
+                )
+
+                return jsonify(response_data)
+
+            # Return VCF records with the INFO field expanded, sorting is not supported
+            if is_vcf_path(file_path):
+                index = get_vcf_index(file_path)
+                region = request.args.get("region")
+
+                if region:
+                    rows, total_rows = query_vcf_region(
+                        file_path, index, region, start_row, rows_per_page
+                    )
+                else:
+                    rows = read_vcf_page(file_path, index, start_row, rows_per_page)
+                    total_rows = index["rows"]
+
+                response_data = {
+                    "page": page,
+                    "totalRows": total_rows,
+                    "header": index["header"],
+                    "rows": rows,
+                    "readOnly": True,
+                }
+                if region:
+                    response_data["region"] = region
+
+                # Emit a feedback to the user's console
+                socketio_emit_to_user_session(
+                    CONSOLE_FEEDBACK_EVENT,
+                    {
+                        "type": "succ",
+                        "message": f"File at '{relative_path}' retrieved successfully.",
+                    },
+                    uuid,
+                    sid,
+                )
+
+                return jsonify(response_data)
+
+            # Return file content with sorting
+            if sort:
+                sort_key, sort_order = list(sort.items())[0]
+                sorted_file_path = _get_sorted_file_path(file_path, sort_key, sort_order)
+
+                with open(sorted_file_path, "r", encoding="utf-8") as file:
+                    reader = csv.reader(file)
+                    # First line as header
+                    header = next(reader)
+                    if header:
+                        # Read the rows within the specified range, otherwise skip to the next row.
+                        # Loop ends when the end row is reached or the end of the file is reached.
+                        for i, row in enumerate(reader):
+                            if start_row <= i < end_row:
+                                paginated_rows.append(row)
+                            total_rows += 1
 
-            existing_sorted_files = [
-                f
-                for f in os.listdir(os.path.dirname(file_path))
-                if f.startswith(os.path.basename(file_path)) and f.endswith(".sort")
-            ]
+                            if i >= end_row:
+                                break
 
-            # Remove old sorted files that do not match the current sort key and order
-            for file_name in existing_sorted_files:
-                if file_name != os.path.basename(sorted_file_path):
-                    os.remove(os.path.join(os.path.dirname(file_path), file_name))
+            # Return file content without sorting
+            else:
+                stats = get_workspace_file_stats(file_path)
 
-            if not os.path.exists(sorted_file_path):
-                with open(file_path, "r", encoding="utf-8") as file:
+                with cold_storage_manager.open(file_path, "r", encoding="utf-8") as file:
                     reader = csv.reader(file)
                     # First line as header
                     header = next(reader)
+                    first_row = 0
+
+                    # Seek to the closest indexed row before the page when the row index is kept,
+                    # which only decompresses the frame holding the page of a file compressed at
+                    # rest
+                    if header and stats and stats["rowOffsets"]:
+                        block = min(start_row // ROW_INDEX_INTERVAL, len(stats["rowOffsets"]) - 1)
+                        file.seek(stats["rowOffsets"][block])
+                        first_row = block * ROW_INDEX_INTERVAL
+
                     if header:
-                        rows = list(reader)  # Read all rows
-
-                        # Find the index of the column to sort by
-                        if sort_key in header:
-                            sort_index = header.index(sort_key)
-                            reverse_sort = sort_order == "desc"
-
-                            # Detect if the column is numeric or string by examining the first valid value
-                            first_valid_value = next(
-                                (row[sort_index] for row in rows if row[sort_index]), None
-                            )
-
-                            if first_valid_value and is_number(first_valid_value):
-                                # Sort numerically
-                                rows = sorted(
-                                    rows,
-                                    key=lambda row: (
-                                        convert_to_number(row[sort_index])
-                                        if row[sort_index]
-                                        else (float("-inf") if reverse_sort else float("inf"))
-                                    ),
-                                    reverse=reverse_sort,
-                                )
-                            else:
-                                # Sort alphabetically (string sort)
-                                rows = sorted(
-                                    rows,
-                                    key=lambda row: (
-                                        row[sort_index].lower()
-                                        if row[sort_index] != ""
-                                        else ("\u0000" if reverse_sort else "\uFFFF")
-                                    ),
-                                    reverse=reverse_sort,
-                                )
-
-                            # Save sorted data
-                            with open(sorted_file_path, "w", encoding="utf-8") as sorted_file:
-                                writer = csv.writer(sorted_file)
-                                writer.writerow(header)
-                                writer.writerows(rows)
-
-            with open(sorted_file_path, "r", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                # First line as header
-                header = next(reader)
-                if header:
-                    # Read the rows within the specified range, otherwise skip to the next row.
-                    # Loop ends when the end row is reached or the end of the file is reached.
-                    for i, row in enumerate(reader):
-                        if start_row <= i < end_row:
-                            paginated_rows.append(row)
-                        total_rows += 1
-
-                        if i >= end_row:
-                            break
-
-        # Return file content without sorting
-        else:
-            with open(file_path, "r", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                # First line as header
-                header = next(reader)
-                if header:
-                    # Read the rows within the specified range, otherwise skip to the next row.
-                    # Loop ends when the end row is reached or the end of the file is reached.
-                    for i, row in enumerate(reader):
-                        if start_row <= i < end_row:
-                            paginated_rows.append(row)
-                        total_rows += 1
-
-                        if i >= end_row:
-                            break
-
-            # Costly operation to read the file and return the required rows.
-            # It gets more expensive as the page number increases, needs to go deeper into the file.
-            # Currently supports CSV files only.
+                        # Read the rows within the specified range, otherwise skip to the next row.
+                        # Loop ends when the end row is reached or the end of the file is reached.
+                        for i, row in enumerate(reader, first_row):
+                            if start_row <= i < end_row:
+                                paginated_rows.append(row)
+                            total_rows += 1
+
+                            if i >= end_row:
+                                break
+
+                if stats:
+                    total_rows = stats["rows"]
+
+                # Costly operation to read the file and return the required rows.
+                # It gets more expensive as the page number increases, needs to go deeper into the
+                # file.
+                # Currently supports CSV files only.
 
             
         # Build the response data
@@ -441,6 +611,19 @@ def get_workspace_file(relative_path):
         # Serve the file in batches
         return jsonify(response_data)
 
+    except ValueError as e:
+        logger.error("ValueError: %s while accessing %s", e, file_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"ValueError: {e} while accessing {file_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": f"{e}"}), 400
     except FileNotFoundError as e:
         logger.error("FileNotFoundError: %s while accessing %s", e, file_path)
         # Emit a feedback to the user's console
@@ -454,6 +637,19 @@ def get_workspace_file(relative_path):
             sid,
         )
         return jsonify({"error": "Requested file not found"}), 404
+    except LockTimeoutError as e:
+        logger.error("LockTimeoutError: %s while accessing %s", e.message, file_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"LockTimeoutError: {e.message} while accessing {file_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "File is in use by another operation"}), 423
     except PermissionError as e:
         logger.error("PermissionError: %s while accessing %s", e, file_path)
         # Emit a feedback to the user's console
@@ -516,9 +712,10 @@ def put_workspace_file(relative_path):
 
     Status Codes:
         200: Success - File saved successfully.
-        400: Bad Request - UUID or SID header is missing.
+        400: Bad Request - UUID or SID header is missing, or the file is an LOVD download.
         403: Forbidden - Permission error while saving the file.
         404: Not Found - Requested file not found.
+        423: Locked - The file stayed in use by another operation.
         500: Internal Server Error - An unexpected error occurred.
     """
 
@@ -560,59 +757,76 @@ def put_workspace_file(relative_path):
         # Ensure the user specific directory exists
         if not os.path.exists(user_workspace_dir):
             # Copy the template from the template directory to the user's workspace
-            shutil.copytree(WORKSPACE_TEMPLATE_DIR, user_workspace_dir)
+            shutil.copytree(
+                WORKSPACE_TEMPLATE_DIR, user_workspace_dir, copy_function=blob_store.copy
+            )
 
         # Ensure the directory exists
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
-        if sort:
-            sort_key, sort_order = list(sort.items())[0]
-            copy_file_path = f"{file_path}.{sort_key}.{sort_order}.sort"
-
-        # Costly operation to read the entire file and update the required rows.
-        # One full file cycle.
-        # Currently supports CSV files only.
+        # LOVD downloads are viewed one table at a time and VCF files with their INFO field
+        # expanded, saving the view would overwrite the file
+        if os.path.exists(file_path) and (is_vcf_path(file_path) or is_lovd_file(file_path)):
+            file_kind = "VCF" if is_vcf_path(file_path) else "LOVD"
+            # Emit a feedback to the user's console
+            socketio_emit_to_user_session(
+                CONSOLE_FEEDBACK_EVENT,
+                {"type": "errr", "message": f"{file_kind} file at '{relative_path}' is read-only."},
+                uuid,
+                sid,
+            )
+            # Emit a feedback to the user's button
+            socketio_emit_to_user_session(
+                WORKSPACE_FILE_SAVE_FEEDBACK_EVENT,
+                {"status": "error"},
+                uuid,
+                sid,
+            )
+            return jsonify({"error": f"{file_kind} files are read-only"}), 400
 
-        # Create a temporary file to write updated content
-        temp_file_path = f"{file_path}.tmp"
+        # Writers are applied one after the other, readers keep the version they opened
+        with lock_manager.exclusive(file_path, "write", timeout=lock_manager.interactive_timeout):
+            if sort:
+                sort_key, sort_order = list(sort.items())[0]
+                copy_file_path = _get_sorted_file_path(file_path, sort_key, sort_order)
 
-        # Read the file and write the updated rows
-        with open(copy_file_path, "r", encoding="utf-8") as infile, open(
-            temp_file_path, "w", encoding="utf-8"
-        ) as outfile:
-            reader = csv.reader(infile)
-            writer = csv.writer(outfile)
+            # Costly operation to read the entire file and update the required rows.
+            # One full file cycle.
+            # Currently supports CSV files only.
 
-            # Skip the header
-            next(reader)
-            writer.writerow(header)  # Write the new header
+            # Create a temporary file to write updated content
+            with track_workspace_usage(uuid, sid, file_path):
+                temp_file_path = cache_manager.temp_path()
+                try:
+                    # Read the file and write the updated rows
+                    with cold_storage_manager.open(
+                        copy_file_path, "r", encoding="utf-8"
+                    ) as infile, open(temp_file_path, "w", encoding="utf-8") as outfile:
+                        reader = csv.reader(infile)
+                        writer = csv.writer(outfile)
+
+                        # Skip the header
+                        next(reader)
+                        writer.writerow(header)  # Write the new header
+
+                        for i, row in enumerate(reader):
+                            if start_row <= i < end_row:
+                                writer.writerow(rows[i - start_row])  # Write the updated row
+                            else:
+                                writer.writerow(row)  # Write the existing row
+                            if i <= end_row:
+                                total_rows += 1
 
-            for i, row in enumerate(reader):
-                if start_row <= i < end_row:
-                    writer.writerow(rows[i - start_row])  # Write the updated row
-                else:
-                    writer.writerow(row)  # Write the existing row
-                if i <= end_row:
-                    total_rows += 1
-
-        # Replace the old file with the new file
-        os.replace(temp_file_path, file_path)
-
-        # Check if outdated files exists
-        existing_files = [
-            f
-            for f in os.listdir(os.path.dirname(file_path))
-            if f.startswith(os.path.basename(file_path))
-            and (
-                not f.endswith(".csv")
-                and not f.endswith(".txt")
-                and not os.path.isdir(os.path.join(os.path.dirname(file_path), f))
-            )
-        ]
+                    # Keep the previous version, then replace the old file with the new file
+                    snapshot_workspace_file(file_path, "save")
+                    with lock_manager.exclusive(file_path):
+                        os.replace(temp_file_path, file_path)
 
-        # Remove old files
-        for file_name in existing_files:
-            os.remove(os.path.join(os.path.dirname(file_path), file_name))
+                        # Remove outdated derived artifacts
+                        cache_manager.invalidate(file_path)
+                finally:
+                    if os.path.exists(temp_file_path):
+                        os.remove(temp_file_path)
 
         # Emit a feedback to the user's console
         socketio_emit_to_user_session(
@@ -660,6 +874,26 @@ def put_workspace_file(relative_path):
             sid,
         )
         return jsonify({"error": "Requested file not found"}), 404
+    except LockTimeoutError as e:
+        logger.error("LockTimeoutError: %s while saving %s", e.message, file_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"LockTimeoutError: {e.message} while saving {file_path}",
+            },
+            uuid,
+            sid,
+        )
+        # Emit a feedback to the user's button
+        socketio_emit_to_user_session(
+            WORKSPACE_FILE_SAVE_FEEDBACK_EVENT,
+            {"status": "error"},
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "File is in use by another operation"}), 423
     except PermissionError as e:
         logger.error("PermissionError: %s while saving %s", e, file_path)
         # Emit a feedback to the user's console
@@ -680,6 +914,26 @@ def put_workspace_file(relative_path):
             sid,
         )
         return jsonify({"error": "Permission denied"}), 403
+    except QuotaExceededError as e:
+        logger.error("QuotaExceededError: %s while saving %s", e.message, file_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"QuotaExceededError: {e.message} while saving {file_path}",
+            },
+            uuid,
+            sid,
+        )
+        # Emit a feedback to the user's button
+        socketio_emit_to_user_session(
+            WORKSPACE_FILE_SAVE_FEEDBACK_EVENT,
+            {"status": "error"},
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Insufficient storage"}), 507
     except UnexpectedError as e:
         logger.error("UnexpectedError: %s while saving %s", e.message, file_path)
         # Emit a feedback to the user's console
@@ -789,12 +1043,16 @@ def put_workspace_create(relative_path=None):
         # Ensure the user specific directory exists
         if not os.path.exists(user_workspace_dir):
             # Copy the template from the template directory to the user's workspace
-            shutil.copytree(WORKSPACE_TEMPLATE_DIR, user_workspace_dir)
+            shutil.copytree(
+                WORKSPACE_TEMPLATE_DIR, user_workspace_dir, copy_function=blob_store.copy
+            )
 
         # Ensure the directory exists
         os.makedirs(os.path.dirname(folder_path), exist_ok=True)
 
         if file_type == "file":
+            keep_pending_snapshots(destination_path)
+            blob_store.detach(destination_path, keep_data=False)
             open(destination_path, "w", encoding="utf-8").close()
         elif file_type == "folder":
             os.mkdir(destination_path)
@@ -946,30 +1204,20 @@ def put_workspace_rename(relative_path):
         # Ensure the user specific directory exists
         if not os.path.exists(user_workspace_dir):
             # Copy the template from the template directory to the user's workspace
-            shutil.copytree(WORKSPACE_TEMPLATE_DIR, user_workspace_dir)
+            shutil.copytree(
+                WORKSPACE_TEMPLATE_DIR, user_workspace_dir, copy_function=blob_store.copy
+            )
 
         # Ensure the directory exists
         os.makedirs(os.path.dirname(destination_path), exist_ok=True)
 
-        # Check if outdated files exists
-        existing_files = [
-            f
-            for f in os.listdir(os.path.dirname(destination_path))
-            if f.startswith(os.path.basename(destination_path))
-            and (
-                not f.endswith(".csv")
-                and not f.endswith(".txt")
-                and not os.path.isdir(os.path.join(os.path.dirname(destination_path), f))
-            )
-        ]
-
-        # Remove old files
-        for file_name in existing_files:
-            os.remove(os.path.join(os.path.dirname(destination_path), file_name))
-
         # Rename the file or folder
         os.rename(destination_path, new_path)
 
+        # Keep derived artifacts and previous versions with the renamed file or folder
+        cache_manager.move(destination_path, new_path)
+        snapshot_manager.move(destination_path, new_path)
+
         # Emit a feedback to the user's console
         socketio_emit_to_user_session(
             CONSOLE_FEEDBACK_EVENT,
@@ -1115,32 +1363,24 @@ def put_workspace_delete(relative_path):
         # Ensure the user specific directory exists
         if not os.path.exists(user_workspace_dir):
             # Copy the template from the template directory to the user's workspace
-            shutil.copytree(WORKSPACE_TEMPLATE_DIR, user_workspace_dir)
+            shutil.copytree(
+                WORKSPACE_TEMPLATE_DIR, user_workspace_dir, copy_function=blob_store.copy
+            )
 
         # Ensure the directory exists
         os.makedirs(os.path.dirname(destination_path), exist_ok=True)
 
-        # Check if outdated files exists
-        existing_files = [
-            f
-            for f in os.listdir(os.path.dirname(destination_path))
-            if f.startswith(os.path.basename(destination_path))
-            and (
-                not f.endswith(".csv")
-                and not f.endswith(".txt")
-                and not os.path.isdir(os.path.join(os.path.dirname(destination_path), f))
-            )
-        ]
-
-        # Remove old files
-        for file_name in existing_files:
-            os.remove(os.path.join(os.path.dirname(destination_path), file_name))
-
-        # Delete the file or folder
+        # Delete the file or folder, deletes are never blocked by the quotas
+        keep_pending_snapshots(destination_path)
+        size = get_path_size(destination_path)
         if file_type == "file":
             os.remove(destination_path)
         elif file_type == "folder":
             shutil.rmtree(destination_path)
+        usage_manager.record(uuid, -size)
+
+        # Remove derived artifacts of the deleted file or folder
+        cache_manager.invalidate(destination_path)
 
         # Emit a feedback to the user's console
         socketio_emit_to_user_session(
@@ -0,0 +1,417 @@
+"""
+Handle chunked, resumable file uploads into the workspace.
+
+This module provides Flask routes for importing large files into a user's workspace in chunks.
+It performs the following:
+- Starts an upload for any file type accepted by a regular import, or resumes it when the same
+  file was announced before, returning the chunks already received.
+- Streams every chunk straight to disk and verifies its SHA-256 checksum, so a failed chunk is
+  simply sent again instead of restarting the whole upload.
+- Verifies the SHA-256 checksum of the whole file on finalize, decompresses or moves it into the
+  workspace and runs the same post-import processing as a regular import. Archives are extracted
+  into the folder like on a regular import.
+- Handles exceptions like missing uploads, checksum mismatches, exceeded quotas, permission
+  errors, or unexpected errors, returning appropriate HTTP responses.
+
+Routes:
+    POST /workspace/upload: Starts or resumes an upload.
+    GET /workspace/upload/<upload_id>: Retrieves the state of an upload.
+    PUT /workspace/upload/<upload_id>/<int:index>: Uploads a chunk.
+    POST /workspace/upload/<upload_id>: Finalizes an upload.
+    DELETE /workspace/upload/<upload_id>: Aborts an upload.
+"""
+
+import os
+from flask import Blueprint, request, jsonify
+
+from ..setup.extensions import logger, upload_manager, usage_manager, lock_manager
+from ..utils.helpers import (
+    socketio_emit_to_user_session,
+    track_workspace_usage,
+    snapshot_workspace_file,
+    complete_workspace_import,
+    complete_workspace_archive_import,
+)
+from ..utils.file_import import get_imported_filename, import_workspace_file
+from ..utils.archive_import import is_archive, import_workspace_archive
+from ..utils.exceptions import UnexpectedError, QuotaExceededError, LockTimeoutError
+from ..constants import (
+    WORKSPACE_DIR,
+    CONSOLE_FEEDBACK_EVENT,
+    WORKSPACE_UPLOAD_ROUTE,
+)
+
+workspace_upload_route_bp = Blueprint("workspace_upload_route", __name__)
+
+
+def _get_user_headers():
+    """
+    Extract the `uuid` and `sid` headers of the request.
+
+    Returns:
+        tuple: The `uuid` and `sid` headers and an error response, which is None if both headers
+            are present.
+    """
+    uuid = request.headers.get("uuid")
+    sid = request.headers.get("sid")
+
+    # Ensure the uuid header is present
+    if not uuid:
+        return uuid, sid, (jsonify({"error": "UUID header is missing"}), 400)
+
+    # Ensure the sid header is present
+    if not sid:
+        return uuid, sid, (jsonify({"error": "SID header is missing"}), 400)
+
+    return uuid, sid, None
+
+
+@workspace_upload_route_bp.route(WORKSPACE_UPLOAD_ROUTE, methods=["POST"])
+def post_workspace_upload():
+    """
+    Start a chunked upload, or resume it if the same file was announced before.
+
+    Headers:
+        uuid: Unique identifier for the user's workspace.
+        sid: Session identifier for emitting real-time events.
+
+    Request Body (JSON):
+        filename (str): The name of the uploaded file, of a type accepted by a regular import,
+            or an archive of such files.
+        size (int): The size of the whole file in bytes.
+        path (str, optional): The folder within the workspace to upload to (default is root).
+        checksum (str, optional): The SHA-256 hex digest of the whole file, verified on finalize.
+        chunkSize (int, optional): The requested chunk size in bytes.
+        keepOriginal (bool, optional): Keep the compressed original for export (default is false).
+
+    Returns:
+        JSON response with the `uploadId`, `chunkSize`, `totalChunks` and the already
+        `receivedChunks` of the upload, or an error message.
+    """
+    uuid, sid, error = _get_user_headers()
+    if error:
+        return error
+
+    data = request.json or {}
+    filename = data.get("filename") or ""
+    relative_path = (data.get("path") or "").strip("/")
+    size = data.get("size")
+
+    if not isinstance(size, int) or size < 0:
+        return jsonify({"error": "'size' must be a non-negative integer"}), 400
+
+    try:
+        imported_filename = "" if is_archive(filename) else get_imported_filename(filename)
+    except ValueError as e:
+        return jsonify({"error": f"FileImportError: {e}"}), 400
+
+    if "/" in filename:
+        return jsonify({"error": "Permission denied"}), 403
+
+    user_workspace_dir = os.path.join(WORKSPACE_DIR, uuid)
+    destination_path = os.path.normpath(
+        os.path.join(user_workspace_dir, relative_path, imported_filename)
+    )
+    if not (destination_path + os.sep).startswith(user_workspace_dir + os.sep):
+        return jsonify({"error": "Permission denied"}), 403
+
+    try:
+        # Fail early instead of after the whole file was uploaded
+        usage_manager.check(uuid, size)
+
+        upload = upload_manager.create(
+            uuid,
+            relative_path,
+            filename,
+            size,
+            data.get("checksum"),
+            data.get("chunkSize"),
+            {"keepOriginal": bool(data.get("keepOriginal"))},
+        )
+
+        return jsonify(upload), 200
+
+    except ValueError as e:
+        return jsonify({"error": f"{e}"}), 400
+    except QuotaExceededError as e:
+        logger.error("QuotaExceededError: %s while uploading %s", e.message, destination_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"QuotaExceededError: {e.message} while uploading {filename}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Insufficient storage"}), 507
+    except (OSError, UnexpectedError) as e:
+        logger.error("UnexpectedError: %s while uploading %s", e, destination_path)
+        return jsonify({"error": "An internal error occurred"}), 500
+
+
+@workspace_upload_route_bp.route(f"{WORKSPACE_UPLOAD_ROUTE}/<upload_id>", methods=["GET"])
+def get_workspace_upload(upload_id):
+    """
+    Retrieve the state of an upload, used to resume it after a disconnect.
+
+    Args:
+        upload_id (str): The identifier of the upload.
+
+    Headers:
+        uuid: Unique identifier for the user's workspace.
+        sid: Session identifier for emitting real-time events.
+
+    Returns:
+        JSON response with the state of the upload, including its `receivedChunks`, or an error
+        message.
+    """
+    uuid, _, error = _get_user_headers()
+    if error:
+        return error
+
+    try:
+        return jsonify(upload_manager.get(uuid, upload_id)), 200
+    except ValueError as e:
+        return jsonify({"error": f"{e}"}), 400
+    except FileNotFoundError:
+        return jsonify({"error": "Upload not found"}), 404
+
+
+@workspace_upload_route_bp.route(
+    f"{WORKSPACE_UPLOAD_ROUTE}/<upload_id>/<int:index>", methods=["PUT"]
+)
+def put_workspace_upload_chunk(upload_id, index):
+    """
+    Upload a chunk of a file. The request body holds the raw bytes of the chunk.
+
+    Args:
+        upload_id (str): The identifier of the upload.
+        index (int): The index of the chunk.
+
+    Headers:
+        uuid: Unique identifier for the user's workspace.
+        sid: Session identifier for emitting real-time events.
+        checksum: The SHA-256 hex digest of the chunk.
+
+    Returns:
+        JSON response with the state of the upload, or an error message. A `400 Bad Request`
+        means the chunk was not stored and must be sent again.
+    """
+    uuid, _, error = _get_user_headers()
+    if error:
+        return error
+
+    if not request.headers.get("checksum"):
+        return jsonify({"error": "Checksum header is missing"}), 400
+
+    try:
+        upload = upload_manager.write_chunk(
+            uuid, upload_id, index, request.stream, request.headers.get("checksum")
+        )
+        return jsonify(upload), 200
+
+    except ValueError as e:
+        logger.error("ValueError: %s while uploading chunk %s of %s", e, index, upload_id)
+        return jsonify({"error": f"{e}"}), 400
+    except FileNotFoundError:
+        return jsonify({"error": "Upload not found"}), 404
+    except (OSError, UnexpectedError) as e:
+        logger.error("UnexpectedError: %s while uploading chunk %s of %s", e, index, upload_id)
+        return jsonify({"error": "An internal error occurred"}), 500
+
+
+@workspace_upload_route_bp.route(f"{WORKSPACE_UPLOAD_ROUTE}/<upload_id>", methods=["POST"])
+def post_workspace_upload_finalize(upload_id):
+    """
+    Finalize an upload once all chunks were received.
+
+    The whole file is verified against the checksum announced on start, then decompressed or moved
+    into the workspace and processed like a regular import.
+
+    Args:
+        upload_id (str): The identifier of the upload.
+
+    Headers:
+        uuid: Unique identifier for the user's workspace.
+        sid: Session identifier for emitting real-time events.
+
+    Returns:
+        JSON response with a success message, the `checksum` of the uploaded file and the name,
+        compression, detected format and delimiter of the imported file, or the `imported` and
+        `skipped` members of an archive, or an error message.
+    """
+    uuid, sid, error = _get_user_headers()
+    if error:
+        return error
+
+    user_workspace_dir = os.path.join(WORKSPACE_DIR, uuid)
+
+    try:
+        upload, data_path = upload_manager.finalize(uuid, upload_id)
+
+        folder_path = os.path.join(user_workspace_dir, upload["path"])
+
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "info",
+                "message": f"Importing file '{upload['filename']}' to "
+                + f"'{upload['path'] or 'root folder'}'...",
+            },
+            uuid,
+            sid,
+        )
+
+        if is_archive(upload["filename"]):
+            with track_workspace_usage(uuid, sid, None, upload["size"]) as record_usage:
+                summary = import_workspace_archive(
+                    data_path, upload["filename"], folder_path, record_usage
+                )
+            upload_manager.remove(uuid, upload_id)
+
+            complete_workspace_archive_import(
+                uuid, sid, upload["filename"], upload["path"], summary
+            )
+
+            return (
+                jsonify(
+                    {
+                        "message": "Archive imported successfully",
+                        "checksum": upload["checksum"],
+                        **summary,
+                    }
+                ),
+                200,
+            )
+
+        destination_path = os.path.join(folder_path, get_imported_filename(upload["filename"]))
+        with track_workspace_usage(uuid, sid, destination_path, upload["size"]):
+            with lock_manager.exclusive(destination_path, "write"):
+                snapshot_workspace_file(destination_path, "import")
+                imported = import_workspace_file(
+                    data_path,
+                    upload["filename"],
+                    folder_path,
+                    upload["options"].get("keepOriginal", False),
+                )
+        upload_manager.remove(uuid, upload_id)
+
+        complete_workspace_import(uuid, sid, destination_path)
+
+        return (
+            jsonify(
+                {
+                    "message": "File imported successfully",
+                    "checksum": upload["checksum"],
+                    "filename": imported["filename"],
+                    "compression": imported["compression"],
+                    "format": imported["format"],
+                    "delimiter": imported["delimiter"],
+                }
+            ),
+            200,
+        )
+
+    except ValueError as e:
+        logger.error("ValueError: %s while finalizing upload %s", e, upload_id)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {"type": "errr", "message": f"FileImportError: {e}"},
+            uuid,
+            sid,
+        )
+        return jsonify({"error": f"{e}"}), 400
+    except FileNotFoundError as e:
+        logger.error("FileNotFoundError: %s while finalizing upload %s", e, upload_id)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"FileNotFoundError: {e} while importing {user_workspace_dir}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Requested file not found"}), 404
+    except LockTimeoutError as e:
+        logger.error("LockTimeoutError: %s while finalizing upload %s", e.message, upload_id)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"LockTimeoutError: {e.message} while importing {user_workspace_dir}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "File is in use by another operation"}), 423
+    except PermissionError as e:
+        logger.error("PermissionError: %s while finalizing upload %s", e, upload_id)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"PermissionError: {e} while importing {user_workspace_dir}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Permission denied"}), 403
+    except QuotaExceededError as e:
+        logger.error("QuotaExceededError: %s while finalizing upload %s", e.message, upload_id)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"QuotaExceededError: {e.message} while importing {user_workspace_dir}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Insufficient storage"}), 507
+    except (OSError, UnexpectedError) as e:
+        logger.error("UnexpectedError: %s while finalizing upload %s", e, upload_id)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"UnexpectedError: {e} while importing {user_workspace_dir}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "An internal error occurred"}), 500
+
+
+@workspace_upload_route_bp.route(f"{WORKSPACE_UPLOAD_ROUTE}/<upload_id>", methods=["DELETE"])
+def delete_workspace_upload(upload_id):
+    """
+    Abort an upload and remove the chunks received so far.
+
+    Args:
+        upload_id (str): The identifier of the upload.
+
+    Headers:
+        uuid: Unique identifier for the user's workspace.
+        sid: Session identifier for emitting real-time events.
+
+    Returns:
+        JSON response with a success or error message.
+    """
+    uuid, _, error = _get_user_headers()
+    if error:
+        return error
+
+    try:
+        upload_manager.remove(uuid, upload_id)
+        return jsonify({"message": "Upload aborted"}), 200
+    except ValueError as e:
+        return jsonify({"error": f"{e}"}), 400
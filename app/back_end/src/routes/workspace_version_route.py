@@ -0,0 +1,285 @@
+"""
+Workspace version route module.
+
+This module defines routes for listing and restoring the previous versions of workspace files.
+A version is kept whenever a file is overwritten (saving a page, merging, applying an algorithm,
+importing or downloading over an existing file), stored as deduplicated content-defined chunks by
+the `SnapshotManager`, so a small edit to a large file only stores the changed chunks.
+
+Restoring a version keeps the current content as a version too, so a restore can be undone.
+
+Routes:
+    GET /workspace/versions/<path:relative_path>: Lists the versions of a file, the latest first.
+    PUT /workspace/versions/<path:relative_path>: Restores a version of a file.
+"""
+
+import os
+import gevent
+from flask import Blueprint, request, jsonify
+
+from ..setup.extensions import logger, cache_manager, snapshot_manager, lock_manager
+from ..utils.helpers import (
+    socketio_emit_to_user_session,
+    track_workspace_usage,
+    snapshot_workspace_file,
+)
+from ..utils.exceptions import UnexpectedError, QuotaExceededError, LockTimeoutError
+from ..constants import (
+    WORKSPACE_DIR,
+    WORKSPACE_VERSION_ROUTE,
+    CONSOLE_FEEDBACK_EVENT,
+    WORKSPACE_UPDATE_FEEDBACK_EVENT,
+)
+
+workspace_version_route_bp = Blueprint("workspace_version_route", __name__)
+
+
+def _resolve_path(user_workspace_dir, relative_path):
+    """
+    Resolve a relative path inside the user's workspace directory.
+
+    Args:
+        user_workspace_dir (str): The root directory of the user's workspace.
+        relative_path (str): The path relative to the workspace root.
+
+    Returns:
+        str: The absolute path of the file.
+
+    Raises:
+        PermissionError: If the path points outside of the user's workspace.
+    """
+    path = os.path.normpath(os.path.join(user_workspace_dir, relative_path))
+    if not path.startswith(user_workspace_dir + os.sep):
+        raise PermissionError(f"Path '{relative_path}' is outside of the workspace")
+    return path
+
+
+@workspace_version_route_bp.route(
+    f"{WORKSPACE_VERSION_ROUTE}/<path:relative_path>", methods=["GET"]
+)
+def get_workspace_versions(relative_path):
+    """
+    Route to list the previous versions of a file in the user's workspace.
+
+    Versions of deleted files are listed as well, so that they can be restored.
+
+    Args:
+        relative_path (str): The relative path to the file inside the user's workspace.
+
+    Request Headers:
+        - uuid: A unique identifier for the user's session.
+        - sid: A session identifier for emitting real-time console feedback via Socket.IO.
+
+    Returns:
+        Response (JSON):
+            - On success: The `versions` of the file, the latest first, each with its `id`,
+              `createdAt`, `modifiedAt`, `size`, `addedBytes` (the bytes it added to the
+              storage), `reason` and number of `chunks`.
+            - On error: A JSON object with an error message and appropriate HTTP status code.
+    """
+    uuid = request.headers.get("uuid")
+    sid = request.headers.get("sid")
+
+    # Ensure the uuid header is present
+    if not uuid:
+        return jsonify({"error": "UUID header is missing"}), 400
+
+    # Ensure the sid header is present
+    if not sid:
+        return jsonify({"error": "SID header is missing"}), 400
+
+    user_workspace_dir = os.path.join(WORKSPACE_DIR, uuid)
+
+    try:
+        file_path = _resolve_path(user_workspace_dir, relative_path)
+        return jsonify({"versions": snapshot_manager.list_versions(file_path)}), 200
+    except PermissionError as e:
+        logger.error("PermissionError: %s while listing versions of %s", e, relative_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"PermissionError: {e} while listing versions of {relative_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Permission denied"}), 403
+    except (OSError, UnexpectedError) as e:
+        logger.error("UnexpectedError: %s while listing versions of %s", e, relative_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"UnexpectedError: {e} while listing versions of {relative_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "An internal error occurred"}), 500
+
+
+@workspace_version_route_bp.route(
+    f"{WORKSPACE_VERSION_ROUTE}/<path:relative_path>", methods=["PUT"]
+)
+def put_workspace_version(relative_path):
+    """
+    Route to restore a previous version of a file in the user's workspace.
+
+    The version is reassembled from its chunks on a worker thread and atomically replaces the
+    file, which is recreated if it was deleted. The current content is kept as a version first.
+
+    Args:
+        relative_path (str): The relative path to the file inside the user's workspace.
+
+    Request Headers:
+        - uuid: A unique identifier for the user's session.
+        - sid: A session identifier for emitting real-time console feedback via Socket.IO.
+
+    Request Body (JSON):
+        - id (str): The ID of the version to restore, as listed by the GET route.
+
+    Returns:
+        Response (JSON):
+            - On success: The restored `version`.
+            - On error: A JSON object with an error message and appropriate HTTP status code.
+
+    Emits:
+        - Real-time console feedback and a workspace update using Socket.IO.
+    """
+    uuid = request.headers.get("uuid")
+    sid = request.headers.get("sid")
+
+    # Ensure the uuid header is present
+    if not uuid:
+        return jsonify({"error": "UUID header is missing"}), 400
+
+    # Ensure the sid header is present
+    if not sid:
+        return jsonify({"error": "SID header is missing"}), 400
+
+    version_id = (request.json or {}).get("id")
+    if not version_id:
+        return jsonify({"error": "'id' is required"}), 400
+
+    # Emit a feedback to the user's console
+    socketio_emit_to_user_session(
+        CONSOLE_FEEDBACK_EVENT,
+        {"type": "info", "message": f"Restoring version {version_id} of '{relative_path}'..."},
+        uuid,
+        sid,
+    )
+
+    user_workspace_dir = os.path.join(WORKSPACE_DIR, uuid)
+    temp_path = cache_manager.temp_path()
+
+    try:
+        file_path = _resolve_path(user_workspace_dir, relative_path)
+        versions = {version["id"]: version for version in snapshot_manager.list_versions(file_path)}
+        if version_id not in versions:
+            raise FileNotFoundError(f"Version '{version_id}' not found")
+
+        # Writers are applied one after the other, readers keep the version they opened
+        with lock_manager.exclusive(file_path, "write"), track_workspace_usage(
+            uuid, sid, file_path, versions[version_id]["size"]
+        ):
+            snapshot_workspace_file(file_path, "restore")
+            version = gevent.get_hub().threadpool.apply(
+                snapshot_manager.restore, (file_path, version_id, temp_path)
+            )
+
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with lock_manager.exclusive(file_path):
+                cache_manager.invalidate(file_path)
+                os.replace(temp_path, file_path)
+
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "succ",
+                "message": f"Version {version_id} of '{relative_path}' was restored successfully.",
+            },
+            uuid,
+            sid,
+        )
+
+        socketio_emit_to_user_session(
+            WORKSPACE_UPDATE_FEEDBACK_EVENT,
+            {"status": "updated"},
+            uuid,
+            sid,
+        )
+
+        return jsonify({"version": version}), 200
+
+    except FileNotFoundError as e:
+        logger.error("FileNotFoundError: %s while restoring %s", e, relative_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"FileNotFoundError: {e} while restoring {relative_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Requested version not found"}), 404
+    except LockTimeoutError as e:
+        logger.error("LockTimeoutError: %s while restoring %s", e.message, relative_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"LockTimeoutError: {e.message} while restoring {relative_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "File is in use by another operation"}), 423
+    except PermissionError as e:
+        logger.error("PermissionError: %s while restoring %s", e, relative_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"PermissionError: {e} while restoring {relative_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Permission denied"}), 403
+    except QuotaExceededError as e:
+        logger.error("QuotaExceededError: %s while restoring %s", e.message, relative_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"QuotaExceededError: {e.message} while restoring {relative_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "Insufficient storage"}), 507
+    except (OSError, ValueError, UnexpectedError) as e:
+        logger.error("UnexpectedError: %s while restoring %s", e, relative_path)
+        # Emit a feedback to the user's console
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "errr",
+                "message": f"UnexpectedError: {e} while restoring {relative_path}",
+            },
+            uuid,
+            sid,
+        )
+        return jsonify({"error": "An internal error occurred"}), 500
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -24,6 +24,20 @@ Initialization:
 - **Env**: An instance of `Env` from `src.config` is used to load environment variables.
 - **SocketManager**: Initialized with the Redis URL from environment variables for managing
     WebSocket sessions.
+- **UsageManager**: Initialized with the Redis URL and quotas from environment variables for
+    accounting per-user disk usage.
+- **CacheManager**: Initialized with the cache directory and byte budget from environment
+    variables for managing derived workspace artifacts. Artifact sizes are accounted to the
+    owning user through the `UsageManager`.
+- **UploadManager**: Initialized with the upload directory for managing chunked, resumable
+    uploads.
+- **ColdStorageManager**: Initialized with the workspace directory and the period without access
+    from environment variables for compressing rarely accessed workspace files at rest.
+- **BlobStore**: Initialized with the blob directory for deduplicating workspace files by content.
+- **SnapshotManager**: Initialized with the snapshot directory and the number of versions kept
+    per file from environment variables for keeping previous versions of workspace files.
+- **LockManager**: Initialized with the lock directory for coordinating readers and writers of
+    workspace files across worker processes.
 - **Flask Extensions**: Instances of `Compress`, `SocketIO`, and `CORS` are created and ready
     to be integrated into the Flask application.
 """
@@ -36,7 +50,22 @@ from flask_socketio import SocketIO
 from flask_cors import CORS
 
 from ..config import Env
+from ..constants import (
+    WORKSPACE_DIR,
+    WORKSPACE_BLOB_DIR,
+    WORKSPACE_SNAPSHOT_DIR,
+    WORKSPACE_LOCK_DIR,
+    WORKSPACE_CACHE_DIR,
+    WORKSPACE_UPLOAD_DIR,
+)
 from ..utils.socket_manager import SocketManager
+from ..utils.usage_manager import UsageManager
+from ..utils.cache_manager import CacheManager
+from ..utils.upload_manager import UploadManager
+from ..utils.cold_storage_manager import ColdStorageManager
+from ..utils.blob_store import BlobStore
+from ..utils.snapshot_manager import SnapshotManager
+from ..utils.lock_manager import LockManager
 
 
 # Configure logging
@@ -53,6 +82,42 @@ env.load_env()
 # Initialize SocketManager
 socket_manager = SocketManager(env.get_redis_url())
 
+# Initialize CacheManager
+cache_manager = CacheManager(WORKSPACE_DIR, WORKSPACE_CACHE_DIR, env.get_cache_max_bytes())
+
+# Initialize UsageManager
+usage_manager = UsageManager(
+    WORKSPACE_DIR,
+    cache_manager.artifacts_dir,
+    env.get_redis_url(),
+    soft_quota=env.get_quota_soft_bytes(),
+    hard_quota=env.get_quota_hard_bytes(),
+    reconcile_interval=env.get_usage_reconcile_interval(),
+)
+cache_manager.listener = usage_manager.record
+
+# Initialize UploadManager
+upload_manager = UploadManager(WORKSPACE_UPLOAD_DIR)
+
+# Initialize ColdStorageManager
+cold_storage_manager = ColdStorageManager(
+    WORKSPACE_DIR, max_idle=env.get_cold_storage_after(), blob_dir=WORKSPACE_BLOB_DIR
+)
+
+# Initialize BlobStore
+blob_store = BlobStore(WORKSPACE_BLOB_DIR)
+
+# Initialize SnapshotManager
+snapshot_manager = SnapshotManager(
+    WORKSPACE_DIR,
+    WORKSPACE_SNAPSHOT_DIR,
+    max_versions=env.get_snapshot_max_versions(),
+    opener=cold_storage_manager.open,
+)
+
+# Initialize LockManager
+lock_manager = LockManager(WORKSPACE_LOCK_DIR, WORKSPACE_DIR)
+
 # Initialize Flask extensions
 compress = Compress()
 socketio = SocketIO()
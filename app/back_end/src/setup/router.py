@@ -16,13 +16,16 @@ Dependencies:
 from flask import Blueprint
 
 from ..routes.workspace_route import workspace_route_bp
+from ..routes.workspace_batch_route import workspace_batch_route_bp
 from ..routes.workspace_aggregate_route import workspace_aggregate_route_bp
 from ..routes.workspace_export_route import workspace_export_route_bp
 from ..routes.workspace_import_route import workspace_import_route_bp
+from ..routes.workspace_upload_route import workspace_upload_route_bp
 from ..routes.workspace_download_route import workspace_download_route_bp
 from ..routes.workspace_merge_route import workspace_merge_route_bp
 from ..routes.workspace_apply_route import workspace_apply_route_bp
 from ..routes.workspace_align_route import workspace_align_route_bp
+from ..routes.workspace_version_route import workspace_version_route_bp
 
 
 def router(prefix):
@@ -47,7 +50,10 @@ def router(prefix):
     router_bp.register_blueprint(workspace_download_route_bp)
     router_bp.register_blueprint(workspace_export_route_bp)
     router_bp.register_blueprint(workspace_import_route_bp)
+    router_bp.register_blueprint(workspace_upload_route_bp)
     router_bp.register_blueprint(workspace_aggregate_route_bp)
+    router_bp.register_blueprint(workspace_batch_route_bp)
+    router_bp.register_blueprint(workspace_version_route_bp)
     router_bp.register_blueprint(workspace_route_bp)
 
     return router_bp
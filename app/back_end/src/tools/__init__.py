@@ -1,4 +1,4 @@
-"""CADD and SpliceAI Tool Package Initialization."""
+"""CADD, SpliceAI and liftover Tool Package Initialization."""
 
 from .cadd import (
     BadResponseException,
@@ -17,6 +17,17 @@ from .spliceai import (
     add_spliceai_eval_columns,
 )
 
+from .liftover import (
+    LiftOverError,
+    ChainIndex,
+    normalize_chromosome,
+    normalize_chromosomes,
+    get_chain_index,
+    download_chain_file,
+    liftover_positions,
+    add_liftover_columns,
+)
+
 __all__ = [
     # CADD related exports
     "BadResponseException",
@@ -31,4 +42,13 @@ __all__ = [
     "run_spliceai",
     "parse_spliceai_vcf",
     "add_spliceai_eval_columns",
+    # Liftover related exports
+    "LiftOverError",
+    "ChainIndex",
+    "normalize_chromosome",
+    "normalize_chromosomes",
+    "get_chain_index",
+    "download_chain_file",
+    "liftover_positions",
+    "add_liftover_columns",
 ]
@@ -3,6 +3,13 @@ import argparse
 import requests
 import pandas as pd
 
+from ..data.variant_keys import (
+    MISSING_KEY,
+    variant_keys_from_ids,
+    unpack_variant_keys,
+    position_keys,
+)
+
 
 class BadResponseException(Exception):
     """Custom exception for bad responses."""
@@ -106,16 +113,11 @@ def prepare_data_cadd(data:pd.DataFrame):
     """
     if 'variant_id_gnomad' not in data.columns:
         raise KeyError("The 'variant_id_gnomad' column is missing from the DataFrame.")
-    try:
-        split_data = data['variant_id_gnomad'].str.split('-', n=2, expand=True)
-        data[['Chromosome_gnomad', 'Position_gnomad']] = split_data[[0, 1]]
-    except ValueError as e:
-        raise ValueError(
-            f"Error processing 'variant_id_gnomad': {e}. "
-            f"This may be due to unexpected formatting or delimiters.")
 
-    data['Chromosome_gnomad'] = data['Chromosome_gnomad'].astype('Int64')
-    data['Position_gnomad'] = data['Position_gnomad'].astype('Int64')
+    keys, alleles = variant_keys_from_ids(data['variant_id_gnomad'])
+    variants = unpack_variant_keys(keys, alleles)
+    data['Chromosome_gnomad'] = variants['chrom']
+    data['Position_gnomad'] = variants['pos']
 
     if 'Chromosome_gnomad' not in data.columns or 'Position_gnomad' not in data.columns:
         raise RuntimeError("The columns 'Chromosome_gnomad' or 'Position_gnomad' "
@@ -132,8 +134,18 @@ def add_cadd_eval_column(data:pd.DataFrame, cadd_version="GRCh38-v1.7"):
     :return: The updated DataFrame with the 'cadd_eval' column.
     """
     data = prepare_data_cadd(data)
+
+    # Scores are fetched once for each position, rows without a valid variant one by one
+    variant_ids = data['hg38_gnomad_format'].where(
+        data['hg38_gnomad_format'].notna(), data['variant_id_gnomad'])
+    positions = position_keys(variant_keys_from_ids(variant_ids)[0])
+    first = ~positions.duplicated() | (positions == MISSING_KEY)
     try:
-        data["cadd_eval(PHRED)"] = data.apply(evaluate_cadd_score, axis=1, cadd_version=cadd_version)
+        evaluated = data[first].apply(evaluate_cadd_score, axis=1, cadd_version=cadd_version)
+        by_position = pd.Series(evaluated.to_numpy(), index=positions[first])
+        by_position = by_position[by_position.index != MISSING_KEY]
+        data["cadd_eval(PHRED)"] = evaluated.reindex(data.index).where(
+            first, positions.map(by_position))
     except ValueError as e:
         raise ValueError(
             f"Error occurred while applying 'evaluate_cadd_score': {e}. "
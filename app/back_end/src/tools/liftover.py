@@ -0,0 +1,447 @@
+"""
+Module provides batch conversion of genomic positions between reference assemblies.
+
+A UCSC chain file (e.g. `hg19ToHg38.over.chain.gz`) describes the aligned blocks of two
+assemblies. It is read once into a `ChainIndex`: sorted numpy arrays of the blocks of every
+chromosome, keyed by `chromosome id << 32 | position`, so that whole arrays of positions on any
+chromosome are converted with a single `searchsorted`. Where blocks of several chains overlap, the
+chain with the highest score wins, as with `pyliftover`.
+
+The arrays are saved beside the chain file and memory-mapped read-only, so that the worker
+processes of a server share their pages instead of each parsing the chain file.
+
+Chain files are downloaded from UCSC when the server is provisioned, see `download_chain_file`,
+never while serving a request: converting between assemblies whose chain file is missing fails.
+
+Positions are 1-based, as in HGVS descriptions, VCF files and gnomAD variant ids. Chromosome names
+are accepted with or without the `chr` prefix and returned without it.
+"""
+
+import os
+import json
+import shutil
+import bisect
+import uuid as uuid_lib
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import requests
+from pyliftover.chainfile import open_liftover_chain_file
+
+from ..constants import WORKSPACE_LIFTOVER_DIR
+from ..data.variant_keys import normalize_chromosome
+
+# Number of bits of the position in the keys of the index
+POSITION_BITS = 32
+
+INDEX_ARRAYS = ("starts", "ends", "offsets", "signs", "target_ids")
+
+# Chain files downloaded when the server is provisioned, as (source assembly, target assembly)
+PROVISIONED_CHAINS = (("hg19", "hg38"), ("hg38", "hg19"))
+
+CHAIN_FILE_URL = "https://hgdownload.soe.ucsc.edu/goldenPath/{from_db}/liftOver/{file_name}"
+
+# Seconds to wait for UCSC to connect or send data when downloading a chain file
+DOWNLOAD_TIMEOUT = 60
+
+
+class LiftOverError(Exception):
+    """Custom exception for chain files which cannot be read."""
+
+
+def normalize_chromosomes(chromosomes: pd.Series) -> pd.Series:
+    """
+    Normalizes the chromosome names of a column, see `normalize_chromosome`.
+
+    Every distinct name is normalized once.
+
+    :param pd.Series chromosomes: chromosome names or numbers
+    :returns: normalized chromosome names, missing where the name is missing
+    :rtype: pd.Series
+    """
+
+    codes, names = pd.factorize(chromosomes)
+    normalized = np.array([normalize_chromosome(name) for name in names] + [pd.NA], dtype=object)
+    return pd.Series(normalized[codes], index=chromosomes.index, dtype="string")
+
+
+def _read_chains(file):
+    """
+    Reads the aligned blocks of a chain file.
+
+    The blocks and gaps of every chain must add up to the spans given in its header, as checked
+    by `pyliftover`, so that a truncated or corrupted file is not indexed.
+
+    :param file: binary stream of the chain file
+    :returns: blocks as (source chromosome, source start, source end, target chromosome, offset,
+        sign, score), where the 0-based target position is `offset + sign * source position`
+    :rtype: list[tuple]
+    :raises LiftOverError: if the file is malformed
+    """
+
+    blocks = []
+    chain = None
+    header = None
+    for line in file:
+        fields = line.split()
+        if not fields or fields[0].startswith(b"#"):
+            continue
+
+        if fields[0] == b"chain":
+            if header is not None:
+                raise LiftOverError(f"Chain ends without its last block: {header!r}")
+            if len(fields) < 12:
+                raise LiftOverError(f"Malformed chain header: {line!r}")
+            header = line
+            score = float(fields[1])
+            source_name = fields[2].decode()
+            target_name, target_size, target_strand = fields[7].decode(), int(fields[8]), fields[9]
+            # The positions of the next block and the ends of the spans are kept with the chain
+            chain = (source_name, target_name, target_size, target_strand, score,
+                     int(fields[6]), int(fields[11]), int(fields[5]), int(fields[10]))
+            continue
+
+        if header is None:
+            raise LiftOverError(f"Alignment data before any chain header: {line!r}")
+        (source_name, target_name, target_size, target_strand, score, source_end, target_end,
+         source, target) = chain
+
+        size = int(fields[0])
+        if target_strand == b"-":
+            offset, sign = target_size - 1 - target + source, -1
+        else:
+            offset, sign = target - source, 1
+        blocks.append((source_name, source, source + size, target_name, offset, sign, score))
+
+        if len(fields) >= 3:
+            chain = chain[:7] + (source + size + int(fields[1]), target + size + int(fields[2]))
+            continue
+
+        # The last block of the chain
+        if source + size != source_end or target + size != target_end:
+            raise LiftOverError(f"Alignment blocks do not match the spans of the chain: {header!r}")
+        header = None
+
+    if header is not None:
+        raise LiftOverError(f"Chain ends without its last block: {header!r}")
+
+    return blocks
+
+
+def _resolve_overlaps(blocks):
+    """
+    Removes the parts of blocks covered by blocks of chains with a higher score.
+
+    :param list[tuple] blocks: blocks of a single source chromosome, as returned by `_read_chains`
+    :returns: non-overlapping blocks, sorted by start
+    :rtype: list[tuple]
+    """
+
+    blocks = sorted(blocks, key=lambda block: block[1])
+    if all(previous[2] <= block[1] for previous, block in zip(blocks, blocks[1:])):
+        return blocks
+
+    starts, ends, resolved = [], [], []
+    for block in sorted(blocks, key=lambda block: -block[6]):
+        position, end = block[1], block[2]
+        # Index of the first covered interval ending after the start of the block
+        i = bisect.bisect_right(ends, position)
+        while position < end:
+            next_start = starts[i] if i < len(starts) else end
+            if position < next_start:
+                # Keep the gap before the next covered interval
+                piece_end = min(next_start, end)
+                starts.insert(i, position)
+                ends.insert(i, piece_end)
+                resolved.append(block[:1] + (position, piece_end) + block[3:])
+                position = piece_end
+            else:
+                position = max(position, ends[i])
+            i += 1
+
+    return sorted(resolved, key=lambda block: block[1])
+
+
+class ChainIndex:
+    """
+    Sorted interval arrays of the aligned blocks of a chain file.
+
+    :ivar dict sources: ids of the source chromosomes by normalized name
+    :ivar list targets: normalized names of the target chromosomes by id
+    :ivar np.ndarray starts: keys of the first source position of every block
+    :ivar np.ndarray ends: keys of the position after the last source position of every block
+    :ivar np.ndarray offsets: offset of the target position of every block
+    :ivar np.ndarray signs: 1 or -1 if the block maps to the reverse strand
+    :ivar np.ndarray target_ids: target chromosome id of every block
+    """
+
+    def __init__(self, sources, targets, arrays):
+        self.sources = sources
+        self.targets = targets
+        self.starts = arrays["starts"]
+        self.ends = arrays["ends"]
+        self.offsets = arrays["offsets"]
+        self.signs = arrays["signs"]
+        self.target_ids = arrays["target_ids"]
+
+    @classmethod
+    def from_chain_file(cls, file):
+        """
+        Builds the index of a chain file.
+
+        :param file: binary stream of the chain file
+        :returns: the index
+        :rtype: ChainIndex
+        """
+
+        by_source = {}
+        for block in _read_chains(file):
+            by_source.setdefault(block[0], []).append(block)
+
+        sources = {}
+        targets = {}
+        columns = {name: [] for name in INDEX_ARRAYS}
+        for source_name in sorted(by_source):
+            source_id = sources.setdefault(normalize_chromosome(source_name), len(sources))
+            for _, start, end, target_name, offset, sign, _ in _resolve_overlaps(
+                    by_source[source_name]):
+                columns["starts"].append((source_id << POSITION_BITS) | start)
+                columns["ends"].append((source_id << POSITION_BITS) | end)
+                columns["offsets"].append(offset)
+                columns["signs"].append(sign)
+                columns["target_ids"].append(
+                    targets.setdefault(normalize_chromosome(target_name), len(targets)))
+
+        arrays = {
+            "starts": np.array(columns["starts"], dtype=np.int64),
+            "ends": np.array(columns["ends"], dtype=np.int64),
+            "offsets": np.array(columns["offsets"], dtype=np.int64),
+            "signs": np.array(columns["signs"], dtype=np.int8),
+            "target_ids": np.array(columns["target_ids"], dtype=np.int32),
+        }
+        # Chromosomes are indexed in the order of their ids, keep the keys sorted overall
+        order = np.argsort(arrays["starts"], kind="stable")
+        return cls(sources, list(targets), {name: array[order] for name, array in arrays.items()})
+
+    def save(self, index_dir):
+        """
+        Saves the index as numpy arrays, atomically.
+
+        :param str index_dir: directory to save the index to
+        """
+
+        temp_dir = f"{index_dir}.{uuid_lib.uuid4().hex}.part"
+        os.makedirs(temp_dir)
+        try:
+            for name in INDEX_ARRAYS:
+                np.save(os.path.join(temp_dir, f"{name}.npy"), getattr(self, name))
+            with open(os.path.join(temp_dir, "chromosomes.json"), "w", encoding="utf-8") as f:
+                json.dump({"sources": self.sources, "targets": self.targets}, f)
+            try:
+                os.rename(temp_dir, index_dir)
+            except OSError:
+                # Another process saved the same index in the meantime
+                pass
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, index_dir):
+        """
+        Loads a saved index, memory-mapping its arrays read-only.
+
+        :param str index_dir: directory the index was saved to
+        :returns: the index
+        :rtype: ChainIndex
+        """
+
+        with open(os.path.join(index_dir, "chromosomes.json"), encoding="utf-8") as f:
+            chromosomes = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+            for name in INDEX_ARRAYS
+        }
+        return cls(chromosomes["sources"], chromosomes["targets"], arrays)
+
+    def convert(self, chromosomes: pd.Series, positions: pd.Series) -> pd.DataFrame:
+        """
+        Converts 1-based positions to the target assembly.
+
+        :param pd.Series chromosomes: source chromosome names of the positions
+        :param pd.Series positions: 1-based source positions
+        :returns: the `chromosome`, 1-based `position` and `strand` of every position in the
+            target assembly, missing for positions outside of any aligned block
+        :rtype: pd.DataFrame
+        """
+
+        if len(self.starts) == 0:
+            return pd.DataFrame({
+                "chromosome": pd.Categorical.from_codes(
+                    np.full(len(positions), -1), categories=self.targets),
+                "position": pd.array([pd.NA] * len(positions), dtype="Int64"),
+                "strand": pd.Categorical.from_codes(
+                    np.full(len(positions), -1), categories=["+", "-"]),
+            }, index=positions.index)
+
+        # Every distinct chromosome name is looked up once
+        codes, names = pd.factorize(chromosomes)
+        lookup = np.array(
+            [self.sources.get(normalize_chromosome(name), -1) for name in names] + [-1],
+            dtype=np.int64,
+        )
+        source_ids = lookup[codes]
+
+        values = pd.to_numeric(positions, errors="coerce").to_numpy(dtype=np.float64,
+                                                                    na_value=np.nan)
+        valid = (source_ids >= 0) & (values >= 1) & (values <= 1 << POSITION_BITS)
+
+        keys = np.zeros(len(values), dtype=np.int64)
+        keys[valid] = (source_ids[valid] << POSITION_BITS) | (values[valid].astype(np.int64) - 1)
+
+        block = np.searchsorted(self.starts, keys, side="right") - 1
+        mapped = valid & (block >= 0)
+        mapped[mapped] = keys[mapped] < self.ends[block[mapped]]
+        block = np.where(mapped, block, 0)
+
+        source_positions = keys & ((1 << POSITION_BITS) - 1)
+        target_positions = self.offsets[block] + self.signs[block] * source_positions + 1
+
+        return pd.DataFrame({
+            "chromosome": pd.Categorical.from_codes(
+                np.where(mapped, self.target_ids[block], -1), categories=self.targets),
+            "position": pd.arrays.IntegerArray(target_positions, ~mapped),
+            "strand": pd.Categorical.from_codes(
+                np.where(mapped, (self.signs[block] < 0).astype(np.int8), -1),
+                categories=["+", "-"]),
+        }, index=positions.index)
+
+
+def _get_chain_name(from_db: str, to_db: str) -> str:
+    """
+    Returns the UCSC name of the chain file converting between two assemblies.
+
+    :param str from_db: source assembly, e.g. `hg19`
+    :param str to_db: target assembly, e.g. `hg38`
+    :returns: the name without extension, e.g. `hg19ToHg38`
+    :rtype: str
+    """
+
+    return f"{from_db}To{to_db[:1].upper()}{to_db[1:]}"
+
+
+def download_chain_file(from_db: str = "hg19", to_db: str = "hg38",
+                        cache_dir: str = WORKSPACE_LIFTOVER_DIR,
+                        timeout: float = DOWNLOAD_TIMEOUT):
+    """
+    Downloads the chain file converting between two assemblies from UCSC, unless it is present.
+
+    This is meant for provisioning the server, requests only use the files already present.
+
+    :param str from_db: source assembly, e.g. `hg19`
+    :param str to_db: target assembly, e.g. `hg38`
+    :param str cache_dir: directory holding the chain files and their indexes
+    :param float timeout: seconds to wait for UCSC to connect or send data
+    :raises LiftOverError: if the chain file cannot be downloaded
+    """
+
+    name = _get_chain_name(from_db, to_db)
+    if any(os.path.isfile(os.path.join(cache_dir, f"{name}.over.chain{extension}"))
+           for extension in (".gz", "")):
+        return
+
+    os.makedirs(cache_dir, exist_ok=True)
+    file_path = os.path.join(cache_dir, f"{name}.over.chain.gz")
+    temp_path = f"{file_path}.{uuid_lib.uuid4().hex}.part"
+    url = CHAIN_FILE_URL.format(from_db=from_db, file_name=os.path.basename(file_path))
+    try:
+        with requests.get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            with open(temp_path, "wb") as file:
+                for block in response.iter_content(chunk_size=1024 * 1024):
+                    file.write(block)
+        os.replace(temp_path, file_path)
+    except (requests.RequestException, OSError) as e:
+        raise LiftOverError(f"Cannot download the {from_db} to {to_db} chain file: {e}") from e
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+@lru_cache(maxsize=None)
+def get_chain_index(from_db: str = "hg19", to_db: str = "hg38",
+                    cache_dir: str = WORKSPACE_LIFTOVER_DIR) -> ChainIndex:
+    """
+    Returns the index of the chain file converting between two assemblies.
+
+    The chain file is looked up in the cache directory, it is not downloaded, see
+    `download_chain_file`. Its index is built once and saved beside it, then memory-mapped by
+    every process.
+
+    :param str from_db: source assembly, e.g. `hg19`
+    :param str to_db: target assembly, e.g. `hg38`
+    :param str cache_dir: directory holding the chain files and their indexes
+    :returns: the index
+    :rtype: ChainIndex
+    :raises LiftOverError: if the chain file cannot be found or read
+    """
+
+    index_dir = os.path.join(cache_dir, f"{_get_chain_name(from_db, to_db)}.index")
+    if not os.path.isdir(index_dir):
+        try:
+            file = open_liftover_chain_file(from_db, to_db, search_dir=cache_dir,
+                                            cache_dir=cache_dir, use_web=False)
+        except (OSError, ValueError) as e:
+            raise LiftOverError(f"Cannot open the {from_db} to {to_db} chain file: {e}") from e
+        if file is None:
+            raise LiftOverError(f"No chain file converting {from_db} to {to_db} was found. Chain "
+                                "files are provisioned when the server starts.")
+        with file:
+            ChainIndex.from_chain_file(file).save(index_dir)
+
+    return ChainIndex.load(index_dir)
+
+
+def liftover_positions(chromosomes: pd.Series, positions: pd.Series, from_db: str = "hg19",
+                       to_db: str = "hg38") -> pd.DataFrame:
+    """
+    Converts 1-based genomic positions between two assemblies.
+
+    :param pd.Series chromosomes: chromosome names of the positions, with or without `chr`
+    :param pd.Series positions: 1-based positions
+    :param str from_db: source assembly
+    :param str to_db: target assembly
+    :returns: the `chromosome`, `position` and `strand` of every position in the target assembly,
+        missing where a position cannot be converted
+    :rtype: pd.DataFrame
+    """
+
+    return get_chain_index(from_db, to_db).convert(chromosomes, positions)
+
+
+def add_liftover_columns(data: pd.DataFrame, chromosome_column: str, position_column: str,
+                         from_db: str = "hg19", to_db: str = "hg38") -> pd.DataFrame:
+    """
+    Adds the chromosome and position of every row in another assembly.
+
+    The columns are named after the source columns and the target assembly, e.g. `pos_hg38`, and
+    are empty for positions which cannot be converted.
+
+    :param pd.DataFrame data: data with a chromosome and a 1-based position column
+    :param str chromosome_column: name of the chromosome column
+    :param str position_column: name of the position column
+    :param str from_db: source assembly
+    :param str to_db: target assembly
+    :returns: the data with the converted columns
+    :rtype: pd.DataFrame
+    :raises KeyError: if a column is not found
+    """
+
+    for column in (chromosome_column, position_column):
+        if column not in data.columns:
+            raise KeyError(f"Column '{column}' not found.")
+
+    converted = liftover_positions(data[chromosome_column], data[position_column], from_db, to_db)
+    data[f"{chromosome_column}_{to_db}"] = converted["chromosome"]
+    data[f"{position_column}_{to_db}"] = converted["position"]
+    return data
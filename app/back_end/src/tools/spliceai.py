@@ -47,11 +47,50 @@ import subprocess
 import tempfile
 import pandas as pd
 
+from ..data.variant_keys import (
+    MISSING_KEY,
+    pack_variant_keys,
+    variant_keys_from_ids,
+    unpack_variant_keys,
+)
+
+
+# Columns of the scores parsed from the output of SpliceAI, and of the variants they belong to
+SCORE_COLUMNS = [
+    "Delta score (acceptor gain)",
+    "Delta score (acceptor loss)",
+    "Delta score (donor gain)",
+    "Delta score (donor loss)",
+    "Delta position (acceptor gain)",
+    "Delta position (acceptor loss)",
+    "Delta position (donor gain)",
+    "Delta position (donor loss)",
+    "Max_Delta_Score",
+]
+VARIANT_COLUMNS = ["CHROM", "POS", "REF", "ALT"]
+
 
 class SpliceAIError(Exception):
     """Custom exception for SpliceAI errors."""
 
 
+def _variant_keys(data: pd.DataFrame):
+    """
+    Packs the variants of a DataFrame into keys.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing variant information, see `write_vcf`.
+
+    Returns:
+        tuple: The keys of the rows, and the reverse dictionary of their hashed alleles.
+    """
+    if 'hg38_gnomad_format' in data.columns and 'variant_id_gnomad' in data.columns:
+        variant_column = data['hg38_gnomad_format'].combine_first(data['variant_id_gnomad'])
+    else:
+        variant_column = data['variant_id']
+    return variant_keys_from_ids(variant_column)
+
+
 def write_vcf(data: pd.DataFrame) -> str:
     """
     Writes all variant information into a temporary VCF file.
@@ -77,27 +116,24 @@ def write_vcf(data: pd.DataFrame) -> str:
                 "##fileDate=20231001\n",
                 "##reference=GRCh38\n"
             ]
-            if 'hg38_gnomad_format' in data.columns and 'variant_id_gnomad' in data.columns:
-                variant_column = data['hg38_gnomad_format'].combine_first(
-                    data['variant_id_gnomad']).fillna('0-0-0-0')
-            else:
-                variant_column = data['variant_id'].fillna('0-0-0-0')
 
+            # Each variant is written once, in the order of the genome
+            keys, alleles = _variant_keys(data)
+            keys = pd.Series(keys[keys != MISSING_KEY].unique()).sort_values()
+            valid_rows = unpack_variant_keys(keys, alleles)
+            alleles_valid = valid_rows[["ref", "alt"]].apply(
+                lambda column: column.str.fullmatch("[ACGTN]+").fillna(False)).all(axis=1)
+            valid_rows = valid_rows[alleles_valid]
 
-            chromosomes = variant_column.str.split('-', n=1).str[0].unique()
+            chromosomes = valid_rows["chrom"].unique()
             lines.extend([f"##contig=<ID={chromosome}>\n" for chromosome in chromosomes])
             lines.append("#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n")
 
-            split_data = variant_column.str.split('-', expand=True)
-            split_data[1] = pd.to_numeric(split_data[1], errors='coerce').fillna(0).astype(int)
-
-            valid_rows = split_data[split_data[3].notna()]
-
             rows = (
-                valid_rows[0] + "\t" +  # CHROM
-                valid_rows[1].astype(str) + "\t.\t" +  # POS
-                valid_rows[2] + "\t" +  # REF allele
-                valid_rows[3] + "\t.\t.\t.\n"  # ALT allele, QUAL, FILTER, INFO
+                valid_rows["chrom"] + "\t" +  # CHROM
+                valid_rows["pos"].astype(str) + "\t.\t" +  # POS
+                valid_rows["ref"] + "\t" +  # REF allele
+                valid_rows["alt"] + "\t.\t.\t.\n"  # ALT allele, QUAL, FILTER, INFO
             )
             lines.extend(rows.tolist())
             vcf.write("".join(lines).encode('utf-8'))
@@ -150,7 +186,7 @@ def run_spliceai(input_vcf: str, fasta: str, distance=50, annotation="grch38") -
             raise SpliceAIError(f"Error running SpliceAI: {exc}") from exc
 
 
-def parse_spliceai_vcf(vcf_file: str):
+def parse_spliceai_vcf(vcf_file: str, locate: bool = False):
     """
     Parses the output VCF file generated by SpliceAI.
 
@@ -159,6 +195,8 @@ def parse_spliceai_vcf(vcf_file: str):
 
     Args:
         vcf_file (str): Path to the VCF file with SpliceAI predictions.
+        locate (bool): Whether to add the `CHROM`, `POS`, `REF` and `ALT` of the
+                       variant to its scores (default is False).
 
     Returns:
         list: A list of dictionaries containing extracted scores for each variant.
@@ -204,6 +242,10 @@ def parse_spliceai_vcf(vcf_file: str):
                                 "Delta position (donor loss)": int(columns[1]) + dp_dl,
                                 "Max_Delta_Score": max_delta_score
                             }
+                            if locate:
+                                scores.update(zip(("CHROM", "POS", "REF", "ALT"),
+                                                  (columns[0], int(columns[1]),
+                                                   columns[3], columns[4])))
                             spliceai_scores.append(scores)
         return spliceai_scores
     except Exception as e:
@@ -234,12 +276,18 @@ def add_spliceai_eval_columns(data: pd.DataFrame, fasta_path: str) -> pd.DataFra
     output_vcf = "spliceai_output.vcf"
     try:
         output_vcf = run_spliceai(input_vcf, fasta_path)
-        spliceai_scores = parse_spliceai_vcf(output_vcf)
+        spliceai_scores = parse_spliceai_vcf(output_vcf, locate=True)
 
-        scores_df = pd.DataFrame(spliceai_scores)
+        # Scores are matched to the rows by variant, each variant was evaluated once
+        scores_df = pd.DataFrame(spliceai_scores, columns=SCORE_COLUMNS + VARIANT_COLUMNS)
+        keys, _ = pack_variant_keys(*(scores_df[column] for column in VARIANT_COLUMNS))
+        scores_df = scores_df[SCORE_COLUMNS].set_index(keys)
+        scores_df = scores_df[~scores_df.index.duplicated()]
         scores_df.columns = [f"{col}_spliceai" for col in scores_df.columns]
+
+        data_keys, _ = _variant_keys(data_copy)
         data_copy = pd.concat([data_copy.reset_index(drop=True),
-                               scores_df.reset_index(drop=True)], axis=1)
+                               scores_df.reindex(data_keys).reset_index(drop=True)], axis=1)
     finally:
         if os.path.exists(input_vcf):
             os.remove(input_vcf)
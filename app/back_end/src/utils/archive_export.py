@@ -0,0 +1,190 @@
+"""
+This module provides utilities for exporting workspace folders as archives streamed on the fly.
+
+Archives are assembled while they are sent: every member file is read block by block and each
+compressed block is yielded as soon as it is produced. No temporary archive is written to disk and
+memory use is bounded by the block size, regardless of the number and size of the files. Files
+compressed at rest are archived with their uncompressed data.
+
+Functions:
+- list_archive_members: Lists the files of a folder with their names within the archive.
+- stream_zip: Streams a folder as a ZIP archive.
+- stream_tar_zst: Streams a folder as a zstd compressed tar archive.
+
+Formats:
+- zip: Members are deflated and written with data descriptors, ZIP64 is used for large members.
+- tar.zst: A POSIX (pax) tar archive compressed with zstd as a single stream.
+
+Dependencies:
+- zstandard: Python bindings of the zstd compression library.
+"""
+
+# pylint: disable=import-error
+
+import os
+import time
+import tarfile
+import zipfile
+import zstandard
+
+from ..setup.extensions import cold_storage_manager
+
+# Supported archive formats with their file extension and MIME type
+ARCHIVE_FORMATS = {
+    "zip": ("zip", "application/zip"),
+    "tar.zst": ("tar.zst", "application/zstd"),
+}
+
+# Size of the blocks read from the member files
+BLOCK_SIZE = 1024 * 1024
+
+
+class _StreamBuffer:
+    """
+    Write-only, unseekable file object collecting the output of an archive writer.
+
+    `zipfile` detects that the buffer cannot seek and writes data descriptors after each member,
+    so the archive can be emitted front to back.
+    """
+
+    def __init__(self):
+        self._blocks = []
+
+    def write(self, data):
+        """
+        Collect written data.
+
+        Args:
+            data (bytes): The data.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        self._blocks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        """
+        Flush the buffer, a no-op as the data is drained by `read_all`.
+
+        Returns:
+            None
+        """
+
+    def read_all(self):
+        """
+        Drain the data collected so far.
+
+        Returns:
+            bytes: The collected data.
+        """
+        data = b"".join(self._blocks)
+        self._blocks.clear()
+        return data
+
+
+def list_archive_members(folder_path):
+    """
+    List the files of a folder with their names within the archive.
+
+    Hidden files and folders (e.g. the derived artifacts cache) are left out. Members are sorted, so
+    the same folder always produces the same archive.
+
+    Args:
+        folder_path (str): The absolute path of the folder.
+
+    Returns:
+        list: Tuples of the absolute file path, the name within the archive and the file status.
+    """
+    root_name = os.path.basename(os.path.normpath(folder_path))
+
+    members = []
+    for dirpath, dirnames, filenames in os.walk(folder_path):
+        dirnames[:] = sorted(name for name in dirnames if not name.startswith("."))
+        for filename in sorted(filenames):
+            if filename.startswith("."):
+                continue
+            file_path = os.path.join(dirpath, filename)
+            arcname = os.path.join(root_name, os.path.relpath(file_path, folder_path))
+            members.append((file_path, arcname.replace(os.sep, "/"), os.stat(file_path)))
+
+    return members
+
+
+def stream_zip(folder_path):
+    """
+    Stream a folder as a ZIP archive.
+
+    Args:
+        folder_path (str): The absolute path of the folder.
+
+    Yields:
+        bytes: The blocks of the archive.
+    """
+    buffer = _StreamBuffer()
+
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        for file_path, arcname, stat in list_archive_members(folder_path):
+            info = zipfile.ZipInfo(arcname, time.localtime(stat.st_mtime)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.file_size = cold_storage_manager.get_size(file_path)
+
+            with cold_storage_manager.open(file_path, "rb") as source, archive.open(
+                info, "w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT
+            ) as member:
+                while block := source.read(BLOCK_SIZE):
+                    member.write(block)
+                    data = buffer.read_all()
+                    if data:
+                        yield data
+
+            yield buffer.read_all()
+
+    # The central directory is written on close
+    yield buffer.read_all()
+
+
+def stream_tar_zst(folder_path):
+    """
+    Stream a folder as a zstd compressed tar archive.
+
+    Tar headers are built by `tarfile` and the member data is copied block by block, so a member is
+    never held in memory as a whole.
+
+    Args:
+        folder_path (str): The absolute path of the folder.
+
+    Yields:
+        bytes: The blocks of the compressed archive.
+    """
+    compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    for file_path, arcname, stat in list_archive_members(folder_path):
+        info = tarfile.TarInfo(arcname)
+        info.size = cold_storage_manager.get_size(file_path)
+        info.mtime = int(stat.st_mtime)
+        info.mode = 0o644
+
+        data = compressor.compress(info.tobuf(tarfile.PAX_FORMAT))
+        if data:
+            yield data
+
+        # Copy exactly the announced size, a file changing meanwhile must not corrupt the archive
+        remaining = info.size
+        with cold_storage_manager.open(file_path, "rb") as source:
+            while remaining > 0:
+                block = source.read(min(BLOCK_SIZE, remaining)) or tarfile.NUL * remaining
+                remaining -= len(block)
+                data = compressor.compress(block)
+                if data:
+                    yield data
+
+        # Member data is padded to a multiple of the tar block size
+        remainder = info.size % tarfile.BLOCKSIZE
+        if remainder:
+            data = compressor.compress(tarfile.NUL * (tarfile.BLOCKSIZE - remainder))
+            if data:
+                yield data
+
+    # Two empty blocks mark the end of the archive
+    yield compressor.compress(tarfile.NUL * (2 * tarfile.BLOCKSIZE)) + compressor.flush()
@@ -0,0 +1,266 @@
+"""
+This module provides utilities for importing ZIP and tar archives of data files into the workspace.
+
+Archives are read as a stream: every member is extracted block by block to a temporary file and
+handed to a pool of worker threads, which prepare it like a regular import (decompression, format
+detection and normalization to CSV) and compute its statistics and row offset index. Extraction
+proceeds while earlier members are processed, and the number of members waiting for a worker is
+bounded, so neither memory nor temporary disk usage grow with the size of the archive.
+
+Workers only touch temporary files. Moving members into the workspace and keeping their index as
+a derived artifact happens on the calling greenlet, which owns the cache and its usage accounting.
+
+Functions:
+- is_archive: Checks whether a file name has an archive extension.
+- import_workspace_archive: Extracts an archive into a workspace folder and processes its members.
+
+Formats:
+- zip: Members are read through the central directory.
+- tar, tar.gz, tgz, tar.zst: Members are read sequentially from the (decompressed) tar stream.
+
+Dependencies:
+- gevent: Native thread pool running the member processing outside of the event loop.
+"""
+
+# pylint: disable=import-error
+
+import os
+import shutil
+import tarfile
+import zipfile
+import posixpath
+from collections import deque
+import zstandard
+from gevent.threadpool import ThreadPoolExecutor
+
+from ..setup.extensions import cache_manager, blob_store, snapshot_manager, lock_manager
+from .file_import import (
+    detect_compression,
+    open_decompressed,
+    get_imported_filename,
+    prepare_import,
+    scan_csv_file,
+    index_workspace_file,
+)
+
+# Extensions of accepted archives
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.zst")
+
+# Number of worker threads processing archive members
+ARCHIVE_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def is_archive(filename):
+    """
+    Check whether a file name has an archive extension.
+
+    Args:
+        filename (str): The name of the file.
+
+    Returns:
+        bool: True if the file is a ZIP or tar archive.
+    """
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def _iter_zip_members(source):
+    """
+    Iterate over the files of a ZIP archive.
+
+    Args:
+        source (file-like): The seekable binary stream of the archive.
+
+    Yields:
+        tuple: The name of the member and a binary stream of its data.
+    """
+    with zipfile.ZipFile(source) as archive:
+        for info in archive.infolist():
+            if not info.is_dir():
+                with archive.open(info) as member:
+                    yield info.filename, member
+
+
+def _iter_tar_members(source):
+    """
+    Iterate over the regular files of a tar archive, optionally gzip or zstd compressed.
+
+    Args:
+        source (file-like): The binary stream of the archive.
+
+    Yields:
+        tuple: The name of the member and a binary stream of its data.
+    """
+    compression = detect_compression(source.read(18))
+    source.seek(0)
+
+    with tarfile.open(fileobj=open_decompressed(source, compression), mode="r|") as archive:
+        for info in archive:
+            # Links and devices are never extracted
+            if info.isfile():
+                yield info.name, archive.extractfile(info)
+
+
+def _get_member_path(name):
+    """
+    Validate the path of an archive member and return the folder and file name it is imported to.
+
+    Args:
+        name (str): The path of the member within the archive.
+
+    Returns:
+        tuple: The relative folder and the name of the member file.
+
+    Raises:
+        ValueError: If the path leaves the target folder or is hidden, or if the file type is not
+            accepted.
+    """
+    path = posixpath.normpath(name.replace("\\", "/"))
+    parts = path.split("/")
+
+    if path.startswith("/") or any(part in ("", "..") or part.startswith(".") for part in parts):
+        raise ValueError(f"Unsafe or hidden path '{name}'")
+
+    # Validate the file type, the imported name is computed again on import
+    get_imported_filename(parts[-1])
+
+    return os.path.join(*parts[:-1]) if len(parts) > 1 else "", parts[-1]
+
+
+def _process_member(temp_path, filename, destination_path):
+    """
+    Prepare an extracted archive member for import and compute its statistics and index.
+
+    The current version of the file the member overwrites, if any, is kept as a snapshot. Runs on
+    a worker thread.
+
+    Args:
+        temp_path (str): The path of the extracted member.
+        filename (str): The name of the member file.
+        destination_path (str): The path the member is imported to.
+
+    Returns:
+        dict: The prepared member as returned by `prepare_import`, with its `stats` for CSV files
+            and the `digest` of its content, or the `error` the member failed with. Errors are
+            returned rather than raised, so that the thread pool does not report them as crashes.
+    """
+    try:
+        prepared = prepare_import(temp_path, filename)
+        if prepared["filename"].endswith(".csv"):
+            prepared["stats"] = scan_csv_file(prepared["data_path"])
+        prepared["digest"] = blob_store.hash_file(prepared["data_path"])
+        snapshot_manager.snapshot(destination_path, "import")
+    except (ValueError, OSError) as e:
+        return {"error": f"{e}"}
+    return prepared
+
+
+def import_workspace_archive(source_path, filename, folder_path, record_usage=None):
+    """
+    Extract an archive into a workspace folder and process its members in parallel.
+
+    The folder structure of the archive is kept. Members which cannot be imported (unsafe or hidden
+    paths, unsupported file types, duplicates, or files failing to import) are skipped and reported,
+    they do not abort the import of the others.
+
+    Args:
+        source_path (str): The path of the uploaded archive.
+        filename (str): The name of the uploaded archive.
+        folder_path (str): The workspace folder to extract the archive to.
+        record_usage (callable): Called with the change in bytes of every imported member, if set.
+
+    Returns:
+        dict: The `imported` members with their path relative to `folder_path`, compression,
+            format, delimiter and number of rows and columns, and the `skipped` members with the
+            reason.
+
+    Raises:
+        ValueError: If the file is not a readable archive.
+    """
+    imported = []
+    skipped = []
+    destinations = set()
+    pending = deque()
+
+    def commit(future, name, temp_path, destination_path):
+        prepared = {}
+        try:
+            prepared = future.result()
+            if "error" in prepared:
+                raise ValueError(prepared["error"])
+
+            with lock_manager.exclusive(destination_path, "write"), lock_manager.exclusive(
+                destination_path
+            ):
+                # Remove derived artifacts of a previous file at the same path
+                cache_manager.invalidate(destination_path)
+                size = os.path.getsize(destination_path) if os.path.exists(destination_path) else 0
+                os.replace(prepared["data_path"], destination_path)
+                blob_store.ingest(destination_path, prepared["digest"])
+                if record_usage:
+                    record_usage(os.path.getsize(destination_path) - size)
+                if "stats" in prepared:
+                    index_workspace_file(destination_path, prepared["stats"])
+        except (ValueError, OSError) as e:
+            skipped.append({"name": name, "reason": f"{e}"})
+            return
+        finally:
+            for path in (temp_path, prepared.get("data_path")):
+                if path and os.path.exists(path) and path != destination_path:
+                    os.remove(path)
+
+        stats = prepared.get("stats")
+        imported.append(
+            {
+                "name": name,
+                "path": os.path.relpath(destination_path, folder_path),
+                "compression": prepared["compression"],
+                "format": prepared["format"],
+                "delimiter": prepared["delimiter"],
+                "rows": stats["rows"] if stats else None,
+                "columns": stats["columns"] if stats else None,
+            }
+        )
+
+    iter_members = _iter_zip_members if filename.lower().endswith(".zip") else _iter_tar_members
+
+    with ThreadPoolExecutor(max_workers=ARCHIVE_WORKERS) as executor, open(
+        source_path, "rb"
+    ) as source:
+        try:
+            for name, stream in iter_members(source):
+                try:
+                    relative_folder, member_filename = _get_member_path(name)
+                except ValueError as e:
+                    skipped.append({"name": name, "reason": f"{e}"})
+                    continue
+
+                member_folder_path = os.path.join(folder_path, relative_folder)
+                destination_path = os.path.join(
+                    member_folder_path, get_imported_filename(member_filename)
+                )
+                if destination_path in destinations:
+                    skipped.append({"name": name, "reason": "Duplicate of another member"})
+                    continue
+                destinations.add(destination_path)
+
+                # Tar streams are read sequentially, the member is extracted before moving on
+                temp_path = cache_manager.temp_path()
+                with open(temp_path, "wb") as temp:
+                    shutil.copyfileobj(stream, temp)
+
+                os.makedirs(member_folder_path, exist_ok=True)
+                future = executor.submit(
+                    _process_member, temp_path, member_filename, destination_path
+                )
+                pending.append((future, name, temp_path, destination_path))
+
+                # Bound the number of extracted members waiting for a worker
+                while len(pending) > 2 * ARCHIVE_WORKERS:
+                    commit(*pending.popleft())
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError, zstandard.ZstdError) as e:
+            raise ValueError(f"Cannot read archive '{filename}': {e}") from e
+        finally:
+            while pending:
+                commit(*pending.popleft())
+
+    return {"imported": imported, "skipped": skipped}
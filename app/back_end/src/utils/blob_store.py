@@ -0,0 +1,293 @@
+"""
+This module provides the `BlobStore` class for deduplicating workspace files by content.
+
+Identical files are often stored many times: every user workspace starts as a copy of the
+template, and many users download or import the same LOVD and gnomAD data. The blob store keeps
+the data of such files once, as a read-only blob named by the SHA-256 of its content. The files in
+the workspaces are symbolic links to their blob.
+
+Links behave like copies on write: every writer of the workspace replaces files atomically, which
+replaces the link itself and leaves the blob untouched, and the few writers modifying a file in
+place detach it from its blob first. Since derived artifacts are keyed by the blob a link points to
+(see `CacheManager`), sorted copies, indexes and statistics are computed once for all identical
+files.
+
+Blobs which are no longer referenced by any link are removed by `cleanup`, after a grace period
+which protects blobs being linked at the same time. Blobs of rarely accessed files are compressed
+at rest by the `ColdStorageManager`, in place: they keep their name, the digest of their content,
+which is read back uncompressed through the links.
+
+Usage:
+    blob_store = BlobStore(blob_dir)
+    blob_store.ingest(file_path)  # The file becomes a link to its blob
+    shutil.copytree(template_dir, user_workspace_dir, copy_function=blob_store.copy)
+    blob_store.detach(file_path)  # Before writing the file in place
+"""
+
+import os
+import time
+import shutil
+import hashlib
+import uuid as uuid_lib
+
+# Size of the blocks read when hashing a file
+BLOCK_SIZE = 1024 * 1024
+
+
+class BlobStore:
+    """
+    Manages content-addressed blobs backing deduplicated workspace files.
+
+    Attributes:
+        blob_dir (str): The directory holding the blobs, named by the SHA-256 of their content.
+        grace_period (int): Seconds after its last use before an unreferenced blob is removed.
+
+    Methods:
+        hash_file(path): Computes the SHA-256 of a file.
+        get_blob_path(digest): Returns the path of a blob.
+        get_link_target(path): Returns the path a symbolic link points to.
+        is_link(path): Checks whether a file is a link to a blob.
+        ingest(path, digest): Moves a workspace file into the store and replaces it with a link.
+        copy(source_path, dest_path): Copies a file as a link to its blob.
+        detach(path, keep_data): Replaces a link with a private file before writing it in place.
+        cleanup(root_dir): Removes the blobs which are no longer referenced.
+    """
+
+    def __init__(self, blob_dir, grace_period=24 * 3600):
+        """
+        Initializes the BlobStore.
+
+        Args:
+            blob_dir (str): The directory holding the blobs. It must be on the same file system as
+                the workspaces, so that files are moved into the store without copying.
+            grace_period (int): Seconds after its last use before an unreferenced blob is
+                removed. Defaults to one day.
+        """
+        self.blob_dir = os.path.abspath(blob_dir)
+        self.grace_period = grace_period
+
+    @staticmethod
+    def hash_file(path):
+        """
+        Computes the SHA-256 of a file.
+
+        Args:
+            path (str): The path of the file.
+
+        Returns:
+            str: The hexadecimal digest.
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            while block := file.read(BLOCK_SIZE):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get_blob_path(self, digest):
+        """
+        Returns the path of a blob, fanned out in directories by the first digest characters.
+
+        Args:
+            digest (str): The SHA-256 of the blob content.
+
+        Returns:
+            str: The absolute path of the blob.
+        """
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    @staticmethod
+    def get_link_target(path):
+        """
+        Returns the path a symbolic link points to, without resolving the links of its parents.
+
+        Args:
+            path (str): The path of the link.
+
+        Returns:
+            str: The absolute path of the link target.
+        """
+        return os.path.abspath(os.path.join(os.path.dirname(path), os.readlink(path)))
+
+    def is_link(self, path):
+        """
+        Checks whether a file is a link to a blob.
+
+        Args:
+            path (str): The path of the file.
+
+        Returns:
+            bool: True if the file is a symbolic link into the store.
+        """
+        return os.path.islink(path) and self.get_link_target(path).startswith(
+            self.blob_dir + os.sep
+        )
+
+    def _store(self, source_path, digest, move):
+        """
+        Adds a file to the store unless a blob with the same content exists.
+
+        Using an existing blob updates its status change time, which marks it as recently used.
+
+        Args:
+            source_path (str): The path of the file.
+            digest (str): The SHA-256 of the file content.
+            move (bool): Hard link the file into the store instead of copying it.
+
+        Returns:
+            str: The path of the blob.
+        """
+        blob_path = self.get_blob_path(digest)
+        if os.path.exists(blob_path):
+            os.chmod(blob_path, 0o444)
+            return blob_path
+
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        temp_path = f"{blob_path}.{uuid_lib.uuid4().hex}.part"
+        try:
+            if move:
+                try:
+                    os.link(source_path, temp_path)
+                except OSError:
+                    shutil.copyfile(source_path, temp_path)
+            else:
+                shutil.copyfile(source_path, temp_path)
+            os.chmod(temp_path, 0o444)
+            os.replace(temp_path, blob_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return blob_path
+
+    @staticmethod
+    def _link(path, blob_path):
+        """
+        Atomically replaces a path with a link to a blob.
+
+        Args:
+            path (str): The path to replace.
+            blob_path (str): The path of the blob.
+
+        Returns:
+            None
+        """
+        temp_path = os.path.join(
+            os.path.dirname(path), f".{os.path.basename(path)}.{uuid_lib.uuid4().hex}.link"
+        )
+        os.symlink(blob_path, temp_path)
+        try:
+            os.replace(temp_path, path)
+        except OSError:
+            os.remove(temp_path)
+            raise
+
+    def ingest(self, path, digest=None):
+        """
+        Moves a workspace file into the store and replaces it with a link to its blob.
+
+        Args:
+            path (str): The path of the workspace file.
+            digest (str, optional): The SHA-256 of the file content, computed if not given.
+
+        Returns:
+            str: The SHA-256 of the file content.
+        """
+        if self.is_link(path):
+            return os.path.basename(self.get_link_target(path))
+
+        digest = digest or self.hash_file(path)
+        self._link(path, self._store(path, digest, move=True))
+        return digest
+
+    def copy(self, source_path, dest_path):
+        """
+        Copies a file as a link to its blob, adding it to the store if necessary.
+
+        The signature follows `shutil.copy`, so that it can be used as the `copy_function` of
+        `shutil.copytree`.
+
+        Args:
+            source_path (str): The path of the file to copy.
+            dest_path (str): The path of the copy.
+
+        Returns:
+            str: The path of the copy.
+        """
+        if self.is_link(source_path):
+            digest = os.path.basename(self.get_link_target(source_path))
+        else:
+            digest = self.hash_file(source_path)
+
+        blob_path = self._store(source_path, digest, move=False)
+
+        self._link(dest_path, blob_path)
+        return dest_path
+
+    def detach(self, path, keep_data=True):
+        """
+        Replaces a link to a blob with a private file, before the file is written in place.
+
+        Files which are not links are left untouched.
+
+        Args:
+            path (str): The path of the workspace file.
+            keep_data (bool): Copy the data of the blob to the private file. Writers rewriting the
+                whole file do not need it, the link is then only removed.
+
+        Returns:
+            None
+        """
+        if not self.is_link(path):
+            return
+
+        if not keep_data:
+            os.remove(path)
+            return
+
+        temp_path = os.path.join(
+            os.path.dirname(path), f".{os.path.basename(path)}.{uuid_lib.uuid4().hex}.part"
+        )
+        try:
+            shutil.copyfile(path, temp_path)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def cleanup(self, root_dir):
+        """
+        Removes the blobs which are no longer referenced by any link under a directory.
+
+        Blobs used or added within the grace period are kept, since they may be in the process of
+        being linked.
+
+        Args:
+            root_dir (str): The directory holding all the links, i.e. the root of the workspaces.
+
+        Returns:
+            list: The paths of the removed blobs.
+        """
+        referenced = set()
+        for root, directories, files in os.walk(root_dir):
+            directories[:] = [
+                name for name in directories if os.path.join(root, name) != self.blob_dir
+            ]
+            for file_name in files:
+                file_path = os.path.join(root, file_name)
+                if os.path.islink(file_path):
+                    referenced.add(self.get_link_target(file_path))
+
+        removed = []
+        threshold = time.time() - self.grace_period
+        for root, _, files in os.walk(self.blob_dir):
+            for file_name in files:
+                blob_path = os.path.join(root, file_name)
+                try:
+                    if blob_path in referenced or os.stat(blob_path).st_ctime >= threshold:
+                        continue
+                    os.remove(blob_path)
+                except FileNotFoundError:
+                    continue
+                removed.append(blob_path)
+
+        return removed
@@ -0,0 +1,483 @@
+"""
+This module provides the `CacheManager` class for managing derived workspace artifacts.
+
+Derived artifacts (sorted copies, indexes, converted exports, ...) are built from workspace files
+and can always be rebuilt. Instead of living beside the user's files, they are stored in a managed
+cache directory and keyed by:
+- the source file id (the path of the file relative to the workspace directory),
+- the source file version (its modification time and size),
+- the artifact kind (e.g. `sort:<column>:<order>`).
+
+The `CacheManager` class is responsible for:
+- Resolving, building and looking up artifacts for a source file.
+- Moving or invalidating the artifacts of a file or folder when it is renamed, moved or deleted.
+- Evicting the least recently used artifacts once a global byte budget is exceeded.
+- Removing orphaned temporary files left behind by crashed workers.
+
+Artifacts are written to a temporary file first and atomically moved into place, so readers never
+observe a partially written artifact and concurrent builders do not corrupt each other. Temporary
+files are named after their writer process, which holds an exclusive `flock` on an owner file for
+its lifetime: a temporary file is orphaned once the lock of its owner can be taken. Unlike process
+IDs, the locks are released by the kernel when a process dies and are never reused.
+
+Workspace files which are symbolic links, i.e. deduplicated files pointing to a blob of the
+`BlobStore`, are keyed by the blob instead. Their artifacts are shared by all the files with the
+same content and are not accounted to any user. Since blobs never change, renaming or removing a
+link leaves the artifacts of its blob in place.
+
+Artifacts may also be keyed by the SHA-256 of the source content, given as `digest`, whether the
+file is deduplicated or not. They are then shared in the same way, without having to move the
+source into the `BlobStore`, and only leave the cache when they are evicted.
+
+Usage:
+    cache_manager = CacheManager(workspace_dir, cache_dir, max_bytes=10 * 1024**3)
+    artifact_path = cache_manager.get(file_path, "sort:name:asc")
+    if artifact_path is None:
+        with cache_manager.build(file_path, "sort:name:asc") as temp_path:
+            ...  # write the artifact to temp_path
+"""
+
+import os
+import re
+import time
+import fcntl
+import shutil
+import hashlib
+import uuid as uuid_lib
+from contextlib import contextmanager
+
+
+class CacheManager:
+    """
+    Manages derived workspace artifacts in a cache directory with a global byte budget.
+
+    Attributes:
+        workspace_dir (str): The root directory of all user workspaces.
+        cache_dir (str): The root directory of the cache.
+        artifacts_dir (str): The directory holding the artifacts, mirroring the workspace layout.
+        temp_dir (str): The directory holding temporary files being written.
+        owners_dir (str): The directory holding the owner lock files of the writer processes.
+        max_bytes (int): The global byte budget of the artifacts.
+        temp_max_age (int): Age in seconds after which a temporary file is considered orphaned.
+        listener (callable): Optional callable receiving `(uuid, delta)` whenever artifacts of a
+            user are added or removed, used for per-user disk usage accounting.
+
+    Methods:
+        path(source_path, kind, digest): Returns the artifact path for the current source version.
+        get(source_path, kind, digest): Returns the artifact path if it exists, marking it as used.
+        build(source_path, kind, digest): Context manager yielding a temporary path to write an
+            artifact.
+        temp_path(suffix): Returns a new temporary file path within the cache.
+        move(source_path, new_path): Moves the artifacts of a renamed or moved file or folder.
+        invalidate(source_path): Removes the artifacts of a file or folder.
+        evict(): Removes the least recently used artifacts until the budget is met.
+        cleanup(): Removes orphaned temporary files and enforces the budget.
+    """
+
+    def __init__(self, workspace_dir, cache_dir, max_bytes=10 * 1024**3, temp_max_age=24 * 3600):
+        """
+        Initializes the CacheManager.
+
+        Args:
+            workspace_dir (str): The root directory of all user workspaces.
+            cache_dir (str): The root directory of the cache.
+            max_bytes (int): The global byte budget of the artifacts. Defaults to 10 GiB.
+            temp_max_age (int): Age in seconds after which a temporary file is removed even if
+                its writer process is still running. Defaults to one day.
+        """
+        self.workspace_dir = workspace_dir
+        self.cache_dir = cache_dir
+        self.artifacts_dir = os.path.join(cache_dir, "artifacts")
+        self.temp_dir = os.path.join(cache_dir, "tmp")
+        self.owners_dir = os.path.join(self.temp_dir, "owners")
+        self.max_bytes = max_bytes
+        self.temp_max_age = temp_max_age
+        self.listener = None
+
+        # Estimated size of the artifacts, refreshed on every eviction walk
+        self._usage = 0
+
+        # Process ID, owner token and locked owner file descriptor of the current process
+        self._owner = None
+
+    def _get_artifact_dir(self, source_path):
+        """
+        Constructs the directory holding the artifacts of a source file or folder.
+
+        Args:
+            source_path (str): The absolute path of the source file or folder.
+
+        Returns:
+            str: The artifact directory, mirroring the source location in the workspace.
+        """
+        if os.path.islink(source_path):
+            source_path = os.path.join(
+                os.path.dirname(source_path), os.readlink(source_path)
+            )
+        return os.path.join(
+            self.artifacts_dir, os.path.relpath(source_path, self.workspace_dir)
+        )
+
+    @staticmethod
+    def _get_kind_prefix(kind):
+        """
+        Constructs a file name safe prefix identifying an artifact kind.
+
+        Args:
+            kind (str): The artifact kind, e.g. `sort:<column>:<order>`.
+
+        Returns:
+            str: A prefix made of a readable part of the kind and its hash.
+        """
+        readable = re.sub(r"[^A-Za-z0-9_-]", "_", kind.split(":", 1)[0])[:32]
+        return f"{readable}-{hashlib.sha1(kind.encode('utf-8')).hexdigest()[:16]}"
+
+    @staticmethod
+    def get_source_version(source_path):
+        """
+        Constructs the version of a source file from its modification time and size.
+
+        Args:
+            source_path (str): The absolute path of the source file.
+
+        Returns:
+            str: The version of the source file.
+        """
+        stat = os.stat(source_path)
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+    def path(self, source_path, kind, digest=None):
+        """
+        Returns the artifact path for the current version of the source file.
+
+        Args:
+            source_path (str): The absolute path of the source file.
+            kind (str): The artifact kind.
+            digest (str, optional): The SHA-256 of the source content, to key the artifact by the
+                content instead of the file.
+
+        Returns:
+            str: The artifact path. The artifact is not guaranteed to exist.
+        """
+        if digest is not None:
+            # Content never changes, so the artifact has a single version
+            return os.path.join(
+                self.artifacts_dir,
+                ".content",
+                digest[:2],
+                digest,
+                f"{self._get_kind_prefix(kind)}.0",
+            )
+        return os.path.join(
+            self._get_artifact_dir(source_path),
+            f"{self._get_kind_prefix(kind)}.{self.get_source_version(source_path)}",
+        )
+
+    def get(self, source_path, kind, digest=None):
+        """
+        Returns the artifact path if the artifact exists and marks it as recently used.
+
+        Args:
+            source_path (str): The absolute path of the source file.
+            kind (str): The artifact kind.
+            digest (str, optional): The SHA-256 of the source content, see `path`.
+
+        Returns:
+            str or None: The artifact path if it exists for the current source version, otherwise
+                None.
+        """
+        artifact_path = self.path(source_path, kind, digest)
+        try:
+            # The modification time serves as the last access time for eviction
+            os.utime(artifact_path)
+        except FileNotFoundError:
+            return None
+        return artifact_path
+
+    def _get_owner_token(self):
+        """
+        Returns the token naming the temporary files of the current process.
+
+        On first use in a process, including a forked one, an owner file named by a new token is
+        locked exclusively and kept open for the lifetime of the process. The file is locked
+        before it is moved into `owners_dir`, so that `cleanup` never sees it unlocked.
+
+        Returns:
+            str: The owner token of the current process.
+        """
+        pid = os.getpid()
+        if self._owner is None or self._owner[0] != pid:
+            token = uuid_lib.uuid4().hex[:16]
+            os.makedirs(self.owners_dir, exist_ok=True)
+            owner_path = os.path.join(self.owners_dir, f"{token}.lock")
+            fd = os.open(f"{owner_path}.new", os.O_WRONLY | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            os.replace(f"{owner_path}.new", owner_path)
+            self._owner = (pid, token, fd)
+        return self._owner[1]
+
+    def _is_owner_alive(self, token):
+        """
+        Checks whether the process owning temporary files is still running.
+
+        Args:
+            token (str): The owner token of the temporary files.
+
+        Returns:
+            bool: True if the owner file of the token is locked, otherwise False.
+        """
+        if self._owner is not None and self._owner[1] == token:
+            return True
+
+        try:
+            fd = os.open(os.path.join(self.owners_dir, f"{token}.lock"), os.O_RDONLY)
+        except (FileNotFoundError, ValueError):
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(fd)
+        return False
+
+    def temp_path(self, suffix=""):
+        """
+        Returns a new temporary file path within the cache.
+
+        The path contains the owner token of the writer process, so that files left behind by a
+        crashed process can be identified and removed by `cleanup`. It may also be used for a
+        temporary directory.
+
+        Args:
+            suffix (str): An optional suffix for the temporary file name.
+
+        Returns:
+            str: A unique temporary file path.
+        """
+        token = self._get_owner_token()
+        os.makedirs(self.temp_dir, exist_ok=True)
+        return os.path.join(self.temp_dir, f"{uuid_lib.uuid4().hex}.{token}{suffix}.part")
+
+    @contextmanager
+    def build(self, source_path, kind, digest=None):
+        """
+        Context manager for building an artifact of the current source version.
+
+        Yields a temporary path to write the artifact to. When the block exits without an error,
+        the artifact is atomically moved into place and stale versions of the same kind are
+        removed. Otherwise, the temporary file is discarded.
+
+        Args:
+            source_path (str): The absolute path of the source file.
+            kind (str): The artifact kind.
+            digest (str, optional): The SHA-256 of the source content, see `path`.
+
+        Yields:
+            str: The temporary path to write the artifact to.
+        """
+        artifact_path = self.path(source_path, kind, digest)
+        temp_path = self.temp_path()
+
+        try:
+            yield temp_path
+
+            artifact_dir = os.path.dirname(artifact_path)
+            os.makedirs(artifact_dir, exist_ok=True)
+            os.replace(temp_path, artifact_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        # Remove stale versions of the same artifact kind
+        prefix = f"{self._get_kind_prefix(kind)}."
+        for file_name in os.listdir(artifact_dir):
+            file_path = os.path.join(artifact_dir, file_name)
+            if file_name.startswith(prefix) and file_path != artifact_path:
+                self._remove(file_path)
+
+        size = os.path.getsize(artifact_path)
+        self._usage += size
+        self._notify(artifact_path, size)
+        if self._usage > self.max_bytes:
+            self.evict()
+
+    def move(self, source_path, new_path):
+        """
+        Moves the artifacts of a renamed or moved file or folder.
+
+        Renaming preserves the modification time and size of files, so the artifacts remain valid
+        for the new location.
+
+        Args:
+            source_path (str): The previous absolute path of the file or folder.
+            new_path (str): The new absolute path of the file or folder.
+
+        Returns:
+            None
+        """
+        if os.path.islink(source_path) or os.path.islink(new_path):
+            return
+
+        artifact_dir = self._get_artifact_dir(source_path)
+        new_artifact_dir = self._get_artifact_dir(new_path)
+
+        try:
+            shutil.rmtree(new_artifact_dir, ignore_errors=True)
+            os.makedirs(os.path.dirname(new_artifact_dir), exist_ok=True)
+            os.rename(artifact_dir, new_artifact_dir)
+        except FileNotFoundError:
+            pass
+
+    def invalidate(self, source_path):
+        """
+        Removes the artifacts of a file or folder.
+
+        The artifacts of links are kept, since they belong to a blob shared with other files.
+
+        Args:
+            source_path (str): The absolute path of the file or folder.
+
+        Returns:
+            None
+        """
+        if os.path.islink(source_path):
+            return
+
+        artifact_dir = self._get_artifact_dir(source_path)
+        for root, _, files in os.walk(artifact_dir, topdown=False):
+            for file_name in files:
+                self._remove(os.path.join(root, file_name))
+        shutil.rmtree(artifact_dir, ignore_errors=True)
+
+    def evict(self):
+        """
+        Removes the least recently used artifacts until their size is within the budget.
+
+        The walk also refreshes the size estimate, which accounts for artifacts built by other
+        worker processes. Eviction stops at 90% of the budget to avoid evicting on every build.
+
+        Returns:
+            int: The number of bytes freed.
+        """
+        artifacts = []
+        for root, _, files in os.walk(self.artifacts_dir):
+            for file_name in files:
+                file_path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                artifacts.append((stat.st_mtime, stat.st_size, file_path))
+
+        self._usage = sum(size for _, size, _ in artifacts)
+        target = int(self.max_bytes * 0.9)
+        freed = 0
+
+        for _, size, file_path in sorted(artifacts):
+            if self._usage <= target:
+                break
+            self._remove(file_path)
+            freed += size
+
+        return freed
+
+    def cleanup(self):
+        """
+        Removes orphaned temporary files and enforces the byte budget.
+
+        A temporary file is orphaned when the owner file of the process that created it is no
+        longer locked or when it is older than `temp_max_age`. The owner files of processes which
+        are no longer running are removed as well. This is intended to be called at startup,
+        which makes the cache safe against workers crashing while writing.
+
+        Returns:
+            None
+        """
+        os.makedirs(self.artifacts_dir, exist_ok=True)
+        os.makedirs(self.owners_dir, exist_ok=True)
+
+        now = time.time()
+        alive = {}
+        for file_name in os.listdir(self.temp_dir):
+            file_path = os.path.join(self.temp_dir, file_name)
+            if file_path == self.owners_dir:
+                continue
+            try:
+                token = file_name.split(".")[1]
+                if token not in alive:
+                    alive[token] = self._is_owner_alive(token)
+                orphaned = not alive[token] or now - os.path.getmtime(file_path) > self.temp_max_age
+            except IndexError:
+                orphaned = True
+            except FileNotFoundError:
+                continue
+
+            if orphaned:
+                self._remove(file_path)
+
+        for file_name in os.listdir(self.owners_dir):
+            token, extension = os.path.splitext(file_name)
+            if extension == ".lock" and not self._is_owner_alive(token):
+                try:
+                    os.remove(os.path.join(self.owners_dir, file_name))
+                except FileNotFoundError:
+                    continue
+
+        self.evict()
+
+    def _remove(self, file_path):
+        """
+        Removes an artifact or temporary file, keeping the size estimate up to date.
+
+        Args:
+            file_path (str): The path of the file to remove.
+
+        Returns:
+            None
+        """
+        size = self._size(file_path)
+        try:
+            if os.path.isdir(file_path) and not os.path.islink(file_path):
+                # Temporary directories, e.g. the partitions of a merge
+                shutil.rmtree(file_path)
+            else:
+                os.remove(file_path)
+        except FileNotFoundError:
+            return
+        if file_path.startswith(self.artifacts_dir + os.sep):
+            self._usage -= size
+            self._notify(file_path, -size)
+
+    def _notify(self, artifact_path, delta):
+        """
+        Notifies the listener about a change in the size of a user's artifacts.
+
+        Args:
+            artifact_path (str): The path of the added or removed artifact.
+            delta (int): The change in bytes.
+
+        Returns:
+            None
+        """
+        if self.listener is not None:
+            uuid = os.path.relpath(artifact_path, self.artifacts_dir).split(os.sep, 1)[0]
+            # Artifacts of shared blobs are not accounted to any user
+            if not uuid.startswith("."):
+                self.listener(uuid, delta)
+
+    @staticmethod
+    def _size(file_path):
+        """
+        Returns the size of a file, or 0 if it does not exist.
+
+        Args:
+            file_path (str): The path of the file.
+
+        Returns:
+            int: The size of the file in bytes.
+        """
+        try:
+            return os.path.getsize(file_path)
+        except FileNotFoundError:
+            return 0
@@ -0,0 +1,437 @@
+"""
+This module provides the `ColdStorageManager` class for keeping rarely accessed workspace files
+compressed at rest.
+
+Workspace files which have not been accessed for a configurable period are recompressed in place
+into the seekable zstd format: the data is split into independently compressed frames, followed by
+a skippable frame holding the seek table (the compressed and decompressed size of every frame).
+Frames start at row boundaries, the ones of the row offset index of CSV files when given, so a
+page of rows is read by decompressing a single frame. The file keeps its name, and any zstd tool
+can still decompress it as a whole.
+
+Reads go through `open`, which returns the regular file for uncompressed files and a random-access
+decompressing stream for compressed ones. Offsets and sizes of the stream are the ones of the
+uncompressed data, so row offset indexes stay valid. Writes replace workspace files with
+uncompressed data, which makes them regular files again.
+
+Files deduplicated by the `BlobStore` are links to a shared blob. The blob itself is compressed,
+once all the links of eligible files pointing to it are cold, and keeps its name: links are read
+through `open` as any other file. The format of a file is checked on the descriptor it is read
+from, so a blob replaced by its compressed version while it is opened is never misread.
+
+Dependencies:
+- zstandard: Python bindings of the zstd library.
+
+Usage:
+    cold_storage_manager = ColdStorageManager(workspace_dir, max_idle=30 * 24 * 3600)
+    with cold_storage_manager.open(file_path, "r", encoding="utf-8") as file:
+        ...
+    for file_path, links in cold_storage_manager.find_cold_files():
+        cold_storage_manager.compress(file_path, temp_path)
+"""
+
+# pylint: disable=import-error
+
+import io
+import os
+import time
+import struct
+import bisect
+import zstandard
+
+# Magic number of zstd frames
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Magic numbers of the seek table, a skippable frame ending with the seekable format footer
+SEEK_TABLE_FRAME_MAGIC = 0x184D2A5E
+SEEKABLE_MAGIC = 0x8F92EAB1
+SEEK_TABLE_FOOTER_SIZE = 9
+
+# Block size for reading files to compress
+BLOCK_SIZE = 1024 * 1024
+
+
+class _SeekableZstdReader(io.RawIOBase):
+    """
+    Random-access reader over the uncompressed data of a seekable zstd file.
+
+    The frame holding the current position is decompressed on demand, the last decompressed frame
+    is kept so sequential reads decompress every frame once.
+    """
+
+    def __init__(self, file, frames):
+        """
+        Initializes the reader, which takes ownership of the file.
+
+        Args:
+            file (file-like): The seekable zstd file, opened for binary reading.
+            frames (list): The `(compressed offset, compressed size, decompressed offset,
+                decompressed size)` of every frame.
+        """
+        super().__init__()
+        self._file = file
+        self._frames = frames
+        self._starts = [frame[2] for frame in frames]
+        self._size = frames[-1][2] + frames[-1][3] if frames else 0
+        self._position = 0
+        self._frame_index = None
+        self._frame_data = b""
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(offset, 0)
+        return self._position
+
+    def readinto(self, buffer):
+        if self._position >= self._size:
+            return 0
+
+        index = bisect.bisect_right(self._starts, self._position) - 1
+        if index != self._frame_index:
+            compressed_offset, compressed_size, _, decompressed_size = self._frames[index]
+            self._file.seek(compressed_offset)
+            self._frame_data = self._decompressor.decompress(
+                self._file.read(compressed_size), max_output_size=decompressed_size
+            )
+            self._frame_index = index
+
+        start = self._position - self._starts[index]
+        data = self._frame_data[start : start + len(buffer)]
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+class ColdStorageManager:
+    """
+    Manages the compression at rest of rarely accessed workspace files.
+
+    Attributes:
+        workspace_dir (str): The root directory of all user workspaces.
+        max_idle (int): Seconds without access after which a file is compressed, 0 disables it.
+        min_size (int): Size in bytes below which files are left uncompressed.
+        level (int): The zstd compression level.
+        frame_size (int): The largest uncompressed size of a frame in bytes.
+        max_ratio (float): Compressed to uncompressed size ratio above which compressing a file is
+            not worth it.
+        extensions (tuple): Extensions of the files to compress.
+        blob_dir (str): The directory of the blobs workspace files may link to, or None.
+
+    Methods:
+        is_cold(path): Checks whether a file is compressed at rest.
+        open(path, mode, **kwargs): Opens a file for reading, compressed at rest or not.
+        get_size(path): Returns the uncompressed size of a file.
+        find_cold_files(): Finds the workspace files and blobs to compress.
+        compress(source_path, dest_path, boundaries): Writes a file in the seekable zstd format.
+    """
+
+    def __init__(
+        self,
+        workspace_dir,
+        max_idle=30 * 24 * 3600,
+        min_size=1024 * 1024,
+        level=12,
+        frame_size=4 * 1024 * 1024,
+        max_ratio=0.8,
+        extensions=(".csv", ".txt", ".vcf"),
+        blob_dir=None,
+    ):
+        """
+        Initializes the ColdStorageManager.
+
+        Args:
+            workspace_dir (str): The root directory of all user workspaces.
+            max_idle (int): Seconds without access after which a file is compressed, 0 disables
+                it. Defaults to 30 days.
+            min_size (int): Size in bytes below which files are left uncompressed. Defaults to
+                1 MiB.
+            level (int): The zstd compression level. Defaults to 12.
+            frame_size (int): The largest uncompressed size of a frame in bytes. Defaults to 4 MiB.
+            max_ratio (float): Compressed to uncompressed size ratio above which compressing a
+                file is not worth it. Defaults to 0.8.
+            extensions (tuple): Extensions of the files to compress.
+            blob_dir (str, optional): The directory of the `BlobStore`, whose blobs are
+                compressed when the workspace files linked to them are cold.
+        """
+        self.workspace_dir = workspace_dir
+        self.max_idle = max_idle
+        self.min_size = min_size
+        self.level = level
+        self.frame_size = frame_size
+        self.max_ratio = max_ratio
+        self.extensions = extensions
+        self.blob_dir = os.path.abspath(blob_dir) if blob_dir else None
+
+    @staticmethod
+    def _is_cold_file(file):
+        """
+        Checks whether an open file is in the seekable zstd format.
+
+        Args:
+            file (file-like): The file, opened for binary reading.
+
+        Returns:
+            bool: True if the file starts with a zstd frame and ends with a seek table.
+        """
+        try:
+            file.seek(0)
+            if file.read(len(ZSTD_MAGIC)) != ZSTD_MAGIC:
+                return False
+            file.seek(-4, os.SEEK_END)
+            return struct.unpack("<I", file.read(4))[0] == SEEKABLE_MAGIC
+        except OSError:
+            return False
+        finally:
+            file.seek(0)
+
+    def is_cold(self, path):
+        """
+        Checks whether a file is compressed at rest, i.e. a zstd file ending with a seek table.
+
+        Args:
+            path (str): The path of the file.
+
+        Returns:
+            bool: True if the file is in the seekable zstd format.
+        """
+        try:
+            with open(path, "rb") as file:
+                return self._is_cold_file(file)
+        except OSError:
+            return False
+
+    @staticmethod
+    def _read_seek_table(file):
+        """
+        Reads the seek table of a seekable zstd file.
+
+        Args:
+            file (file-like): The file, opened for binary reading.
+
+        Returns:
+            list: The `(compressed offset, compressed size, decompressed offset, decompressed
+                size)` of every frame.
+
+        Raises:
+            ValueError: If the seek table is malformed.
+        """
+        file.seek(-SEEK_TABLE_FOOTER_SIZE, os.SEEK_END)
+        count, descriptor, _ = struct.unpack("<IBI", file.read(SEEK_TABLE_FOOTER_SIZE))
+
+        # Entries hold a checksum when the highest bit of the descriptor is set
+        entry_size = 12 if descriptor & 0x80 else 8
+        file.seek(-(SEEK_TABLE_FOOTER_SIZE + count * entry_size), os.SEEK_END)
+        table = file.read(count * entry_size)
+        file.seek(0)
+
+        if len(table) != count * entry_size:
+            raise ValueError(f"Malformed seek table in '{file.name}'")
+
+        frames = []
+        compressed_offset = decompressed_offset = 0
+        for index in range(count):
+            compressed_size, decompressed_size = struct.unpack_from(
+                "<II", table, index * entry_size
+            )
+            frames.append(
+                (compressed_offset, compressed_size, decompressed_offset, decompressed_size)
+            )
+            compressed_offset += compressed_size
+            decompressed_offset += decompressed_size
+
+        return frames
+
+    def open(self, path, mode="r", **kwargs):
+        """
+        Opens a file for reading, whether it is compressed at rest or not.
+
+        Args:
+            path (str): The path of the file.
+            mode (str): `r` for text or `rb` for binary reading.
+            **kwargs: The `encoding`, `errors` and `newline` of text streams, as for `open`.
+
+        Returns:
+            file-like: The regular file, or a seekable stream over the uncompressed data.
+        """
+        # pylint: disable=consider-using-with
+        file = open(path, "rb")
+        try:
+            if self._is_cold_file(file):
+                stream = io.BufferedReader(_SeekableZstdReader(file, self._read_seek_table(file)))
+            else:
+                stream = file
+        except BaseException:
+            file.close()
+            raise
+
+        if "b" in mode:
+            return stream
+        return io.TextIOWrapper(
+            stream,
+            encoding=kwargs.get("encoding") or "utf-8",
+            errors=kwargs.get("errors"),
+            newline=kwargs.get("newline"),
+        )
+
+    def get_size(self, path):
+        """
+        Returns the uncompressed size of a file.
+
+        Args:
+            path (str): The path of the file.
+
+        Returns:
+            int: The size of the uncompressed data in bytes.
+        """
+        with open(path, "rb") as file:
+            if not self._is_cold_file(file):
+                return os.fstat(file.fileno()).st_size
+            return sum(frame[3] for frame in self._read_seek_table(file))
+
+    def _is_idle(self, path, threshold):
+        """
+        Checks whether a file is large enough, not accessed since a time and not compressed yet.
+
+        Args:
+            path (str): The path of the file, or of a link to it.
+            threshold (float): The time of the latest access of an idle file.
+
+        Returns:
+            bool: True if the file is to be compressed.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+
+        return (
+            stat.st_size >= self.min_size
+            and max(stat.st_atime, stat.st_mtime) < threshold
+            and not self.is_cold(path)
+        )
+
+    def find_cold_files(self):
+        """
+        Finds the workspace files and blobs which have not been accessed for `max_idle` seconds.
+
+        The last access is the latest of the access and modification times. Hidden files and
+        directories are skipped, as well as small and already compressed files. Links to a blob
+        are compressed as their blob, whose times are shared by all its links: it is compressed
+        once none of them was accessed for `max_idle` seconds. Other links are skipped.
+
+        Yields:
+            tuple: The path of every file or blob to compress, and the workspace links pointing to
+                it, empty for workspace files.
+        """
+        if not self.max_idle:
+            return
+
+        threshold = time.time() - self.max_idle
+        blobs = {}
+        for root, directories, files in os.walk(self.workspace_dir):
+            directories[:] = [name for name in directories if not name.startswith(".")]
+            for file_name in files:
+                if file_name.startswith(".") or not file_name.lower().endswith(self.extensions):
+                    continue
+
+                file_path = os.path.join(root, file_name)
+                if not os.path.islink(file_path):
+                    if self._is_idle(file_path, threshold):
+                        yield file_path, []
+                    continue
+
+                target = os.path.abspath(os.path.join(root, os.readlink(file_path)))
+                if self.blob_dir and target.startswith(self.blob_dir + os.sep):
+                    blobs.setdefault(target, []).append(file_path)
+
+        for blob_path, links in blobs.items():
+            if self._is_idle(blob_path, threshold):
+                yield blob_path, links
+
+    def _iter_frames(self, source, boundaries):
+        """
+        Splits a file into the uncompressed data of its frames.
+
+        Frames end at the given boundaries. Frames larger than `frame_size` are split further at
+        the last line break within the limit.
+
+        Args:
+            source (file-like): The binary stream of the file.
+            boundaries (list): Sorted offsets at which frames must start.
+
+        Yields:
+            bytes: The data of every frame.
+        """
+        boundaries = iter(sorted({offset for offset in boundaries if offset > 0}))
+        boundary = next(boundaries, None)
+        offset = 0
+        pending = b""
+
+        while True:
+            limit = self.frame_size - len(pending)
+            if boundary is not None:
+                limit = min(limit, boundary - offset)
+            block = source.read(min(limit, BLOCK_SIZE))
+            pending += block
+            offset += len(block)
+
+            if boundary is not None and offset == boundary:
+                yield pending
+                pending = b""
+                boundary = next(boundaries, None)
+            elif len(pending) >= self.frame_size or not block:
+                if not block:
+                    if pending:
+                        yield pending
+                    return
+                cut = pending.rfind(b"\n") + 1 or len(pending)
+                yield pending[:cut]
+                pending = pending[cut:]
+
+    def compress(self, source_path, dest_path, boundaries=None):
+        """
+        Writes a file in the seekable zstd format.
+
+        Args:
+            source_path (str): The path of the uncompressed file.
+            dest_path (str): The path to write the compressed file to.
+            boundaries (list, optional): Offsets at which frames must start, e.g. the row offsets
+                of a CSV file.
+
+        Returns:
+            int: The size of the compressed file in bytes.
+        """
+        compressor = zstandard.ZstdCompressor(level=self.level, write_content_size=True)
+        entries = []
+
+        with open(source_path, "rb") as source, open(dest_path, "wb") as dest:
+            for data in self._iter_frames(source, boundaries or []):
+                frame = compressor.compress(data)
+                dest.write(frame)
+                entries.append((len(frame), len(data)))
+
+            table = b"".join(struct.pack("<II", *entry) for entry in entries)
+            dest.write(
+                struct.pack("<II", SEEK_TABLE_FRAME_MAGIC, len(table) + SEEK_TABLE_FOOTER_SIZE)
+            )
+            dest.write(table)
+            dest.write(struct.pack("<IBI", len(entries), 0, SEEKABLE_MAGIC))
+
+            return dest.tell()
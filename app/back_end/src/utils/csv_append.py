@@ -0,0 +1,232 @@
+"""
+This module provides appending rows to workspace CSV files without rewriting them.
+
+Routes which keep the existing content of their destination used to read the whole file, concatenate
+the new rows and write everything back, so that appending a few rows to a large file cost reading
+and writing the whole file. The new rows are instead aligned to the header of the file and appended
+at its end, the existing rows are neither parsed nor written again.
+
+The file is only rewritten when it has to change before its end:
+- The new rows have columns the file lacks: the header is extended and the existing rows are padded
+    with empty values, as with `pd.concat`. Their values are copied as they are.
+- The file is compressed at rest: it is decompressed while the rows are appended.
+
+Files linked to a blob are detached first, so that the rows are not appended to the data shared with
+other files. The previous version of the file is snapshotted before it changes, so that appends can
+be undone like other edits. Before an append in place, the previous version is the beginning of the
+file, the snapshot only records its size and the file is not read.
+
+The rows are written to a temporary file first, readers are only kept out while its content is
+copied at the end of the file.
+
+Functions:
+- read_csv_header: Returns the columns of a CSV file.
+- append_csv_batches: Appends batches of rows to a CSV file, creating it if needed.
+
+Dependencies:
+- csv: Reads the header and copies the existing rows when the header is extended.
+- src.utils.helpers: `snapshot_workspace_file` keeps the version of a file before it is rewritten.
+- src.setup.extensions: `lock_manager` keeps readers out while the file changes, `cache_manager`
+    provides the temporary files and drops the artifacts of the previous version,
+    `cold_storage_manager` reads files compressed at rest, `blob_store` detaches linked files and
+    `snapshot_manager` keeps the version of a file before rows are appended in place.
+"""
+
+# pylint: disable=import-error
+
+import os
+import csv
+import shutil
+from itertools import chain
+
+from ..setup.extensions import (
+    logger,
+    cache_manager,
+    cold_storage_manager,
+    blob_store,
+    lock_manager,
+    snapshot_manager,
+)
+from .helpers import snapshot_workspace_file
+
+# Number of characters copied at a time when the rows of a file are copied as they are
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def read_csv_header(file_path):
+    """
+    Return the columns of a CSV file.
+
+    Args:
+        file_path (str): The path of the CSV file, compressed at rest or not.
+
+    Returns:
+        list: The column names, empty if the file is empty or does not exist.
+    """
+    try:
+        with cold_storage_manager.open(file_path, "r", encoding="utf-8", newline="") as file:
+            return next(csv.reader(file), [])
+    except FileNotFoundError:
+        return []
+
+
+def _ends_with_newline(file_path):
+    """
+    Check whether a file is empty or ends with a line break.
+
+    Args:
+        file_path (str): The path of the file.
+
+    Returns:
+        bool: True if rows can be appended to the file as they are.
+    """
+    with open(file_path, "rb") as file:
+        if not file.seek(0, os.SEEK_END):
+            return True
+        file.seek(-1, os.SEEK_END)
+        return file.read(1) == b"\n"
+
+
+def _write_batches(file, batches, columns, header):
+    """
+    Write batches of rows as CSV, aligned to the given columns.
+
+    Args:
+        file (file-like): The text stream to write to.
+        batches (iterable): The batches of rows, as DataFrames.
+        columns (list): The columns of the written rows, missing ones are left empty.
+        header (bool): Whether to write the column names first.
+
+    Returns:
+        int: The number of rows written.
+    """
+    rows = 0
+    for batch in batches:
+        batch.reindex(columns=columns).to_csv(file, header=header, index=False)
+        header = False
+        rows += len(batch)
+    return rows
+
+
+def _append_in_place(file_path, temp_path):
+    """
+    Append the content of a file at the end of a CSV file, removing it again if copying fails.
+
+    Args:
+        file_path (str): The path of the uncompressed CSV file.
+        temp_path (str): The path of the file holding the rows to append.
+
+    Returns:
+        None
+    """
+    size = os.path.getsize(file_path)
+    try:
+        with open(file_path, "ab") as file, open(temp_path, "rb") as rows:
+            if not _ends_with_newline(file_path):
+                file.write(b"\n")
+            shutil.copyfileobj(rows, file, COPY_CHUNK_SIZE)
+    except BaseException:
+        os.truncate(file_path, size)
+        raise
+
+
+def _rewrite(file_path, batches, header, columns, temp_path):
+    """
+    Write the existing rows of a CSV file followed by batches of rows to a temporary file.
+
+    Args:
+        file_path (str): The path of the CSV file, compressed at rest or not.
+        batches (iterable): The batches of rows, as DataFrames.
+        header (list): The current header of the file, not empty.
+        columns (list): The header of the rewritten file, starting with `header`.
+        temp_path (str): The path of the temporary file.
+
+    Returns:
+        int: The number of rows appended.
+    """
+    with cold_storage_manager.open(
+        file_path, "r", encoding="utf-8", newline=""
+    ) as source, open(temp_path, "w", encoding="utf-8", newline="") as file:
+        if columns == header:
+            last = ""
+            for text in iter(lambda: source.read(COPY_CHUNK_SIZE), ""):
+                file.write(text)
+                last = text[-1]
+            if last != "\n":
+                file.write("\n")
+        else:
+            padding = [""] * (len(columns) - len(header))
+            reader = csv.reader(source)
+            writer = csv.writer(file, lineterminator="\n")
+            writer.writerow(columns)
+            next(reader, None)
+            writer.writerows(row + padding for row in reader if row)
+
+        return _write_batches(file, batches, columns, header=False)
+
+
+def append_csv_batches(file_path, batches, reason="append"):
+    """
+    Append batches of rows to a CSV file, creating it if needed.
+
+    The rows are aligned to the header of the file: columns the file has but the rows lack are
+    left empty, and columns the rows have but the file lacks are added after the existing ones,
+    rewriting the file. Otherwise the rows are written to a temporary file, then copied at the end
+    of the file, which is neither read nor rewritten, and readers are kept out only meanwhile. The
+    artifacts of the file are invalidated.
+
+    The caller is expected to hold the `write` lock of the file.
+
+    Args:
+        file_path (str): The path of the CSV file.
+        batches (iterable): The batches of rows to append, as DataFrames with the same columns.
+        reason (str): The operation appending the rows, shown with the snapshot of the file.
+
+    Returns:
+        int: The number of rows appended.
+    """
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is None:
+        return 0
+    batches = chain([first], batches)
+
+    header = read_csv_header(file_path)
+    columns = header + [str(column) for column in first.columns if str(column) not in header]
+
+    temp_path = cache_manager.temp_path()
+    try:
+        if header and columns == header and not cold_storage_manager.is_cold(file_path):
+            with open(temp_path, "w", encoding="utf-8", newline="") as file:
+                rows = _write_batches(file, batches, columns, header=False)
+
+            snapshot_manager.snapshot_before_append(file_path, reason)
+            blob_store.detach(file_path)
+            with lock_manager.exclusive(file_path):
+                _append_in_place(file_path, temp_path)
+                cache_manager.invalidate(file_path)
+
+            logger.info("Appended %d rows to '%s'", rows, file_path)
+            return rows
+
+        if header:
+            snapshot_workspace_file(file_path, reason)
+            rows = _rewrite(file_path, batches, header, columns, temp_path)
+        else:
+            with open(temp_path, "w", encoding="utf-8", newline="") as file:
+                rows = _write_batches(file, batches, columns, header=True)
+
+        with lock_manager.exclusive(file_path):
+            os.replace(temp_path, file_path)
+            cache_manager.invalidate(file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    logger.info(
+        "Appended %d rows to '%s', rewritten with %d new columns",
+        rows,
+        file_path,
+        len(columns) - len(header),
+    )
+    return rows
@@ -4,9 +4,14 @@ This module defines custom exception classes for the application.
 It provides:
 - `UnexpectedError`: A custom exception class used to signal unexpected errors
   that occur during the execution of the application.
+- `QuotaExceededError`: A custom exception class used to signal that a write would
+  exceed the user's workspace disk quota.
+- `LockTimeoutError`: A custom exception class used to signal that a workspace file
+  stayed locked by another operation for longer than the request could wait.
 
 Dependencies:
 - Exception: The base class for all built-in exceptions in Python.
+- TimeoutError: The built-in exception raised when an operation times out.
 """
 
 
@@ -39,3 +44,59 @@ class UnexpectedError(Exception):
         """
         self.message = message
         super().__init__(self.message)
+
+
+class QuotaExceededError(Exception):
+    """
+    Exception raised when a write would exceed the user's workspace disk quota.
+
+    Args:
+        message (str): A descriptive message about the exceeded quota.
+
+    Attributes:
+        message (str): The error message provided during the exception initialization.
+
+    Inherits:
+        Exception: The base class for all built-in exceptions in Python.
+    """
+
+    def __init__(self, message):
+        """
+        Initialize an instance of the `QuotaExceededError` exception.
+
+        Args:
+            message (str): A descriptive message about the exceeded quota. This message
+                           is stored in the `message` attribute and is passed
+                           to the base `Exception` class.
+        """
+        self.message = message
+        super().__init__(self.message)
+
+
+class LockTimeoutError(TimeoutError):
+    """
+    Exception raised when a workspace file stays locked by another operation for too long.
+
+    Routes report it as a conflict the user can retry, rather than as an internal error.
+
+    Args:
+        message (str): A descriptive message about the locked file.
+
+    Attributes:
+        message (str): The error message provided during the exception initialization.
+
+    Inherits:
+        TimeoutError: The built-in exception raised when an operation times out.
+    """
+
+    def __init__(self, message):
+        """
+        Initialize an instance of the `LockTimeoutError` exception.
+
+        Args:
+            message (str): A descriptive message about the locked file. This message
+                           is stored in the `message` attribute and is passed
+                           to the base `TimeoutError` class.
+        """
+        self.message = message
+        super().__init__(self.message)
@@ -0,0 +1,284 @@
+"""
+This module provides utilities for converting workspace CSV files to other formats on export.
+
+Conversions read the source in chunks and write the target in chunks, so the whole table is never
+held in memory.
+
+Functions:
+- convert_csv: Converts a CSV file to TSV, Parquet, VCF or XLSX.
+
+Formats:
+- tsv: Tab separated values, converted row by row.
+- parquet: Apache Parquet, converted block by block through Arrow record batches. Column types are
+    inferred from the first block; if a later block does not fit them, all columns are exported
+    as strings.
+- vcf: Variant Call Format. Variants are located either by CHROM/POS/REF/ALT columns or by a
+    gnomAD style variant ID column (`<chrom>-<pos>-<ref>-<alt>`). The remaining columns are
+    written to the INFO field. Rows without a variant are skipped.
+- xlsx: Excel workbook, written in openpyxl's write-only mode.
+
+Dependencies:
+- pyarrow: Arrow CSV reader and Parquet writer.
+- openpyxl: Excel workbook writer.
+"""
+
+# pylint: disable=import-error
+
+import re
+import csv
+import logging
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+from ..setup.extensions import cold_storage_manager
+from .helpers import is_number
+
+# Supported export formats with their file extension and MIME type
+EXPORT_FORMATS = {
+    "tsv": ("tsv", "text/tab-separated-values"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "vcf": ("vcf", "text/x-vcf"),
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+# Formats which are compressed internally and are not compressed again on export
+COMPRESSED_FORMATS = ("parquet", "xlsx")
+
+# Size of the blocks read by the Arrow CSV reader
+BLOCK_SIZE = 16 * 1024 * 1024
+
+# Column names locating a variant, matched case-insensitively
+VCF_COLUMNS = {
+    "CHROM": ("chrom", "#chrom", "chromosome", "chr"),
+    "POS": ("pos", "position", "start"),
+    "REF": ("ref", "reference"),
+    "ALT": ("alt", "alternate"),
+}
+VARIANT_ID_COLUMNS = ("variant_id", "hg38_gnomad_format", "variant_id_gnomad")
+VARIANT_ID_PATTERN = re.compile(r"^(?:chr)?([0-9XYMT]+)-(\d+)-([ACGTN]+)-([ACGTN]+)$", re.I)
+
+# Largest number of rows in an Excel worksheet, including the header
+XLSX_MAX_ROWS = 1048576
+
+
+def _convert_to_tsv(source_path, destination_path):
+    """
+    Convert a CSV file to TSV row by row.
+
+    Args:
+        source_path (str): The path of the CSV file.
+        destination_path (str): The path to write the TSV file to.
+
+    Returns:
+        None
+    """
+    with cold_storage_manager.open(
+        source_path, "r", encoding="utf-8", newline=""
+    ) as source, open(
+        destination_path, "w", encoding="utf-8", newline=""
+    ) as destination:
+        writer = csv.writer(destination, delimiter="\t", lineterminator="\n")
+        writer.writerows(csv.reader(source))
+
+
+def _convert_to_parquet(source_path, destination_path, column_types=None):
+    """
+    Convert a CSV file to Parquet block by block.
+
+    Args:
+        source_path (str): The path of the CSV file.
+        destination_path (str): The path to write the Parquet file to.
+        column_types (dict, optional): Arrow types of the columns. Inferred from the first block
+            if not given.
+
+    Returns:
+        None
+
+    Raises:
+        pyarrow.ArrowInvalid: If a block does not fit the column types.
+    """
+    with cold_storage_manager.open(source_path, "rb") as source:
+        reader = pa_csv.open_csv(
+            source,
+            read_options=pa_csv.ReadOptions(block_size=BLOCK_SIZE),
+            convert_options=pa_csv.ConvertOptions(column_types=column_types),
+        )
+
+        with pq.ParquetWriter(destination_path, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+
+
+def _get_vcf_locator(header):
+    """
+    Find the columns locating a variant in a CSV header.
+
+    Args:
+        header (list): The column names.
+
+    Returns:
+        tuple: A function returning `(chrom, pos, ref, alt)` for a row or None, and the indexes of
+            the columns used to locate the variant.
+
+    Raises:
+        ValueError: If the header has no columns locating a variant.
+    """
+    lower = [column.strip().lower() for column in header]
+
+    indexes = []
+    for aliases in VCF_COLUMNS.values():
+        index = next((lower.index(alias) for alias in aliases if alias in lower), None)
+        indexes.append(index)
+
+    if None not in indexes:
+        return (lambda row: tuple(row[index] for index in indexes)), indexes
+
+    for column in VARIANT_ID_COLUMNS:
+        if column in lower:
+            index = lower.index(column)
+
+            def locate(row, index=index):
+                match = VARIANT_ID_PATTERN.match(row[index])
+                return match.groups() if match else None
+
+            return locate, [index]
+
+    raise ValueError(
+        "Cannot export as VCF, no CHROM, POS, REF and ALT columns or variant ID column "
+        + f"({', '.join(VARIANT_ID_COLUMNS)}) found"
+    )
+
+
+def _escape_info_value(value):
+    """
+    Escape a value for the INFO field of a VCF record.
+
+    Args:
+        value (str): The value.
+
+    Returns:
+        str: The value with characters reserved by VCF percent-encoded.
+    """
+    for character, encoded in (("%", "%25"), (";", "%3B"), ("=", "%3D"), (",", "%2C")):
+        value = value.replace(character, encoded)
+    return re.sub(r"\s", "_", value)
+
+
+def _convert_to_vcf(source_path, destination_path):
+    """
+    Convert a CSV file to VCF row by row.
+
+    Args:
+        source_path (str): The path of the CSV file.
+        destination_path (str): The path to write the VCF file to.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the file has no columns locating a variant.
+    """
+    with cold_storage_manager.open(
+        source_path, "r", encoding="utf-8", newline=""
+    ) as source, open(
+        destination_path, "w", encoding="utf-8"
+    ) as destination:
+        reader = csv.reader(source)
+        header = next(reader, [])
+        locate, located_indexes = _get_vcf_locator(header)
+
+        info = [
+            (index, re.sub(r"[^A-Za-z0-9_.]", "_", column))
+            for index, column in enumerate(header)
+            if index not in located_indexes
+        ]
+
+        destination.write("##fileformat=VCFv4.2\n")
+        for _, key in info:
+            destination.write(
+                f'##INFO=<ID={key},Number=.,Type=String,Description="{key} column">\n'
+            )
+        destination.write("#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n")
+
+        skipped = 0
+        for row in reader:
+            variant = locate(row) if len(row) == len(header) else None
+            if not variant or not all(variant):
+                skipped += 1
+                continue
+
+            fields = ";".join(
+                f"{key}={_escape_info_value(row[index])}" for index, key in info if row[index]
+            )
+            destination.write("\t".join([*variant[:2], ".", *variant[2:], ".", ".", fields or "."]))
+            destination.write("\n")
+
+        if skipped:
+            logging.warning("Skipped %s rows without a variant while exporting VCF", skipped)
+
+
+def _convert_to_xlsx(source_path, destination_path):
+    """
+    Convert a CSV file to XLSX row by row in write-only mode.
+
+    Args:
+        source_path (str): The path of the CSV file.
+        destination_path (str): The path to write the XLSX file to.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the file has more rows than an Excel worksheet can hold.
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+
+    with cold_storage_manager.open(source_path, "r", encoding="utf-8", newline="") as source:
+        for index, row in enumerate(csv.reader(source)):
+            if index >= XLSX_MAX_ROWS:
+                raise ValueError(f"Cannot export as XLSX, more than {XLSX_MAX_ROWS} rows")
+            worksheet.append(
+                [float(value) if index and is_number(value) else value for value in row]
+            )
+
+    workbook.save(destination_path)
+
+
+def convert_csv(source_path, destination_path, file_format):
+    """
+    Convert a CSV file to another format in a streaming fashion.
+
+    Args:
+        source_path (str): The path of the CSV file.
+        destination_path (str): The path to write the converted file to.
+        file_format (str): The target format, one of `EXPORT_FORMATS`.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the format is not supported or the file cannot be converted to it.
+    """
+    if file_format == "tsv":
+        _convert_to_tsv(source_path, destination_path)
+    elif file_format == "parquet":
+        try:
+            _convert_to_parquet(source_path, destination_path)
+        except pa.ArrowInvalid:
+            # A later block did not fit the types inferred from the first one
+            with cold_storage_manager.open(
+                source_path, "r", encoding="utf-8", newline=""
+            ) as source:
+                header = next(csv.reader(source), [])
+            _convert_to_parquet(
+                source_path, destination_path, {column: pa.string() for column in header}
+            )
+    elif file_format == "vcf":
+        _convert_to_vcf(source_path, destination_path)
+    elif file_format == "xlsx":
+        _convert_to_xlsx(source_path, destination_path)
+    else:
+        raise ValueError(f"Unsupported export format '{file_format}'")
@@ -0,0 +1,373 @@
+"""
+This module provides utilities for importing plain and compressed files into the workspace.
+
+Source data often arrives compressed (`.csv.gz`, `.tsv.bgz`, `.vcf.gz`, `.txt.zst`, ...). Imported
+files are decompressed as a stream while they are written to the workspace, so neither the
+compressed nor the decompressed file is ever held in memory.
+
+Functions:
+- get_imported_filename: Validates the name of an imported file and returns the name it is
+    stored under in the workspace.
+- detect_compression: Detects gzip, bgzip and zstd compressed data from its first bytes.
+- open_decompressed: Opens a decompressing stream over a compressed binary stream.
+- sniff_format: Detects the format and delimiter of a text sample.
+- prepare_import: Decompresses an uploaded file and normalizes delimited data to CSV, without
+    touching the workspace.
+- import_workspace_file: Writes an uploaded file to the workspace, decompressing it and
+    normalizing delimited data to CSV.
+- scan_csv_file: Computes the statistics and sparse row offset index of a CSV file.
+- index_workspace_file: Keeps the statistics and row offset index of a workspace CSV file as a
+    derived artifact.
+- get_workspace_file_stats: Returns the statistics and row offset index of a workspace CSV file, if
+    kept.
+
+Dependencies:
+- zstandard: Python bindings of the zstd compression library.
+"""
+
+# pylint: disable=import-error
+
+import io
+import os
+import csv
+import json
+import gzip
+import shutil
+import zstandard
+
+from ..setup.extensions import cache_manager, blob_store, lock_manager
+
+# Extensions accepted for import, optionally followed by a compression extension
+IMPORT_EXTENSIONS = ("csv", "txt", "tsv", "vcf")
+COMPRESSION_EXTENSIONS = {"gz": "gzip", "bgz": "bgzip", "zst": "zstd"}
+
+# Extensions the workspace stores imported formats under
+STORED_EXTENSIONS = {"csv": "csv", "txt": "txt", "tsv": "csv", "vcf": "vcf"}
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Size of the text sample used to detect the format and delimiter
+SAMPLE_SIZE = 64 * 1024
+
+# Number of rows between two entries of the row offset index
+ROW_INDEX_INTERVAL = 10000
+
+
+def get_imported_filename(filename):
+    """
+    Validate the name of an imported file and return the name it is stored under.
+
+    Compression extensions are removed and tab separated files are stored as CSV, e.g.
+    `variants.tsv.bgz` is stored as `variants.csv`.
+
+    Args:
+        filename (str): The name of the imported file.
+
+    Returns:
+        str: The name of the file in the workspace.
+
+    Raises:
+        ValueError: If the file type is not accepted.
+    """
+    parts = filename.split(".")
+    if len(parts) > 2 and parts[-1].lower() in COMPRESSION_EXTENSIONS:
+        parts.pop()
+
+    extension = parts[-1].lower() if len(parts) > 1 else None
+    if extension not in IMPORT_EXTENSIONS or not parts[0] or "/" in filename:
+        raise ValueError(
+            f"Incorrect file type for '{filename}'. Accepted file types: "
+            + ", ".join(f"'{extension}'" for extension in IMPORT_EXTENSIONS)
+            + ", optionally compressed with "
+            + ", ".join(f"'{extension}'" for extension in COMPRESSION_EXTENSIONS)
+            + "."
+        )
+
+    return ".".join(parts[:-1] + [STORED_EXTENSIONS[extension]])
+
+
+def detect_compression(head):
+    """
+    Detect the compression of data from its first bytes.
+
+    Args:
+        head (bytes): At least the first 14 bytes of the data.
+
+    Returns:
+        str or None: `bgzip`, `gzip` or `zstd`, or None if the data is not compressed.
+    """
+    if head.startswith(GZIP_MAGIC):
+        # BGZF is gzip with an extra field holding the "BC" subfield
+        return "bgzip" if len(head) >= 14 and head[3] & 4 and head[12:14] == b"BC" else "gzip"
+    if head.startswith(ZSTD_MAGIC):
+        return "zstd"
+    return None
+
+
+def open_decompressed(stream, compression):
+    """
+    Open a decompressing stream over a compressed binary stream.
+
+    BGZF files are concatenated gzip members and zstd files may hold several frames, both are read
+    through to the end.
+
+    Args:
+        stream (file-like): The compressed binary stream.
+        compression (str or None): The compression as returned by `detect_compression`.
+
+    Returns:
+        file-like: A binary stream of the decompressed data.
+    """
+    if compression in ("gzip", "bgzip"):
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if compression == "zstd":
+        return zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+    return stream
+
+
+def sniff_format(sample):
+    """
+    Detect the format and delimiter of a text sample.
+
+    Args:
+        sample (str): The first lines of the file.
+
+    Returns:
+        tuple: The format (`vcf`, `csv`, `tsv`, `delimited` or `text`) and the delimiter, which is
+            None for unstructured text.
+    """
+    if sample.startswith("##fileformat=VCF"):
+        return "vcf", "\t"
+
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=",\t;|").delimiter
+    except csv.Error:
+        return "text", None
+
+    return {",": "csv", "\t": "tsv"}.get(delimiter, "delimited"), delimiter
+
+
+def _write_decompressed(path, text, sample, delimiter=None):
+    """
+    Write the decompressed text of an imported file, rewriting delimited data as CSV.
+
+    Args:
+        path (str): The path to write to.
+        text (file-like): The decompressed text stream, positioned after the sample.
+        sample (str): The sample already read from the text stream.
+        delimiter (str, optional): The delimiter to rewrite with commas, or None to copy the text
+            as is.
+
+    Returns:
+        None
+    """
+    with open(path, "w", encoding="utf-8", errors="surrogateescape", newline="") as destination:
+        if delimiter:
+            writer = csv.writer(destination)
+            writer.writerows(csv.reader(io.StringIO(sample), delimiter=delimiter))
+            writer.writerows(csv.reader(text, delimiter=delimiter))
+        else:
+            destination.write(sample)
+            shutil.copyfileobj(text, destination)
+
+
+def prepare_import(source_path, filename):
+    """
+    Decompress an uploaded file as a stream and normalize delimited data to CSV.
+
+    The workspace and the derived artifacts cache are not touched, so this can run on any thread.
+    Files which are neither compressed nor need rewriting are not copied.
+
+    Args:
+        source_path (str): The path of the uploaded file.
+        filename (str): The name of the uploaded file.
+
+    Returns:
+        dict: The `filename` the file is stored under, the `data_path` of the prepared data (a
+            temporary file, or `source_path` if the file is used as is), its `compression`, its
+            detected `format` and `delimiter`, and whether it was `converted` to CSV.
+
+    Raises:
+        ValueError: If the file type is not accepted or the file cannot be decompressed.
+        OSError: If the file cannot be read or written.
+    """
+    imported_filename = get_imported_filename(filename)
+
+    temp_path = cache_manager.temp_path()
+    written = False
+    try:
+        with open(source_path, "rb") as source:
+            compression = detect_compression(source.read(18))
+            source.seek(0)
+
+            text = io.TextIOWrapper(
+                open_decompressed(source, compression),
+                encoding="utf-8",
+                errors="surrogateescape",
+                newline="",
+            )
+            # Complete the last line of the sample, so that no record is split
+            sample = text.read(SAMPLE_SIZE)
+            sample += text.readline()
+            file_format, delimiter = sniff_format(sample)
+
+            convert = imported_filename.endswith(".csv") and delimiter not in (None, ",")
+            if compression or convert:
+                _write_decompressed(temp_path, text, sample, delimiter if convert else None)
+                written = True
+    except (gzip.BadGzipFile, EOFError, zstandard.ZstdError) as e:
+        raise ValueError(f"Cannot decompress '{filename}': {e}") from e
+    finally:
+        if not written and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return {
+        "filename": imported_filename,
+        "data_path": temp_path if written else source_path,
+        "compression": compression,
+        "format": file_format,
+        "delimiter": delimiter,
+        "converted": convert,
+    }
+
+
+def import_workspace_file(source_path, filename, folder_path, keep_original=False):
+    """
+    Write an uploaded file to the workspace, decompressing it as a stream.
+
+    Delimited files stored as CSV are rewritten with commas while they are decompressed. Files
+    which are neither compressed nor need rewriting are moved into place without copying. Unless
+    the file was rewritten, the compressed original can be kept as a derived artifact of the
+    imported file (kind `original:<compression>`), so that it can be served on export. The imported
+    file is added to the blob store, so that identical imports are stored once.
+
+    Args:
+        source_path (str): The path of the uploaded file. The file may be moved by this function.
+        filename (str): The name of the uploaded file.
+        folder_path (str): The workspace folder to import the file to.
+        keep_original (bool): Keep the compressed original for export.
+
+    Returns:
+        dict: The `path` and `filename` of the imported file, its `compression`, and its detected
+            `format` and `delimiter`.
+
+    Raises:
+        ValueError: If the file type is not accepted or the file cannot be decompressed.
+        OSError: If the file cannot be read or written.
+    """
+    prepared = prepare_import(source_path, filename)
+    destination_path = os.path.join(folder_path, prepared["filename"])
+
+    with lock_manager.exclusive(destination_path):
+        # Remove derived artifacts of a previous file at the same path
+        cache_manager.invalidate(destination_path)
+
+        try:
+            os.replace(prepared["data_path"], destination_path)
+        finally:
+            if prepared["data_path"] != source_path and os.path.exists(prepared["data_path"]):
+                os.remove(prepared["data_path"])
+
+        # Files with the same content are stored once and share their derived artifacts
+        blob_store.ingest(destination_path)
+
+    compression = prepared["compression"]
+    if compression and keep_original and not prepared["converted"]:
+        with cache_manager.build(destination_path, f"original:{compression}") as original_path:
+            os.replace(source_path, original_path)
+
+    return {
+        "path": destination_path,
+        "filename": prepared["filename"],
+        "compression": compression,
+        "format": prepared["format"],
+        "delimiter": prepared["delimiter"],
+    }
+
+
+def scan_csv_file(file_path):
+    """
+    Compute the statistics and sparse row offset index of a CSV file.
+
+    The file is scanned once as bytes. A record ends at a line break outside of quotes, so quoted
+    values spanning several lines are counted as one row. The byte offset of every
+    `ROW_INDEX_INTERVAL`-th data row is recorded, which allows seeking close to any row without
+    parsing the rows before it.
+
+    Args:
+        file_path (str): The path of the CSV file.
+
+    Returns:
+        dict: The `bytes` size, the number of data `rows`, the `header`, the number of `columns`
+            and the `rowOffsets` of the file.
+    """
+    header = []
+    rows = 0
+    offsets = []
+
+    with open(file_path, "rb") as file:
+        header_line = file.readline()
+        if header_line:
+            header = next(csv.reader([header_line.decode("utf-8", errors="replace")]), [])
+
+        offset = file.tell()
+        in_quotes = False
+        for line in file:
+            if not in_quotes:
+                if rows % ROW_INDEX_INTERVAL == 0:
+                    offsets.append(offset)
+                rows += 1
+            # An odd number of quotes toggles whether the record continues on the next line
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            offset += len(line)
+
+    return {
+        "bytes": os.path.getsize(file_path),
+        "rows": rows,
+        "header": header,
+        "columns": len(header),
+        "rowOffsets": offsets,
+    }
+
+
+def index_workspace_file(file_path, stats=None):
+    """
+    Keep the statistics and row offset index of a workspace CSV file as a derived artifact.
+
+    The artifact (kind `stats`) is tied to the current version of the file.
+
+    Args:
+        file_path (str): The path of the CSV file.
+        stats (dict, optional): The result of `scan_csv_file` for the file, computed if not given.
+
+    Returns:
+        dict: The statistics and row offset index of the file.
+    """
+    stats = stats or scan_csv_file(file_path)
+
+    with cache_manager.build(file_path, "stats") as temp_path:
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(stats, file)
+
+    return stats
+
+
+def get_workspace_file_stats(file_path):
+    """
+    Return the statistics and row offset index of a workspace CSV file, if kept as an artifact.
+
+    Args:
+        file_path (str): The path of the CSV file.
+
+    Returns:
+        dict or None: The statistics and row offset index of the current version of the file, or
+            None if they are not kept.
+    """
+    stats_path = cache_manager.get(file_path, "stats")
+    if stats_path is None:
+        return None
+
+    with open(stats_path, "r", encoding="utf-8") as file:
+        return json.load(file)
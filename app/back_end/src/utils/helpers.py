@@ -8,12 +8,27 @@ Functions:
 - build_workspace_structure: Recursively builds a dictionary representation of a directory structure 
     for a given workspace. It includes metadata about files and directories and provides a
     hierarchical view of the workspace.
+- get_path_size: Computes the size of a file or the total size of the files within a directory.
+- estimate_output_size: Estimates the size of a file derived from input files.
+- track_workspace_usage: Context manager enforcing the user's disk quotas before a write and
+    recording the change in disk usage after it.
+- complete_workspace_import: Runs the processing shared by all imports once a file has been
+    written to the workspace.
+- complete_workspace_archive_import: Notifies the user once with a summary of an imported archive.
+- compact_cold_workspace_files: Compresses the workspace files which have not been accessed for a
+    while at rest.
+- snapshot_workspace_file: Keeps the current version of a workspace file before it is overwritten.
+- keep_pending_snapshots: Keeps the versions of a workspace file still read from it before a delete.
+- parse_override_arg: Reads the `override` parameter of the merge and apply routes.
 
 Dependencies:
 - os: Provides a way to interact with the operating system, including filesystem operations.
 - datetime: Supplies classes for manipulating dates and times.
+- gevent: Native thread pool compressing and chunking files outside of the event loop.
 - src.setup.extensions: Contains `socketio` and `socket_manager` used for emitting events and
-    managing user sessions in Socket.IO.
+    managing user sessions in Socket.IO, `usage_manager` used for disk usage accounting, and
+    `cache_manager` and `cold_storage_manager` used for compressing files at rest, and
+    `snapshot_manager` used for keeping previous versions of files.
 
 Details:
 - `socketio_emit_to_user_session` emits an event to a specific user session identified by UUID
@@ -34,8 +49,22 @@ above.
 
 import os
 from datetime import datetime
+from contextlib import contextmanager, ExitStack
+import gevent
+import zstandard
 
-from ..setup.extensions import socketio, socket_manager
+from ..setup.extensions import (
+    socketio,
+    socket_manager,
+    usage_manager,
+    cache_manager,
+    cold_storage_manager,
+    snapshot_manager,
+    lock_manager,
+    logger,
+)
+from ..constants import CONSOLE_FEEDBACK_EVENT, WORKSPACE_UPDATE_FEEDBACK_EVENT
+from .file_import import scan_csv_file, index_workspace_file
 
 
 def socketio_emit_to_user_session(event, data, uuid, sid):
@@ -87,18 +116,21 @@ def build_workspace_structure(path: str, user_workspace_dir):
         dict: A dictionary representing the directory structure. Each entry contains:
             - "id" (str): # The relative path of the item from the `user_workspace_dir`.
             - "label" (str): # The name of the file or directory.
-            - "fileType" (str): # The type of the item, either "folder" for directories or "csv"
-                for files.
+            - "fileType" (str): # The type of the item, either "folder" for directories or "csv",
+                "txt" or "vcf" for files.
             - "children" (list): # A list of child items, which is empty for files and populated
                 with nested dictionaries for directories.
     """
-    file_type = (
-        "folder"
-        if os.path.isdir(path)
-        else (
-            "txt" if path.endswith(".txt") else ("csv" if path.endswith(".csv") else "unsupported")
-        )
-    )
+    if os.path.isdir(path):
+        file_type = "folder"
+    elif path.endswith(".txt"):
+        file_type = "txt"
+    elif path.endswith(".csv"):
+        file_type = "csv"
+    elif path.endswith((".vcf", ".vcf.gz", ".vcf.bgz")):
+        file_type = "vcf"
+    else:
+        file_type = "unsupported"
 
     if file_type == "unsupported":
         return None
@@ -127,6 +159,341 @@ def build_workspace_structure(path: str, user_workspace_dir):
     return workspace_structure
 
 
+def get_path_size(path):
+    """
+    Compute the size of a file or the total size of the files within a directory.
+
+    Args:
+        path (str): The path of the file or directory.
+
+    Returns:
+        int: The size in bytes, or 0 if the path does not exist.
+    """
+    if not os.path.isdir(path):
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            return 0
+
+    size = 0
+    for root, _, files in os.walk(path):
+        for file_name in files:
+            try:
+                size += os.path.getsize(os.path.join(root, file_name))
+            except FileNotFoundError:
+                continue
+    return size
+
+
+def estimate_output_size(*paths):
+    """
+    Estimate the size of a file derived from input files, such as a merge, as the sum of the
+    uncompressed sizes of the inputs.
+
+    Args:
+        *paths (str): The paths of the input files.
+
+    Returns:
+        int: The estimated size in bytes. Missing inputs count as empty.
+    """
+    size = 0
+    for path in paths:
+        try:
+            size += cold_storage_manager.get_size(path)
+        except (FileNotFoundError, IsADirectoryError):
+            continue
+    return size
+
+
+@contextmanager
+def track_workspace_usage(uuid, sid, path, expected_bytes=0):
+    """
+    Enforce the user's disk quotas before a write and record the change in disk usage after it.
+
+    The hard quota is checked before the block runs, so that writes fail early instead of filling
+    the disk. When the soft quota is exceeded, the write proceeds and a warning is emitted to the
+    user's console. After the block, the difference in size of the file at `path` is added to the
+    user's usage counter, also when the block fails after writing partially. Blocks writing many
+    files, such as archive imports, pass no path and record the change of every file they write
+    through the yielded callable instead, so that no directory is walked.
+
+    Args:
+        uuid (str): The unique identifier of the user.
+        sid (str): The session ID of the user session to warn.
+        path (str): The file written by the block, or None if the block records its own changes.
+        expected_bytes (int): The number of bytes the write is expected to add, if known.
+
+    Yields:
+        callable: Records a change in bytes to the user's usage.
+
+    Raises:
+        QuotaExceededError: If the write would exceed the user's hard quota.
+    """
+    if usage_manager.check(uuid, expected_bytes):
+        socketio_emit_to_user_session(
+            CONSOLE_FEEDBACK_EVENT,
+            {
+                "type": "warn",
+                "message": "Workspace disk usage is above the soft quota of "
+                + f"{usage_manager.soft_quota} bytes. Please remove unused files.",
+            },
+            uuid,
+            sid,
+        )
+
+    def record(delta):
+        usage_manager.record(uuid, delta)
+
+    if path is None:
+        yield record
+        return
+
+    size = get_path_size(path)
+    try:
+        yield record
+    finally:
+        record(get_path_size(path) - size)
+
+
+def complete_workspace_import(uuid, sid, destination_path):
+    """
+    Run the processing shared by all imports once a file has been written to the workspace.
+
+    The user is notified about the imported file and the workspace is refreshed.
+
+    Args:
+        uuid (str): The unique identifier of the user.
+        sid (str): The session ID of the user session to notify.
+        destination_path (str): The path of the imported file.
+
+    Returns:
+        None: This function does not return a value.
+    """
+    socketio_emit_to_user_session(
+        CONSOLE_FEEDBACK_EVENT,
+        {
+            "type": "succ",
+            "message": f"File {os.path.basename(destination_path)} was imported successfully.",
+        },
+        uuid,
+        sid,
+    )
+
+    socketio_emit_to_user_session(
+        WORKSPACE_UPDATE_FEEDBACK_EVENT,
+        {"status": "updated"},
+        uuid,
+        sid,
+    )
+
+
+def complete_workspace_archive_import(uuid, sid, filename, relative_path, summary):
+    """
+    Notify the user once with a summary of an imported archive.
+
+    A single console message and a single workspace update carrying the delta are emitted for the
+    whole archive, instead of one per member file.
+
+    Args:
+        uuid (str): The unique identifier of the user.
+        sid (str): The session ID of the user session to notify.
+        filename (str): The name of the imported archive.
+        relative_path (str): The workspace folder the archive was extracted to.
+        summary (dict): The `imported` and `skipped` members, as returned by
+            `import_workspace_archive`.
+
+    Returns:
+        None: This function does not return a value.
+    """
+    message = (
+        f"Archive {filename} was imported: {len(summary['imported'])} files imported, "
+        + f"{len(summary['skipped'])} skipped."
+    )
+    if summary["skipped"]:
+        message += " Skipped: " + ", ".join(
+            f"{member['name']} ({member['reason']})" for member in summary["skipped"][:10]
+        )
+
+    socketio_emit_to_user_session(
+        CONSOLE_FEEDBACK_EVENT,
+        {"type": "warn" if summary["skipped"] else "succ", "message": message},
+        uuid,
+        sid,
+    )
+
+    socketio_emit_to_user_session(
+        WORKSPACE_UPDATE_FEEDBACK_EVENT,
+        {
+            "status": "updated",
+            "delta": {
+                "added": [
+                    os.path.join(relative_path, member["path"]) for member in summary["imported"]
+                ],
+                "skipped": len(summary["skipped"]),
+            },
+        },
+        uuid,
+        sid,
+    )
+
+
+def _compress_cold_file(file_path, temp_path, csv_file):
+    """
+    Compress a workspace file or blob at rest to a temporary file. Runs on a worker thread.
+
+    Frames of CSV files start at the offsets of their row index, computed along the way.
+
+    Args:
+        file_path (str): The path of the workspace file or blob.
+        temp_path (str): The path to write the compressed file to.
+        csv_file (bool): Whether the file is read as CSV.
+
+    Returns:
+        tuple: The size of the compressed file and the statistics of CSV files, otherwise None.
+    """
+    stats = scan_csv_file(file_path) if csv_file else None
+    size = cold_storage_manager.compress(
+        file_path, temp_path, stats["rowOffsets"] if stats else None
+    )
+    return size, stats
+
+
+def _replace_cold_file(file_path, temp_path, stat, stats, links):
+    """
+    Replace a workspace file or blob with its compressed version, keeping its times.
+
+    Workspace files are locked, those being written are skipped. Blobs are never written, they are
+    replaced by a read-only file without locking their links.
+
+    Args:
+        file_path (str): The path of the workspace file or blob.
+        temp_path (str): The path of the compressed file.
+        stat (os.stat_result): The status of the file when it was compressed.
+        stats (dict): The statistics of CSV files, kept as their `stats` artifact, or None.
+        links (list): The workspace links pointing to a blob, empty for workspace files.
+
+    Returns:
+        bool: True if the file was replaced, False if it changed in the meantime.
+    """
+    with ExitStack() as stack:
+        if not links:
+            stack.enter_context(lock_manager.exclusive(file_path, "write", timeout=0))
+            stack.enter_context(lock_manager.exclusive(file_path))
+
+        current = os.stat(file_path)
+        if (current.st_ino, current.st_mtime_ns, current.st_size) != (
+            stat.st_ino,
+            stat.st_mtime_ns,
+            stat.st_size,
+        ):
+            return False
+
+        if links:
+            os.chmod(temp_path, 0o444)
+        cache_manager.invalidate(file_path)
+        os.replace(temp_path, file_path)
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        if stats:
+            index_workspace_file(file_path, stats)
+
+    return True
+
+
+def compact_cold_workspace_files():
+    """
+    Compress the workspace files which have not been accessed for a while at rest.
+
+    Files are compressed one at a time on a worker thread. The compressed file replaces the
+    original on the calling greenlet, only if the original is not being written, did not change in
+    the meantime and the compression saves enough space. The access and modification times are
+    kept, the derived artifacts are invalidated since the file version changes, and the row index
+    of CSV files is kept as their `stats` artifact. The freed space is recorded in the owner's
+    disk usage.
+
+    Deduplicated files are compressed as their blob, the freed space is then recorded in the disk
+    usage of the owner of every link, since each is accounted the size of the blob.
+
+    Returns:
+        int: The number of bytes freed.
+    """
+    threadpool = gevent.get_hub().threadpool
+    freed = 0
+
+    for file_path, links in cold_storage_manager.find_cold_files():
+        temp_path = cache_manager.temp_path()
+        try:
+            stat = os.stat(file_path)
+            csv_file = any(path.endswith(".csv") for path in links or [file_path])
+            size, stats = threadpool.apply(_compress_cold_file, (file_path, temp_path, csv_file))
+
+            # Files being written are skipped, they are not cold anymore
+            if size > stat.st_size * cold_storage_manager.max_ratio or not _replace_cold_file(
+                file_path, temp_path, stat, stats, links
+            ):
+                continue
+
+            for path in links or [file_path]:
+                uuid = os.path.relpath(path, cold_storage_manager.workspace_dir).split(os.sep)[0]
+                usage_manager.record(uuid, size - stat.st_size)
+            freed += stat.st_size - size
+            logger.info(
+                "Compressed '%s' at rest from %d to %d bytes", file_path, stat.st_size, size
+            )
+        except (OSError, ValueError, zstandard.ZstdError) as e:
+            logger.warning("Cannot compress '%s' at rest: %s", file_path, e)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    return freed
+
+
+def snapshot_workspace_file(file_path, reason):
+    """
+    Keep the current version of a workspace file before it is overwritten.
+
+    The file is chunked on a worker thread, so other requests are served in the meantime. Nothing
+    is stored if the file does not exist or its current version is already kept.
+
+    Args:
+        file_path (str): The path of the workspace file.
+        reason (str): The operation about to overwrite the file, e.g. `save` or `merge`.
+
+    Returns:
+        dict or None: The description of the new version, or None if nothing was stored.
+    """
+    return gevent.get_hub().threadpool.apply(snapshot_manager.snapshot, (file_path, reason))
+
+
+def keep_pending_snapshots(path):
+    """
+    Keep the versions of a workspace file or folder which are still read from its files.
+
+    The versions kept before rows were appended in place are the beginning of the file, they are
+    chunked on a worker thread before the file is deleted or truncated without a snapshot.
+
+    Args:
+        path (str): The path of the workspace file or folder.
+
+    Returns:
+        None
+    """
+    gevent.get_hub().threadpool.apply(snapshot_manager.resolve, (path,))
+
+
+def parse_override_arg(args):
+    """
+    Reads the `override` parameter of a request, which the front end sends as `true` or `false`.
+
+    Args:
+        args (MultiDict): The query parameters of the request.
+
+    Returns:
+        bool: True only if the parameter is `true`, in any case.
+    """
+    return str(args.get("override", "false")).strip().lower() == "true"
+
+
 def is_number(value):
     """
     Checks if the given value can be converted to a float.
@@ -0,0 +1,174 @@
+"""
+This module provides the `LockManager` class for coordinating readers and writers of workspace
+files across worker processes.
+
+Writers never modify workspace files in place: they build the new version in a temporary file and
+atomically replace the file with it. A reader holding the file open keeps reading the version it
+opened, so reads do not need to wait for writers. What readers need is consistency between the
+several paths they resolve for one version of a file, e.g. the file itself, its row index and its
+sorted copy. The coordination therefore uses two locks per file:
+- the commit lock, held shared by readers while they resolve and read a file, and held exclusive by
+  writers only for the short time they replace the file and invalidate its derived artifacts,
+- named exclusive locks, held by writers while they build the new version, so that concurrent
+  read-modify-write operations (saving a page, appending a merge) are applied one after the other
+  instead of overwriting each other, and by builders of a derived artifact, so that concurrent
+  requests build it once.
+
+Locks are `flock` locks on small files in a lock directory, which work across the processes of a
+server. They are acquired without blocking and polled, so that waiting yields to other greenlets.
+The lock directory must be on a local file system. Interactive requests, e.g. reading or saving a
+page, wait for `interactive_timeout` instead of `timeout`, so that the user gets an answer while a
+long operation holds the file.
+
+Usage:
+    lock_manager = LockManager(lock_dir, workspace_dir)
+    with lock_manager.shared(file_path):
+        ...  # resolve and read the file and its artifacts
+    with lock_manager.exclusive(file_path, "write"):
+        ...  # build the new version in a temporary file
+        with lock_manager.exclusive(file_path):
+            os.replace(temp_path, file_path)
+"""
+
+import os
+import time
+import fcntl
+import hashlib
+from contextlib import contextmanager
+
+from .exceptions import LockTimeoutError
+
+
+class LockManager:
+    """
+    Manages shared and exclusive locks on workspace files, across worker processes.
+
+    Attributes:
+        lock_dir (str): The directory holding the lock files.
+        workspace_dir (str): The root directory of all user workspaces.
+        timeout (float): Seconds to wait for a lock before giving up.
+        interactive_timeout (float): Seconds interactive requests wait for a lock before giving up.
+        poll_interval (float): The longest pause in seconds between two attempts to lock.
+
+    Methods:
+        shared(path, name, timeout): Context manager holding a shared lock on a file.
+        exclusive(path, name, timeout): Context manager holding an exclusive lock on a file.
+    """
+
+    def __init__(
+        self, lock_dir, workspace_dir, timeout=120, interactive_timeout=10, poll_interval=0.05
+    ):
+        """
+        Initializes the LockManager.
+
+        Args:
+            lock_dir (str): The directory holding the lock files.
+            workspace_dir (str): The root directory of all user workspaces.
+            timeout (float): Seconds to wait for a lock before giving up. Defaults to 120.
+            interactive_timeout (float): Seconds interactive requests wait for a lock before
+                giving up. Defaults to 10.
+            poll_interval (float): The longest pause in seconds between two attempts to lock.
+                Defaults to 50 milliseconds.
+        """
+        self.lock_dir = lock_dir
+        self.workspace_dir = workspace_dir
+        self.timeout = timeout
+        self.interactive_timeout = interactive_timeout
+        self.poll_interval = poll_interval
+
+    def _get_lock_path(self, path, name):
+        """
+        Constructs the path of the lock file of a workspace file.
+
+        Args:
+            path (str): The absolute path of the workspace file.
+            name (str): The name of the lock, empty for the commit lock.
+
+        Returns:
+            str: The path of the lock file, named by a hash of the file and lock names.
+        """
+        key = f"{os.path.relpath(path, self.workspace_dir)}\0{name}"
+        digest = hashlib.sha1(key.encode("utf-8", errors="surrogateescape")).hexdigest()
+        return os.path.join(self.lock_dir, digest[:2], f"{digest}.lock")
+
+    @contextmanager
+    def _lock(self, path, name, operation, timeout):
+        """
+        Context manager holding a lock on a workspace file.
+
+        Args:
+            path (str): The absolute path of the workspace file.
+            name (str): The name of the lock, empty for the commit lock.
+            operation (int): `fcntl.LOCK_SH` or `fcntl.LOCK_EX`.
+            timeout (float or None): Seconds to wait for the lock, defaults to `timeout`.
+
+        Yields:
+            None
+
+        Raises:
+            LockTimeoutError: If the lock is not acquired in time.
+        """
+        lock_path = self._get_lock_path(path, name)
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        pause = 0.001
+
+        with open(lock_path, "a", encoding="utf-8") as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, operation | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError as e:
+                    if time.monotonic() >= deadline:
+                        raise LockTimeoutError(
+                            f"'{os.path.basename(path)}' is in use by another operation"
+                        ) from e
+                    # Sleeping yields to other greenlets when the standard library is patched
+                    time.sleep(pause)
+                    pause = min(pause * 2, self.poll_interval)
+
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def shared(self, path, name="", timeout=None):
+        """
+        Context manager holding a shared lock on a workspace file.
+
+        Readers hold the shared commit lock while they resolve and read a file, so that no writer
+        replaces it in the meantime.
+
+        Args:
+            path (str): The absolute path of the workspace file.
+            name (str): The name of the lock, empty for the commit lock.
+            timeout (float, optional): Seconds to wait for the lock, defaults to `timeout`.
+
+        Returns:
+            contextmanager: The context holding the lock.
+
+        Raises:
+            LockTimeoutError: If the lock is not acquired in time.
+        """
+        return self._lock(path, name, fcntl.LOCK_SH, timeout)
+
+    def exclusive(self, path, name="", timeout=None):
+        """
+        Context manager holding an exclusive lock on a workspace file.
+
+        Writers hold the exclusive commit lock while they replace a file and invalidate its
+        derived artifacts, and a named exclusive lock (e.g. `write`) while they build the new
+        version.
+
+        Args:
+            path (str): The absolute path of the workspace file.
+            name (str): The name of the lock, empty for the commit lock.
+            timeout (float, optional): Seconds to wait for the lock, defaults to `timeout`.
+
+        Returns:
+            contextmanager: The context holding the lock.
+
+        Raises:
+            LockTimeoutError: If the lock is not acquired in time.
+        """
+        return self._lock(path, name, fcntl.LOCK_EX, timeout)
@@ -0,0 +1,176 @@
+"""
+This module provides utilities for viewing LOVD downloads in the workspace without converting them.
+
+An LOVD download is a text file made of several tables (`Genes`, `Transcripts`,
+`Variants_On_Genome`, `Variants_On_Transcripts`, ...). Every table starts with a
+`## <name> ## Do not remove or alter this header ##` line, followed by `## ...` notes, a header
+of quoted `"{{column}}"` names and tab separated rows of quoted values, and ends with an empty line.
+
+The file is scanned once to build an index of the table boundaries and a sparse row offset index
+of every table, kept as a derived artifact of the file (kind `lovd:index`). A page of any table is
+then read by seeking to the nearest indexed row, so the cost of a page does not depend on its
+position in the file.
+
+Functions:
+- is_lovd_file: Checks whether a file is an LOVD download.
+- get_lovd_index: Returns the table index of an LOVD file, building it if necessary.
+- read_lovd_page: Reads a page of rows of one table of an LOVD file.
+"""
+
+import json
+
+from ..setup.extensions import cache_manager, cold_storage_manager
+from .file_import import ROW_INDEX_INTERVAL
+
+# First bytes of an LOVD download
+LOVD_MAGIC = b"### LOVD-version"
+
+
+def is_lovd_file(file_path):
+    """
+    Check whether a file is an LOVD download.
+
+    Args:
+        file_path (str): The path of the file.
+
+    Returns:
+        bool: True if the file starts with the LOVD download header.
+    """
+    with cold_storage_manager.open(file_path, "rb") as file:
+        return file.read(len(LOVD_MAGIC)) == LOVD_MAGIC
+
+
+def _split_row(line):
+    """
+    Split a line of an LOVD table into its values, stripping the quotes.
+
+    Args:
+        line (bytes): The line, with or without the line break.
+
+    Returns:
+        list: The values of the row.
+    """
+    values = line.decode("utf-8", errors="replace").rstrip("\r\n").split("\t")
+    return [
+        value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+        for value in values
+    ]
+
+
+def _index_table_line(table, line, offset):
+    """
+    Add a non-empty line following the title of an LOVD table to the index of the table.
+
+    Args:
+        table (dict): The index of the table, see `_build_lovd_index`.
+        line (bytes): The line, as read from the file.
+        offset (int): The byte offset of the line in the file.
+    """
+    stripped = line.strip()
+
+    if "header" in table:
+        if table["rows"] % ROW_INDEX_INTERVAL == 0:
+            table["rowOffsets"].append(offset)
+        table["rows"] += 1
+    elif stripped.startswith(b"##"):
+        table["notes"].append(stripped[2:].decode("utf-8", errors="replace").strip())
+    else:
+        # Column names are quoted and enclosed in double braces, "{{name}}"
+        table["header"] = [
+            column.removeprefix("{{").removesuffix("}}") for column in _split_row(line)
+        ]
+
+
+def _build_lovd_index(file_path):
+    """
+    Scan an LOVD file and index its tables.
+
+    Args:
+        file_path (str): The path of the LOVD file.
+
+    Returns:
+        dict: The `tables` of the file, each with its `name`, `notes`, `header`, number of `rows`
+            and `rowOffsets` (the byte offset of every `ROW_INDEX_INTERVAL`-th row).
+    """
+    tables = []
+    current = None
+
+    with cold_storage_manager.open(file_path, "rb") as file:
+        offset = 0
+        for line in file:
+            stripped = line.strip()
+
+            if current is not None and stripped:
+                _index_table_line(current, line, offset)
+            elif stripped.startswith(b"## ") and stripped.count(b"##") >= 2:
+                name = stripped.split(b"##")[1].decode("utf-8", errors="replace").strip()
+                current = {"name": name, "notes": [], "rows": 0, "rowOffsets": []}
+                tables.append(current)
+            else:
+                # An empty line ends the table
+                current = None
+
+            offset += len(line)
+
+    for table in tables:
+        table.setdefault("header", [])
+
+    return {"tables": tables}
+
+
+def get_lovd_index(file_path):
+    """
+    Return the table index of an LOVD file, building it if necessary.
+
+    Args:
+        file_path (str): The path of the LOVD file.
+
+    Returns:
+        dict: The `tables` of the file, see `_build_lovd_index`.
+    """
+    index_path = cache_manager.get(file_path, "lovd:index")
+    if index_path is not None:
+        with open(index_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    index = _build_lovd_index(file_path)
+    with cache_manager.build(file_path, "lovd:index") as temp_path:
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(index, file)
+
+    return index
+
+
+def read_lovd_page(file_path, table, start_row, count):
+    """
+    Read a page of rows of one table of an LOVD file.
+
+    Args:
+        file_path (str): The path of the LOVD file.
+        table (dict): The table, as found in the index returned by `get_lovd_index`.
+        start_row (int): The index of the first row of the page.
+        count (int): The number of rows of the page.
+
+    Returns:
+        list: The rows of the page, as lists of unquoted values.
+    """
+    if start_row >= table["rows"] or count <= 0:
+        return []
+
+    block = start_row // ROW_INDEX_INTERVAL
+    skip = start_row - block * ROW_INDEX_INTERVAL
+
+    rows = []
+    with cold_storage_manager.open(file_path, "rb") as file:
+        file.seek(table["rowOffsets"][block])
+        for line in file:
+            if not line.strip():
+                break
+            if skip:
+                skip -= 1
+                continue
+            rows.append(_split_row(line))
+            if len(rows) == count:
+                break
+
+    return rows
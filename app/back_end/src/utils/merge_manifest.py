@@ -0,0 +1,147 @@
+"""
+This module provides the manifests of merged workspace files, recording the sources they were built
+from.
+
+Updating a merged file to new versions of its sources only merges the variants which changed, see
+`src.data.incremental_merge`. This is only correct if the file holds exactly the merge of the
+previous versions, which the manifest of the file records: the SHA-256 of every source, by name
+(e.g. `{"lovd": "...", "gnomad": "..."}`).
+
+Manifests are kept with the snapshots of the merged file, see `SnapshotManager.get_metadata_path`,
+so they move with the file and are never evicted like cache artifacts. They record the version of
+the file they describe (modification time and uncompressed size): once the file is edited,
+appended to or replaced, its manifest no longer applies and the next update merges the sources
+from scratch. Compressing the file at rest keeps its manifest.
+
+Functions:
+- source_digest: Returns the SHA-256 of a source file.
+- read_merge_manifest: Returns the sources a merged file was built from.
+- write_merge_manifest: Records the sources a merged file was built from.
+
+Dependencies:
+- json: Serializes the manifests.
+- src.setup.extensions: `snapshot_manager` locates the manifests, `cache_manager` keeps the digests
+    of sources, `cold_storage_manager` reads files compressed at rest, `blob_store` provides the
+    digests of shared sources and `lock_manager` keeps writers out while a source is hashed.
+"""
+
+# pylint: disable=import-error
+
+import os
+import json
+import hashlib
+import uuid as uuid_lib
+
+from ..setup.extensions import (
+    cache_manager,
+    snapshot_manager,
+    cold_storage_manager,
+    blob_store,
+    lock_manager,
+)
+
+# Name of the manifests among the metadata of a file
+MANIFEST_NAME = "merge"
+
+# Kind of the artifacts keeping the digest of a version of a source file
+DIGEST_KIND = "digest:sha256"
+
+# Size of the blocks read when hashing a source file
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def source_digest(file_path):
+    """
+    Return the SHA-256 of a source file.
+
+    Sources added to the blob store are named by their digest, which is returned without reading
+    them. Other files are hashed once per version, the digest of their uncompressed content is
+    kept as an artifact of the file, so that compressing the file at rest does not change it.
+
+    Args:
+        file_path (str): The path of the source file.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    if blob_store.is_link(file_path):
+        return os.path.basename(blob_store.get_link_target(file_path))
+
+    with lock_manager.shared(file_path):
+        digest_path = cache_manager.get(file_path, DIGEST_KIND)
+        if digest_path:
+            with open(digest_path, "r", encoding="utf-8") as file:
+                return file.read()
+
+        digest = hashlib.sha256()
+        with cold_storage_manager.open(file_path, "rb") as file:
+            while block := file.read(HASH_BLOCK_SIZE):
+                digest.update(block)
+
+        with cache_manager.build(file_path, DIGEST_KIND) as temp_path:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                file.write(digest.hexdigest())
+        return digest.hexdigest()
+
+
+def _get_file_version(file_path):
+    """
+    Return the version of a merged file, which changes with every write but not with compression.
+
+    Args:
+        file_path (str): The path of the merged file.
+
+    Returns:
+        list: The modification time in nanoseconds and the uncompressed size of the file.
+    """
+    return [os.stat(file_path).st_mtime_ns, cold_storage_manager.get_size(file_path)]
+
+
+def read_merge_manifest(file_path):
+    """
+    Return the sources the current version of a merged file was built from.
+
+    Args:
+        file_path (str): The path of the merged file.
+
+    Returns:
+        dict or None: The digests of the sources by name, None if the file has no manifest or the
+            manifest describes another version of the file.
+    """
+    manifest_path = snapshot_manager.get_metadata_path(file_path, MANIFEST_NAME)
+
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+        if manifest["version"] != _get_file_version(file_path):
+            return None
+        return manifest["sources"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_merge_manifest(file_path, sources):
+    """
+    Record the sources the current version of a merged file was built from.
+
+    The caller is expected to hold the `write` lock of the file, so that it does not change
+    meanwhile.
+
+    Args:
+        file_path (str): The path of the merged file.
+        sources (dict): The digests of the sources by name, see `source_digest`.
+
+    Returns:
+        None
+    """
+    manifest_path = snapshot_manager.get_metadata_path(file_path, MANIFEST_NAME)
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+
+    temp_path = f"{manifest_path}.{uuid_lib.uuid4().hex}.part"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"version": _get_file_version(file_path), "sources": sources}, file)
+        os.replace(temp_path, manifest_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,689 @@
+"""
+This module provides the `SnapshotManager` class for keeping previous versions of workspace files.
+
+Before a workspace file is overwritten, its current content is kept as a snapshot, so that it can
+be listed and restored later. Snapshots are split into content-defined chunks: chunk boundaries
+are placed where a rolling hash of the last 32 bytes matches a pattern, so they depend on the
+content around them rather than on their offset. Editing a page of a large file only changes the
+chunks covering the edited rows, the other chunks are the same as in the previous snapshot and
+are stored once.
+
+The rolling hash is the Gear hash used by FastCDC. Since a byte only contributes to the hash of
+the 32 positions following it, the hash of every position of a block is computed at once with
+numpy instead of byte by byte.
+
+Chunks are stored compressed with zstd, named by the SHA-256 of their content, and shared by all
+files and users. Each snapshot is a JSON manifest listing its chunks, stored in a directory
+mirroring the location of the file in the workspace. Other metadata of a file, such as the sources
+a merged file was built from, can be kept in the same directory, so that it moves with the file
+and is not subject to the byte budget of the cache.
+
+Appending rows to a file must not cost reading the whole file. Before an append, the content of
+the file is the beginning of the file after it, so the snapshot only records its size and is
+pending: its chunks are stored when the file next changes other than by an append, from the same
+read as the snapshot of that change, or before the file is deleted. A pending snapshot is
+restored from the beginning of the file.
+
+Dependencies:
+- numpy: Computes the rolling hash of whole blocks.
+- zstandard: Compresses the stored chunks.
+
+Usage:
+    snapshot_manager = SnapshotManager(workspace_dir, snapshot_dir)
+    snapshot_manager.snapshot(file_path, "save")  # Before overwriting the file
+    snapshot_manager.snapshot_before_append(file_path, "merge")  # Before appending to the file
+    versions = snapshot_manager.list_versions(file_path)
+    snapshot_manager.restore(file_path, versions[0]["id"], temp_path)
+"""
+
+# pylint: disable=import-error
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import uuid as uuid_lib
+import numpy as np
+import zstandard
+
+# Size of the blocks read when chunking a file, small enough for the hashes to stay in cache
+BLOCK_SIZE = 1024 * 1024
+
+# Number of bytes contributing to the rolling hash of a position
+WINDOW_SIZE = 32
+
+# Gear table of the rolling hash, derived from SHA-256 so that boundaries are stable everywhere
+GEAR = np.array(
+    [
+        int.from_bytes(hashlib.sha256(bytes([value])).digest()[:4], "little")
+        for value in range(256)
+    ],
+    dtype=np.uint32,
+)
+
+
+class SnapshotManager:
+    """
+    Manages snapshots of workspace files stored as deduplicated content-defined chunks.
+
+    Attributes:
+        workspace_dir (str): The root directory of all user workspaces.
+        snapshot_dir (str): The root directory of the snapshots.
+        chunks_dir (str): The directory holding the chunks, named by their SHA-256.
+        manifests_dir (str): The directory holding the manifests, mirroring the workspace layout.
+        max_versions (int): The number of snapshots kept per file.
+        average_bits (int): Chunks are cut on average every `2 ** average_bits` bytes.
+        min_size (int): The smallest size of a chunk in bytes, but for the last one.
+        max_size (int): The largest size of a chunk in bytes.
+        level (int): The zstd compression level of the chunks.
+        grace_period (int): Seconds after its last use before an unreferenced chunk is removed.
+        opener (callable): Opens a workspace file for binary reading, as `open(path, "rb")`.
+
+    Methods:
+        iter_chunks(stream): Splits a binary stream into content-defined chunks.
+        snapshot(file_path, reason): Keeps the current content of a file as a snapshot.
+        snapshot_before_append(file_path, reason): Keeps the content of a file before an append.
+        resolve(path): Stores the chunks of the pending snapshots of a file or folder.
+        get_metadata_path(file_path, name): Constructs the path of metadata kept with a file.
+        list_versions(file_path): Lists the snapshots of a file, the latest first.
+        restore(file_path, version_id, dest_path): Writes the content of a snapshot to a file.
+        move(source_path, new_path): Moves the snapshots of a renamed or moved file or folder.
+        cleanup(): Removes the chunks which are no longer referenced by any snapshot.
+    """
+
+    def __init__(
+        self,
+        workspace_dir,
+        snapshot_dir,
+        max_versions=20,
+        average_bits=16,
+        min_size=16 * 1024,
+        max_size=512 * 1024,
+        level=3,
+        grace_period=24 * 3600,
+        opener=None,
+    ):
+        """
+        Initializes the SnapshotManager.
+
+        Args:
+            workspace_dir (str): The root directory of all user workspaces.
+            snapshot_dir (str): The root directory of the snapshots.
+            max_versions (int): The number of snapshots kept per file. Defaults to 20.
+            average_bits (int): Chunks are cut on average every `2 ** average_bits` bytes.
+                Defaults to 16, i.e. 64 KiB.
+            min_size (int): The smallest size of a chunk in bytes. Defaults to 16 KiB.
+            max_size (int): The largest size of a chunk in bytes. Defaults to 512 KiB.
+            level (int): The zstd compression level of the chunks. Defaults to 3.
+            grace_period (int): Seconds after its last use before an unreferenced chunk is
+                removed. Defaults to one day.
+            opener (callable, optional): Opens a workspace file for binary reading, e.g. to read
+                files compressed at rest. Defaults to `open`.
+        """
+        self.workspace_dir = workspace_dir
+        self.snapshot_dir = snapshot_dir
+        self.chunks_dir = os.path.join(snapshot_dir, "chunks")
+        self.manifests_dir = os.path.join(snapshot_dir, "manifests")
+        self.max_versions = max_versions
+        self.average_bits = average_bits
+        self.min_size = min_size
+        self.max_size = max_size
+        self.level = level
+        self.grace_period = grace_period
+        self.opener = opener or open
+
+    def _get_manifest_dir(self, file_path):
+        """
+        Constructs the directory holding the manifests of a file or folder.
+
+        Args:
+            file_path (str): The absolute path of the workspace file or folder.
+
+        Returns:
+            str: The manifest directory, mirroring the file location in the workspace.
+        """
+        return os.path.join(self.manifests_dir, os.path.relpath(file_path, self.workspace_dir))
+
+    def get_metadata_path(self, file_path, name):
+        """
+        Constructs the path of metadata kept with the snapshots of a file.
+
+        Metadata is moved with the snapshots when the file is renamed or moved, and is ignored
+        otherwise. The caller is responsible for creating its directory.
+
+        Args:
+            file_path (str): The absolute path of the workspace file.
+            name (str): The name of the metadata, e.g. "merge".
+
+        Returns:
+            str: The path of the metadata file.
+        """
+        return os.path.join(self._get_manifest_dir(file_path), f"{name}.meta")
+
+    def _get_chunk_path(self, digest):
+        """
+        Returns the path of a chunk, fanned out in directories by the first digest characters.
+
+        Args:
+            digest (str): The SHA-256 of the chunk content.
+
+        Returns:
+            str: The path of the chunk.
+        """
+        return os.path.join(self.chunks_dir, digest[:2], digest)
+
+    def _find_boundaries(self, gear, context):
+        """
+        Finds the candidate chunk boundaries of a block.
+
+        The Gear hash of a position is `sum(GEAR[byte[i - k]] << k for k < 32)` modulo 2**32, which
+        is computed for the whole block by doubling the window five times, each doubling consuming
+        as many context values as the window width. A boundary follows the positions whose
+        `average_bits` highest hash bits are zero, the bits depending on the whole window.
+
+        Args:
+            gear (numpy.ndarray): The gear values of the bytes of the block.
+            context (numpy.ndarray): The gear values of the bytes preceding the block.
+
+        Returns:
+            numpy.ndarray: The offsets within the block at which a chunk may end.
+        """
+        hashes = np.concatenate([context, gear])
+        width = 1
+        while width < WINDOW_SIZE:
+            hashes = hashes[width:] + (hashes[:-width] << np.uint32(width))
+            width *= 2
+
+        return np.flatnonzero(hashes < np.uint32(1 << (32 - self.average_bits))) + 1
+
+    def iter_chunks(self, stream):
+        """
+        Splits a binary stream into content-defined chunks.
+
+        Args:
+            stream (file-like): The binary stream to split.
+
+        Yields:
+            bytes: The data of every chunk.
+        """
+        context = np.zeros(WINDOW_SIZE - 1, dtype=np.uint32)
+        pending = b""
+
+        while block := stream.read(BLOCK_SIZE):
+            gear = np.take(GEAR, np.frombuffer(block, dtype=np.uint8))
+            boundaries = self._find_boundaries(gear, context)
+            context = np.concatenate([context, gear[-(WINDOW_SIZE - 1) :]])[-(WINDOW_SIZE - 1) :]
+
+            data = pending + block
+            start = 0
+            for end in (boundaries + len(pending)).tolist():
+                while end - start > self.max_size:
+                    yield data[start : start + self.max_size]
+                    start += self.max_size
+                if end - start >= self.min_size:
+                    yield data[start:end]
+                    start = end
+
+            while len(data) - start > self.max_size:
+                yield data[start : start + self.max_size]
+                start += self.max_size
+            pending = data[start:]
+
+        if pending:
+            yield pending
+
+    def _store_chunk(self, data, compressor):
+        """
+        Stores a chunk unless a chunk with the same content exists.
+
+        Using an existing chunk updates its modification time, which marks it as recently used.
+
+        Args:
+            data (bytes): The data of the chunk.
+            compressor (zstandard.ZstdCompressor): The compressor of new chunks.
+
+        Returns:
+            tuple: The SHA-256 of the chunk and the number of bytes added to the store.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        chunk_path = self._get_chunk_path(digest)
+        try:
+            os.utime(chunk_path)
+            return digest, 0
+        except FileNotFoundError:
+            pass
+
+        compressed = compressor.compress(data)
+        os.makedirs(os.path.dirname(chunk_path), exist_ok=True)
+        temp_path = f"{chunk_path}.{uuid_lib.uuid4().hex}.part"
+        try:
+            with open(temp_path, "wb") as file:
+                file.write(compressed)
+            os.replace(temp_path, chunk_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return digest, len(compressed)
+
+    def _read_manifests(self, file_path):
+        """
+        Reads the manifests of a file, the latest first.
+
+        Args:
+            file_path (str): The absolute path of the workspace file.
+
+        Returns:
+            list: The manifests of the snapshots.
+        """
+        manifest_dir = self._get_manifest_dir(file_path)
+        try:
+            file_names = sorted(
+                (name for name in os.listdir(manifest_dir) if name.endswith(".json")),
+                reverse=True,
+            )
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+
+        manifests = []
+        for file_name in file_names:
+            try:
+                with open(os.path.join(manifest_dir, file_name), "r", encoding="utf-8") as file:
+                    manifests.append(json.load(file))
+            except (FileNotFoundError, ValueError):
+                continue
+        return manifests
+
+    def _chunk_file(self, file_path, cuts):
+        """
+        Stores the chunks of a file, and of its beginnings of the given sizes.
+
+        A beginning ends within a chunk of the file, the part of that chunk it covers is stored as
+        a chunk of its own.
+
+        Args:
+            file_path (str): The absolute path of the workspace file.
+            cuts (iterable): The sizes of the beginnings of the file, e.g. of pending snapshots.
+
+        Returns:
+            tuple: The chunks of the file, its size, the number of bytes added to the store and
+                the chunks of every beginning by size, missing for sizes beyond the file.
+        """
+        compressor = zstandard.ZstdCompressor(level=self.level)
+        cuts = sorted(set(cuts))
+        chunks = []
+        prefixes = {}
+        size = added = 0
+        with self.opener(file_path, "rb") as stream:
+            for data in self.iter_chunks(stream):
+                while cuts and cuts[0] < size + len(data):
+                    cut = cuts.pop(0)
+                    prefixes[cut] = list(chunks)
+                    if cut > size:
+                        digest, stored = self._store_chunk(data[: cut - size], compressor)
+                        prefixes[cut].append([digest, cut - size])
+                        added += stored
+
+                digest, stored = self._store_chunk(data, compressor)
+                chunks.append([digest, len(data)])
+                size += len(data)
+                added += stored
+
+        if cuts and cuts[0] == size:
+            prefixes[size] = list(chunks)
+
+        return chunks, size, added, prefixes
+
+    def _write_manifest(self, file_path, manifest):
+        """
+        Writes the manifest of a snapshot of a file atomically.
+
+        Args:
+            file_path (str): The absolute path of the workspace file.
+            manifest (dict): The manifest of the snapshot.
+
+        Returns:
+            None
+        """
+        manifest_dir = self._get_manifest_dir(file_path)
+        os.makedirs(manifest_dir, exist_ok=True)
+        manifest_path = os.path.join(manifest_dir, f"{manifest['id']}.json")
+        temp_path = os.path.join(manifest_dir, f".{manifest['id']}.{uuid_lib.uuid4().hex}.part")
+        try:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(manifest, file, separators=(",", ":"))
+            os.replace(temp_path, manifest_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _remove_manifests(self, file_path, manifests):
+        """
+        Removes snapshots of a file, their chunks are removed by `cleanup`.
+
+        Args:
+            file_path (str): The absolute path of the workspace file.
+            manifests (list): The manifests of the snapshots to remove.
+
+        Returns:
+            None
+        """
+        manifest_dir = self._get_manifest_dir(file_path)
+        for manifest in manifests:
+            try:
+                os.remove(os.path.join(manifest_dir, f"{manifest['id']}.json"))
+            except FileNotFoundError:
+                continue
+
+    def _resolve_pending(self, file_path, pending, prefixes):
+        """
+        Completes the pending snapshots of a file with the chunks of their content.
+
+        Snapshots larger than the file can no longer be restored and are removed.
+
+        Args:
+            file_path (str): The absolute path of the workspace file.
+            pending (list): The manifests of the pending snapshots.
+            prefixes (dict): The chunks of the beginnings of the file by size, see `_chunk_file`.
+
+        Returns:
+            None
+        """
+        for manifest in pending:
+            if manifest["size"] not in prefixes:
+                self._remove_manifests(file_path, [manifest])
+                continue
+
+            del manifest["pending"]
+            manifest["chunks"] = prefixes[manifest["size"]]
+            self._write_manifest(file_path, manifest)
+
+    def snapshot(self, file_path, reason=""):
+        """
+        Keeps the current content of a file as a snapshot.
+
+        Nothing is stored if snapshots are disabled (`max_versions` is 0), if the file does not
+        exist or if it did not change since its latest snapshot. The oldest snapshots beyond
+        `max_versions` are removed. The pending snapshots of the file are completed from the same
+        read, since the file is about to change other than by an append.
+
+        Args:
+            file_path (str): The absolute path of the workspace file.
+            reason (str): The operation about to overwrite the file, shown when listing.
+
+        Returns:
+            dict or None: The new snapshot as returned by `list_versions`, or None if nothing was
+                stored.
+        """
+        if not self.max_versions:
+            return None
+
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        if not os.path.isfile(file_path):
+            return None
+
+        source_version = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        manifests = self._read_manifests(file_path)
+        pending = [manifest for manifest in manifests if manifest.get("pending")]
+        kept = bool(manifests) and manifests[0]["sourceVersion"] == source_version
+        if kept and not pending:
+            return None
+
+        chunks, size, added, prefixes = self._chunk_file(
+            file_path, [manifest["size"] for manifest in pending]
+        )
+        self._resolve_pending(file_path, pending, prefixes)
+        if kept:
+            return None
+
+        manifest = {
+            "id": f"{time.time_ns():016x}",
+            "createdAt": time.time(),
+            "modifiedAt": stat.st_mtime,
+            "size": size,
+            "addedBytes": added,
+            "reason": reason,
+            "sourceVersion": source_version,
+            "chunks": chunks,
+        }
+        self._write_manifest(file_path, manifest)
+        self._remove_manifests(file_path, manifests[self.max_versions - 1 :])
+
+        return self._describe(manifest)
+
+    def snapshot_before_append(self, file_path, reason=""):
+        """
+        Keeps the current content of a file which is about to be appended to, without reading it.
+
+        The snapshot is pending: it records the size of the file, whose content stays the
+        beginning of the file. The file must not be compressed at rest, since its size on disk
+        is recorded.
+
+        Args:
+            file_path (str): The absolute path of the workspace file.
+            reason (str): The operation about to append to the file, shown when listing.
+
+        Returns:
+            dict or None: The new snapshot as returned by `list_versions`, or None if nothing was
+                stored.
+        """
+        if not self.max_versions:
+            return None
+
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        if not os.path.isfile(file_path):
+            return None
+
+        source_version = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        manifests = self._read_manifests(file_path)
+        if manifests and manifests[0]["sourceVersion"] == source_version:
+            return None
+
+        manifest = {
+            "id": f"{time.time_ns():016x}",
+            "createdAt": time.time(),
+            "modifiedAt": stat.st_mtime,
+            "size": stat.st_size,
+            "addedBytes": 0,
+            "reason": reason,
+            "sourceVersion": source_version,
+            "pending": True,
+            "chunks": [],
+        }
+        self._write_manifest(file_path, manifest)
+        self._remove_manifests(file_path, manifests[self.max_versions - 1 :])
+
+        return self._describe(manifest)
+
+    def resolve(self, path):
+        """
+        Stores the chunks of the pending snapshots of a file, or of the files in a folder.
+
+        Pending snapshots are restored from the beginning of their file, this is called before
+        the file is deleted or truncated without a snapshot.
+
+        Args:
+            path (str): The absolute path of the workspace file or folder.
+
+        Returns:
+            None
+        """
+        manifest_root = self._get_manifest_dir(path)
+        for root, _, files in os.walk(manifest_root):
+            if not any(file_name.endswith(".json") for file_name in files):
+                continue
+
+            file_path = os.path.normpath(os.path.join(path, os.path.relpath(root, manifest_root)))
+            pending = [
+                manifest for manifest in self._read_manifests(file_path) if manifest.get("pending")
+            ]
+            if not pending:
+                continue
+
+            prefixes = {}
+            if os.path.isfile(file_path):
+                cuts = [manifest["size"] for manifest in pending]
+                prefixes = self._chunk_file(file_path, cuts)[3]
+            self._resolve_pending(file_path, pending, prefixes)
+
+    @staticmethod
+    def _describe(manifest):
+        """
+        Returns the public description of a snapshot, without its chunk list.
+
+        Args:
+            manifest (dict): The manifest of the snapshot.
+
+        Returns:
+            dict: The `id`, `createdAt`, `modifiedAt`, `size`, `addedBytes`, `reason` and
+                number of `chunks` of the snapshot.
+        """
+        return {
+            **{key: value for key, value in manifest.items() if key != "chunks"},
+            "chunks": len(manifest["chunks"]),
+        }
+
+    def list_versions(self, file_path):
+        """
+        Lists the snapshots of a file, the latest first.
+
+        Snapshots of deleted files are still listed, so that they can be restored.
+
+        Args:
+            file_path (str): The absolute path of the workspace file.
+
+        Returns:
+            list: The descriptions of the snapshots, as returned by `snapshot`.
+        """
+        return [self._describe(manifest) for manifest in self._read_manifests(file_path)]
+
+    def restore(self, file_path, version_id, dest_path):
+        """
+        Writes the content of a snapshot of a file.
+
+        Args:
+            file_path (str): The absolute path of the workspace file.
+            version_id (str): The ID of the snapshot.
+            dest_path (str): The path to write the content to, e.g. a temporary file which then
+                replaces the workspace file.
+
+        Returns:
+            dict: The description of the restored snapshot.
+
+        Raises:
+            FileNotFoundError: If the snapshot or one of its chunks does not exist.
+            ValueError: If a chunk is corrupted.
+        """
+        if not version_id.isalnum():
+            raise FileNotFoundError(f"Version '{version_id}' not found")
+
+        manifest_path = os.path.join(self._get_manifest_dir(file_path), f"{version_id}.json")
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+        except (FileNotFoundError, NotADirectoryError) as e:
+            raise FileNotFoundError(f"Version '{version_id}' not found") from e
+
+        if manifest.get("pending"):
+            self._restore_pending(file_path, manifest, dest_path)
+            return self._describe(manifest)
+
+        decompressor = zstandard.ZstdDecompressor()
+        with open(dest_path, "wb") as dest:
+            for digest, size in manifest["chunks"]:
+                with open(self._get_chunk_path(digest), "rb") as file:
+                    try:
+                        data = decompressor.decompress(file.read(), max_output_size=size)
+                    except zstandard.ZstdError as e:
+                        raise ValueError(f"Corrupted chunk '{digest}': {e}") from e
+                if len(data) != size:
+                    raise ValueError(f"Corrupted chunk '{digest}' in version '{version_id}'")
+                dest.write(data)
+
+        return self._describe(manifest)
+
+    def _restore_pending(self, file_path, manifest, dest_path):
+        """
+        Writes the content of a pending snapshot, the beginning of its file.
+
+        Args:
+            file_path (str): The absolute path of the workspace file.
+            manifest (dict): The manifest of the pending snapshot.
+            dest_path (str): The path to write the content to.
+
+        Raises:
+            FileNotFoundError: If the file is shorter than the snapshot.
+        """
+        remaining = manifest["size"]
+        with self.opener(file_path, "rb") as source, open(dest_path, "wb") as dest:
+            while remaining and (data := source.read(min(remaining, BLOCK_SIZE))):
+                dest.write(data)
+                remaining -= len(data)
+
+        if remaining:
+            raise FileNotFoundError(f"Version '{manifest['id']}' is no longer available")
+
+    def move(self, source_path, new_path):
+        """
+        Moves the snapshots of a renamed or moved file or folder.
+
+        Args:
+            source_path (str): The previous absolute path of the file or folder.
+            new_path (str): The new absolute path of the file or folder.
+
+        Returns:
+            None
+        """
+        manifest_dir = self._get_manifest_dir(source_path)
+        new_manifest_dir = self._get_manifest_dir(new_path)
+
+        try:
+            shutil.rmtree(new_manifest_dir, ignore_errors=True)
+            os.makedirs(os.path.dirname(new_manifest_dir), exist_ok=True)
+            os.rename(manifest_dir, new_manifest_dir)
+        except FileNotFoundError:
+            pass
+
+    def cleanup(self):
+        """
+        Removes the chunks which are no longer referenced by any snapshot.
+
+        Chunks used or added within the grace period are kept, since they may belong to a
+        snapshot being written.
+
+        Returns:
+            int: The number of bytes freed.
+        """
+        referenced = set()
+        for root, _, files in os.walk(self.manifests_dir):
+            for file_name in files:
+                if not file_name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(root, file_name), "r", encoding="utf-8") as file:
+                        referenced.update(digest for digest, _ in json.load(file)["chunks"])
+                except (FileNotFoundError, ValueError, KeyError):
+                    continue
+
+        freed = 0
+        threshold = time.time() - self.grace_period
+        for root, _, files in os.walk(self.chunks_dir):
+            for file_name in files:
+                chunk_path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(chunk_path)
+                    if file_name in referenced or stat.st_mtime >= threshold:
+                        continue
+                    os.remove(chunk_path)
+                except FileNotFoundError:
+                    continue
+                freed += stat.st_size
+
+        return freed
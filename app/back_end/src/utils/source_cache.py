@@ -0,0 +1,202 @@
+"""
+This module provides a cache of parsed and typed source data for the merge routes.
+
+Parsing an LOVD download or a gnomAD export and converting its types takes much longer than
+reading the resulting tables back from Parquet. Users often merge the same sources repeatedly, into
+different destinations, and many users work on the same downloads. The parsed tables are therefore
+kept as Parquet artifacts of the source file (kinds `parsed:<source>:<version>:<table>`).
+
+The tables are keyed by the SHA-256 of the source content (see `source_digest`), so they are
+shared by every file with the same content, across users and worker processes, and are not
+accounted to any user. Loading a source does not change it: files are hashed where they are, the
+digest of a version of a file being kept, and deduplicated files are named by their digest. The
+version of the parsers is part of the artifact kind, so that tables parsed by an older version are
+never read back.
+
+Functions:
+- load_lovd_tables: Returns the parsed and typed tables of an LOVD download.
+- load_gnomad_data: Returns the parsed and typed data of a gnomAD export.
+- iter_gnomad_batches: Yields the parsed and typed data of a gnomAD export batch by batch.
+- iter_clinvar_batches: Yields the parsed data of a ClinVar export batch by batch, without caching.
+"""
+
+# pylint: disable=import-error
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ..setup.extensions import logger, cache_manager, cold_storage_manager, lock_manager
+from ..data.refactoring import (
+    parse_lovd,
+    parse_gnomad,
+    parse_clinvar,
+    set_lovd_dtypes,
+    set_gnomad_dtypes,
+)
+from ..data.schemas import arrow_to_pandas
+from .merge_manifest import source_digest
+
+# Version of the parsed tables, to increase whenever the parsers or the type conversions change
+PARSED_SOURCE_VERSION = 4
+
+# Number of rows in the batches of `iter_gnomad_batches` and `iter_clinvar_batches`
+GNOMAD_BATCH_ROWS = 100_000
+CLINVAR_BATCH_ROWS = 100_000
+
+
+def _load_tables(file_path, source, names, parse):
+    """
+    Return parsed tables of a source file from the cache, parsing and caching the missing ones.
+
+    Args:
+        file_path (str): The path of the source file.
+        source (str): The name of the source, e.g. `lovd`.
+        names (list): The names of the tables.
+        parse (callable): Called with the text stream of the file and the names of the missing
+            tables, returns the missing tables by name.
+
+    Returns:
+        dict: The tables by name.
+    """
+    kinds = {name: f"parsed:{source}:{PARSED_SOURCE_VERSION}:{name}" for name in names}
+
+    def read_cached(digest):
+        # Tables keyed by content are never replaced, so no lock is needed to read them
+        paths = {name: cache_manager.get(file_path, kind, digest) for name, kind in kinds.items()}
+        return {name: arrow_to_pandas(pq.read_table(path)) for name, path in paths.items() if path}
+
+    tables = read_cached(source_digest(file_path))
+    if len(tables) == len(names):
+        logger.info("Read parsed %s tables of '%s' from the cache", source, file_path)
+        return tables
+
+    # Concurrent requests parse the file once
+    with lock_manager.exclusive(file_path, f"build:parsed:{source}"), lock_manager.shared(
+        file_path
+    ):
+        # The digest of the version being parsed, which writers cannot replace meanwhile
+        digest = source_digest(file_path)
+        tables = read_cached(digest)
+        missing = [name for name in names if name not in tables]
+        if not missing:
+            return tables
+
+        with cold_storage_manager.open(file_path, "r", encoding="utf-8") as file:
+            parsed = parse(file, missing)
+
+            for name in missing:
+                try:
+                    with cache_manager.build(file_path, kinds[name], digest) as temp_path:
+                        parsed[name].to_parquet(temp_path, index=False)
+                except (pa.ArrowException, TypeError, ValueError) as e:
+                    # Columns mixing types cannot be stored, the table is parsed again next time
+                    logger.warning(
+                        "Cannot cache %s table '%s' of '%s': %s", source, name, file_path, e
+                    )
+
+    tables.update(parsed)
+    return tables
+
+
+def load_lovd_tables(file_path, tables):
+    """
+    Return the parsed and typed tables of an LOVD download, from the cache if possible.
+
+    Args:
+        file_path (str): The path of the LOVD download.
+        tables (list): The names of the tables, e.g. `Variants_On_Genome`.
+
+    Returns:
+        dict: The tables by name, as returned by `parse_lovd` and converted by `set_lovd_dtypes`.
+
+    Raises:
+        KeyError: If a table is not found in the download.
+    """
+    def parse(file, names):
+        parsed = parse_lovd(file, save_to=None, tables=names)
+        set_lovd_dtypes(parsed)
+        return {name: parsed[name] for name in names}
+
+    return _load_tables(file_path, "lovd", tables, parse)
+
+
+def load_gnomad_data(file_path):
+    """
+    Return the parsed and typed data of a gnomAD export, from the cache if possible.
+
+    Args:
+        file_path (str): The path of the gnomAD export.
+
+    Returns:
+        DataFrame: The data, as returned by `parse_gnomad` and converted by `set_gnomad_dtypes`.
+    """
+    def parse(file, _):
+        data = parse_gnomad(file)
+        set_gnomad_dtypes(data)
+        return {"data": data}
+
+    return _load_tables(file_path, "gnomad", ["data"], parse)["data"]
+
+
+def iter_gnomad_batches(file_path, batch_rows=GNOMAD_BATCH_ROWS):
+    """
+    Yield the parsed and typed data of a gnomAD export batch by batch, with bounded memory.
+
+    The cached data is read back if the export was parsed before. Otherwise the export is parsed
+    chunk by chunk and is not cached, since caching would need the whole data in memory.
+
+    The data is opened while writers are kept out, then read without holding the lock, so that
+    writers do not wait for the consumer of the batches. Cached tables are never changed and
+    sources are replaced by writers, so the open file keeps the version it was opened at, but for
+    rows appended to the source in place meanwhile.
+
+    Args:
+        file_path (str): The path of the gnomAD export.
+        batch_rows (int): The number of rows in a batch.
+
+    Yields:
+        DataFrame: The next rows of the data, as returned by `load_gnomad_data`.
+    """
+    kind = f"parsed:gnomad:{PARSED_SOURCE_VERSION}:data"
+
+    with lock_manager.shared(file_path):
+        cached_path = cache_manager.get(file_path, kind, source_digest(file_path))
+        if cached_path:
+            # pylint: disable=consider-using-with
+            file = open(cached_path, "rb")
+        else:
+            file = cold_storage_manager.open(file_path, "r", encoding="utf-8")
+
+    with file:
+        if cached_path:
+            logger.info("Reading parsed gnomAD data of '%s' from the cache", file_path)
+            for batch in pq.ParquetFile(file).iter_batches(batch_size=batch_rows):
+                yield arrow_to_pandas(batch)
+            return
+
+        for chunk in pd.read_csv(file, sep=",", chunksize=batch_rows):
+            set_gnomad_dtypes(chunk)
+            yield chunk
+
+
+def iter_clinvar_batches(file_path, batch_rows=CLINVAR_BATCH_ROWS):
+    """
+    Yield the parsed data of a ClinVar export batch by batch, with bounded memory.
+
+    ClinVar exports are read once per merge and their values are kept as strings, so parsing them
+    as they are read is as fast as reading a cached copy, which is not built.
+
+    Args:
+        file_path (str): The path of the ClinVar export.
+        batch_rows (int): The number of rows in a batch.
+
+    Yields:
+        DataFrame: The next rows of the data, as returned by `parse_clinvar`.
+    """
+    # Writers only wait for the export to be opened, see `iter_gnomad_batches`
+    with lock_manager.shared(file_path):
+        file = cold_storage_manager.open(file_path, "r", encoding="utf-8")
+
+    with file:
+        yield from parse_clinvar(file, batch_rows)
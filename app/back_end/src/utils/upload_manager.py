@@ -0,0 +1,333 @@
+"""
+This module provides the `UploadManager` class for managing chunked, resumable uploads.
+
+A chunked upload is made of three steps:
+- init: the client announces the file name, size and (optionally) the SHA-256 of the whole file
+    and receives an upload ID, the chunk size and the chunks received so far.
+- chunk: the client sends each chunk with its SHA-256. Chunks are streamed straight to their
+    offset in a preallocated data file, so they can be sent in any order and by several
+    connections at once.
+- finalize: once all chunks are received, the whole file is hashed and verified, and the data
+    file is handed over to be moved into the workspace.
+
+The upload ID is derived from the announced file, so initializing the same upload again after a
+disconnect resumes it. Every received chunk is recorded by a marker file, which keeps the state
+on disk and shared by all workers without locking.
+
+Usage:
+    upload_manager = UploadManager(upload_dir)
+    upload = upload_manager.create(uuid, "folder", "file.csv", size, checksum)
+    upload_manager.write_chunk(uuid, upload["uploadId"], 0, request.stream, chunk_checksum)
+    data_path = upload_manager.finalize(uuid, upload["uploadId"])
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+
+# Size of the blocks read from the request stream and the data file
+BLOCK_SIZE = 1024 * 1024
+
+
+class UploadManager:
+    """
+    Manages chunked, resumable uploads stored in an upload directory.
+
+    Attributes:
+        upload_dir (str): The root directory of the uploads in progress.
+        chunk_size (int): The default size of a chunk in bytes.
+        max_chunk_size (int): The largest chunk size a client can request.
+        max_age (int): Seconds of inactivity after which an upload is removed by `cleanup`.
+
+    Methods:
+        create(uuid, relative_path, filename, size, checksum, chunk_size, options): Starts or
+            resumes an upload.
+        get(uuid, upload_id): Retrieves the state of an upload.
+        write_chunk(uuid, upload_id, index, stream, checksum): Streams a chunk to disk.
+        finalize(uuid, upload_id): Verifies a complete upload and returns its data file.
+        remove(uuid, upload_id): Removes an upload.
+        cleanup(): Removes inactive uploads.
+    """
+
+    def __init__(
+        self,
+        upload_dir,
+        chunk_size=8 * 1024**2,
+        max_chunk_size=64 * 1024**2,
+        max_age=7 * 24 * 3600,
+    ):
+        """
+        Initializes the UploadManager.
+
+        Args:
+            upload_dir (str): The root directory of the uploads in progress.
+            chunk_size (int): The default size of a chunk in bytes. Defaults to 8 MiB.
+            max_chunk_size (int): The largest chunk size a client can request. Defaults to 64 MiB.
+            max_age (int): Seconds of inactivity after which an upload is removed. Defaults to
+                one week.
+        """
+        self.upload_dir = upload_dir
+        self.chunk_size = chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.max_age = max_age
+
+    def _get_upload_dir(self, uuid, upload_id):
+        """
+        Constructs the directory of an upload.
+
+        Args:
+            uuid (str): The unique identifier for the user.
+            upload_id (str): The identifier of the upload.
+
+        Returns:
+            str: The directory holding the manifest, data file and chunk markers of the upload.
+
+        Raises:
+            ValueError: If the upload ID is malformed.
+        """
+        if not upload_id.isalnum():
+            raise ValueError(f"Invalid upload ID '{upload_id}'")
+        return os.path.join(self.upload_dir, uuid, upload_id)
+
+    def _get_status(self, upload_dir):
+        """
+        Reads the manifest of an upload and adds the chunks received so far.
+
+        Args:
+            upload_dir (str): The directory of the upload.
+
+        Returns:
+            dict: The state of the upload.
+
+        Raises:
+            FileNotFoundError: If the upload does not exist.
+        """
+        with open(os.path.join(upload_dir, "manifest.json"), "r", encoding="utf-8") as file:
+            status = json.load(file)
+
+        status["receivedChunks"] = sorted(
+            int(marker) for marker in os.listdir(os.path.join(upload_dir, "chunks"))
+        )
+        return status
+
+    def create(
+        self,
+        uuid,
+        relative_path,
+        filename,
+        size,
+        checksum=None,
+        chunk_size=None,
+        options=None,
+    ):
+        """
+        Starts an upload, or resumes it if the same file was announced before.
+
+        Args:
+            uuid (str): The unique identifier for the user.
+            relative_path (str): The folder within the workspace the file is uploaded to.
+            filename (str): The name of the uploaded file.
+            size (int): The size of the whole file in bytes.
+            checksum (str, optional): The SHA-256 hex digest of the whole file.
+            chunk_size (int, optional): The requested chunk size in bytes.
+            options (dict, optional): Options stored with the upload and used on finalize.
+
+        Returns:
+            dict: The state of the upload, including `uploadId`, `chunkSize`, `totalChunks` and
+                `receivedChunks`.
+
+        Raises:
+            ValueError: If the size or chunk size is invalid.
+        """
+        if not isinstance(size, int) or size < 0:
+            raise ValueError("'size' must be a non-negative integer")
+
+        chunk_size = min(chunk_size or self.chunk_size, self.max_chunk_size)
+        if chunk_size <= 0:
+            raise ValueError("'chunkSize' must be a positive integer")
+
+        key = json.dumps([relative_path, filename, size, checksum, chunk_size])
+        upload_id = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        upload_dir = self._get_upload_dir(uuid, upload_id)
+
+        try:
+            return self._get_status(upload_dir)
+        except FileNotFoundError:
+            pass
+
+        # Build the upload in a temporary directory, so that it appears complete to other workers
+        temp_upload_dir = f"{upload_dir}.{os.getpid()}.part"
+        shutil.rmtree(temp_upload_dir, ignore_errors=True)
+        os.makedirs(os.path.join(temp_upload_dir, "chunks"))
+
+        # Preallocate the data file, chunks are written at their offsets
+        with open(os.path.join(temp_upload_dir, "data"), "wb") as file:
+            file.truncate(size)
+
+        manifest = {
+            "uploadId": upload_id,
+            "path": relative_path,
+            "filename": filename,
+            "size": size,
+            "checksum": checksum,
+            "chunkSize": chunk_size,
+            "totalChunks": max(1, -(-size // chunk_size)),
+            "options": options or {},
+        }
+        with open(os.path.join(temp_upload_dir, "manifest.json"), "w", encoding="utf-8") as file:
+            json.dump(manifest, file)
+
+        try:
+            os.rename(temp_upload_dir, upload_dir)
+        except OSError:
+            # Another worker created the same upload in the meantime
+            shutil.rmtree(temp_upload_dir, ignore_errors=True)
+
+        return self._get_status(upload_dir)
+
+    def get(self, uuid, upload_id):
+        """
+        Retrieves the state of an upload.
+
+        Args:
+            uuid (str): The unique identifier for the user.
+            upload_id (str): The identifier of the upload.
+
+        Returns:
+            dict: The state of the upload.
+
+        Raises:
+            FileNotFoundError: If the upload does not exist.
+        """
+        return self._get_status(self._get_upload_dir(uuid, upload_id))
+
+    def write_chunk(self, uuid, upload_id, index, stream, checksum):
+        """
+        Streams a chunk to its offset in the data file and verifies its checksum.
+
+        The chunk is recorded as received only when its size and SHA-256 match, so a chunk
+        interrupted by a disconnect is simply sent again.
+
+        Args:
+            uuid (str): The unique identifier for the user.
+            upload_id (str): The identifier of the upload.
+            index (int): The index of the chunk.
+            stream (file-like): The stream to read the chunk from.
+            checksum (str): The SHA-256 hex digest of the chunk.
+
+        Returns:
+            dict: The state of the upload.
+
+        Raises:
+            FileNotFoundError: If the upload does not exist.
+            ValueError: If the index is out of range or the size or checksum does not match.
+        """
+        upload_dir = self._get_upload_dir(uuid, upload_id)
+        status = self._get_status(upload_dir)
+
+        if not 0 <= index < status["totalChunks"]:
+            raise ValueError(f"Chunk index {index} is out of range")
+
+        offset = index * status["chunkSize"]
+        expected_size = min(status["chunkSize"], status["size"] - offset)
+
+        digest = hashlib.sha256()
+        written = 0
+        fd = os.open(os.path.join(upload_dir, "data"), os.O_WRONLY)
+        try:
+            while written <= expected_size:
+                block = stream.read(BLOCK_SIZE)
+                if not block:
+                    break
+                block = block[: expected_size + 1 - written]
+                digest.update(block)
+                if written + len(block) <= expected_size:
+                    os.pwrite(fd, block, offset + written)
+                written += len(block)
+        finally:
+            os.close(fd)
+
+        if written != expected_size:
+            raise ValueError(
+                f"Chunk {index} has {written} bytes, expected {expected_size} bytes"
+            )
+        if (checksum or "").lower() != digest.hexdigest():
+            raise ValueError(f"Checksum mismatch for chunk {index}")
+
+        with open(os.path.join(upload_dir, "chunks", str(index)), "w", encoding="utf-8"):
+            pass
+        status["receivedChunks"] = sorted(set(status["receivedChunks"]) | {index})
+
+        return status
+
+    def finalize(self, uuid, upload_id):
+        """
+        Verifies that an upload is complete and returns its data file.
+
+        Args:
+            uuid (str): The unique identifier for the user.
+            upload_id (str): The identifier of the upload.
+
+        Returns:
+            tuple: The state of the upload and the path of the assembled data file. The caller is
+                expected to move the data file and then `remove` the upload.
+
+        Raises:
+            FileNotFoundError: If the upload does not exist.
+            ValueError: If chunks are missing or the whole file checksum does not match.
+        """
+        upload_dir = self._get_upload_dir(uuid, upload_id)
+        status = self._get_status(upload_dir)
+
+        missing = sorted(set(range(status["totalChunks"])) - set(status["receivedChunks"]))
+        if missing:
+            raise ValueError(f"Upload is incomplete, missing chunks: {missing[:20]}")
+
+        data_path = os.path.join(upload_dir, "data")
+        digest = hashlib.sha256()
+        with open(data_path, "rb") as file:
+            while block := file.read(BLOCK_SIZE):
+                digest.update(block)
+
+        if status["checksum"] and status["checksum"].lower() != digest.hexdigest():
+            raise ValueError("Checksum mismatch for the uploaded file")
+
+        status["checksum"] = digest.hexdigest()
+        return status, data_path
+
+    def remove(self, uuid, upload_id):
+        """
+        Removes an upload.
+
+        Args:
+            uuid (str): The unique identifier for the user.
+            upload_id (str): The identifier of the upload.
+
+        Returns:
+            None
+        """
+        shutil.rmtree(self._get_upload_dir(uuid, upload_id), ignore_errors=True)
+
+    def cleanup(self):
+        """
+        Removes uploads which have not received a chunk within `max_age` seconds.
+
+        Returns:
+            None
+        """
+        os.makedirs(self.upload_dir, exist_ok=True)
+
+        now = time.time()
+        for uuid in os.listdir(self.upload_dir):
+            user_upload_dir = os.path.join(self.upload_dir, uuid)
+            for upload_id in os.listdir(user_upload_dir):
+                upload_dir = os.path.join(user_upload_dir, upload_id)
+                try:
+                    # Adding a chunk marker updates the modification time of the chunks directory
+                    last_activity = os.path.getmtime(os.path.join(upload_dir, "chunks"))
+                except FileNotFoundError:
+                    last_activity = 0
+                if now - last_activity > self.max_age:
+                    shutil.rmtree(upload_dir, ignore_errors=True)
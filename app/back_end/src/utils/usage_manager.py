@@ -0,0 +1,205 @@
+"""
+This module provides the `UsageManager` class for accounting per-user disk usage using Redis.
+
+The `UsageManager` class is responsible for:
+- Keeping a disk usage counter per user UUID, updated incrementally by every write path.
+- Enforcing soft and hard quotas before writes start.
+- Periodically reconciling the counters with the actual disk usage by walking the user's
+    workspace and derived artifacts.
+
+Counters live in Redis, so they are shared by all workers and updating them costs a single
+`INCRBY` per write. Reconciliation walks the disk, so it runs in the background on the gevent
+thread pool and never delays the request which found the counter due; a single worker claims it.
+
+Dependencies:
+- redis: Python Redis client for interacting with the Redis store.
+- gevent: Native thread pool running reconciliations in the background.
+
+Usage:
+    usage_manager = UsageManager(
+        workspace_dir, artifacts_dir, redis_url="redis://localhost:6379/0"
+    )
+    usage_manager.check(uuid, expected_bytes)
+    usage_manager.record(uuid, delta)
+"""
+
+# pylint: disable=import-error
+
+import os
+import gevent
+import redis
+
+from .exceptions import QuotaExceededError
+
+
+class UsageManager:
+    """
+    Manages per-user disk usage counters and quotas using Redis as a backend.
+
+    Attributes:
+        redis (StrictRedis): A Redis client for interacting with the Redis store.
+        namespace (str): A namespace used as a prefix for Redis keys to avoid key collisions.
+        workspace_dir (str): The root directory of all user workspaces.
+        artifacts_dir (str): The root directory of the derived artifacts, mirroring the
+            workspace layout.
+        soft_quota (int): Usage in bytes above which writes succeed with a warning.
+        hard_quota (int): Usage in bytes above which writes are rejected.
+        reconcile_interval (int): Seconds after which a counter is reconciled with the disk.
+
+    Methods:
+        get_usage(uuid): Retrieves the disk usage of a user, scheduling a reconciliation when due.
+        record(uuid, delta): Adds a change in bytes to the usage of a user.
+        check(uuid, expected_bytes): Enforces the quotas before a write.
+        reconcile(uuid): Walks the user's directories and corrects the counter.
+    """
+
+    def __init__(
+        self,
+        workspace_dir,
+        artifacts_dir,
+        redis_url="redis://localhost:6379/0",
+        namespace="workspace_usage",
+        soft_quota=8 * 1024**3,
+        hard_quota=10 * 1024**3,
+        reconcile_interval=3600,
+    ):
+        """
+        Initializes the UsageManager with a connection to a Redis instance and quota settings.
+
+        Args:
+            workspace_dir (str): The root directory of all user workspaces.
+            artifacts_dir (str): The root directory of the derived artifacts.
+            redis_url (str): The URL of the Redis instance to connect to. Defaults
+                to "redis://localhost:6379/0".
+            namespace (str): The namespace used as a prefix for Redis keys. Defaults to
+                "workspace_usage".
+            soft_quota (int): Usage in bytes above which writes succeed with a warning. Defaults
+                to 8 GiB.
+            hard_quota (int): Usage in bytes above which writes are rejected. Defaults to 10 GiB.
+            reconcile_interval (int): Seconds after which a counter is reconciled with the disk.
+                Defaults to one hour.
+        """
+        self.redis = redis.StrictRedis.from_url(redis_url)
+        self.namespace = namespace
+        self.workspace_dir = workspace_dir
+        self.artifacts_dir = artifacts_dir
+        self.soft_quota = soft_quota
+        self.hard_quota = hard_quota
+        self.reconcile_interval = reconcile_interval
+
+    def _get_redis_key(self, uuid):
+        """
+        Constructs the Redis key holding the usage counter of a user.
+
+        Args:
+            uuid (str): The unique identifier for the user.
+
+        Returns:
+            str: The Redis key of the usage counter.
+        """
+        return f"{self.namespace}:{uuid}"
+
+    def _get_reconciled_redis_key(self, uuid):
+        """
+        Constructs the Redis key marking a recently reconciled usage counter.
+
+        Args:
+            uuid (str): The unique identifier for the user.
+
+        Returns:
+            str: The Redis key, expiring after the reconcile interval.
+        """
+        return f"{self.namespace}_reconciled:{uuid}"
+
+    def get_usage(self, uuid):
+        """
+        Retrieves the disk usage of a user.
+
+        When the counter does not exist yet or the reconcile interval has passed since the last
+        reconciliation, a reconciliation is claimed and scheduled in the background. The current
+        counter is returned meanwhile, so a missing counter reads as no usage until the first
+        reconciliation completes.
+
+        Args:
+            uuid (str): The unique identifier for the user.
+
+        Returns:
+            int: The disk usage of the user in bytes.
+        """
+        # Claim the reconciliation, so that only one request across all workers schedules it
+        if self.redis.set(
+            self._get_reconciled_redis_key(uuid), 1, ex=self.reconcile_interval, nx=True
+        ):
+            gevent.get_hub().threadpool.spawn(self.reconcile, uuid)
+
+        usage = self.redis.get(self._get_redis_key(uuid))
+        return int(usage) if usage is not None else 0
+
+    def record(self, uuid, delta):
+        """
+        Adds a change in bytes to the usage counter of a user.
+
+        Args:
+            uuid (str): The unique identifier for the user.
+            delta (int): The change in bytes, negative for freed space.
+
+        Returns:
+            None
+        """
+        if delta:
+            self.redis.incrby(self._get_redis_key(uuid), int(delta))
+
+    def check(self, uuid, expected_bytes=0):
+        """
+        Enforces the quotas of a user before a write.
+
+        Args:
+            uuid (str): The unique identifier for the user.
+            expected_bytes (int): The number of bytes the write is expected to add, if known.
+
+        Returns:
+            bool: True if the soft quota is exceeded, otherwise False.
+
+        Raises:
+            QuotaExceededError: If the write would exceed the hard quota.
+        """
+        usage = self.get_usage(uuid)
+
+        if usage + expected_bytes > self.hard_quota:
+            raise QuotaExceededError(
+                f"Workspace disk quota exceeded ({usage} of {self.hard_quota} bytes used)"
+            )
+
+        return usage + expected_bytes > self.soft_quota
+
+    def reconcile(self, uuid):
+        """
+        Walks the user's workspace and derived artifacts and corrects the usage counter.
+
+        The counter is corrected by the difference between the walked usage and the counter read
+        before the walk, rather than overwritten, so that changes recorded concurrently by other
+        requests are kept.
+
+        Args:
+            uuid (str): The unique identifier for the user.
+
+        Returns:
+            int: The disk usage of the user in bytes.
+        """
+        counted = int(self.redis.get(self._get_redis_key(uuid)) or 0)
+
+        usage = 0
+        for directory in (self.workspace_dir, self.artifacts_dir):
+            for root, _, files in os.walk(os.path.join(directory, uuid)):
+                for file_name in files:
+                    try:
+                        usage += os.path.getsize(os.path.join(root, file_name))
+                    except FileNotFoundError:
+                        continue
+
+        pipeline = self.redis.pipeline()
+        pipeline.incrby(self._get_redis_key(uuid), usage - counted)
+        pipeline.set(self._get_reconciled_redis_key(uuid), 1, ex=self.reconcile_interval)
+        pipeline.execute()
+
+        return usage
@@ -0,0 +1,456 @@
+"""
+This module provides utilities for viewing and querying VCF files in the workspace.
+
+VCF files (`.vcf`, or `.vcf.gz` compressed with bgzip or gzip) are read page by page with the INFO
+field expanded into one column per key. The file is scanned once to build an index kept as a
+derived artifact of the file (kind `vcf:index`):
+- the INFO keys declared in the header or found in the records, which become columns,
+- a sparse row offset index, allowing to seek close to any row of a page,
+- a linear region index in the style of tabix: for every 16 kbp window of every chromosome, the
+  offset of the first record overlapping the window. A `chrom:start-end` query seeks to the window
+  of `start` and reads only the records up to `end`.
+
+Offsets are byte offsets for plain files and BGZF virtual offsets (the compressed offset of the
+block shifted by 16 bits, plus the offset within the decompressed block) for bgzip files. Plain gzip
+files cannot be seeked efficiently and are read from the start.
+
+Functions:
+- is_vcf_path: Checks whether a file name has a VCF extension.
+- parse_region: Parses a `chrom:start-end` region.
+- get_vcf_index: Returns the index of a VCF file, building it if necessary.
+- read_vcf_page: Reads a page of records with the INFO field expanded.
+- query_vcf_region: Reads a page of the records overlapping a region.
+"""
+
+import re
+import gzip
+import json
+import zlib
+import struct
+
+from ..setup.extensions import cache_manager, cold_storage_manager
+from .file_import import ROW_INDEX_INTERVAL, detect_compression
+
+# Extensions of VCF files
+VCF_EXTENSIONS = (".vcf", ".vcf.gz", ".vcf.bgz")
+
+# Size of the windows of the linear region index, as in tabix
+REGION_WINDOW_SHIFT = 14
+
+# Fixed columns preceding the INFO column
+VCF_FIXED_COLUMNS = ["CHROM", "POS", "ID", "REF", "ALT", "QUAL", "FILTER"]
+
+REGION_PATTERN = re.compile(r"^([^:\s]+)(?::([\d,]+)(?:-([\d,]+))?)?$")
+
+
+def is_vcf_path(path):
+    """
+    Check whether a file name has a VCF extension.
+
+    Args:
+        path (str): The path or name of the file.
+
+    Returns:
+        bool: True if the file is a plain or compressed VCF file.
+    """
+    return path.lower().endswith(VCF_EXTENSIONS)
+
+
+def parse_region(region):
+    """
+    Parse a region given as `chrom`, `chrom:pos` or `chrom:start-end`.
+
+    Args:
+        region (str): The region, positions are 1-based and inclusive.
+
+    Returns:
+        tuple: The chromosome, start and end of the region.
+
+    Raises:
+        ValueError: If the region is malformed.
+    """
+    match = REGION_PATTERN.match(region.strip())
+    if not match:
+        raise ValueError(f"Invalid region '{region}', expected 'chrom:start-end'")
+
+    chrom, start, end = match.groups()
+    start = int(start.replace(",", "")) if start else 1
+    end = int(end.replace(",", "")) if end else (start if match.group(2) else 2**31 - 1)
+
+    if end < start:
+        raise ValueError(f"Invalid region '{region}', end is before start")
+
+    return chrom, start, end
+
+
+class _BgzfReader:
+    """
+    Line reader over a BGZF file with seeking to virtual offsets.
+
+    A BGZF file is a series of gzip members of at most 64 KiB of data each, whose compressed size is
+    stored in the `BC` extra subfield, so every block can be decompressed on its own.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")  # pylint: disable=consider-using-with
+        self._block_start = 0
+        self._next_block_start = 0
+        self._data = b""
+        self._position = 0
+        self._load_block(0)
+
+    def _load_block(self, block_start):
+        """
+        Load and decompress the block starting at a compressed offset.
+
+        Args:
+            block_start (int): The compressed offset of the block.
+
+        Returns:
+            None
+        """
+        self._file.seek(block_start)
+        header = self._file.read(18)
+        self._block_start = block_start
+        self._position = 0
+
+        if len(header) < 18:
+            self._data = b""
+            self._next_block_start = block_start
+            return
+
+        block_size = struct.unpack("<H", header[16:18])[0] + 1
+        compressed = self._file.read(block_size - 18)
+        # Raw deflate data between the header and the CRC32 and size trailer
+        self._data = zlib.decompressobj(-15).decompress(compressed[:-8])
+        self._next_block_start = block_start + block_size
+
+    def tell(self):
+        """
+        Return the virtual offset of the current position.
+
+        Returns:
+            int: The virtual offset.
+        """
+        return (self._block_start << 16) | self._position
+
+    def seek(self, offset):
+        """
+        Move to a virtual offset.
+
+        Args:
+            offset (int): The virtual offset.
+
+        Returns:
+            None
+        """
+        self._load_block(offset >> 16)
+        self._position = offset & 0xFFFF
+
+    def readline(self):
+        """
+        Read a line, crossing block boundaries as needed.
+
+        Returns:
+            bytes: The line including the line break, or an empty bytes object at the end.
+        """
+        parts = []
+        while True:
+            if self._position >= len(self._data):
+                if self._next_block_start == self._block_start:
+                    break
+                self._load_block(self._next_block_start)
+                continue
+
+            end = self._data.find(b"\n", self._position)
+            if end == -1:
+                parts.append(self._data[self._position :])
+                self._position = len(self._data)
+                continue
+
+            parts.append(self._data[self._position : end + 1])
+            self._position = end + 1
+            break
+
+        return b"".join(parts)
+
+    def close(self):
+        """
+        Close the underlying file.
+
+        Returns:
+            None
+        """
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _open_vcf(file_path):
+    """
+    Open a VCF file for reading lines with `readline`, `tell` and `seek`.
+
+    Args:
+        file_path (str): The path of the VCF file.
+
+    Returns:
+        file-like: A binary reader whose offsets are byte offsets, BGZF virtual offsets, or
+            decompressed offsets for plain gzip files and files compressed at rest.
+    """
+    if cold_storage_manager.is_cold(file_path):
+        return cold_storage_manager.open(file_path, "rb")
+
+    with open(file_path, "rb") as file:
+        compression = detect_compression(file.read(18))
+
+    if compression == "bgzip":
+        return _BgzfReader(file_path)
+    if compression == "gzip":
+        return gzip.open(file_path, "rb")
+    return open(file_path, "rb")  # pylint: disable=consider-using-with
+
+
+def _parse_info(info):
+    """
+    Parse an INFO field into a dictionary, flags are given the value `true`.
+
+    Args:
+        info (str): The INFO field.
+
+    Returns:
+        dict: The INFO values by key.
+    """
+    if info in ("", "."):
+        return {}
+
+    values = {}
+    for entry in info.split(";"):
+        key, separator, value = entry.partition("=")
+        values[key] = value if separator else "true"
+    return values
+
+
+def _build_vcf_index(file_path):
+    """
+    Scan a VCF file and build its index.
+
+    Args:
+        file_path (str): The path of the VCF file.
+
+    Returns:
+        dict: The `header` of the expanded view, the `infoKeys`, the number of `rows`, the
+            `rowOffsets`, the linear region index by chromosome (`regions`) and whether the
+            records are `sorted` by chromosome and position.
+    """
+    info_keys = {}
+    columns = VCF_FIXED_COLUMNS + ["INFO"]
+    rows = 0
+    offsets = []
+    regions = {}
+    sorted_records = True
+    last_chrom, last_pos = None, 0
+
+    with _open_vcf(file_path) as file:
+        while True:
+            offset = file.tell()
+            line = file.readline()
+            if not line:
+                break
+
+            text = line.decode("utf-8", errors="replace").rstrip("\r\n")
+            if text.startswith("##INFO=<"):
+                match = re.search(r"ID=([^,>]+)", text)
+                if match:
+                    info_keys.setdefault(match.group(1), None)
+                continue
+            if text.startswith("#CHROM"):
+                columns = text[1:].split("\t")
+                continue
+            if not text or text.startswith("#"):
+                continue
+
+            fields = text.split("\t", 8)
+            if len(fields) < 8:
+                continue
+
+            if rows % ROW_INDEX_INTERVAL == 0:
+                offsets.append(offset)
+            rows += 1
+
+            for key in _parse_info(fields[7]):
+                info_keys.setdefault(key, None)
+
+            chrom, pos, ref = fields[0], int(fields[1]), fields[3]
+            if chrom != last_chrom:
+                if chrom in regions:
+                    sorted_records = False
+                regions.setdefault(chrom, [])
+            elif pos < last_pos:
+                sorted_records = False
+            last_chrom, last_pos = chrom, pos
+
+            # Record the first record overlapping every window the record spans
+            windows = regions[chrom]
+            first_window = (pos - 1) >> REGION_WINDOW_SHIFT
+            last_window = (pos + max(len(ref), 1) - 2) >> REGION_WINDOW_SHIFT
+            if len(windows) <= last_window:
+                windows.extend([None] * (last_window + 1 - len(windows)))
+            for window in range(first_window, last_window + 1):
+                if windows[window] is None:
+                    windows[window] = offset
+
+    info_keys = list(info_keys)
+    return {
+        "header": columns[:7] + info_keys + columns[8:],
+        "infoKeys": info_keys,
+        "rows": rows,
+        "rowOffsets": offsets,
+        "regions": regions,
+        "sorted": sorted_records,
+    }
+
+
+def get_vcf_index(file_path):
+    """
+    Return the index of a VCF file, building it if necessary.
+
+    Args:
+        file_path (str): The path of the VCF file.
+
+    Returns:
+        dict: The index of the file, see `_build_vcf_index`.
+    """
+    index_path = cache_manager.get(file_path, "vcf:index")
+    if index_path is not None:
+        with open(index_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    index = _build_vcf_index(file_path)
+    with cache_manager.build(file_path, "vcf:index") as temp_path:
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(index, file)
+
+    return index
+
+
+def _expand_record(fields, info_keys):
+    """
+    Expand the INFO field of a record into one value per INFO key.
+
+    Args:
+        fields (list): The fields of the record.
+        info_keys (list): The INFO keys of the expanded view.
+
+    Returns:
+        list: The fixed fields, the INFO values and the FORMAT and sample fields.
+    """
+    info = _parse_info(fields[7]) if len(fields) > 7 else {}
+    return fields[:7] + [info.get(key, "") for key in info_keys] + fields[8:]
+
+
+def _iter_records(file):
+    """
+    Iterate over the records of a VCF file from its current position.
+
+    Args:
+        file (file-like): The reader returned by `_open_vcf`.
+
+    Yields:
+        list: The fields of every record.
+    """
+    while line := file.readline():
+        text = line.decode("utf-8", errors="replace").rstrip("\r\n")
+        if text and not text.startswith("#"):
+            fields = text.split("\t")
+            if len(fields) >= 8:
+                yield fields
+
+
+def read_vcf_page(file_path, index, start_row, count):
+    """
+    Read a page of records with the INFO field expanded.
+
+    Args:
+        file_path (str): The path of the VCF file.
+        index (dict): The index returned by `get_vcf_index`.
+        start_row (int): The index of the first record of the page.
+        count (int): The number of records of the page.
+
+    Returns:
+        list: The expanded records of the page.
+    """
+    if start_row >= index["rows"] or count <= 0:
+        return []
+
+    block = start_row // ROW_INDEX_INTERVAL
+    skip = start_row - block * ROW_INDEX_INTERVAL
+
+    rows = []
+    with _open_vcf(file_path) as file:
+        file.seek(index["rowOffsets"][block])
+        for fields in _iter_records(file):
+            if skip:
+                skip -= 1
+                continue
+            rows.append(_expand_record(fields, index["infoKeys"]))
+            if len(rows) == count:
+                break
+
+    return rows
+
+
+def query_vcf_region(file_path, index, region, start_row, count):
+    """
+    Read a page of the records overlapping a region.
+
+    With sorted records, reading starts at the first record overlapping the window of the region
+    start and stops after the region end. Unsorted files are scanned in full.
+
+    Args:
+        file_path (str): The path of the VCF file.
+        index (dict): The index returned by `get_vcf_index`.
+        region (str): The region, as accepted by `parse_region`.
+        start_row (int): The index of the first overlapping record of the page.
+        count (int): The number of records of the page.
+
+    Returns:
+        tuple: The expanded records of the page and the total number of overlapping records.
+
+    Raises:
+        ValueError: If the region is malformed.
+    """
+    chrom, start, end = parse_region(region)
+
+    windows = index["regions"].get(chrom)
+    if not windows:
+        return [], 0
+
+    offset = None
+    if index["sorted"]:
+        window = (start - 1) >> REGION_WINDOW_SHIFT
+        offset = next((offset for offset in windows[window:] if offset is not None), None)
+        if offset is None:
+            return [], 0
+
+    rows = []
+    total = 0
+    with _open_vcf(file_path) as file:
+        if offset is not None:
+            file.seek(offset)
+
+        for fields in _iter_records(file):
+            pos = int(fields[1])
+            if fields[0] != chrom or pos < start - len(fields[3]) + 1 or pos > end:
+                if index["sorted"] and (fields[0] != chrom or pos > end):
+                    break
+                continue
+
+            if start_row <= total < start_row + count:
+                rows.append(_expand_record(fields, index["infoKeys"]))
+            total += 1
+
+    return rows, total
@@ -2,7 +2,7 @@ import { useStatusContext } from '@/hooks';
 import { socket } from '@/lib';
 import { Events } from '@/types';
 import { Done as DoneIcon, Error as ErrorIcon } from '@mui/icons-material';
-import { alpha, Box, Button, CircularProgress, Typography, useTheme } from '@mui/material';
+import { alpha, Box, Button, CircularProgress, MenuItem, Select, Typography, useTheme } from '@mui/material';
 import {
   GridToolbarColumnsButton,
   GridToolbarContainer,
@@ -14,6 +14,10 @@ import { useEffect, useState } from 'react';
 
 interface EditorToolbarProps extends GridToolbarProps, ToolbarPropsOverrides {
   handleSave: () => void;
+  table?: string;
+  tables?: string[];
+  readOnly?: boolean;
+  handleTableChange?: (table: string) => void;
 }
 
 /**
@@ -24,6 +28,9 @@ interface EditorToolbarProps extends GridToolbarProps, ToolbarPropsOverrides {
  * The save button displays a spinner during save operations and shows success or error icons based on the result. The component
  * listens to the `workspace_file_update_status` event from a socket connection to update the save status.
  *
+ * Files made of several tables (LOVD downloads) show a table selector. Read-only files (LOVD downloads and VCF files)
+ * cannot be saved.
+ *
  * The toolbar uses Material-UI components for styling and layout, including `GridToolbarContainer` for organizing the buttons,
  * and `Box` for layout adjustments. It supports a `disabled` prop to control the button's disabled state and a `handleSave` function
  * prop that is triggered when the "Save" button is clicked.
@@ -44,10 +51,14 @@ interface EditorToolbarProps extends GridToolbarProps, ToolbarPropsOverrides {
  * @param {Object} props - The props for the EditorToolbar component.
  * @param {boolean} [props.disabled] - Optional flag to disable the save button.
  * @param {function} props.handleSave - Function to be called when the "Save" button is clicked.
+ * @param {string} [props.table] - Optional name of the displayed table of a multi-table file.
+ * @param {string[]} [props.tables] - Optional names of all tables of a multi-table file.
+ * @param {boolean} [props.readOnly] - Optional flag to disable saving a read-only file.
+ * @param {function} [props.handleTableChange] - Optional function to be called when another table is selected.
  *
  * @returns {JSX.Element} The rendered toolbar component with buttons for DataGrid actions and a save button with status feedback.
  */
-export const EditorToolbar: React.FC<EditorToolbarProps> = ({ handleSave }) => {
+export const EditorToolbar: React.FC<EditorToolbarProps> = ({ handleSave, table, tables, readOnly, handleTableChange }) => {
   const [isSaving, setIsSaving] = useState(false);
   const [saveStatus, setSaveStatus] = useState(true);
 
@@ -72,6 +83,22 @@ export const EditorToolbar: React.FC<EditorToolbarProps> = ({ handleSave }) => {
       {/* <GridToolbarFilterButton /> */}
       <GridToolbarDensitySelector />
       {/* <GridToolbarExport /> */}
+      {tables && tables.length > 0 && (
+        <Select
+          value={table || ''}
+          onChange={(event) => handleTableChange && handleTableChange(event.target.value)}
+          disabled={blocked}
+          size='small'
+          variant='standard'
+          sx={{ fontSize: '0.9rem', ml: '0.5rem' }}
+        >
+          {tables.map((name) => (
+            <MenuItem key={name} value={name}>
+              {name}
+            </MenuItem>
+          ))}
+        </Select>
+      )}
       <Box sx={{ flexGrow: 1 }} />
       {unsaved && (
         <Typography sx={{ fontSize: '0.9rem', color: alpha(Theme.palette.text.primary, 0.5), pr: '0.5rem' }}>
@@ -85,7 +112,7 @@ export const EditorToolbar: React.FC<EditorToolbarProps> = ({ handleSave }) => {
           handleSave();
           unsavedStateUpdate(false);
         }}
-        disabled={blocked}
+        disabled={blocked || readOnly}
         startIcon={
           isSaving ? (
             <CircularProgress size={16} sx={{ color: Theme.palette.primary.main }} />
@@ -64,6 +64,7 @@ export const EditorView: React.FC = () => {
     rows: [],
     page: 0,
   });
+  const [table, setTable] = useState<string | undefined>(undefined);
 
   const { connected } = useSessionContext();
   const { file, fileContent, filePagination, fileStateUpdate } = useWorkspaceContext();
@@ -168,6 +169,7 @@ export const EditorView: React.FC = () => {
           page: filePagination.page,
           rowsPerPage: filePagination.rowsPerPage,
           sorts: JSON.stringify(fileContent.sorts),
+          table: table,
         },
       });
 
@@ -178,15 +180,16 @@ export const EditorView: React.FC = () => {
       setIsLoading(false);
       blockedStateUpdate(false);
     }
-  }, [filePagination.page, filePagination.rowsPerPage, fileContent.sorts]);
+  }, [filePagination.page, filePagination.rowsPerPage, fileContent.sorts, table]);
 
   // File content fetching effect
   useEffect(() => {
     if (connected) getWorkspaceFile();
   }, [connected, getWorkspaceFile]);
 
-  // Aggregation reset effect
+  // Aggregation and table reset effect
   useEffect(() => {
+    setTable(undefined);
     fileStateUpdate(
       undefined,
       { columns: fileContent.columns, rows: fileContent.rows, aggregations: {}, sorts: {} },
@@ -307,7 +310,25 @@ export const EditorView: React.FC = () => {
           }
         }}
         slots={{
-          toolbar: (props) => <EditorToolbar {...props} disabled={blocked || !file.id} handleSave={handleSave} />,
+          toolbar: (props) => (
+            <EditorToolbar
+              {...props}
+              disabled={blocked || !file.id}
+              handleSave={handleSave}
+              table={fileContentResponse.table}
+              tables={fileContentResponse.tables}
+              readOnly={fileContentResponse.readOnly}
+              handleTableChange={(value) => {
+                setTable(value);
+                fileStateUpdate(undefined, undefined, {
+                  page: 0,
+                  rowsPerPage: filePagination.rowsPerPage,
+                  totalRows: filePagination.totalRows,
+                });
+                setPaginationModel({ page: 0, pageSize: filePagination.rowsPerPage });
+              }}
+            />
+          ),
           columnMenu: (props) => (
             <EditorColumnMenu
               {...props}
@@ -117,6 +117,13 @@ export const FileTreeItemContextMenu: React.FC<FileTreeItemContextMenuProps> = (
         Import...
       </MenuItem>
     );
+    if (item.fileType === FileTypes.FOLDER) {
+      menuItems.push(
+        <MenuItem key='export' onClick={() => handleActionContextMenu('export')}>
+          Export as ZIP...
+        </MenuItem>
+      );
+    }
   } else {
     menuItems.push(
       <MenuItem key='export' onClick={handleExportClick}>
@@ -201,12 +208,15 @@ export const FileTreeItemContextMenu: React.FC<FileTreeItemContextMenuProps> = (
 
   const handleExport = useCallback(async () => {
     try {
+      const isFolder = item.fileType === FileTypes.FOLDER;
       const response = await axios.get(`${Endpoints.WORKSPACE_EXPORT}/${item.id}`, {
         responseType: 'blob',
+        params: isFolder ? { archive: 'zip' } : undefined,
       });
       const url = window.URL.createObjectURL(new Blob([response.data]));
 
-      const fileName = item.id.match(/[^/\\]+$/)?.[0] || item.id; // Extracts only the file name, otherwise uses the full path
+      const name = item.id.match(/[^/\\]+$/)?.[0] || item.id; // Extracts only the file name, otherwise uses the full path
+      const fileName = isFolder ? `${name}.zip` : name;
 
       const link = Object.assign(document.createElement('a'), {
         href: url,
@@ -1,9 +1,7 @@
 import { FileTreeItemContextMenuStyledDialog } from '@/features/editor/components/fileTreeView/fileTreeItem';
 import { useWorkspaceContext } from '@/features/editor/hooks';
 import { FileTreeViewItemProps } from '@/features/editor/types';
-import { doesFileExist, findUniqueFileName, getFileExtension } from '@/features/editor/utils';
-import { axios } from '@/lib';
-import { Endpoints } from '@/types';
+import { doesFileExist, findUniqueFileName, getFileExtension, uploadFileInChunks } from '@/features/editor/utils';
 import { Close as CloseIcon, UploadFile as UploadFileIcon } from '@mui/icons-material';
 import {
   Box,
@@ -53,8 +51,13 @@ export const FileTreeItemContextMenuFileImportDialog: React.FC<FileTreeItemConte
 
     const filePath = item.id === '' ? selectedFile.name : `${item.id}/${selectedFile.name}`;
 
-    const fileExtension = getFileExtension(selectedFile.name);
-    if (fileExtension !== 'csv' && fileExtension !== 'txt') {
+    // Archives are extracted into the folder, their members are validated on the server
+    if (/\.(zip|tar|tar\.gz|tgz|tar\.zst)$/i.test(selectedFile.name)) {
+      return;
+    }
+
+    const fileExtension = getFileExtension(selectedFile.name.replace(/\.(gz|bgz|zst)$/i, ''));
+    if (!['csv', 'txt', 'tsv', 'vcf'].includes(fileExtension)) {
       setIsIncorrectFileType(true);
       return;
     }
@@ -75,17 +78,8 @@ export const FileTreeItemContextMenuFileImportDialog: React.FC<FileTreeItemConte
       return;
     }
 
-    const formData = new FormData();
-    formData.append('file', file);
-
     try {
-      const url = item.id ? `${Endpoints.WORKSPACE_IMPORT}/${item.id}` : Endpoints.WORKSPACE_IMPORT;
-
-      await axios.post(url, formData, {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-        },
-      });
+      await uploadFileInChunks(file, item.id);
 
       onClose();
     } catch (error) {
@@ -131,7 +125,7 @@ export const FileTreeItemContextMenuFileImportDialog: React.FC<FileTreeItemConte
             sx={{ width: '100%', marginRight: '1rem' }}
           >
             Select a file...
-            <input type='file' accept='.csv, .txt' hidden onChange={handleFileChange} />
+            <input type='file' accept='.csv, .txt, .tsv, .vcf, .gz, .bgz, .zst, .zip, .tar, .tgz' hidden onChange={handleFileChange} />
           </Button>
           <Typography style={{ fontSize: '1rem', marginTop: '0.5rem', wordWrap: 'break-word' }}>
             {filename !== '' && (
@@ -149,7 +143,9 @@ export const FileTreeItemContextMenuFileImportDialog: React.FC<FileTreeItemConte
         {isIncorrectFileType && (
           <Typography sx={{ fontSize: '1rem', color: Theme.palette.error.main, mt: '1rem' }}>
             <b>Incorrect file extension!</b>
-            <br /> Accepted file extensions: '<b>.csv</b>', '<b>.txt</b>'
+            <br /> Accepted file extensions: '<b>.csv</b>', '<b>.txt</b>', '<b>.tsv</b>', '<b>.vcf</b>', optionally
+            compressed: '<b>.gz</b>', '<b>.bgz</b>', '<b>.zst</b>', or archives of such files: '<b>.zip</b>',
+            '<b>.tar</b>', '<b>.tar.gz</b>', '<b>.tgz</b>', '<b>.tar.zst</b>'
           </Typography>
         )}
       </DialogContent>
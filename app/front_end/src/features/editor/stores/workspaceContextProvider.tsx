@@ -1,5 +1,5 @@
-import { ConsoleFeedback, FileContentModel, FileModel, FilePaginationModel, FileTypes } from '@/features/editor/types';
-import { getWorkspaceArray } from '@/features/editor/utils';
+import { ConsoleFeedback, FileContentModel, FileModel, FilePaginationModel, FileTypes, WorkspaceUpdateFeedback } from '@/features/editor/types';
+import { applyWorkspaceDelta, getWorkspaceArray } from '@/features/editor/utils';
 import { useSessionContext, useStatusContext } from '@/hooks';
 import { axios, socket } from '@/lib';
 import { Endpoints, Events } from '@/types';
@@ -185,6 +185,22 @@ export const WorkspaceContextProvider: React.FC<Props> = ({ children }) => {
     }
   }, []);
 
+  const updateWorkspace = useCallback(
+    (feedback?: WorkspaceUpdateFeedback) => {
+      // Apply the delta of a batch to the file tree, other updates fetch the whole workspace
+      const delta = feedback?.delta;
+      const updatedFileTree = Array.isArray(delta) ? applyWorkspaceDelta(fileTree, delta) : undefined;
+      if (!updatedFileTree) {
+        getWorkspace();
+        return;
+      }
+
+      setFileTree(updatedFileTree);
+      setFileTreeArray(getWorkspaceArray(updatedFileTree));
+    },
+    [fileTree, getWorkspace]
+  );
+
   //
   // Use effects for fetching data
   //
@@ -194,13 +210,16 @@ export const WorkspaceContextProvider: React.FC<Props> = ({ children }) => {
   // File tree fetching effect
   useEffect(() => {
     if (connected) getWorkspace();
+  }, [connected, getWorkspace]);
 
-    socket.on(Events.WORKSPACE_UPDATE_FEEDBACK_EVENT, getWorkspace);
+  // File tree updating effect
+  useEffect(() => {
+    socket.on(Events.WORKSPACE_UPDATE_FEEDBACK_EVENT, updateWorkspace);
 
     return () => {
       socket.off(Events.WORKSPACE_UPDATE_FEEDBACK_EVENT);
     };
-  }, [connected, getWorkspace]);
+  }, [updateWorkspace]);
 
   // Console feedback state
   const [consoleFeedback, setConsoleFeedback] = useState<ConsoleFeedback[]>([]);
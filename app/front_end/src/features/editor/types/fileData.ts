@@ -10,4 +10,9 @@ export type FileDataRequestDTO = FileData & {
 
 export type FileDataResponseDTO = FileData & {
   totalRows: number;
+  table?: string;
+  tables?: string[];
+  notes?: string[];
+  region?: string;
+  readOnly?: boolean;
 };
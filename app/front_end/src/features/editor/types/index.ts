@@ -11,4 +11,5 @@ export type { FileContentModel } from './models/fileContentModel';
 export type { FileContentSortModel } from './models/fileContentSortModel';
 export { FileTypes } from './models/fileModel';
 export type { FileModel } from './models/fileModel';
-export type { FilePaginationModel } from './models/filePaginationModel';
\ No newline at end of file
+export type { FilePaginationModel } from './models/filePaginationModel';
+export type { WorkspaceDelta, WorkspaceUpdateFeedback } from './workspaceDelta';
\ No newline at end of file
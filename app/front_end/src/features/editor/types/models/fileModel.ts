@@ -10,6 +10,7 @@ export enum FileTypes {
   // specific
   CSV = 'csv',
   TXT = 'txt',
+  VCF = 'vcf',
 }
 
 
@@ -0,0 +1,12 @@
+export type WorkspaceDelta = {
+  op: 'create' | 'rename' | 'move' | 'delete';
+  oldId?: string;
+  newId?: string;
+  newLabel?: string;
+  newType?: 'file' | 'folder';
+};
+
+export type WorkspaceUpdateFeedback = {
+  status: string;
+  delta?: WorkspaceDelta[] | object;
+};
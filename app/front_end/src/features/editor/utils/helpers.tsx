@@ -1,6 +1,8 @@
-import { FileModel, FileTreeViewItemProps, FileTypes } from '@/features/editor/types';
+import { FileModel, FileTreeViewItemProps, FileTypes, WorkspaceDelta } from '@/features/editor/types';
 import { Article as ArticleIcon, FolderRounded, InsertDriveFile as InsertDriveFileIcon } from '@mui/icons-material';
 import { TreeViewBaseItem } from '@mui/x-tree-view';
+import { axios } from '@/lib';
+import { Endpoints } from '@/types';
 
 export const isExpandable = (reactChildren: React.ReactNode) => {
   if (Array.isArray(reactChildren)) {
@@ -15,6 +17,8 @@ export const getIconFromFileType = (fileType: FileTypes) => {
       return ArticleIcon;
     case FileTypes.TXT:
       return ArticleIcon;
+    case FileTypes.VCF:
+      return ArticleIcon;
     case FileTypes.FOLDER:
       return FolderRounded;
     default:
@@ -91,6 +95,73 @@ export const getWorkspaceArray = (fileTreeView: TreeViewBaseItem<FileTreeViewIte
   return workspaceArray;
 };
 
+type FileTreeViewItem = TreeViewBaseItem<FileTreeViewItemProps>;
+
+// Mirrors the file types listed by the workspace route, unsupported files are not part of the tree
+const getFileTreeItemType = (label: string, type?: string): FileTypes | undefined => {
+  if (type === FileTypes.FOLDER) return FileTypes.FOLDER;
+  if (label.endsWith('.txt')) return FileTypes.TXT;
+  if (label.endsWith('.csv')) return FileTypes.CSV;
+  if (['.vcf', '.vcf.gz', '.vcf.bgz'].some((extension) => label.endsWith(extension))) return FileTypes.VCF;
+  return undefined;
+};
+
+const removeFileTreeItem = (fileTreeView: FileTreeViewItem[], id: string): [FileTreeViewItem[], FileTreeViewItem?] => {
+  const removed = fileTreeView.find((item) => item.id === id);
+  if (removed) return [fileTreeView.filter((item) => item !== removed), removed];
+
+  const parent = fileTreeView.find((item) => item.children && id.startsWith(`${item.id}/`));
+  if (!parent || !parent.children) return [fileTreeView, undefined];
+
+  const [children, child] = removeFileTreeItem(parent.children, id);
+  return [fileTreeView.map((item) => (item === parent ? { ...parent, children } : item)), child];
+};
+
+const insertFileTreeItem = (fileTreeView: FileTreeViewItem[], parentId: string, child: FileTreeViewItem): FileTreeViewItem[] | undefined => {
+  if (!parentId) return [...fileTreeView.filter((item) => item.id !== child.id), child];
+
+  const parent = fileTreeView.find((item) => item.id === parentId || parentId.startsWith(`${item.id}/`));
+  if (!parent || !parent.children) return undefined;
+
+  const children = insertFileTreeItem(parent.children, parent.id === parentId ? '' : parentId, child);
+  return children && fileTreeView.map((item) => (item === parent ? { ...parent, children } : item));
+};
+
+const moveFileTreeItem = (item: FileTreeViewItem, oldId: string, newId: string): FileTreeViewItem => ({
+  ...item,
+  id: newId + item.id.substring(oldId.length),
+  children: item.children?.map((child) => moveFileTreeItem(child, oldId, newId)),
+});
+
+/**
+ * Applies the delta of a workspace batch to the file tree, without fetching the whole workspace.
+ *
+ * @returns The updated file tree, or `undefined` if the delta does not match the file tree and the workspace must be fetched.
+ */
+export const applyWorkspaceDelta = (fileTreeView: FileTreeViewItem[], deltas: WorkspaceDelta[]): FileTreeViewItem[] | undefined => {
+  let updatedFileTreeView: FileTreeViewItem[] | undefined = fileTreeView;
+
+  for (const delta of deltas) {
+    let item: FileTreeViewItem | undefined;
+    if (delta.oldId) [updatedFileTreeView, item] = removeFileTreeItem(updatedFileTreeView, delta.oldId);
+    if (delta.op === 'delete' || !delta.newId || !delta.newLabel) continue;
+
+    const fileType = getFileTreeItemType(delta.newLabel, delta.newType);
+    if (!fileType) continue;
+
+    const child =
+      item && delta.oldId
+        ? { ...moveFileTreeItem(item, delta.oldId, delta.newId), label: delta.newLabel, fileType }
+        : { id: delta.newId, label: delta.newLabel, fileType, children: [] };
+    const parentId = delta.newId.includes('/') ? delta.newId.substring(0, delta.newId.lastIndexOf('/')) : '';
+
+    updatedFileTreeView = insertFileTreeItem(updatedFileTreeView, parentId, child);
+    if (!updatedFileTreeView) return undefined;
+  }
+
+  return updatedFileTreeView;
+};
+
 export const generateTimestamp = () => {
   const now = new Date();
   return (
@@ -107,3 +178,44 @@ export const generateTimestamp = () => {
     String(now.getSeconds()).padStart(2, '0')
   );
 };
+
+const toHex = (buffer: ArrayBuffer) =>
+  Array.from(new Uint8Array(buffer))
+    .map((byte) => byte.toString(16).padStart(2, '0'))
+    .join('');
+
+/**
+ * Uploads a file to the workspace in chunks.
+ *
+ * The upload is started (or resumed, if the same file was uploaded before and interrupted), only the chunks the server
+ * has not received yet are sent with their SHA-256 checksum, and a failed chunk is retried before the upload is finalized.
+ */
+export const uploadFileInChunks = async (file: File, path: string, attempts = 3) => {
+  const response = await axios.post(Endpoints.WORKSPACE_UPLOAD, { filename: file.name, size: file.size, path });
+  const { uploadId, chunkSize, totalChunks, receivedChunks } = response.data;
+  const received = new Set<number>(receivedChunks);
+
+  for (let index = 0; index < totalChunks; index++) {
+    if (received.has(index)) {
+      continue;
+    }
+
+    const chunk = await file.slice(index * chunkSize, (index + 1) * chunkSize).arrayBuffer();
+    const checksum = toHex(await crypto.subtle.digest('SHA-256', chunk));
+
+    for (let attempt = 1; ; attempt++) {
+      try {
+        await axios.put(`${Endpoints.WORKSPACE_UPLOAD}/${uploadId}/${index}`, chunk, {
+          headers: { 'Content-Type': 'application/octet-stream', checksum },
+        });
+        break;
+      } catch (error) {
+        if (attempt >= attempts) {
+          throw error;
+        }
+      }
+    }
+  }
+
+  await axios.post(`${Endpoints.WORKSPACE_UPLOAD}/${uploadId}`);
+};
@@ -1 +1 @@
-export { doesFileExist, findUniqueFileName, getFileExtension, getIconFromFileType, isExpandable, getWorkspaceArray, generateTimestamp } from './helpers';
+export { applyWorkspaceDelta, doesFileExist, findUniqueFileName, getFileExtension, getIconFromFileType, isExpandable, getWorkspaceArray, generateTimestamp, uploadFileInChunks } from './helpers';
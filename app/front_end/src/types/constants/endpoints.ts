@@ -22,6 +22,7 @@
  * @property {string} WORKSPACE_DELETE - The endpoint path for deleting items in the workspace.
  * @property {string} WORKSPACE_AGGREGATE - The endpoint path for aggregating workspace items.
  * @property {string} WORKSPACE_IMPORT - The endpoint path for importing workspace items.
+ * @property {string} WORKSPACE_UPLOAD - The endpoint path for chunked, resumable uploads of workspace items.
  * @property {string} WORKSPACE_EXPORT - The endpoint path for exporting workspace items.
  * @property {string} WORKSPACE_DOWNLOAD - The endpoint path for downloading workspace items.
  * @property {string} WORKSPACE_MERGE - The endpoint path for merging workspace items.
@@ -46,6 +47,7 @@ export const Endpoints = {
   WORKSPACE_DELETE: `/workspace/delete`,
   WORKSPACE_AGGREGATE: `/workspace/aggregate`,
   WORKSPACE_IMPORT: `/workspace/import`,
+  WORKSPACE_UPLOAD: `/workspace/upload`,
   WORKSPACE_EXPORT: `/workspace/export`,
   WORKSPACE_DOWNLOAD: `/workspace/download`,
   WORKSPACE_MERGE: `/workspace/merge`,
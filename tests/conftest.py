@@ -0,0 +1,23 @@
+"""
+Configuration of the tests of the back end.
+
+The tests import the `src` package of the back end as the server does, from `app/back_end`. The
+workspace of the server is resolved from the working directory, the tests run in a temporary one
+so that their files are kept out of the workspace of the checkout.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+BACK_END_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "back_end")
+sys.path.insert(0, BACK_END_DIR)
+
+WORKING_DIR = tempfile.mkdtemp(prefix="kath-tests-")
+os.chdir(WORKING_DIR)
+
+
+def pytest_unconfigure():
+    """Remove the temporary working directory and the workspace of the tests."""
+    shutil.rmtree(WORKING_DIR, ignore_errors=True)
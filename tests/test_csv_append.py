@@ -0,0 +1,99 @@
+"""
+Tests of appending rows to workspace CSV files without rewriting them.
+"""
+
+# pylint: disable=import-error
+
+import os
+import uuid as uuid_lib
+
+import pandas as pd
+import pytest
+
+from src.constants import WORKSPACE_DIR
+from src.setup.extensions import snapshot_manager
+from src.utils.csv_append import append_csv_batches
+
+BASE = pd.DataFrame({"a": [1, 2, None], "b": ["x", "y,z", "q\nr"]})
+NEW = pd.DataFrame({"b": ["n1", "n2"], "a": [5, 6]})
+
+
+@pytest.fixture(name="workspace_dir")
+def fixture_workspace_dir():
+    """The workspace of a new user."""
+    path = os.path.join(WORKSPACE_DIR, uuid_lib.uuid4().hex)
+    os.makedirs(path)
+    return path
+
+
+def _assert_concatenated(file_path, *frames):
+    """Assert that a CSV file holds the rows of concatenating frames."""
+    expected = pd.concat(frames, ignore_index=True)
+    actual = pd.read_csv(file_path)
+    assert list(actual.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(actual.astype(str), expected.astype(str))
+
+
+def test_append_same_columns(workspace_dir):
+    """Rows are appended after the existing rows, which are kept as they are."""
+    file_path = os.path.join(workspace_dir, "same.csv")
+    BASE.to_csv(file_path, index=False)
+    with open(file_path, "rb") as file:
+        before = file.read()
+
+    assert append_csv_batches(file_path, [NEW.iloc[:1], NEW.iloc[1:]]) == 2
+
+    _assert_concatenated(file_path, BASE, NEW)
+    with open(file_path, "rb") as file:
+        assert file.read().startswith(before)
+    assert len(snapshot_manager.list_versions(file_path)) == 1
+
+
+def test_append_new_columns(workspace_dir):
+    """New columns are added after the existing ones, the existing rows are padded."""
+    file_path = os.path.join(workspace_dir, "new.csv")
+    BASE.to_csv(file_path, index=False)
+
+    append_csv_batches(file_path, [NEW.assign(c=[7, 8])])
+
+    _assert_concatenated(file_path, BASE, NEW.assign(c=[7, 8]))
+
+
+def test_append_without_trailing_newline(workspace_dir):
+    """Rows are appended on their own lines to a file not ending with a newline."""
+    file_path = os.path.join(workspace_dir, "newline.csv")
+    with open(file_path, "w", encoding="utf-8") as file:
+        file.write("a,b\n1,x")
+
+    append_csv_batches(file_path, [NEW])
+
+    _assert_concatenated(file_path, pd.DataFrame({"a": [1], "b": ["x"]}), NEW)
+
+
+@pytest.mark.parametrize("content", [None, ""])
+def test_append_to_missing_or_empty_file(workspace_dir, content):
+    """Appending to a missing or empty file writes the rows with their header."""
+    file_path = os.path.join(workspace_dir, "created.csv")
+    if content is not None:
+        with open(file_path, "w", encoding="utf-8") as file:
+            file.write(content)
+
+    append_csv_batches(file_path, [NEW])
+
+    _assert_concatenated(file_path, NEW)
+
+
+def test_append_failure_keeps_file(workspace_dir):
+    """A failing batch leaves the file as it was."""
+    file_path = os.path.join(workspace_dir, "failure.csv")
+    BASE.to_csv(file_path, index=False)
+    size = os.path.getsize(file_path)
+
+    def batches():
+        yield NEW
+        raise ValueError("Batch cannot be read")
+
+    with pytest.raises(ValueError):
+        append_csv_batches(file_path, batches())
+
+    assert os.path.getsize(file_path) == size
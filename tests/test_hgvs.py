@@ -0,0 +1,94 @@
+"""
+Tests of the batch parsing and formatting of HGVS variant descriptions.
+"""
+
+# pylint: disable=import-error
+
+import pandas as pd
+
+from src.data.hgvs import HGVS_COLUMNS, format_hgvs, parse_hgvs, parse_hgvs_variant
+
+
+def test_parse_hgvs_variant_types():
+    """Every supported variant type is parsed into its positions, alleles and kind."""
+    variants = pd.Series([
+        "g.123A>G",
+        "g.100_102delACT",
+        "g.5dup",
+        "g.10_11insAT",
+        "g.20_22delinsAT",
+        "c.11+5_12-3inv",
+    ])
+
+    parsed = parse_hgvs(variants, "6")
+
+    assert list(parsed.columns) == HGVS_COLUMNS
+    assert parsed["kind"].tolist() == ["subst", "del", "dup", "ins", "delins", "inv"]
+    assert parsed["start"].tolist()[:5] == [123, 100, 5, 10, 20]
+    assert parsed["end"].tolist()[:5] == [123, 102, 5, 11, 22]
+    assert parsed.loc[0, ["ref", "alt"]].tolist() == ["A", "G"]
+    assert parsed.loc[1, "ref"] == "ACT"
+    assert parsed.loc[3, "alt"] == "AT"
+    assert parsed.loc[4, "alt"] == "AT"
+    # Intronic positions are not numbered, their location is kept as written
+    assert pd.isna(parsed.loc[5, "start"])
+    assert parsed.loc[5, "location"] == "11+5_12-3"
+    assert parsed.loc[5, "coordinate"] == "c"
+
+
+def test_parse_hgvs_reference_sequences():
+    """The chromosome is read from genomic accessions, ClinVar names are parsed."""
+    variants = pd.Series([
+        "NC_000006.12:g.100A>G",
+        "NC_000023.11:g.5A>C",
+        "NM_000329.3(RPE65):c.11A>G (p.Glu4Gly)",
+        "g.7C>T",
+    ])
+
+    parsed = parse_hgvs(variants, "6")
+
+    assert parsed["chrom"].tolist() == ["6", "X", "6", "6"]
+    assert parsed["coordinate"].tolist() == ["g", "g", "c", "g"]
+    assert parsed["start"].tolist() == [100, 5, 11, 7]
+
+
+def test_parse_hgvs_invalid_values():
+    """Invalid and missing descriptions give missing values, the index is kept."""
+    variants = pd.Series(["junk", None, "g.123A>G", "g.123A>G"], index=[10, 20, 30, 40])
+
+    parsed = parse_hgvs(variants, "6")
+
+    assert parsed.index.tolist() == [10, 20, 30, 40]
+    assert parsed.loc[[10, 20]].isna().all().all()
+    assert parsed.loc[30].equals(parsed.loc[40].rename(30))
+
+
+def test_format_hgvs_round_trip():
+    """Formatting parsed variants gives back the descriptions without reference sequence."""
+    variants = pd.Series([
+        "g.123A>G",
+        "NC_000006.12:g.100_102delACT",
+        "g.5dup",
+        "g.10_11insAT",
+        "g.20_22delinsAT",
+        "c.11+5_12-3inv",
+        None,
+    ])
+
+    formatted = format_hgvs(parse_hgvs(variants, "6"))
+
+    assert formatted.tolist()[:6] == [
+        "g.123A>G",
+        "g.100_102delACT",
+        "g.5dup",
+        "g.10_11insAT",
+        "g.20_22delinsAT",
+        "c.11+5_12-3inv",
+    ]
+    assert pd.isna(formatted.iloc[6])
+
+
+def test_parse_hgvs_variant():
+    """A single description is parsed into the values of the columns."""
+    assert parse_hgvs_variant("g.123A>G", "6") == ("6", 123, 123, "A", "G", "subst", "g", "123")
+    assert parse_hgvs_variant("junk", "6") == (None,) * len(HGVS_COLUMNS)
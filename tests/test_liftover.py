@@ -0,0 +1,85 @@
+"""
+Tests of the conversion of positions between assemblies with the index of a chain file.
+"""
+
+# pylint: disable=import-error
+
+import io
+
+import pandas as pd
+import pytest
+from pyliftover.chainfile import LiftOverChainFile
+
+from src.tools.liftover import ChainIndex, LiftOverError
+
+# A forward chain with a gap on chr1, and a chain mapping chr6 to the reverse strand
+CHAIN_FILE = b"""chain 1000 chr1 1000 + 0 70 chr1 1000 + 10 85 1
+30\t10\t15
+30
+
+chain 1000 chr6 1000 + 0 100 chr6 500 - 50 150 2
+100
+"""
+
+
+def _convert(chain_file, chromosomes, positions):
+    """Convert positions with the index of a chain file."""
+    index = ChainIndex.from_chain_file(io.BytesIO(chain_file))
+    return index.convert(pd.Series(chromosomes), pd.Series(positions))
+
+
+def test_convert_forward_strand():
+    """Positions in aligned blocks are shifted, positions in gaps are not converted."""
+    converted = _convert(CHAIN_FILE, ["1", "chr1", "1", "1", "1", "1", "1"],
+                         [1, 30, 31, 40, 41, 70, 71])
+
+    assert converted["position"].tolist()[:2] == [11, 40]
+    assert converted["position"].tolist()[4:6] == [56, 85]
+    assert converted["position"].iloc[[2, 3, 6]].isna().all()
+    assert converted["chromosome"].tolist()[:2] == ["1", "1"]
+    assert converted["strand"].tolist()[:2] == ["+", "+"]
+
+
+def test_convert_reverse_strand():
+    """Positions mapped to the reverse strand are counted from the end of the target."""
+    converted = _convert(CHAIN_FILE, ["6", "6", "6"], [1, 50, 100])
+
+    assert converted["position"].tolist() == [450, 401, 351]
+    assert converted["strand"].tolist() == ["-", "-", "-"]
+
+
+def test_convert_matches_pyliftover():
+    """Converted 1-based positions match the 0-based conversions of pyliftover."""
+    reference = LiftOverChainFile(io.BytesIO(CHAIN_FILE))
+    positions = list(range(1, 121))
+
+    for chromosome in ("1", "6"):
+        converted = _convert(CHAIN_FILE, [chromosome] * len(positions), positions)
+        for position, row in zip(positions, converted.itertuples(index=False)):
+            hits = reference.query(f"chr{chromosome}", position - 1)
+            if not hits:
+                assert pd.isna(row.position)
+                continue
+
+            source_start, _, (target_start, chain) = hits[0]
+            expected = target_start + position - 1 - source_start
+            if chain.target_strand == "-":
+                expected = chain.target_size - 1 - expected
+            assert (row.position, row.strand) == (expected + 1, chain.target_strand)
+
+
+def test_convert_unknown_chromosome():
+    """Positions on chromosomes without chain are not converted."""
+    converted = _convert(CHAIN_FILE, ["2", "X"], [1, 1])
+
+    assert converted["position"].isna().all()
+
+
+@pytest.mark.parametrize("chain_file", [
+    b"chain 1000 chr1 1000 + 0 80 chr1 1000 + 10 85 1\n30\t10\t15\n30\n",
+    b"chain 1000 chr1 1000 + 0 70 chr1 1000 + 10 85 1\n30\t10\t15\n",
+])
+def test_invalid_chain_file(chain_file):
+    """Chains whose blocks do not match their spans are rejected."""
+    with pytest.raises(LiftOverError):
+        ChainIndex.from_chain_file(io.BytesIO(chain_file))
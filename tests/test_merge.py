@@ -0,0 +1,138 @@
+"""
+Tests of the merges of LOVD and gnomAD data: in memory, partitioned, and incremental updates.
+"""
+
+# pylint: disable=import-error
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.refactoring import merge_gnomad_lovd
+from src.data.partitioned_merge import merge_gnomad_lovd_partitioned
+from src.data.incremental_merge import update_merged_lovd_gnomad
+
+
+def _lovd_data(count=200, edited=()):
+    """LOVD variants on transcripts with the DNA of their variants on genome."""
+    positions = np.arange(1000, 1000 + 10 * count, 10)
+    positions[list(edited)] += 1
+    return pd.DataFrame({
+        "id": [f"{number:010d}" for number in range(count)],
+        "VariantOnTranscript/DNA": [f"c.{number}A>G" for number in range(count)],
+        "VariantOnGenome/DNA": [f"g.{position}A>G" for position in positions],
+        "VariantOnGenome/DNA/hg38": [f"g.{position}A>G" for position in positions],
+    })
+
+
+def _gnomad_data(count=300, seed=0):
+    """gnomAD variants, half of them at the positions of the LOVD variants."""
+    rng = np.random.default_rng(seed)
+    positions = np.concatenate([np.arange(1000, 1000 + 10 * (count // 2), 10),
+                                rng.integers(10 ** 6, 10 ** 7, count - count // 2)])
+    return pd.DataFrame({
+        "variant_id": [f"6-{position}-A-G" for position in positions],
+        "allele_frequency": rng.random(count),
+        "population": "nfe",
+    })
+
+
+def _merge(lovd, gnomad):
+    """Merge LOVD and gnomAD data in memory, as CSV."""
+    return merge_gnomad_lovd(lovd.copy(), gnomad.copy()).to_csv(index=False)
+
+
+def _batches(frame, rows):
+    """Split a frame into batches of rows."""
+    return [frame.iloc[start:start + rows].copy() for start in range(0, len(frame), rows)]
+
+
+def _rows(text):
+    """The header and the sorted rows of a CSV text, as they are written."""
+    frame = pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False)
+    rows = frame.sort_values(list(frame.columns)).reset_index(drop=True)
+    return list(frame.columns), rows
+
+
+def _assert_same_rows(expected, actual):
+    """Assert that two CSV texts have the same columns and rows, in any order."""
+    expected_columns, expected_rows = _rows(expected)
+    actual_columns, actual_rows = _rows(actual)
+    assert expected_columns == actual_columns
+    pd.testing.assert_frame_equal(expected_rows, actual_rows)
+
+
+@pytest.mark.parametrize("partitions", [1, 4, 64])
+def test_partitioned_merge_matches_in_memory_merge(tmp_path, partitions):
+    """Merging partition by partition gives the rows of merging in memory."""
+    lovd, gnomad = _lovd_data(), _gnomad_data()
+    output = io.StringIO()
+
+    rows = merge_gnomad_lovd_partitioned(_batches(lovd, 70), _batches(gnomad, 40), output,
+                                         str(tmp_path), partitions)
+
+    expected = _merge(lovd, gnomad)
+    assert rows == len(_rows(expected)[1])
+    _assert_same_rows(expected, output.getvalue())
+    assert not list(tmp_path.iterdir())
+
+
+def _update(old_sources, sources, changed=("lovd", "gnomad")):
+    """Update the merge of the old LOVD and gnomAD data to the new data, as CSV."""
+    (old_lovd, old_gnomad), (lovd, gnomad) = old_sources, sources
+    merged = pd.read_csv(io.StringIO(_merge(old_lovd, old_gnomad)), dtype=str,
+                         keep_default_na=False)
+    output = io.StringIO()
+
+    counts = update_merged_lovd_gnomad(
+        _batches(merged, 50),
+        lovd.copy(),
+        old_lovd.copy() if "lovd" in changed else None,
+        lambda: _batches(gnomad, 40),
+        _batches(old_gnomad, 40) if "gnomad" in changed else None,
+        output,
+    )
+    return counts, output.getvalue()
+
+
+def test_incremental_merge_matches_full_merge():
+    """Updating a merge to new sources gives the rows of merging the new sources."""
+    old_lovd, old_gnomad = _lovd_data(), _gnomad_data()
+    lovd = _lovd_data(edited=[3, 50, 51])
+    gnomad = old_gnomad.drop(index=[5, 200]).copy()
+    gnomad.loc[10:40:3, "allele_frequency"] = 0.5
+    gnomad = pd.concat([gnomad, pd.DataFrame({
+        "variant_id": ["6-1031-A-G", "6-5-C-T"],
+        "allele_frequency": [0.1, 0.2],
+        "population": "nfe",
+    })], ignore_index=True)
+
+    counts, updated = _update((old_lovd, old_gnomad), (lovd, gnomad))
+
+    kept, merged_again = counts
+    assert kept > 0 and merged_again > 0
+    _assert_same_rows(_merge(lovd, gnomad), updated)
+
+
+@pytest.mark.parametrize("changed", ["lovd", "gnomad"])
+def test_incremental_merge_one_source_changed(changed):
+    """Updating a merge when only one source changed gives the rows of merging from scratch."""
+    old_lovd, old_gnomad = _lovd_data(), _gnomad_data()
+    lovd = _lovd_data(edited=[7]) if changed == "lovd" else old_lovd
+    gnomad = _gnomad_data(seed=1) if changed == "gnomad" else old_gnomad
+
+    _, updated = _update((old_lovd, old_gnomad), (lovd, gnomad), [changed])
+
+    _assert_same_rows(_merge(lovd, gnomad), updated)
+
+
+def test_incremental_merge_columns_changed():
+    """Sources whose columns changed cannot be updated incrementally."""
+    old_lovd, gnomad = _lovd_data(), _gnomad_data()
+    lovd = old_lovd.assign(extra="value")
+
+    counts, _ = _update((old_lovd, gnomad), (lovd, gnomad), ["lovd"])
+
+    assert counts is None
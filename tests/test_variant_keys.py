@@ -0,0 +1,74 @@
+"""
+Tests of the packing of variants into int64 keys.
+"""
+
+# pylint: disable=import-error
+
+import pandas as pd
+
+from src.data.variant_keys import (
+    MISSING_KEY,
+    pack_variant_keys,
+    position_keys,
+    unpack_variant_keys,
+    variant_keys_from_ids,
+)
+
+
+def test_pack_unpack_round_trip():
+    """Unpacking keys gives back the variants, with hashed long alleles."""
+    variants = pd.DataFrame({
+        "chrom": ["6", "X", "M", "7", "6"],
+        "pos": [123, 5, 1, 10, 100],
+        "ref": ["A", "C", "G", "ACGTACGTACGTACGT", "T"],
+        "alt": ["G", "T", "A", "A", "TTT"],
+    }, index=[3, 1, 4, 1, 5])
+
+    keys, alleles = pack_variant_keys(variants["chrom"], variants["pos"], variants["ref"],
+                                      variants["alt"])
+    unpacked = unpack_variant_keys(keys, alleles)
+
+    assert keys.index.equals(variants.index)
+    assert list(alleles.values()) == [("ACGTACGTACGTACGT", "A")]
+    assert unpacked["chrom"].tolist() == variants["chrom"].tolist()
+    assert unpacked["pos"].tolist() == variants["pos"].tolist()
+    assert unpacked["ref"].tolist() == variants["ref"].tolist()
+    assert unpacked["alt"].tolist() == variants["alt"].tolist()
+
+
+def test_pack_variant_keys_equal_and_ordered():
+    """Keys ignore the `chr` prefix and are ordered by chromosome and position."""
+    keys, _ = pack_variant_keys(pd.Series(["chr6", "6", "6", "7", "X"]),
+                                pd.Series([123, 123, 124, 1, 1]),
+                                pd.Series(["A", "A", "A", "A", "A"]),
+                                pd.Series(["G", "G", "G", "G", "G"]))
+
+    assert keys[0] == keys[1]
+    assert keys.is_monotonic_increasing
+    assert position_keys(keys)[2] == position_keys(pd.Series([keys[2] + 1]))[0]
+
+
+def test_pack_variant_keys_incomplete_variants():
+    """Incomplete variants, invalid positions and unknown chromosomes have the missing key."""
+    keys, _ = pack_variant_keys(pd.Series(["6", "Z", "6", None, "6"]),
+                                pd.Series([1, 5, 0, 4, 200]),
+                                pd.Series(["A", "A", "A", "A", "A"]),
+                                pd.Series(["C", "C", "C", "C", None]))
+    unpacked = unpack_variant_keys(keys, {})
+
+    assert keys.tolist()[1:] == [MISSING_KEY] * 4
+    assert unpacked.iloc[1:].isna().all().all()
+
+
+def test_variant_keys_from_ids():
+    """gnomAD IDs are packed like their parts, deletions without alleles are kept."""
+    keys, alleles = variant_keys_from_ids(
+        pd.Series(["6-123-A-G", "chr6-123-del", "X-5-C-T", "bad", None])
+    )
+    expected, _ = pack_variant_keys(pd.Series(["6", "X"]), pd.Series([123, 5]),
+                                    pd.Series(["A", "C"]), pd.Series(["G", "T"]))
+    unpacked = unpack_variant_keys(keys, alleles)
+
+    assert keys[[0, 2]].tolist() == expected.tolist()
+    assert unpacked.loc[1, ["ref", "alt"]].tolist() == ["", "del"]
+    assert keys[[3, 4]].tolist() == [MISSING_KEY, MISSING_KEY]